@@ -1,7 +1,14 @@
 """Gunicorn configuration for QuizWeaver."""
 
+import os
+
 bind = "0.0.0.0:8000"
-workers = 2  # Keep low for SQLite (avoids write contention)
+# SQLite runs in WAL mode with busy_timeout (src/database.py SQLITE_PRAGMAS), so
+# workers read concurrently and queue for the single write lock instead of failing.
+# tests/test_sqlite_profile.py exercises this default of 4 workers x 4 threads.
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))  # gthread: SSE streams hold a thread, not a whole worker
+# Background generation jobs run on their own pool (jobs.max_workers in config.yaml)
 timeout = 120
 accesslog = "-"
 errorlog = "-"
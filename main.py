@@ -4,17 +4,20 @@ from datetime import date, datetime
 
 import yaml
 from dotenv import load_dotenv
+from sqlalchemy.orm import selectinload
 
 from src.agents import run_agentic_pipeline
 from src.classroom import create_class, get_class, list_classes, set_active_class
 from src.cost_tracking import format_cost_report, get_cost_summary
-from src.database import Asset, Lesson, Question, Quiz, get_engine, get_session, init_db
+from src.database import Asset, Lesson, Question, Quiz, add_questions_to_bank, get_engine, get_session, init_db
 from src.export import create_qti_package, generate_pdf_preview
 from src.image_gen import generate_image
+from src.image_pipeline import DEFAULT_MAX_IMAGES, image_page, parse_page_ranges, select_images
 
 # Import from our new library structure
 from src.ingestion import get_retake_analysis, ingest_content
 from src.lesson_tracker import get_assumed_knowledge, list_lessons, log_lesson
+from src.retrieval import select_lesson_context
 from src.review import interactive_review
 
 
@@ -57,6 +60,30 @@ def handle_ingest(config):
     print("[OK] Ingestion complete.")
 
 
+def _image_assets(session):
+    """Load extracted image assets with their lessons (one extra IN query, not one per asset)."""
+    return session.query(Asset).options(selectinload(Asset.lesson)).filter_by(asset_type="image").all()
+
+
+def _image_candidates(assets):
+    """Pair each image asset with the analyzed text of the page it came from."""
+    candidates = []
+    for asset in assets:
+        page_text = ""
+        page = image_page(asset.path)
+        page_data = asset.lesson.page_data if asset.lesson else None
+        if page and isinstance(page_data, list) and page <= len(page_data) and isinstance(page_data[page - 1], dict):
+            analysis = page_data[page - 1]
+            diagrams = " ".join(
+                f"{d.get('description', '')} {d.get('caption', '')}"
+                for d in analysis.get("diagrams") or []
+                if isinstance(d, dict)
+            )
+            page_text = " ".join([analysis.get("text_content", ""), *(analysis.get("headings") or []), diagrams])
+        candidates.append((asset.path, page_text))
+    return candidates
+
+
 def handle_generate(config, args):
     """Handles the "generate" command."""
     print("--- Starting Quiz Generation ---")
@@ -80,26 +107,46 @@ def handle_generate(config, args):
 
     # --- 1. Load Data & Analyze ---
     print("\nStep 1: Loading content and analyzing retake...")
-    all_lessons = session.query(Lesson).all()
-    content_summary = "\n".join([lesson.content for lesson in all_lessons])
-
-    # Aggregate structured page data if available
-    structured_data = []
-    for lesson in all_lessons:
-        if lesson.page_data:
-            if isinstance(lesson.page_data, list):
-                structured_data.extend(lesson.page_data)
-            else:
-                structured_data.append(lesson.page_data)
-
-    all_assets = session.query(Asset).filter_by(asset_type="image").all()
-    extracted_images = [asset.path for asset in all_assets]
+    requested_topics = [t.strip() for t in (getattr(args, "topics", None) or "").split(",") if t.strip()]
+    sol_standards = args.sol if args.sol else config["generation"]["sol_standards"]
+    retrieved = select_lesson_context(session, config, requested_topics, sol_standards, class_id=class_id)
+    if retrieved:
+        # Only the lesson chunks relevant to the topics/standards, within a token budget
+        content_summary = retrieved["content_summary"]
+        structured_data = []
+        stats = retrieved["stats"]
+        print(
+            f"   - Using {stats['chunks']} of {stats['total_chunks']} content chunks "
+            f"(~{stats['tokens']} of {stats['library_tokens']} tokens)."
+        )
+    else:
+        all_lessons = session.query(Lesson).all()
+        content_summary = "\n".join([lesson.content for lesson in all_lessons])
+
+        # Aggregate structured page data if available
+        structured_data = []
+        for lesson in all_lessons:
+            if lesson.page_data:
+                if isinstance(lesson.page_data, list):
+                    structured_data.extend(lesson.page_data)
+                else:
+                    structured_data.append(lesson.page_data)
+
+    all_assets = _image_assets(session)
+    images_config = config.get("generation", {}).get("images") or {}
+    extracted_images = select_images(
+        _image_candidates(all_assets),
+        topics=requested_topics,
+        pages=parse_page_ranges(args.pages) if getattr(args, "pages", None) else None,
+        max_images=int(images_config.get("max_images", DEFAULT_MAX_IMAGES)),
+    )
+    if len(extracted_images) < len(all_assets):
+        print(f"   - Using {len(extracted_images)} of {len(all_assets)} extracted images.")
 
     retake_text, est_q_count, img_count, img_ratio = get_retake_analysis(config)
 
     num_questions = args.count if args.count else est_q_count
     grade_level = args.grade if args.grade else config["generation"]["default_grade_level"]
-    sol_standards = args.sol if args.sol else config["generation"]["sol_standards"]
 
     # --- 2. Create Quiz Record ---
     print("\nStep 2: Creating new quiz record...")
@@ -136,8 +183,10 @@ def handle_generate(config, args):
         "grade_level": grade_level,
         "sol_standards": sol_standards,
     }
+    if retrieved:
+        context["critic_content_summary"] = retrieved["critic_content_summary"]
 
-    questions, _generation_metadata = run_agentic_pipeline(config, context, class_id=class_id)
+    questions, generation_metadata = run_agentic_pipeline(config, context, class_id=class_id)
 
     if not questions:
         print("Error: AI Agent failed to generate valid questions.")
@@ -281,9 +330,15 @@ def handle_generate(config, args):
         )
         session.add(question_record)
 
+    surplus = (generation_metadata or {}).get("surplus_questions") or []
+    if surplus:
+        add_questions_to_bank(session, surplus, source_quiz_id=new_quiz.id)
+
     new_quiz.status = "generated"
     session.commit()
     print(f"   - Stored {len(questions)} questions for Quiz ID: {new_quiz.id}")
+    if surplus:
+        print(f"   - Saved {len(surplus)} surplus approved question(s) to the question bank.")
 
     # --- 5. Generate Output Files ---
     print("\nStep 5: Generating output files...")
@@ -551,6 +606,10 @@ def main():
     parser_generate.add_argument(
         "--class", dest="class_id", type=int, help="Override active class for this generation."
     )
+    parser_generate.add_argument(
+        "--topics", type=str, help="Comma-separated topics; only images from pages about them are sent."
+    )
+    parser_generate.add_argument("--pages", type=str, help="Only send images from these pages (e.g., '1-3,7').")
 
     # --- New Class Command ---
     parser_new_class = subparsers.add_parser("new-class", help="Create a new class/block.")
@@ -589,6 +648,7 @@ def main():
 
     # --- Register CLI module commands ---
     from src.cli.analytics_commands import register_analytics_commands
+    from src.cli.benchmark_commands import register_benchmark_commands
     from src.cli.class_commands import register_class_commands
     from src.cli.lesson_plan_commands import register_lesson_plan_commands
     from src.cli.provider_commands import register_provider_commands
@@ -613,6 +673,7 @@ def main():
     register_provider_commands(subparsers)
     register_variant_commands(subparsers)
     register_topic_commands(subparsers)
+    register_benchmark_commands(subparsers)
 
     args = parser.parse_args()
 
@@ -719,6 +780,10 @@ def main():
         from src.cli.provider_commands import handle_provider_info
 
         handle_provider_info(config, args)
+    elif args.command == "benchmark":
+        from src.cli.benchmark_commands import handle_benchmark
+
+        handle_benchmark(config, args)
     elif args.command == "generate-variant":
         from src.cli.variant_commands import handle_generate_variant
 
@@ -0,0 +1,22 @@
+-- Migration 014: Persisted API audit log
+-- Optional copy of the in-memory API audit ring buffer (llm.audit_log.persist),
+-- so transparency reports survive worker restarts.
+
+CREATE TABLE IF NOT EXISTS api_audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT,
+    provider TEXT,
+    model TEXT,
+    prompt_char_count INTEGER DEFAULT 0,
+    prompt_preview TEXT,
+    response_char_count INTEGER DEFAULT 0,
+    response_preview TEXT,
+    input_tokens INTEGER DEFAULT 0,
+    output_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,
+    duration_ms INTEGER DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_api_audit_log_run_id ON api_audit_log (run_id);
@@ -0,0 +1,14 @@
+-- Migration 015: Critic pass rates
+-- Running critic verdict counts per generator provider/model and question
+-- type, used to size over-generation (agent_loop.overgeneration).
+
+CREATE TABLE IF NOT EXISTS critic_pass_rates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL DEFAULT '',
+    question_type TEXT NOT NULL,
+    passed INTEGER DEFAULT 0,
+    total INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (provider, model, question_type)
+);
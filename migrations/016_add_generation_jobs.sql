@@ -0,0 +1,20 @@
+-- Migration 016: Background generation jobs
+-- Job records for the web app's bounded generation worker pool (src/jobs.py),
+-- polled by the /api/jobs status and result endpoints.
+
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT DEFAULT 'queued',
+    progress INTEGER DEFAULT 0,
+    message TEXT,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    user_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_generation_jobs_status ON generation_jobs (status);
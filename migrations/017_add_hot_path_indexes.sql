@@ -0,0 +1,13 @@
+-- Migration 017: Composite indexes for the hot query paths
+-- Quiz lists, question loading, the question bank, lesson history,
+-- analytics and standard provenance all filter (and mostly order) on these
+-- columns; without them every page scans the whole table.
+-- Mirrored by the Index declarations in src/database.py (used on PostgreSQL).
+
+CREATE INDEX IF NOT EXISTS ix_questions_quiz_id_sort_order ON questions (quiz_id, sort_order, id);
+CREATE INDEX IF NOT EXISTS ix_questions_saved_to_bank ON questions (saved_to_bank, id);
+CREATE INDEX IF NOT EXISTS ix_quizzes_class_id_created_at ON quizzes (class_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_quizzes_parent_quiz_id_created_at ON quizzes (parent_quiz_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_lesson_logs_class_id_date ON lesson_logs (class_id, date);
+CREATE INDEX IF NOT EXISTS ix_performance_data_class_id_topic_date ON performance_data (class_id, topic, date);
+CREATE INDEX IF NOT EXISTS ix_standard_excerpts_standard_id_sort_order ON standard_excerpts (standard_id, sort_order);
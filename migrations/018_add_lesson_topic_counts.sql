@@ -0,0 +1,39 @@
+-- Migration 018: Per-class lesson topic and standard counts
+-- Number of lessons tagged with each topic (lesson_logs.topics) or standard
+-- (lesson_logs.standards_addressed) per class. Maintained by the ORM on
+-- every lesson log insert, update and delete (src/database.py), and read by
+-- the topic picker and pacing guide progress instead of every lesson log.
+
+CREATE TABLE IF NOT EXISTS lesson_topic_counts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    lesson_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (class_id, kind, value)
+);
+
+-- Backfill from existing lesson logs. The JSON columns hold either an array
+-- or a JSON-encoded string containing the array; anything else counts as empty.
+INSERT OR IGNORE INTO lesson_topic_counts (class_id, kind, value, lesson_count)
+SELECT t.class_id, t.kind, trim(j.value), COUNT(DISTINCT t.id)
+FROM (
+    SELECT id, class_id, 'topic' AS kind, topics AS raw FROM lesson_logs
+    UNION ALL
+    SELECT id, class_id, 'standard' AS kind, standards_addressed AS raw FROM lesson_logs
+) t
+JOIN json_each(
+    CASE
+        WHEN NOT json_valid(t.raw) THEN '[]'
+        WHEN json_type(t.raw) = 'array' THEN t.raw
+        WHEN json_type(t.raw) = 'text' THEN
+            CASE
+                WHEN NOT json_valid(json_extract(t.raw, '$')) THEN '[]'
+                WHEN json_type(json_extract(t.raw, '$')) = 'array' THEN json_extract(t.raw, '$')
+                ELSE '[]'
+            END
+        ELSE '[]'
+    END
+) j
+WHERE j.type = 'text' AND trim(j.value) != ''
+GROUP BY t.class_id, t.kind, trim(j.value);
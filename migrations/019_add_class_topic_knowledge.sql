@@ -0,0 +1,55 @@
+-- Migration 019: Per-class assumed knowledge table
+-- One row per (class, topic) with depth, last_taught and mention_count,
+-- replacing the assumed_knowledge object inside classes.config. Written with
+-- one upsert per topic taught (src/lesson_tracker.py).
+
+CREATE TABLE IF NOT EXISTS class_topic_knowledge (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    class_id INTEGER NOT NULL REFERENCES classes(id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    depth INTEGER NOT NULL DEFAULT 1,
+    last_taught DATE,
+    mention_count INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (class_id, topic)
+);
+
+CREATE INDEX IF NOT EXISTS ix_class_topic_knowledge_class_id_depth
+    ON class_topic_knowledge (class_id, depth);
+CREATE INDEX IF NOT EXISTS ix_class_topic_knowledge_class_id_last_taught
+    ON class_topic_knowledge (class_id, last_taught);
+CREATE INDEX IF NOT EXISTS ix_class_topic_knowledge_class_id_mention_count
+    ON class_topic_knowledge (class_id, mention_count);
+
+-- Backfill from classes.config. The column holds either an object or a
+-- JSON-encoded string containing the object; anything else has no knowledge.
+-- Topics that already have a row are left alone.
+INSERT OR IGNORE INTO class_topic_knowledge (class_id, topic, depth, last_taught, mention_count)
+SELECT
+    c.id,
+    k.key,
+    COALESCE(CAST(json_extract(k.value, '$.depth') AS INTEGER), 1),
+    date(substr(json_extract(k.value, '$.last_taught'), 1, 10)),
+    COALESCE(CAST(json_extract(k.value, '$.mention_count') AS INTEGER), 1)
+FROM (
+    SELECT
+        id,
+        CASE
+            WHEN NOT json_valid(config) THEN '{}'
+            WHEN json_type(config) = 'object' THEN config
+            WHEN json_type(config) = 'text' THEN
+                CASE
+                    WHEN NOT json_valid(json_extract(config, '$')) THEN '{}'
+                    WHEN json_type(json_extract(config, '$')) = 'object' THEN json_extract(config, '$')
+                    ELSE '{}'
+                END
+            ELSE '{}'
+        END AS cfg
+    FROM classes
+) c
+JOIN json_each(
+    CASE
+        WHEN json_type(c.cfg, '$.assumed_knowledge') = 'object' THEN json_extract(c.cfg, '$.assumed_knowledge')
+        ELSE '{}'
+    END
+) k
+WHERE k.type = 'object';
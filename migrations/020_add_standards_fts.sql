@@ -0,0 +1,38 @@
+-- Migration 020: Full-text search index over standards
+-- FTS5 table over code, description, strand, full text and the curriculum
+-- framework content (essential knowledge, understandings and skills), read
+-- by search_standards() for ranked prefix search. Triggers keep it in step
+-- with every insert, update and delete on standards. Must match
+-- STANDARDS_FTS_DDL in src/database.py.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS standards_fts USING fts5(
+    code, description, strand, full_text, curriculum, prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS standards_fts_insert AFTER INSERT ON standards BEGIN
+    INSERT INTO standards_fts (rowid, code, description, strand, full_text, curriculum)
+    VALUES (new.id, new.code, new.description, new.strand, new.full_text,
+            coalesce(new.essential_knowledge, '') || ' ' || coalesce(new.essential_understandings, '') || ' ' ||
+            coalesce(new.essential_skills, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS standards_fts_delete AFTER DELETE ON standards BEGIN
+    DELETE FROM standards_fts WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS standards_fts_update AFTER UPDATE OF code, description, strand, full_text,
+    essential_knowledge, essential_understandings, essential_skills ON standards BEGIN
+    DELETE FROM standards_fts WHERE rowid = old.id;
+    INSERT INTO standards_fts (rowid, code, description, strand, full_text, curriculum)
+    VALUES (new.id, new.code, new.description, new.strand, new.full_text,
+            coalesce(new.essential_knowledge, '') || ' ' || coalesce(new.essential_understandings, '') || ' ' ||
+            coalesce(new.essential_skills, ''));
+END;
+
+-- Backfill from existing standards (rebuilt from scratch, so re-running is safe)
+DELETE FROM standards_fts;
+INSERT INTO standards_fts (rowid, code, description, strand, full_text, curriculum)
+SELECT id, code, description, strand, full_text,
+       coalesce(essential_knowledge, '') || ' ' || coalesce(essential_understandings, '') || ' ' ||
+       coalesce(essential_skills, '')
+FROM standards;
@@ -4,6 +4,8 @@ Reusable trial run script for QuizWeaver.
 
 Tests all CLI features with a specified LLM provider/model and generates exports.
 Outputs go to trial_run_outputs/<model_name>/ for easy comparison.
+For latency, token, cost and critic pass-rate comparisons between providers,
+use ``python main.py benchmark`` (src/benchmark.py) instead.
 
 Usage:
     python scripts/run_trial.py --provider gemini --model gemini-2.5-flash
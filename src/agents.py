@@ -1,19 +1,33 @@
+import contextvars
 import json
 import logging
+import math
 import os
 import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from src.cognitive_frameworks import BLOOMS_LEVELS, DOK_LEVELS, FRAMEWORK_BLOOMS, get_framework
 from src.cost_tracking import check_rate_limit, estimate_cost, estimate_pipeline_cost, estimate_tokens
-from src.critic_validation import pre_validate_questions
-from src.database import Class, get_engine, get_session
+from src.critic_validation import DUPLICATE_SIMILARITY_THRESHOLD, pre_validate_questions
+from src.database import Class, get_critic_pass_rates, get_engine, get_session, record_critic_outcomes
+from src.image_pipeline import ImagePipeline
+from src.json_extraction import IncrementalArrayParser, extract_json_array, extract_json_object
 from src.lesson_tracker import get_assumed_knowledge, get_recent_lessons
-from src.llm_provider import PROVIDER_MOCK, get_api_audit_log, get_provider
+from src.llm_provider import PROVIDER_MOCK, CacheablePrefix, audit_run, current_audit_run, get_provider
+from src.tracing import current_tracer, export_trace, start_trace, trace_span
 
 logger = logging.getLogger(__name__)
 
 
+class PipelineCancelled(BaseException):
+    """Raised from an ``on_event`` callback to stop a running pipeline.
+
+    Derives from BaseException, like ``asyncio.CancelledError``, so the
+    pipeline's per-stage ``except Exception`` recovery lets it through.
+    """
+
+
 class AgentMetrics:
     """Tracks performance metrics for a pipeline run."""
 
@@ -32,6 +46,14 @@ class AgentMetrics:
         # Token usage tracking
         self.input_tokens = 0
         self.output_tokens = 0
+        self.cached_tokens = 0  # prompt tokens served from the provider's prompt cache
+        # Busy time per stage; in pipelined runs stages overlap, so the sum
+        # can exceed duration_seconds
+        self.stage_seconds = {"generate": 0.0, "pre_validate": 0.0, "critique": 0.0}
+        self.pipelined = False
+
+    def record_stage(self, stage: str, seconds: float):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
 
     def start(self):
         self.start_time = time.time()
@@ -64,6 +86,9 @@ class AgentMetrics:
             "input_tokens": self.input_tokens,
             "output_tokens": self.output_tokens,
             "total_tokens": self.input_tokens + self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+            "pipelined": self.pipelined,
         }
 
 
@@ -111,6 +136,7 @@ class GeneratorAgent:
         """
         self.config = config
         self.provider = provider or get_provider(config)
+        self.image_pipeline = ImagePipeline(self.provider, config.get("generation", {}).get("images"))
         self.base_prompt = load_prompt("generator_prompt.txt")
 
     def generate(self, context: Dict[str, Any], feedback: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -139,6 +165,50 @@ class GeneratorAgent:
             - title: Optional question title
             - image_ref: Optional image reference
         """
+        with trace_span("generator.generate", num_questions=context.get("num_questions", 10), retry=bool(feedback)):
+            with trace_span("generator.prompt"):
+                prompt_parts = self._build_prompt_parts(context, feedback)
+
+            # Call LLM
+            with trace_span("generator.llm_call") as span:
+                response_text = self.provider.generate(prompt_parts, json_mode=True)
+                if span is not None:
+                    span.set(response_chars=len(response_text or ""))
+
+            with trace_span("generator.parse") as span:
+                questions = _parse_generator_response(response_text, span)
+            return questions
+
+    def generate_stream(self, context: Dict[str, Any], feedback: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Generate quiz questions, yielding each one as soon as it is complete.
+
+        Uses the provider's streaming API and parses question objects out of
+        the token stream incrementally, so the first question is available
+        long before the model finishes the whole array.
+
+        Args:
+            context: Same generation context as generate().
+            feedback: Optional feedback from Critic agent to improve generation.
+
+        Yields:
+            Normalized question dictionaries (see generate()).
+        """
+        with trace_span("generator.generate", num_questions=context.get("num_questions", 10), retry=bool(feedback)):
+            with trace_span("generator.prompt"):
+                prompt_parts = self._build_prompt_parts(context, feedback)
+            parser = IncrementalArrayParser()
+            # Parsing is interleaved with the token stream, so one span covers both
+            with trace_span("generator.llm_call", streamed=True) as span:
+                for chunk in self.provider.stream_generate(prompt_parts, json_mode=True):
+                    for q in parser.feed(chunk):
+                        yield _normalize_question(q)
+                if span is not None:
+                    span.set(questions=parser.parsed, skipped=parser.skipped)
+            if parser.skipped:
+                print(f"Warning: skipped {parser.skipped} malformed question object(s) in streamed response.")
+
+    def _build_prompt_parts(self, context: Dict[str, Any], feedback: Optional[str] = None) -> list:
+        """Assemble the generator prompt (text plus prepared images) for *context*."""
         # Unpack context
         content_summary = context.get("content_summary", "")
         structured_data = context.get("structured_data", [])
@@ -177,18 +247,15 @@ class GeneratorAgent:
         prompt_text = prompt_text.replace("{class_context}", class_context_section)
         prompt_text = prompt_text.replace("{cognitive_section}", cognitive_section)
 
-        full_prompt = f"""
+        # Everything that stays the same across attempts goes first so
+        # providers can serve it from their prompt cache; the feedback and
+        # the per-attempt task (question count) form the variable suffix.
+        prefix = f"""
 {prompt_text}
 
 **CRITICAL INSTRUCTIONS:**
 {qa_guidelines_content}
 
-{feedback_section}
-
-**Task:**
-Generate {num_questions} unique quiz questions.
-Image Ratio Target: {int(image_ratio * 100)}%
-
 **Image Policy:**
 Do NOT include image URLs or links in your response — any URLs you generate will be fake.
 Instead, if a question would benefit from a visual (diagram, chart, photo, etc.), include an
@@ -204,163 +271,29 @@ The teacher will add or generate the actual image later. Do NOT include "image"
 **Previous Test Questions (for style reference, do not copy):**
 {retake_text}
 ---
+"""
+        suffix = f"""
+{feedback_section}
+
+**Task:**
+Generate {num_questions} unique quiz questions.
+Image Ratio Target: {int(image_ratio * 100)}%
 """
 
-        prompt_parts = [full_prompt]
+        prompt_parts = [CacheablePrefix(prefix)]
 
-        # Add images
-        for img_path in images:
+        # Add images (part of the stable prefix); the pipeline downscales
+        # them and reuses the prepared payloads across attempts
+        for img_path in images[: self.image_pipeline.max_images]:
             try:
-                img_context = self.provider.prepare_image_context(img_path)
+                img_context = self.image_pipeline.prepare(img_path)
                 prompt_parts.append(img_context)
-                prompt_parts.append(f"Context for image: {os.path.basename(img_path)}")
+                prompt_parts.append(CacheablePrefix(f"Context for image: {os.path.basename(img_path)}"))
             except Exception as e:
                 print(f"Could not prepare image context for {img_path}: {e}")
 
-        # Call LLM
-        response_text = self.provider.generate(prompt_parts, json_mode=True)
-
-        # Parse JSON
-        try:
-            cleaned_text = response_text.strip()
-            # Remove markdown code blocks if present
-            if cleaned_text.startswith("```"):
-                lines = cleaned_text.splitlines()
-                # Remove first line if it starts with ```
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                # Remove last line if it starts with ```
-                if lines and lines[-1].strip().startswith("```"):
-                    lines = lines[:-1]
-                cleaned_text = "\n".join(lines)
-
-            # Attempt to find list brackets
-            start = cleaned_text.find("[")
-            end = cleaned_text.rfind("]")
-            if start != -1 and end != -1:
-                cleaned_text = cleaned_text[start : end + 1]
-
-            questions = json.loads(cleaned_text)
-
-            if not isinstance(questions, list):
-                print("Generator output is not a list.")
-                return []
-
-            valid_questions = []
-            for q in questions:
-                if not isinstance(q, dict):
-                    continue
-
-                # Normalization: Map keys if necessary
-                if "text" not in q:
-                    # Check for various common keys returned by LLMs
-                    for key in ["question_text", "question", "stem", "prompt", "body"]:
-                        if key in q:
-                            q["text"] = q[key]
-                            break
-
-                # After all normalization attempts, if 'text' is still missing, log a warning
-                if "text" not in q:
-                    print(f"Warning: Question missing 'text' after normalization. Raw: {json.dumps(q)}")
-
-                if "title" not in q and "question_title" in q:
-                    q["title"] = q["question_title"]
-
-                if "correct_answer" not in q and "answer" in q:
-                    q["correct_answer"] = q["answer"]
-
-                if "image_ref" not in q and "image_url" in q:
-                    q["image_ref"] = q["image_url"]
-
-                if "image_ref" not in q and "question_image" in q:  # New normalization
-                    q["image_ref"] = q["question_image"]
-
-                # Normalization: Handle Options (Dict -> List)
-                if isinstance(q.get("options"), dict):
-                    opts_map = q["options"]
-                    sorted_keys = sorted(opts_map.keys())  # ["A", "B", "C", "D"]
-                    q["options"] = [opts_map[k] for k in sorted_keys]
-
-                    # Map correct_answer (e.g., "C") to index
-                    if "correct_answer" in q:
-                        ans = str(q["correct_answer"]).upper()
-                        if ans in sorted_keys:
-                            q["correct_index"] = sorted_keys.index(ans)
-
-                # Normalization: Handle correct_answer if options is already a list
-                elif isinstance(q.get("options"), list):
-                    if "correct_index" not in q and "correct_answer" in q:
-                        ans = q["correct_answer"]
-                        # If answer is a string letter "A", "B"...
-                        if isinstance(ans, str) and len(ans) == 1 and ans.isalpha():
-                            idx = ord(ans.upper()) - ord("A")
-                            if 0 <= idx < len(q["options"]):
-                                q["correct_index"] = idx
-                        # If answer is the text of the option
-                        elif ans in q["options"]:
-                            q["correct_index"] = q["options"].index(ans)
-
-                # Normalize cognitive level fields
-                if "cognitive_level" not in q:
-                    for key in ["bloom_level", "blooms_level", "dok_level", "webb_level"]:
-                        if key in q:
-                            q["cognitive_level"] = q[key]
-                            break
-                if "cognitive_level" in q and "cognitive_framework" not in q:
-                    # Infer framework from level name
-                    level_name = str(q["cognitive_level"]).strip()
-                    blooms_names = {lvl["name"].lower(): lvl for lvl in BLOOMS_LEVELS}
-                    dok_names = {lvl["name"].lower(): lvl for lvl in DOK_LEVELS}
-                    if level_name.lower() in blooms_names:
-                        q["cognitive_framework"] = "blooms"
-                        if "cognitive_level_number" not in q:
-                            q["cognitive_level_number"] = blooms_names[level_name.lower()]["number"]
-                    elif level_name.lower() in dok_names:
-                        q["cognitive_framework"] = "dok"
-                        if "cognitive_level_number" not in q:
-                            q["cognitive_level_number"] = dok_names[level_name.lower()]["number"]
-
-                # Map LLM-style question_type to internal type
-                if "type" not in q and "question_type" in q:
-                    _type_map = {
-                        "multiple choice": "mc",
-                        "multiple_choice": "mc",
-                        "true/false": "tf",
-                        "true false": "tf",
-                        "short answer": "short_answer",
-                        "short_answer": "short_answer",
-                        "fill in the blank": "fill_in_blank",
-                        "fill_in_blank": "fill_in_blank",
-                        "matching": "matching",
-                        "essay": "essay",
-                        "ordering": "ordering",
-                    }
-                    mapped = _type_map.get(q["question_type"].lower().strip())
-                    if mapped:
-                        q["type"] = mapped
-
-                if "type" not in q:
-                    # Try to infer type from structure
-                    if "options" in q:
-                        if "correct_indices" in q:
-                            q["type"] = "ma"
-                        else:
-                            q["type"] = "mc"
-                    elif "is_true" in q:
-                        q["type"] = "tf"
-                    elif "text" in q:
-                        q["type"] = "short_answer"
-
-                if not q.get("points"):
-                    q["points"] = 1
-                valid_questions.append(q)
-
-            return valid_questions
-
-        except json.JSONDecodeError as e:
-            print(f"Error parsing Generator response: {e}")
-            print(f"Raw LLM Response: {response_text}")
-            return []
+        prompt_parts.append(suffix)
+        return prompt_parts
 
 
 class CriticAgent:
@@ -407,6 +340,42 @@ class CriticAgent:
             - failed_indices: List of indices that failed
             - overall_notes: General observations
         """
+        with trace_span("critic.critique", questions=len(questions)) as span:
+            result = self._critique(
+                questions, guidelines, content_summary, class_context, cognitive_config, teacher_config
+            )
+            if span is not None:
+                span.set(passed=len(result.get("passed_indices", [])), failed=len(result.get("failed_indices", [])))
+            return result
+
+    def _critique(
+        self,
+        questions: List[Dict[str, Any]],
+        guidelines: str,
+        content_summary: str,
+        class_context: Optional[Dict[str, Any]],
+        cognitive_config: Optional[Dict[str, Any]],
+        teacher_config: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Body of :meth:`critique`, timed in prompt, LLM call and parse spans."""
+        with trace_span("critic.prompt"):
+            prefix, draft = self._build_prompt(questions, guidelines, content_summary, class_context, cognitive_config)
+        with trace_span("critic.llm_call") as span:
+            response_text = self.provider.generate([CacheablePrefix(prefix), draft], json_mode=True)
+            if span is not None:
+                span.set(response_chars=len(response_text or ""))
+        with trace_span("critic.parse"):
+            return _parse_critic_response(response_text, len(questions))
+
+    def _build_prompt(
+        self,
+        questions: List[Dict[str, Any]],
+        guidelines: str,
+        content_summary: str,
+        class_context: Optional[Dict[str, Any]],
+        cognitive_config: Optional[Dict[str, Any]],
+    ) -> tuple:
+        """Assemble the critic prompt as (cacheable prefix, per-draft suffix)."""
         prompt_text = self.base_prompt
 
         # Build cognitive validation section for critic
@@ -440,7 +409,9 @@ class CriticAgent:
                         )
                         class_context_section += f"- {topic}: depth {depth} ({label})\n"
 
-        full_prompt = f"""
+        # Instructions, guidelines and lesson context are identical for every
+        # draft of a quiz, so they form the cacheable prefix.
+        prefix = f"""
 {prompt_text}
 
 **QA Guidelines:**
@@ -448,13 +419,33 @@ class CriticAgent:
 
 **Reference Content Summary:**
 {content_summary}
-{class_context_section}
+{class_context_section}"""
+        draft = f"""
 **Quiz Draft:**
 {questions_json}
 """
-        response_text = self.provider.generate([full_prompt], json_mode=True)
+        return prefix, draft
+
 
-        return _parse_critic_response(response_text, len(questions))
+def _parse_generator_response(response_text: str, span=None) -> List[Dict[str, Any]]:
+    """Parse the generator's JSON array response into normalized question dicts.
+
+    Complete questions are recovered from truncated or partly malformed
+    arrays; the salvage statistics are recorded on *span* when given.
+    Returns an empty list when the response holds no JSON array.
+    """
+    extraction = extract_json_array(response_text, source="generator response")
+    if span is not None:
+        span.set(questions=len(extraction.items), **extraction.stats())
+    if not extraction.found:
+        print("Generator output is not a list.")
+        print(f"Raw LLM Response: {response_text}")
+    elif extraction.salvaged:
+        print(
+            f"Warning: salvaged {extraction.parsed} question(s) from a damaged generator response "
+            f"({extraction.skipped} malformed, {'truncated' if extraction.truncated else 'complete'})."
+        )
+    return [_normalize_question(q) for q in extraction.items]
 
 
 def _parse_critic_response(response_text: str, num_questions: int) -> Dict[str, Any]:
@@ -473,23 +464,9 @@ def _parse_critic_response(response_text: str, num_questions: int) -> Dict[str,
     """
     # Try structured JSON parse
     try:
-        cleaned = response_text.strip()
-        # Strip markdown fences
-        if cleaned.startswith("```"):
-            lines = cleaned.splitlines()
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip().startswith("```"):
-                lines = lines[:-1]
-            cleaned = "\n".join(lines)
-
-        # Find the JSON object
-        brace_start = cleaned.find("{")
-        brace_end = cleaned.rfind("}")
-        if brace_start != -1 and brace_end != -1:
-            cleaned = cleaned[brace_start : brace_end + 1]
-
-        data = json.loads(cleaned)
+        data = extract_json_object(response_text, source="critic response")
+        if data is None:
+            data = _salvage_critic_verdicts(response_text, num_questions)
 
         if isinstance(data, dict) and "questions" in data:
             verdicts = data["questions"]
@@ -525,7 +502,7 @@ def _parse_critic_response(response_text: str, num_questions: int) -> Dict[str,
                 "overall_notes": overall,
             }
 
-    except (json.JSONDecodeError, KeyError, TypeError):
+    except (KeyError, TypeError, AttributeError):
         pass  # Fall through to legacy detection
 
     # Legacy fallback: plain-text "APPROVED" detection
@@ -549,14 +526,40 @@ def _parse_critic_response(response_text: str, num_questions: int) -> Dict[str,
     }
 
 
+def _salvage_critic_verdicts(response_text: str, num_questions: int) -> Optional[Dict[str, Any]]:
+    """Rebuild a critic result from a verdict array that was cut off.
+
+    Returns the verdicts that arrived intact; questions whose verdict was
+    lost fail so they are regenerated rather than silently dropped. Returns
+    None when the response holds no verdict array.
+    """
+    extraction = extract_json_array(response_text, source="critic response")
+    if not extraction.found or not extraction.truncated:
+        return None
+    seen = {v.get("index") for v in extraction.items}
+    verdicts = extraction.items + [
+        {"index": i, "verdict": "FAIL", "issues": ["No verdict (critic response was cut off)"]}
+        for i in range(num_questions)
+        if i not in seen
+    ]
+    return {"questions": verdicts, "overall_notes": ""}
+
+
 class Orchestrator:
-    def __init__(self, config: Dict[str, Any], web_mode: bool = False):
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        web_mode: bool = False,
+        pass_rates: Optional[Dict[str, tuple]] = None,
+    ):
         """Initialize the Orchestrator to coordinate Generator and Critic agents.
 
         Args:
             config: Application configuration dictionary containing agent loop settings,
                    LLM provider config, and retry limits.
             web_mode: If True, skip interactive input() approval gate (for web UI).
+            pass_rates: Historical critic ``{question_type: (passed, total)}`` for the
+                generator's provider/model, used by over-generation.
         """
         self.config = config
         # Create generator provider
@@ -572,26 +575,68 @@ class Orchestrator:
             # Separate critic config — let CriticAgent create its own provider
             self.critic = CriticAgent(critic_config)
 
-        self.max_retries = config.get("agent_loop", {}).get("max_retries", 3)
+        agent_loop = config.get("agent_loop", {})
+        self.max_retries = agent_loop.get("max_retries", 3)
+        pipeline = agent_loop.get("pipeline") or {}
+        self.pipelined = bool(pipeline.get("enabled", False))
+        self.chunk_size = max(1, int(pipeline.get("chunk_size", 5)))
+        self.max_parallel_generations = max(1, int(pipeline.get("max_parallel_generations", 2)))
+        self.max_parallel_critiques = max(1, int(pipeline.get("max_parallel_critiques", 3)))
+        overgeneration = agent_loop.get("overgeneration") or {}
+        self.overgeneration = bool(overgeneration.get("enabled", False))
+        self.target_probability = float(overgeneration.get("target_probability", 0.9))
+        self.max_extra_ratio = float(overgeneration.get("max_extra_ratio", 0.5))
+        self.prior_pass_rate = float(overgeneration.get("prior_pass_rate", 0.85))
+        self.prior_weight = float(overgeneration.get("prior_weight", 10))
+        self.pass_rates = pass_rates or {}
+        self.duplicate_threshold = float(agent_loop.get("duplicate_threshold", DUPLICATE_SIMILARITY_THRESHOLD))
         self.last_metrics = None
 
-    def run(self, context: Dict[str, Any]) -> tuple:
+    def run(self, context: Dict[str, Any], on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> tuple:
         """Run the generate-critique feedback loop with per-question granularity.
 
         New flow per attempt:
         1. Generate questions
         2. Pre-validate (deterministic) — remove structurally invalid questions
+           and near-duplicates of approved or same-batch questions
         3. LLM critique — get per-question verdicts
         4. Keep passed questions in accumulator
         5. If enough approved, stop early
         6. Otherwise regenerate only the still-needed count
 
+        With ``agent_loop.overgeneration.enabled`` each request asks for extra
+        questions, sized from historical critic pass rates, so the target is
+        usually met on the first attempt. Approved questions beyond the target
+        are returned as ``metadata["surplus_questions"]`` for the question bank.
+
+        With ``agent_loop.pipeline.enabled`` the same steps run on chunks of
+        ``chunk_size`` questions instead, so generating the next chunk
+        overlaps critiquing the previous ones (see :meth:`_run_pipelined`).
+
         Args:
             context: Generation context dictionary.
+            on_event: Optional callback ``on_event(event, payload)``. When set,
+                the generator streams and the callback receives a
+                ``"question"`` event per parsed question, a ``"verdict"``
+                event per critic verdict, and ``"status"`` events at each
+                stage transition.
+
+        Provider calls are attributed to a fresh audit run, so token totals
+        stay correct when several pipelines run in one process; its id is
+        returned as ``metadata["run_id"]``.
 
         Returns:
             Tuple of (questions, metadata).
         """
+        with audit_run() as run, trace_span("orchestrator.run", pipelined=self.pipelined) as span:
+            questions, metadata = self._run_loop(context, on_event)
+            if span is not None:
+                span.set(run_id=run.run_id, questions=len(questions))
+        metadata["run_id"] = run.run_id
+        return questions, metadata
+
+    def _run_loop(self, context: Dict[str, Any], on_event: Optional[Callable[[str, Dict[str, Any]], None]]) -> tuple:
+        """Body of :meth:`run`, executed inside the run's audit scope."""
         feedback = None
         guidelines = get_qa_guidelines()
         critic_history = []
@@ -627,6 +672,13 @@ class Orchestrator:
                         f"cover worst-case cost (${estimate['estimated_max_cost']:.4f})"
                     )
 
+        pass_rate = self._expected_pass_rate(context)
+        outcomes: Dict[str, Dict[str, int]] = {}
+        if self.pipelined:
+            return self._run_pipelined(
+                context, on_event, metrics, guidelines, teacher_config, target_count, pass_rate, outcomes
+            )
+
         approved_questions: List[Dict[str, Any]] = []
         consecutive_errors = 0
         max_errors = 2  # Abort after this many consecutive transient failures
@@ -636,19 +688,33 @@ class Orchestrator:
             if still_needed == 0:
                 break
 
-            print(f"   [Agent Loop] Attempt {attempt + 1}/{self.max_retries} (need {still_needed} more questions)...")
+            requested = self._planned_count(still_needed, pass_rate)
+            extra = f", requesting {requested}" if requested > still_needed else ""
+            print(
+                f"   [Agent Loop] Attempt {attempt + 1}/{self.max_retries} "
+                f"(need {still_needed} more questions{extra})..."
+            )
 
             # Update context for partial regeneration
             gen_context = dict(context)
-            gen_context["num_questions"] = still_needed
+            gen_context["num_questions"] = requested
 
             # Generate with error handling
+            _emit(on_event, "status", stage="generating", attempt=attempt + 1, still_needed=still_needed)
+            stage_start = time.monotonic()
             try:
-                audit_before = len(get_api_audit_log())
-                questions = self.generator.generate(gen_context, feedback)
+                audit_before = _audit_mark()
+                if on_event is None:
+                    questions = self.generator.generate(gen_context, feedback)
+                else:
+                    questions = []
+                    for q in self.generator.generate_stream(gen_context, feedback):
+                        _emit(on_event, "question", attempt=attempt + 1, index=len(questions), question=q)
+                        questions.append(q)
                 _accumulate_tokens(metrics, audit_before)
                 metrics.generator_calls += 1
                 metrics.attempts += 1
+                metrics.record_stage("generate", time.monotonic() - stage_start)
             except Exception as e:
                 consecutive_errors += 1
                 metrics.errors += 1
@@ -661,10 +727,10 @@ class Orchestrator:
                     self.last_metrics = metrics
                     # Return whatever we have so far
                     final = approved_questions if approved_questions else []
-                    return final, self._build_metadata(context, metrics, critic_history)
+                    return final, self._build_metadata(context, metrics, critic_history, outcomes, pass_rate)
                 # Brief pause before retry (skip in mock mode)
                 if provider_name != "mock":
-                    time.sleep(min(2**consecutive_errors, 10))
+                    time.sleep(_retry_delay(e, consecutive_errors))
                 feedback = "Your previous response caused an error. Please try again with valid output."
                 continue
 
@@ -676,7 +742,7 @@ class Orchestrator:
                     metrics.stop()
                     self.last_metrics = metrics
                     final = approved_questions if approved_questions else []
-                    return final, self._build_metadata(context, metrics, critic_history)
+                    return final, self._build_metadata(context, metrics, critic_history, outcomes, pass_rate)
                 feedback = (
                     "Your previous response was empty or invalid JSON. Please generate a valid JSON list of questions."
                 )
@@ -686,15 +752,9 @@ class Orchestrator:
             consecutive_errors = 0
 
             # --- Step 2: Pre-validate (deterministic) ---
-            pre_results = pre_validate_questions(questions, teacher_config)
-            structurally_valid = []
-            pre_fail_feedback = []
-            for r in pre_results:
-                if r["passed"]:
-                    structurally_valid.append(questions[r["index"]])
-                else:
-                    metrics.pre_validation_failures += 1
-                    pre_fail_feedback.append(f"Q{r['index']}: {'; '.join(r['issues'])}")
+            structurally_valid, pre_fail_feedback = _pre_validate(
+                questions, teacher_config, metrics, approved_questions, self.duplicate_threshold
+            )
 
             if pre_fail_feedback:
                 print(f"   [Agent Loop] Pre-validation removed {len(pre_fail_feedback)} question(s)")
@@ -709,29 +769,17 @@ class Orchestrator:
 
             # --- Step 3: LLM critique ---
             print("   [Agent Loop] Critiquing draft...")
-            content_summary = context.get("content_summary", "")
-            class_context = {
-                "lesson_logs": context.get("lesson_logs", []),
-                "assumed_knowledge": context.get("assumed_knowledge", {}),
-            }
-            cognitive_config = {
-                "cognitive_framework": context.get("cognitive_framework"),
-                "cognitive_distribution": context.get("cognitive_distribution"),
-                "difficulty": context.get("difficulty", 3),
-            }
+            _emit(on_event, "status", stage="critiquing", attempt=attempt + 1, count=len(structurally_valid))
 
+            stage_start = time.monotonic()
             try:
-                audit_before = len(get_api_audit_log())
+                audit_before = _audit_mark()
                 critique_result = self.critic.critique(
-                    structurally_valid,
-                    guidelines,
-                    content_summary,
-                    class_context=class_context,
-                    cognitive_config=cognitive_config,
-                    teacher_config=teacher_config,
+                    structurally_valid, guidelines, **_critique_kwargs(context, teacher_config)
                 )
                 _accumulate_tokens(metrics, audit_before)
                 metrics.critic_calls += 1
+                metrics.record_stage("critique", time.monotonic() - stage_start)
             except Exception as e:
                 print(f"   [Agent Loop] Critic error: {e}. Accepting pre-validated draft.")
                 # On critic failure, accept all structurally-valid questions
@@ -740,7 +788,7 @@ class Orchestrator:
                 metrics.stop()
                 self.last_metrics = metrics
                 final = approved_questions[:target_count]
-                return final, self._build_metadata(context, metrics, critic_history)
+                return final, self._build_metadata(context, metrics, critic_history, outcomes, pass_rate)
 
             # --- Step 4: Collect passed questions ---
             passed_indices = critique_result.get("passed_indices", [])
@@ -751,6 +799,9 @@ class Orchestrator:
                     approved_questions.append(structurally_valid[idx])
                     metrics.questions_approved += 1
             metrics.questions_rejected += len(failed_indices)
+            _tally_outcomes(outcomes, structurally_valid, passed_indices, failed_indices)
+
+            _emit_verdicts(on_event, attempt + 1, critique_result, structurally_valid)
 
             # Record critic feedback in history
             critic_history.append(
@@ -770,7 +821,9 @@ class Orchestrator:
                 metrics.approved = True
                 self.last_metrics = metrics
                 final = approved_questions[:target_count]
-                return final, self._build_metadata(context, metrics, critic_history)
+                return final, self._build_metadata(
+                    context, metrics, critic_history, outcomes, pass_rate, approved_questions[target_count:]
+                )
 
             # Build specific feedback for next attempt
             feedback_parts = []
@@ -799,13 +852,289 @@ class Orchestrator:
         metrics.approved = len(approved_questions) >= target_count
         self.last_metrics = metrics
         final = approved_questions[:target_count] if approved_questions else questions if "questions" in dir() else []
-        return final, self._build_metadata(context, metrics, critic_history)
+        return final, self._build_metadata(context, metrics, critic_history, outcomes, pass_rate)
+
+    def _run_pipelined(
+        self,
+        context: Dict[str, Any],
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]],
+        metrics: AgentMetrics,
+        guidelines: str,
+        teacher_config: Optional[Dict[str, Any]],
+        target_count: int,
+        pass_rate: float,
+        outcomes: Dict[str, Dict[str, int]],
+    ) -> tuple:
+        """Chunked variant of the feedback loop that keeps the provider busy.
+
+        The generator writes up to ``chunk_size`` questions per call, with up
+        to ``max_parallel_generations`` calls in flight. Each pre-validated
+        chunk goes to the critic right away, and up to
+        ``max_parallel_critiques`` chunks are reviewed at once. The generator
+        does not wait for those reviews: it starts the next chunk as soon as
+        the quiz has room for it. Every call sees the questions already
+        drafted and the critic's latest feedback. A chunk is only started if
+        approved, in-review and in-progress questions stay within the target,
+        so nothing is left running once the quiz is complete. With
+        over-generation the target is the planned count for the questions
+        still needed. Calls still in flight when the quiz completes are
+        waited for, so the token totals include every call that was sent,
+        and their results are discarded.
+
+        The generator gets ``max_retries`` calls per chunk of the quiz.
+
+        Returns:
+            Tuple of (questions, metadata), as :meth:`run`.
+        """
+        metrics.pipelined = True
+        provider_name = self.config.get("llm", {}).get("provider", "mock")
+        audit_before = _audit_mark()
+        critic_kwargs = _critique_kwargs(context, teacher_config)
+        critic_history: List[Dict[str, Any]] = []
+        approved_questions: List[Dict[str, Any]] = []
+        in_review: Dict[Any, tuple] = {}  # critique future -> (chunk number, questions)
+        drafted: List[str] = []
+        critic_notes: List[str] = []
+        error_note = None
+        last_draft: List[Dict[str, Any]] = []
+        generating: Dict[Any, tuple] = {}  # generation future -> (chunk number, size)
+        retry_delay = 0.0
+        chunks = 0
+        max_chunks = self.max_retries * math.ceil(target_count / self.chunk_size)
+        consecutive_errors = 0
+        max_errors = 2  # Abort after this many consecutive transient failures
+        aborted = False
+
+        generator_pool = ThreadPoolExecutor(
+            max_workers=self.max_parallel_generations, thread_name_prefix="quiz-generate"
+        )
+        critic_pool = ThreadPoolExecutor(max_workers=self.max_parallel_critiques, thread_name_prefix="quiz-critique")
+        try:
+            while len(approved_questions) < target_count and not aborted:
+                while len(generating) < self.max_parallel_generations and chunks < max_chunks:
+                    reviewing = sum(len(chunk) for _, chunk in in_review.values())
+                    in_progress = sum(size for _, size in generating.values())
+                    planned = self._planned_count(target_count - len(approved_questions), pass_rate)
+                    room = min(self.chunk_size, planned - reviewing - in_progress)
+                    if room <= 0:
+                        break
+                    chunks += 1
+                    gen_context = dict(context)
+                    gen_context["num_questions"] = room
+                    still_needed = target_count - len(approved_questions)
+                    feedback = _pipelined_feedback(error_note, critic_notes, drafted, still_needed)
+                    error_note = None
+                    print(f"   [Agent Loop] Chunk {chunks}: generating {room} question(s)...")
+                    future = generator_pool.submit(
+                        contextvars.copy_context().run,
+                        self._generate_chunk,
+                        gen_context,
+                        feedback,
+                        chunks,
+                        on_event,
+                        retry_delay,
+                    )
+                    generating[future] = (chunks, room)
+                    retry_delay = 0.0
+
+                pending = list(generating) + list(in_review)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in in_review:
+                        chunk_no, chunk = in_review.pop(future)
+                        try:
+                            critique_result, seconds = future.result()
+                        except Exception as e:
+                            print(f"   [Agent Loop] Critic error on chunk {chunk_no}: {e}. Accepting chunk as is.")
+                            approved_questions.extend(chunk)
+                            metrics.questions_approved += len(chunk)
+                            continue
+                        metrics.critic_calls += 1
+                        metrics.record_stage("critique", seconds)
+                        passed_indices = critique_result.get("passed_indices", [])
+                        failed_indices = critique_result.get("failed_indices", [])
+                        for idx in passed_indices:
+                            if idx < len(chunk):
+                                approved_questions.append(chunk[idx])
+                                metrics.questions_approved += 1
+                        metrics.questions_rejected += len(failed_indices)
+                        _tally_outcomes(outcomes, chunk, passed_indices, failed_indices)
+                        _emit_verdicts(on_event, chunk_no, critique_result, chunk)
+                        critic_history.append(
+                            {
+                                "attempt": chunk_no,
+                                "status": critique_result["status"],
+                                "feedback": critique_result.get("feedback"),
+                                "passed_count": len(passed_indices),
+                                "failed_count": len(failed_indices),
+                                "verdicts": critique_result.get("verdicts", []),
+                            }
+                        )
+                        if critique_result.get("feedback"):
+                            critic_notes.append(f"Chunk {chunk_no}:\n{critique_result['feedback']}")
+                        print(
+                            f"   [Agent Loop] Chunk {chunk_no}: {len(passed_indices)} passed, "
+                            f"{len(failed_indices)} failed. "
+                            f"Total approved: {len(approved_questions)}/{target_count}"
+                        )
+                        continue
+
+                    chunk_no, _ = generating.pop(future)
+                    metrics.generator_calls += 1
+                    metrics.attempts += 1
+                    try:
+                        questions, seconds = future.result()
+                    except Exception as e:
+                        consecutive_errors += 1
+                        metrics.errors += 1
+                        print(f"   [Agent Loop] Generator error: {e}")
+                        if consecutive_errors >= max_errors:
+                            print("   [Agent Loop] Too many consecutive errors. Aborting.")
+                            aborted = True
+                            break
+                        if provider_name != "mock":
+                            retry_delay = _retry_delay(e, consecutive_errors)
+                        error_note = "Your previous response caused an error. Please try again with valid output."
+                        continue
+                    metrics.record_stage("generate", seconds)
+
+                    if not questions:
+                        consecutive_errors += 1
+                        print("   [Agent Loop] Generator failed to produce questions. Retrying...")
+                        if consecutive_errors >= max_errors:
+                            print("   [Agent Loop] Too many consecutive failures. Aborting.")
+                            aborted = True
+                            break
+                        error_note = (
+                            "Your previous response was empty or invalid JSON. "
+                            "Please generate a valid JSON list of questions."
+                        )
+                        continue
+                    consecutive_errors = 0
+                    last_draft = questions
+
+                    # Chunks drafted concurrently must not repeat each other either
+                    structurally_valid, pre_fail_feedback = _pre_validate(
+                        questions,
+                        teacher_config,
+                        metrics,
+                        approved_questions,
+                        self.duplicate_threshold,
+                        in_review=[q for _, chunk in in_review.values() for q in chunk],
+                    )
+                    if pre_fail_feedback:
+                        print(f"   [Agent Loop] Pre-validation removed {len(pre_fail_feedback)} question(s)")
+                    if not structurally_valid:
+                        error_note = (
+                            "All questions failed structural validation:\n"
+                            + "\n".join(pre_fail_feedback)
+                            + "\nPlease fix and regenerate."
+                        )
+                        continue
+                    if pre_fail_feedback:
+                        critic_notes.append("Pre-validation failures:\n" + "\n".join(pre_fail_feedback))
+
+                    drafted.extend(str(q.get("text", "")) for q in structurally_valid)
+                    _emit(on_event, "status", stage="critiquing", attempt=chunk_no, count=len(structurally_valid))
+                    review = critic_pool.submit(
+                        contextvars.copy_context().run,
+                        self._critique_chunk,
+                        structurally_valid,
+                        guidelines,
+                        critic_kwargs,
+                    )
+                    in_review[review] = (chunk_no, structurally_valid)
+        finally:
+            # Queued calls are cancelled, but ones already sent are billed:
+            # wait for them so their usage is counted below. Their results
+            # are discarded.
+            generator_pool.shutdown(wait=True, cancel_futures=True)
+            critic_pool.shutdown(wait=True, cancel_futures=True)
+
+        _accumulate_tokens(metrics, audit_before)
+        metrics.stop()
+        metrics.approved = len(approved_questions) >= target_count
+        self.last_metrics = metrics
+        if metrics.approved:
+            print(f"   [Agent Loop] Collected {len(approved_questions)} approved questions in {chunks} chunk(s). Done.")
+            final = approved_questions[:target_count]
+        elif aborted:
+            final = approved_questions
+        else:
+            print(f"   [Agent Loop] Generation budget used. Returning {len(approved_questions)} approved questions.")
+            final = approved_questions or last_draft
+        surplus = approved_questions[target_count:]
+        return final, self._build_metadata(context, metrics, critic_history, outcomes, pass_rate, surplus)
+
+    def _expected_pass_rate(self, context: Dict[str, Any]) -> float:
+        """Estimate the share of generated questions the critic will pass.
+
+        Uses the historical counts for the requested question types (all
+        types when none are requested), smoothed toward ``prior_pass_rate``
+        so a handful of verdicts cannot swing the estimate. Returns 1.0 when
+        over-generation is disabled.
+        """
+        if not self.overgeneration:
+            return 1.0
+        types = context.get("question_types") or list(self.pass_rates)
+        passed = sum(self.pass_rates.get(t, (0, 0))[0] for t in types)
+        total = sum(self.pass_rates.get(t, (0, 0))[1] for t in types)
+        rate = (passed + self.prior_pass_rate * self.prior_weight) / (total + self.prior_weight)
+        return min(max(rate, 0.05), 1.0)
+
+    def _planned_count(self, still_needed: int, pass_rate: float) -> int:
+        """Questions to request so that at least *still_needed* pass with ``target_probability``.
+
+        Capped at ``max_extra_ratio`` extra (at least one) so a poor pass
+        rate cannot balloon the request.
+        """
+        if pass_rate >= 1.0 or still_needed <= 0:
+            return still_needed
+        cap = still_needed + max(1, math.ceil(still_needed * self.max_extra_ratio))
+        for n in range(still_needed, cap):
+            if _binomial_tail(n, still_needed, pass_rate) >= self.target_probability:
+                return n
+        return cap
+
+    def _generate_chunk(
+        self,
+        gen_context: Dict[str, Any],
+        feedback: Optional[str],
+        chunk_no: int,
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]],
+        delay: float = 0.0,
+    ) -> tuple:
+        """Generate one chunk for :meth:`_run_pipelined`; returns (questions, seconds)."""
+        if delay:
+            time.sleep(delay)
+        _emit(on_event, "status", stage="generating", attempt=chunk_no, still_needed=gen_context["num_questions"])
+        started = time.monotonic()
+        if on_event is None:
+            questions = self.generator.generate(gen_context, feedback)
+        else:
+            questions = []
+            for q in self.generator.generate_stream(gen_context, feedback):
+                _emit(on_event, "question", attempt=chunk_no, index=len(questions), question=q)
+                questions.append(q)
+        return questions, time.monotonic() - started
+
+    def _critique_chunk(self, questions: List[Dict[str, Any]], guidelines: str, critic_kwargs: Dict[str, Any]) -> tuple:
+        """Critique one chunk for :meth:`_run_pipelined`; returns (result, seconds)."""
+        started = time.monotonic()
+        result = self.critic.critique(questions, guidelines, **critic_kwargs)
+        return result, time.monotonic() - started
 
     def _build_metadata(
         self,
         context: Dict[str, Any],
         metrics: AgentMetrics,
         critic_history: List[Dict[str, Any]],
+        outcomes: Optional[Dict[str, Dict[str, int]]] = None,
+        pass_rate: float = 1.0,
+        surplus: Optional[List[Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
         """Build the generation metadata dict for Glass Box transparency.
 
@@ -813,10 +1142,14 @@ class Orchestrator:
             context: The generation context dict.
             metrics: The AgentMetrics instance with pipeline stats.
             critic_history: List of critic feedback entries.
+            outcomes: Critic verdict counts per question type for this run.
+            pass_rate: Expected pass rate used to size over-generation.
+            surplus: Approved questions beyond the target count.
 
         Returns:
-            Dict with prompt_summary, metrics, critic_history, provider, model,
-            and optional critic_provider / critic_model.
+            Dict with prompt_summary, metrics, critic_history, critic_outcomes,
+            provider, model, and optional critic_provider / critic_model,
+            overgeneration and surplus_questions.
         """
         # Extract topics from lesson logs if available
         topics_from_lessons = []
@@ -868,7 +1201,12 @@ class Orchestrator:
             "provider": provider_name,
             "model": model_name,
             "token_usage": token_usage,
+            "critic_outcomes": outcomes or {},
         }
+        if self.overgeneration:
+            result["overgeneration"] = {"expected_pass_rate": round(pass_rate, 3), "surplus": len(surplus or [])}
+        if surplus:
+            result["surplus_questions"] = surplus
 
         # Add critic provider info if it differs
         critic_cfg = self.config.get("llm", {}).get("critic", {})
@@ -884,17 +1222,170 @@ class Orchestrator:
 # ------------------------------------------------------------------
 
 
-def _accumulate_tokens(metrics: AgentMetrics, audit_log_len_before: int) -> None:
-    """Sum token counts from new audit log entries added since *audit_log_len_before*.
+def _retry_delay(error: Exception, consecutive_errors: int) -> float:
+    """Seconds to wait before retrying after *error*.
+
+    Honors the provider's Retry-After (ProviderError.retry_after, capped at
+    a minute) and otherwise falls back to exponential backoff.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after:
+        return min(float(retry_after), 60.0)
+    return min(2**consecutive_errors, 10)
+
+
+def _emit(on_event, event: str, **payload) -> None:
+    """Deliver a progress event to *on_event*, never letting it break the pipeline.
+
+    Only :class:`PipelineCancelled` raised by the callback stops the run.
+    """
+    if on_event is None:
+        return
+    try:
+        on_event(event, payload)
+    except Exception as e:
+        logger.warning("Pipeline event callback failed for %s: %s", event, e)
+
+
+def _binomial_tail(n: int, k: int, p: float) -> float:
+    """Probability of at least *k* successes in *n* trials with success rate *p*."""
+    return sum(math.comb(n, i) * p**i * (1 - p) ** (n - i) for i in range(k, n + 1))
+
+
+def _tally_outcomes(
+    outcomes: Dict[str, Dict[str, int]],
+    questions: List[Dict[str, Any]],
+    passed_indices: List[int],
+    failed_indices: List[int],
+) -> None:
+    """Add critic verdicts on *questions* to per-question-type pass counts."""
+    for indices, passed in ((passed_indices, True), (failed_indices, False)):
+        for idx in indices:
+            if isinstance(idx, int) and 0 <= idx < len(questions):
+                counts = outcomes.setdefault(str(questions[idx].get("type") or "mc"), {"passed": 0, "total": 0})
+                counts["total"] += 1
+                counts["passed"] += int(passed)
+
+
+def _emit_verdicts(on_event, attempt: int, critique_result: Dict[str, Any], questions: List[Dict[str, Any]]) -> None:
+    """Emit a ``"verdict"`` event per critic verdict on *questions*."""
+    if on_event is None:
+        return
+    for v in critique_result.get("verdicts", []):
+        idx = v.get("index", 0)
+        _emit(
+            on_event,
+            "verdict",
+            attempt=attempt,
+            index=idx,
+            verdict=str(v.get("verdict", "")).upper(),
+            issues=v.get("issues", []),
+            question=questions[idx] if isinstance(idx, int) and idx < len(questions) else None,
+        )
+
+
+def _pre_validate(
+    questions: List[Dict[str, Any]],
+    teacher_config: Optional[Dict[str, Any]],
+    metrics: AgentMetrics,
+    approved: Optional[List[Dict[str, Any]]] = None,
+    duplicate_threshold: float = DUPLICATE_SIMILARITY_THRESHOLD,
+    in_review: Optional[List[Dict[str, Any]]] = None,
+) -> tuple:
+    """Run the deterministic pre-validator and time it.
+
+    Questions that repeat *approved* or *in_review* ones (or each other)
+    are dropped as near-duplicates and reported with the other
+    pre-validation failures.
+
+    Returns:
+        Tuple of (structurally valid questions, feedback lines for the failures).
+    """
+    started = time.monotonic()
+    structurally_valid = []
+    pre_fail_feedback = []
+    with trace_span("pre_validate", questions=len(questions)) as span:
+        for r in pre_validate_questions(questions, teacher_config, approved, duplicate_threshold, in_review):
+            if r["passed"]:
+                structurally_valid.append(questions[r["index"]])
+            else:
+                metrics.pre_validation_failures += 1
+                pre_fail_feedback.append(f"Q{r['index']}: {'; '.join(r['issues'])}")
+        if span is not None:
+            span.set(failed=len(pre_fail_feedback))
+    metrics.record_stage("pre_validate", time.monotonic() - started)
+    return structurally_valid, pre_fail_feedback
+
+
+def _critique_kwargs(context: Dict[str, Any], teacher_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Keyword arguments for CriticAgent.critique() derived from the generation context."""
+    return {
+        # Retrieval may give the critic a tighter selection of the lesson material
+        "content_summary": context.get("critic_content_summary", context.get("content_summary", "")),
+        "class_context": {
+            "lesson_logs": context.get("lesson_logs", []),
+            "assumed_knowledge": context.get("assumed_knowledge", {}),
+        },
+        "cognitive_config": {
+            "cognitive_framework": context.get("cognitive_framework"),
+            "cognitive_distribution": context.get("cognitive_distribution"),
+            "difficulty": context.get("difficulty", 3),
+        },
+        "teacher_config": teacher_config,
+    }
+
+
+# Caps on how much running state is echoed back into each chunk's prompt
+_PIPELINE_FEEDBACK_NOTES = 3
+_PIPELINE_DRAFTED_LIMIT = 40
+
 
-    For mock providers the audit log is empty, so this estimates tokens from
+def _pipelined_feedback(
+    error_note: Optional[str], critic_notes: List[str], drafted: List[str], still_needed: int
+) -> Optional[str]:
+    """Build the generator feedback for the next pipelined chunk.
+
+    Combines the last generation problem, the most recent critic notes and
+    the questions already drafted (so later chunks do not repeat earlier
+    ones). Returns None for the first chunk so its prompt matches a
+    sequential run's.
+    """
+    parts = []
+    if error_note:
+        parts.append(error_note)
+    parts.extend(critic_notes[-_PIPELINE_FEEDBACK_NOTES:])
+    if drafted:
+        recent = drafted[-_PIPELINE_DRAFTED_LIMIT:]
+        parts.append(
+            "Questions already written (do not repeat them):\n" + "\n".join(f"- {text[:150]}" for text in recent)
+        )
+        parts.append(
+            f"{still_needed} more question(s) are still needed for the quiz. "
+            "Previously approved questions are kept; generate only NEW questions."
+        )
+    return "\n\n".join(parts) if parts else None
+
+
+def _audit_mark() -> int:
+    """Return a position in the active audit run to pass to :func:`_accumulate_tokens`."""
+    run = current_audit_run()
+    return len(run.entries) if run is not None else 0
+
+
+def _accumulate_tokens(metrics: AgentMetrics, audit_mark: int) -> None:
+    """Sum token counts from audit entries the active run recorded since *audit_mark*.
+
+    Only entries from the current audit run are counted, so concurrent
+    pipelines in the same process do not see each other's calls. For mock
+    providers no tokens are reported, so this estimates tokens from
     prompt/response character counts instead.
     """
-    audit_log = get_api_audit_log()
-    new_entries = audit_log[audit_log_len_before:]
+    run = current_audit_run()
+    new_entries = run.since(audit_mark) if run is not None else []
     for entry in new_entries:
         in_tok = entry.get("input_tokens", 0)
         out_tok = entry.get("output_tokens", 0)
+        metrics.cached_tokens += entry.get("cached_tokens", 0)
         if in_tok or out_tok:
             metrics.input_tokens += in_tok
             metrics.output_tokens += out_tok
@@ -906,6 +1397,118 @@ def _accumulate_tokens(metrics: AgentMetrics, audit_log_len_before: int) -> None
             metrics.output_tokens += estimate_tokens("x" * response_chars)
 
 
+def _normalize_question(q: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a raw generator question dict in place and return it.
+
+    Maps the many key spellings LLMs use (question_text, answer, bloom_level,
+    question_type, ...) onto the internal schema and infers missing fields
+    such as ``type``, ``correct_index`` and ``points``.
+    """
+    # Normalization: Map keys if necessary
+    if "text" not in q:
+        # Check for various common keys returned by LLMs
+        for key in ["question_text", "question", "stem", "prompt", "body"]:
+            if key in q:
+                q["text"] = q[key]
+                break
+
+    # After all normalization attempts, if 'text' is still missing, log a warning
+    if "text" not in q:
+        print(f"Warning: Question missing 'text' after normalization. Raw: {json.dumps(q)}")
+
+    if "title" not in q and "question_title" in q:
+        q["title"] = q["question_title"]
+
+    if "correct_answer" not in q and "answer" in q:
+        q["correct_answer"] = q["answer"]
+
+    if "image_ref" not in q and "image_url" in q:
+        q["image_ref"] = q["image_url"]
+
+    if "image_ref" not in q and "question_image" in q:  # New normalization
+        q["image_ref"] = q["question_image"]
+
+    # Normalization: Handle Options (Dict -> List)
+    if isinstance(q.get("options"), dict):
+        opts_map = q["options"]
+        sorted_keys = sorted(opts_map.keys())  # ["A", "B", "C", "D"]
+        q["options"] = [opts_map[k] for k in sorted_keys]
+
+        # Map correct_answer (e.g., "C") to index
+        if "correct_answer" in q:
+            ans = str(q["correct_answer"]).upper()
+            if ans in sorted_keys:
+                q["correct_index"] = sorted_keys.index(ans)
+
+    # Normalization: Handle correct_answer if options is already a list
+    elif isinstance(q.get("options"), list):
+        if "correct_index" not in q and "correct_answer" in q:
+            ans = q["correct_answer"]
+            # If answer is a string letter "A", "B"...
+            if isinstance(ans, str) and len(ans) == 1 and ans.isalpha():
+                idx = ord(ans.upper()) - ord("A")
+                if 0 <= idx < len(q["options"]):
+                    q["correct_index"] = idx
+            # If answer is the text of the option
+            elif ans in q["options"]:
+                q["correct_index"] = q["options"].index(ans)
+
+    # Normalize cognitive level fields
+    if "cognitive_level" not in q:
+        for key in ["bloom_level", "blooms_level", "dok_level", "webb_level"]:
+            if key in q:
+                q["cognitive_level"] = q[key]
+                break
+    if "cognitive_level" in q and "cognitive_framework" not in q:
+        # Infer framework from level name
+        level_name = str(q["cognitive_level"]).strip()
+        blooms_names = {lvl["name"].lower(): lvl for lvl in BLOOMS_LEVELS}
+        dok_names = {lvl["name"].lower(): lvl for lvl in DOK_LEVELS}
+        if level_name.lower() in blooms_names:
+            q["cognitive_framework"] = "blooms"
+            if "cognitive_level_number" not in q:
+                q["cognitive_level_number"] = blooms_names[level_name.lower()]["number"]
+        elif level_name.lower() in dok_names:
+            q["cognitive_framework"] = "dok"
+            if "cognitive_level_number" not in q:
+                q["cognitive_level_number"] = dok_names[level_name.lower()]["number"]
+
+    # Map LLM-style question_type to internal type
+    if "type" not in q and "question_type" in q:
+        _type_map = {
+            "multiple choice": "mc",
+            "multiple_choice": "mc",
+            "true/false": "tf",
+            "true false": "tf",
+            "short answer": "short_answer",
+            "short_answer": "short_answer",
+            "fill in the blank": "fill_in_blank",
+            "fill_in_blank": "fill_in_blank",
+            "matching": "matching",
+            "essay": "essay",
+            "ordering": "ordering",
+        }
+        mapped = _type_map.get(q["question_type"].lower().strip())
+        if mapped:
+            q["type"] = mapped
+
+    if "type" not in q:
+        # Try to infer type from structure
+        if "options" in q:
+            if "correct_indices" in q:
+                q["type"] = "ma"
+            else:
+                q["type"] = "mc"
+        elif "is_true" in q:
+            q["type"] = "tf"
+        elif "text" in q:
+            q["type"] = "short_answer"
+
+    if not q.get("points"):
+        q["points"] = 1
+    return q
+
+
 def _build_class_context_section(context: Dict[str, Any]) -> str:
     """Build the class context section for generator/critic prompts.
 
@@ -1088,58 +1691,120 @@ def _extract_teacher_config(context: Dict[str, Any]) -> Optional[Dict[str, Any]]
     return None
 
 
-def run_agentic_pipeline(config, context, class_id=None, web_mode=False):
+def run_agentic_pipeline(config, context, class_id=None, web_mode=False, on_event=None):
     """Run the agentic quiz generation pipeline with optional class context enrichment.
 
+    The run's critic verdicts are added to the pass rates for the configured
+    provider/model. With ``agent_loop.overgeneration.enabled`` those rates
+    are also loaded before the run to size generation requests.
+
+    A timing summary of the run's stages is attached as ``metadata["trace"]``
+    (see src/tracing.py). The full trace is written when
+    ``tracing.export_dir`` is set, unless the caller started the trace (as
+    generate_quiz() does), in which case the caller exports it.
+
     Args:
         config: Application configuration dictionary.
         context: Generation context dictionary with content, images, and parameters.
         class_id: Optional class ID to load recent lessons and assumed knowledge for.
         web_mode: If True, skip interactive input() approval gate (for web UI).
+        on_event: Optional progress callback; enables streaming (see Orchestrator.run).
 
     Returns:
         Tuple of (questions, metadata) from the Orchestrator.
     """
+    owns_trace = current_tracer() is None
+    with start_trace("quiz") as tracer:
+        with trace_span("run_agentic_pipeline", class_id=class_id):
+            questions, metadata = _run_pipeline(config, context, class_id, web_mode, on_event)
+        metadata["trace"] = tracer.summary()
+    if owns_trace:
+        try:
+            trace_file = export_trace(tracer, config, metadata.get("run_id"))
+            if trace_file:
+                metadata["trace_file"] = trace_file
+        except OSError as e:
+            print(f"Warning: Could not write pipeline trace: {e}")
+    return questions, metadata
+
+
+def _run_pipeline(config, context, class_id, web_mode, on_event):
+    """Body of :func:`run_agentic_pipeline`, executed inside its trace."""
     # Enrich context with class data if class_id provided
     if class_id is not None:
+        with trace_span("load_class_context"):
+            _load_class_context(config, context, class_id)
+
+    overgeneration = (config.get("agent_loop", {}).get("overgeneration") or {}).get("enabled", False)
+    llm_config = config.get("llm", {})
+    provider_name = llm_config.get("provider", PROVIDER_MOCK)
+    model_name = llm_config.get("model_name") or ""
+    db_path = config.get("paths", {}).get("database_file", "quiz_warehouse.db")
+    pass_rates = None
+    if overgeneration:
         try:
-            db_path = config.get("paths", {}).get("database_file", "quiz_warehouse.db")
-            engine = get_engine(db_path)
-            session = get_session(engine)
-
-            # Load recent lessons
-            recent = get_recent_lessons(session, class_id, days=14)
-            lesson_logs = []
-            for log in recent:
-                import json as _json
-
-                topics = _json.loads(log.topics) if isinstance(log.topics, str) else (log.topics or [])
-                lesson_logs.append(
-                    {
-                        "date": str(log.date),
-                        "topics": topics,
-                        "notes": log.notes,
-                    }
-                )
-            context["lesson_logs"] = lesson_logs
-
-            # Load assumed knowledge
-            knowledge = get_assumed_knowledge(session, class_id)
-            context["assumed_knowledge"] = knowledge
-
-            # Load class config
-            class_obj = session.query(Class).filter_by(id=class_id).first()
-            if class_obj:
-                context["class_config"] = {
-                    "name": class_obj.name,
-                    "grade_level": class_obj.grade_level,
-                    "subject": class_obj.subject,
-                    "standards": class_obj.standards,
-                }
+            session = get_session(get_engine(db_path))
+            try:
+                pass_rates = get_critic_pass_rates(session, provider_name, model_name)
+            finally:
+                session.close()
+        except Exception as e:
+            print(f"Warning: Could not load critic pass rates: {e}")
+
+    with trace_span("orchestrator.init"):
+        orch = Orchestrator(config, web_mode=web_mode, pass_rates=pass_rates)
+    questions, metadata = orch.run(context, on_event=on_event)
 
-            session.close()
+    # Record verdicts on every run so pass rates are ready when over-generation is turned on
+    if metadata.get("critic_outcomes"):
+        try:
+            session = get_session(get_engine(db_path))
+            try:
+                record_critic_outcomes(session, provider_name, model_name, metadata["critic_outcomes"])
+            finally:
+                session.close()
         except Exception as e:
-            print(f"Warning: Could not load class context: {e}")
+            print(f"Warning: Could not record critic pass rates: {e}")
+    return questions, metadata
+
+
+def _load_class_context(config, context, class_id):
+    """Add recent lessons, assumed knowledge and class config for *class_id* to *context*."""
+    try:
+        db_path = config.get("paths", {}).get("database_file", "quiz_warehouse.db")
+        engine = get_engine(db_path)
+        session = get_session(engine)
+
+        # Load recent lessons
+        recent = get_recent_lessons(session, class_id, days=14)
+        lesson_logs = []
+        for log in recent:
+            import json as _json
+
+            topics = _json.loads(log.topics) if isinstance(log.topics, str) else (log.topics or [])
+            lesson_logs.append(
+                {
+                    "date": str(log.date),
+                    "topics": topics,
+                    "notes": log.notes,
+                }
+            )
+        context["lesson_logs"] = lesson_logs
+
+        # Load assumed knowledge
+        knowledge = get_assumed_knowledge(session, class_id)
+        context["assumed_knowledge"] = knowledge
+
+        # Load class config
+        class_obj = session.query(Class).filter_by(id=class_id).first()
+        if class_obj:
+            context["class_config"] = {
+                "name": class_obj.name,
+                "grade_level": class_obj.grade_level,
+                "subject": class_obj.subject,
+                "standards": class_obj.standards,
+            }
 
-    orch = Orchestrator(config, web_mode=web_mode)
-    return orch.run(context)
+        session.close()
+    except Exception as e:
+        print(f"Warning: Could not load class context: {e}")
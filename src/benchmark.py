@@ -0,0 +1,905 @@
+"""
+In-process benchmark harness for comparing LLM providers and models.
+
+scripts/run_trial.py runs every CLI feature in a subprocess and reports
+pass/fail with elapsed seconds, which is enough to smoke-test a provider
+but not to choose between models or notice that a change made generation
+slower. This module replays a fixed corpus of generation cases (quizzes,
+reading-level variants, study material and rubrics) in-process against one
+or more targets and measures each run:
+
+- Latency percentiles (p50/p90/p95) for the whole case, for every traced
+  pipeline stage (see src/tracing.py) and for individual provider calls
+  (from the audit log, see llm_provider.audit_run())
+- Input/output/cached tokens and an estimated cost, priced with
+  cost_tracking.estimate_cost() for the target's model
+- Critic pass rate and retry attempts for quiz cases
+- Provider errors and success rate
+
+Each target runs against its own temporary database seeded from the corpus,
+so results never touch the real database. A target is an ``llm`` config
+block; the common ones have shorthands (see parse_target()):
+
+- ``mock``: MockLLMProvider with ``llm.mock_simulation`` latency, token and
+  error sampling
+- ``standin``: the real OpenAI-compatible provider talking over HTTP to a
+  local StandInServer that answers with mock responses, so the SDK,
+  serialization and connection handling are part of the measurement
+- ``openai-compatible:llama3@http://localhost:11434/v1`` or any other
+  ``provider:model`` for real endpoints
+
+run_benchmark() returns a JSON-serializable report; format_comparison()
+renders it as a table and compare_reports() flags regressions against a
+saved baseline report.
+"""
+
+import copy
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.cost_tracking import estimate_cost
+from src.database import Class, Lesson, LessonLog, Question, Quiz, get_engine, get_session, init_db
+from src.json_extraction import extract_json_array
+from src.llm_provider import PROVIDER_REGISTRY, audit_run
+from src.mock_responses import (
+    SCIENCE_TOPICS,
+    MockSimulation,
+    get_mock_response,
+    get_rubric_response,
+    get_study_material_response,
+    get_variant_response,
+)
+from src.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+CASE_KINDS = ("quiz", "variant", "study", "rubric")
+
+# Characters per token when a provider reports no usage
+_CHARS_PER_TOKEN = 4
+
+DEFAULT_CORPUS: Dict[str, Any] = {
+    "name": "default",
+    "class": {"name": "Benchmark Science 7", "grade_level": "7th Grade", "subject": "Science"},
+    "standards": ["SOL 7.1", "SOL 7.2"],
+    "lessons": [
+        {
+            "source_file": "photosynthesis.pdf",
+            "topics": ["photosynthesis", "chloroplasts"],
+            "content": (
+                "Photosynthesis converts light energy into chemical energy stored in glucose. "
+                "Chlorophyll inside the chloroplast absorbs mostly red and blue light. "
+                "Plants take in carbon dioxide through the stomata and release oxygen.\n\n"
+                "The light-dependent reactions happen in the thylakoid membranes and produce ATP. "
+                "The Calvin cycle in the stroma uses that ATP to fix carbon into sugar."
+            ),
+        },
+        {
+            "source_file": "cells.pdf",
+            "topics": ["cell structure", "organelles"],
+            "content": (
+                "All living things are made of cells. The cell membrane controls what enters and "
+                "leaves the cell. The nucleus holds the cell's DNA.\n\n"
+                "Mitochondria release energy from food during cellular respiration. "
+                "Plant cells also have a cell wall and chloroplasts; animal cells do not."
+            ),
+        },
+    ],
+    "source_quiz": {
+        "title": "Cells and Energy Check",
+        "questions": [
+            {
+                "type": "mc",
+                "text": "Which organelle captures light energy for photosynthesis?",
+                "options": ["Mitochondrion", "Chloroplast", "Nucleus", "Ribosome"],
+                "correct_index": 1,
+            },
+            {
+                "type": "mc",
+                "text": "What gas do plants release during photosynthesis?",
+                "options": ["Carbon dioxide", "Nitrogen", "Oxygen", "Hydrogen"],
+                "correct_index": 2,
+            },
+            {
+                "type": "tf",
+                "text": "Animal cells have a cell wall.",
+                "is_true": False,
+            },
+            {
+                "type": "short_answer",
+                "text": "Explain why mitochondria are called the powerhouse of the cell.",
+                "expected_answer": "They release energy from food during cellular respiration.",
+            },
+        ],
+    },
+    "cases": [
+        {"name": "quiz-photosynthesis", "kind": "quiz", "num_questions": 5, "topics": ["photosynthesis"]},
+        {"name": "quiz-cells-10", "kind": "quiz", "num_questions": 10, "topics": ["cell structure", "organelles"]},
+        {"name": "variant-ell", "kind": "variant", "reading_level": "ell"},
+        {"name": "study-flashcards", "kind": "study", "material_type": "flashcard", "from_quiz": True},
+        {"name": "study-guide", "kind": "study", "material_type": "study_guide", "topic": "photosynthesis"},
+        {"name": "rubric", "kind": "rubric"},
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+
+
+class BenchmarkTarget:
+    """One provider configuration to benchmark.
+
+    Attributes:
+        name: Label used in tables and reports.
+        llm: The ``llm`` config block the target runs with.
+        standin: Serve the target from a local StandInServer.
+        simulation: MockSimulation config for ``mock`` and stand-in targets.
+    """
+
+    __slots__ = ("name", "llm", "standin", "simulation")
+
+    def __init__(
+        self,
+        name: str,
+        llm: Dict[str, Any],
+        standin: bool = False,
+        simulation: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.llm = dict(llm)
+        self.standin = standin
+        self.simulation = simulation
+
+    @property
+    def model(self) -> str:
+        provider = self.llm.get("provider", "mock")
+        return self.llm.get("model_name") or PROVIDER_REGISTRY.get(provider, {}).get("default_model", "")
+
+    @property
+    def pricing_model(self) -> str:
+        """Model whose prices are used for cost estimates."""
+        return self.llm.get("pricing_model") or self.model
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "provider": "standin" if self.standin else self.llm.get("provider", "mock"),
+            "model": self.model,
+            "pricing_model": self.pricing_model,
+            "simulation": self.simulation,
+        }
+
+
+def _default_simulation(config: Dict[str, Any]) -> Dict[str, Any]:
+    """The configured ``llm.mock_simulation``, or zero latency with a fixed seed."""
+    simulation = dict((config.get("llm") or {}).get("mock_simulation") or {})
+    simulation.pop("enabled", None)
+    simulation.setdefault("seed", 42)
+    return simulation
+
+
+def parse_target(spec: str, config: Optional[Dict[str, Any]] = None) -> BenchmarkTarget:
+    """Build a target from a ``provider[:model][@base_url]`` shorthand.
+
+    ``mock`` and ``standin`` take the model to price calls as
+    (``mock:gemini-2.5-flash``) and use the configured
+    ``llm.mock_simulation``, if any, for latency and errors.
+
+    Raises:
+        ValueError: If *spec* is empty.
+    """
+    config = config or {}
+    spec = spec.strip()
+    if not spec:
+        raise ValueError("Empty benchmark target")
+    body, _, base_url = spec.partition("@")
+    provider, _, model = body.partition(":")
+    if provider in ("mock", "standin"):
+        simulation = _default_simulation(config)
+        llm: Dict[str, Any] = {"provider": "mock"}
+        if model:
+            llm["pricing_model"] = model
+        return BenchmarkTarget(spec, llm, standin=provider == "standin", simulation=simulation)
+    llm = {"provider": provider}
+    if model:
+        llm["model_name"] = model
+    if base_url:
+        llm["base_url"] = base_url
+    base_llm = config.get("llm") or {}
+    for key in ("api_key", "vertex_project_id", "vertex_location"):
+        if base_llm.get(key) and base_llm.get("provider") == provider:
+            llm[key] = base_llm[key]
+    if provider == "openai-compatible" and not base_url and base_llm.get("base_url"):
+        llm["base_url"] = base_llm["base_url"]
+    return BenchmarkTarget(spec, llm)
+
+
+def load_targets(path: str, config: Optional[Dict[str, Any]] = None) -> List[BenchmarkTarget]:
+    """Read targets from a JSON or YAML list.
+
+    Entries are shorthand strings (see parse_target()) or mappings with
+    ``name`` plus either ``llm`` (a full llm config block) or ``standin:
+    true``, and optionally ``simulation`` and ``pricing_model``.
+
+    Raises:
+        ValueError: If the file is not a list of targets.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            entries = yaml.safe_load(f)
+        else:
+            entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a list of benchmark targets")
+    targets = []
+    for entry in entries:
+        if isinstance(entry, str):
+            targets.append(parse_target(entry, config))
+            continue
+        if not isinstance(entry, dict) or not entry.get("name"):
+            raise ValueError(f"{path}: every target needs a name")
+        standin = bool(entry.get("standin"))
+        llm = dict(entry.get("llm") or {"provider": "mock"})
+        if standin:
+            llm["provider"] = "mock"
+        if entry.get("pricing_model"):
+            llm["pricing_model"] = entry["pricing_model"]
+        simulation = entry.get("simulation")
+        if simulation is None and (standin or llm.get("provider") == "mock"):
+            simulation = _default_simulation(config or {})
+        targets.append(BenchmarkTarget(entry["name"], llm, standin=standin, simulation=simulation))
+    return targets
+
+
+# ---------------------------------------------------------------------------
+# OpenAI-compatible stand-in server
+# ---------------------------------------------------------------------------
+
+
+def standin_response(prompt: str, json_mode: bool = False) -> str:
+    """Mock response for *prompt*, recognising each generator's prompt.
+
+    MockLLMProvider is bypassed by the variant, study and rubric generators
+    (they call the matching mock_responses function directly), so over HTTP
+    the prompt itself has to say which response to fabricate.
+    """
+    from src.study_generator import MATERIAL_PROMPTS
+    from src.variant_generator import READING_LEVELS
+
+    lowered = prompt.lower()
+    keywords = [t for t in SCIENCE_TOPICS if t in lowered] or None
+    for material_type, material_prompt in MATERIAL_PROMPTS.items():
+        if prompt.startswith(material_prompt):
+            return get_study_material_response([prompt], material_type, keywords)
+    if prompt.startswith("Rewrite the following quiz questions at the "):
+        level = next((key for key, desc in READING_LEVELS.items() if desc in prompt), "on_grade")
+        return get_variant_response(_prompt_questions(prompt), level, keywords)
+    if prompt.startswith("Generate a scoring rubric"):
+        return get_rubric_response(_prompt_questions(prompt), {}, keywords)
+    return get_mock_response([prompt], json_mode=json_mode)
+
+
+def _prompt_questions(prompt: str) -> List[Dict[str, Any]]:
+    """The question array embedded after ``Questions`` in a generator prompt."""
+    _, _, tail = prompt.partition("Questions")
+    return [q for q in extract_json_array(tail, source="standin prompt").items if isinstance(q, dict)]
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if block.get("type") == "text")
+    return " ".join(parts)
+
+
+_ERROR_STATUS = {"rate_limit": 429, "server_error": 503, "timeout": 504}
+
+
+class StandInServer:
+    """Local OpenAI-compatible chat completions endpoint serving mock responses.
+
+    Latency, output pacing and injected errors follow a MockSimulation, so
+    a stand-in target behaves like ``mock`` with the same simulation plus
+    the real client's HTTP round trip. Streaming requests are answered with
+    server-sent events paced by ``tokens_per_second``.
+
+    Usage is only reported with *report_usage*: the provider writes calls
+    that report usage to api_costs.log, and benchmark traffic must not
+    count against real budgets. The harness estimates tokens instead.
+
+    Usage::
+
+        with StandInServer({"latency": {"seconds": 0.5}}) as server:
+            config["llm"] = {"provider": "openai-compatible", "base_url": server.base_url}
+    """
+
+    def __init__(self, simulation: Optional[Dict[str, Any]] = None, report_usage: bool = False):
+        self.simulation = MockSimulation(simulation or {})
+        self.report_usage = report_usage
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("StandInServer is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StandInServer":
+        """Listen on a free localhost port in a daemon thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def complete(self, request: Dict[str, Any]):
+        """Plan the response to one chat completions *request* (a SimulatedCall)."""
+        with self._lock:
+            self.requests += 1
+        prompt = _message_text(request.get("messages"))
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        return self.simulation.plan([prompt], standin_response(prompt, json_mode))
+
+
+def _make_handler(server: StandInServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug("standin: " + format, *args)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "invalid JSON body"}})
+                return
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            call = server.complete(request)
+            time.sleep(call.first_token_seconds)
+            if call.error:
+                headers = {"Retry-After": f"{server.simulation.retry_after_seconds:g}"}
+                self._send_json(_ERROR_STATUS[call.error], {"error": {"message": call.error_message}}, headers)
+                return
+            model = request.get("model") or "standin"
+            if request.get("stream"):
+                self._stream(call, model)
+            else:
+                time.sleep(call.generation_seconds)
+                body = _completion(call, model, server.report_usage)
+                self._send_json(200, body)
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, call, model):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            step = server.simulation.stream_chunk_chars
+            text = call.response
+            for start in range(0, len(text), step):
+                piece = text[start : start + step]
+                time.sleep(server.simulation.chunk_delay(piece))
+                self._event(_chunk(model, {"content": piece}, None))
+            final = _chunk(model, {}, "stop")
+            if server.report_usage:
+                final["usage"] = _usage(call)
+            self._event(final)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def _event(self, body):
+            self.wfile.write(b"data: " + json.dumps(body).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def _usage(call) -> Dict[str, int]:
+    return {
+        "prompt_tokens": call.input_tokens,
+        "completion_tokens": call.output_tokens,
+        "total_tokens": call.input_tokens + call.output_tokens,
+    }
+
+
+def _completion(call, model: str, report_usage: bool) -> Dict[str, Any]:
+    body = {
+        "id": f"chatcmpl-standin-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": call.response}, "finish_reason": "stop"}],
+    }
+    if report_usage:
+        body["usage"] = _usage(call)
+    return body
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str]) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+
+def load_corpus(path: Optional[str] = None) -> Dict[str, Any]:
+    """Return the built-in corpus, with keys overridden from a JSON file at *path*.
+
+    Raises:
+        ValueError: If a case has an unknown kind.
+    """
+    corpus = copy.deepcopy(DEFAULT_CORPUS)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            corpus.update(json.load(f))
+        corpus.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    for case in corpus["cases"]:
+        if case.get("kind") not in CASE_KINDS:
+            raise ValueError(f"Benchmark case {case.get('name')!r}: kind must be one of {', '.join(CASE_KINDS)}")
+        case.setdefault("name", case["kind"])
+    return corpus
+
+
+def seed_corpus(session, corpus: Dict[str, Any]) -> Dict[str, int]:
+    """Insert the corpus class, lessons, lesson logs and source quiz.
+
+    Returns the ``class_id`` and ``quiz_id`` the cases run against.
+    """
+    class_info = corpus.get("class") or {}
+    cls = Class(
+        name=class_info.get("name", "Benchmark Class"),
+        grade_level=class_info.get("grade_level", "7th Grade"),
+        subject=class_info.get("subject", "Science"),
+        standards=json.dumps(corpus.get("standards") or []),
+        config=json.dumps({}),
+    )
+    session.add(cls)
+    session.flush()
+    start = date(2026, 1, 5)
+    for i, lesson in enumerate(corpus.get("lessons") or []):
+        session.add(Lesson(source_file=lesson.get("source_file", f"lesson{i + 1}.txt"), content=lesson["content"]))
+        session.add(
+            LessonLog(
+                class_id=cls.id,
+                date=start + timedelta(days=i),
+                content=lesson["content"],
+                topics=lesson.get("topics") or [],
+            )
+        )
+    source = corpus.get("source_quiz") or {}
+    quiz = Quiz(
+        title=source.get("title", "Benchmark Quiz"),
+        class_id=cls.id,
+        status="generated",
+        style_profile=json.dumps({"grade_level": cls.grade_level, "sol_standards": corpus.get("standards") or []}),
+    )
+    session.add(quiz)
+    session.flush()
+    for i, q in enumerate(source.get("questions") or []):
+        session.add(
+            Question(
+                quiz_id=quiz.id,
+                question_type=q.get("type", "mc"),
+                title=f"Question {i + 1}",
+                text=q["text"],
+                points=q.get("points", 5),
+                sort_order=i,
+                data=q,
+            )
+        )
+    session.commit()
+    return {"class_id": cls.id, "quiz_id": quiz.id}
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+
+def _run_quiz(session, config, case, corpus, ids):
+    from src.quiz_generator import generate_quiz
+
+    content = "\n\n".join(lesson["content"] for lesson in corpus.get("lessons") or [])
+    return generate_quiz(
+        session,
+        ids["class_id"],
+        config,
+        num_questions=int(case.get("num_questions", 5)),
+        sol_standards=corpus.get("standards"),
+        difficulty=int(case.get("difficulty", 3)),
+        topics=", ".join(case.get("topics") or []),
+        content_text=content,
+    )
+
+
+def _run_variant(session, config, case, corpus, ids):
+    from src.variant_generator import generate_variant
+
+    return generate_variant(session, ids["quiz_id"], case.get("reading_level", "ell"), config)
+
+
+def _run_study(session, config, case, corpus, ids):
+    from src.study_generator import generate_study_material
+
+    return generate_study_material(
+        session,
+        ids["class_id"],
+        case.get("material_type", "flashcard"),
+        config,
+        quiz_id=ids["quiz_id"] if case.get("from_quiz") else None,
+        topic=case.get("topic"),
+    )
+
+
+def _run_rubric(session, config, case, corpus, ids):
+    from src.rubric_generator import generate_rubric
+
+    return generate_rubric(session, ids["quiz_id"], config)
+
+
+_RUNNERS: Dict[str, Callable] = {
+    "quiz": _run_quiz,
+    "variant": _run_variant,
+    "study": _run_study,
+    "rubric": _run_rubric,
+}
+
+
+def _critic_outcome(result) -> Optional[Dict[str, int]]:
+    """Critic verdict counts and attempts from a generated quiz's metadata."""
+    raw = getattr(result, "generation_metadata", None)
+    if not raw:
+        return None
+    try:
+        metrics = (json.loads(raw) or {}).get("metrics") or {}
+    except (TypeError, ValueError):
+        return None
+    if not metrics:
+        return None
+    return {
+        "approved": int(metrics.get("questions_approved") or 0),
+        "rejected": int(metrics.get("questions_rejected") or 0),
+        "attempts": int(metrics.get("attempts") or 0),
+    }
+
+
+def run_case(session, config, case, corpus, ids, target: BenchmarkTarget) -> Dict[str, Any]:
+    """Run one corpus case once and return its measurements."""
+    kind = case["kind"]
+    result = None
+    error = None
+    with audit_run(f"benchmark-{kind}") as run, start_trace(f"benchmark.{kind}") as tracer:
+        started = time.perf_counter()
+        try:
+            result = _RUNNERS[kind](session, config, case, corpus, ids)
+        except Exception as e:
+            logger.warning("Benchmark case %s failed on %s: %s", case["name"], target.name, e)
+            error = f"{type(e).__name__}: {e}"
+            session.rollback()
+        wall_ms = (time.perf_counter() - started) * 1000
+        spans = list(tracer.spans)
+
+    stages: Dict[str, float] = {}
+    for span in spans:
+        stages[span.name] = stages.get(span.name, 0.0) + span.duration() * 1000
+    status = getattr(result, "status", None)
+    sample: Dict[str, Any] = {
+        "case": case["name"],
+        "kind": kind,
+        "ok": result is not None and status != "failed" and error is None,
+        "error": error,
+        "wall_ms": round(wall_ms, 2),
+        "stages_ms": {name: round(ms, 2) for name, ms in stages.items()},
+        "llm_calls_ms": [],
+        "llm_errors": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_tokens": 0,
+        "tokens_estimated": False,
+        "cost": 0.0,
+        "critic": _critic_outcome(result) if kind == "quiz" else None,
+    }
+    for entry in run.entries:
+        sample["llm_calls_ms"].append(entry.get("duration_ms", 0))
+        if entry.get("error"):
+            sample["llm_errors"] += 1
+            continue
+        input_tokens = entry.get("input_tokens", 0)
+        output_tokens = entry.get("output_tokens", 0)
+        cached_tokens = entry.get("cached_tokens", 0)
+        if not (input_tokens or output_tokens or cached_tokens):
+            input_tokens = entry.get("prompt_char_count", 0) // _CHARS_PER_TOKEN
+            output_tokens = entry.get("response_char_count", 0) // _CHARS_PER_TOKEN
+            sample["tokens_estimated"] = True
+        sample["input_tokens"] += input_tokens
+        sample["output_tokens"] += output_tokens
+        sample["cached_tokens"] += cached_tokens
+        sample["cost"] += estimate_cost(target.pricing_model, input_tokens, output_tokens, cached_tokens)
+    return sample
+
+
+def _target_config(config: Dict[str, Any], llm: Dict[str, Any], simulation, db_path: str) -> Dict[str, Any]:
+    run_config = copy.deepcopy(config)
+    # Generators that open their own session (class context) must see the benchmark database
+    run_config.setdefault("paths", {})["database_file"] = db_path
+    llm = dict(llm)
+    # Benchmarks are an explicit opt-in; never stop at the interactive approval gate
+    llm["mode"] = "production"
+    if llm.get("provider") == "mock" and simulation is not None:
+        llm["mock_simulation"] = dict(simulation, enabled=True)
+    run_config["llm"] = llm
+    run_config.setdefault("tracing", {})["export_dir"] = None
+    return run_config
+
+
+def run_target(
+    target: BenchmarkTarget,
+    config: Dict[str, Any],
+    corpus: Dict[str, Any],
+    repeat: int = 3,
+    progress: Optional[Callable[[str], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Run every corpus case *repeat* times against *target* in a fresh database."""
+    server = None
+    llm = target.llm
+    if target.standin:
+        server = StandInServer(target.simulation).start()
+        llm = dict(llm, provider="openai-compatible", base_url=server.base_url, api_key="standin")
+        llm.setdefault("model_name", "standin")
+        # Stand-in calls are free and never logged, so the real budget does not apply
+        llm.update(max_calls_per_session=float("inf"), max_cost_per_session=float("inf"))
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="quizweaver-bench-") as tmp:
+        db_path = os.path.join(tmp, "benchmark.db")
+        run_config = _target_config(config, llm, target.simulation, db_path)
+        engine = get_engine(db_path)
+        session = None
+        try:
+            init_db(engine)
+            session = get_session(engine)
+            ids = seed_corpus(session, corpus)
+            for case in corpus["cases"]:
+                for _ in range(repeat):
+                    samples.append(run_case(session, run_config, case, corpus, ids, target))
+                if progress:
+                    ok = sum(1 for s in samples[-repeat:] if s["ok"])
+                    progress(f"{target.name}: {case['name']} ({ok}/{repeat} ok)")
+        finally:
+            if session is not None:
+                session.close()
+            engine.dispose()
+            if server is not None:
+                server.stop()
+    return samples
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p90/p95, max and mean of *values* (linear interpolation)."""
+    if not values:
+        return {"p50": None, "p90": None, "p95": None, "max": None, "mean": None}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        position = q * (len(ordered) - 1)
+        low = int(position)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    return {
+        "p50": round(pick(0.5), 2),
+        "p90": round(pick(0.9), 2),
+        "p95": round(pick(0.95), 2),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate the samples of one target (and case) into report statistics."""
+    count = len(samples)
+    stage_values: Dict[str, List[float]] = {}
+    for sample in samples:
+        for name, ms in sample["stages_ms"].items():
+            stage_values.setdefault(name, []).append(ms)
+    critic = [s["critic"] for s in samples if s.get("critic")]
+    approved = sum(c["approved"] for c in critic)
+    judged = approved + sum(c["rejected"] for c in critic)
+    llm_calls = [ms for s in samples for ms in s["llm_calls_ms"]]
+
+    def mean(key):
+        return round(sum(s[key] for s in samples) / count, 6) if count else 0.0
+
+    return {
+        "samples": count,
+        "success_rate": round(sum(1 for s in samples if s["ok"]) / count, 4) if count else 0.0,
+        "latency_ms": percentiles([s["wall_ms"] for s in samples]),
+        "stages_ms": {name: percentiles(values) for name, values in sorted(stage_values.items())},
+        "llm_call_ms": percentiles(llm_calls),
+        "llm_calls_mean": round(len(llm_calls) / count, 2) if count else 0.0,
+        "llm_errors": sum(s["llm_errors"] for s in samples),
+        "input_tokens_mean": mean("input_tokens"),
+        "output_tokens_mean": mean("output_tokens"),
+        "cached_tokens_mean": mean("cached_tokens"),
+        "tokens_estimated": any(s["tokens_estimated"] for s in samples),
+        "cost_mean": mean("cost"),
+        "critic_pass_rate": round(approved / judged, 4) if judged else None,
+        "retries_mean": round(sum(max(0, c["attempts"] - 1) for c in critic) / len(critic), 2) if critic else None,
+    }
+
+
+def run_benchmark(
+    config: Dict[str, Any],
+    targets: List[BenchmarkTarget],
+    corpus: Optional[Dict[str, Any]] = None,
+    repeat: int = 3,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Benchmark every target on *corpus* and return the report.
+
+    Args:
+        config: Application config; everything but ``llm`` is shared by all targets.
+        targets: Targets to compare (see parse_target()/load_targets()).
+        corpus: Corpus dict (see load_corpus()); the built-in one by default.
+        repeat: Runs per case per target.
+        progress: Optional callback receiving one line per finished case.
+    """
+    corpus = corpus or load_corpus()
+    repeat = max(1, int(repeat))
+    report: Dict[str, Any] = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "corpus": corpus.get("name", "default"),
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "targets": [],
+    }
+    for target in targets:
+        samples = run_target(target, config, corpus, repeat, progress)
+        by_case: Dict[str, List[Dict[str, Any]]] = {}
+        for sample in samples:
+            by_case.setdefault(sample["case"], []).append(sample)
+        entry = target.describe()
+        entry["overall"] = summarize(samples)
+        entry["cases"] = {name: summarize(case_samples) for name, case_samples in by_case.items()}
+        entry["samples"] = samples
+        report["targets"].append(entry)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def _fmt(value, spec: str = ".0f") -> str:
+    return "-" if value is None else f"{value:{spec}}"
+
+
+def format_comparison(report: Dict[str, Any]) -> str:
+    """Render *report* as a text table, targets side by side for each case."""
+    header = (
+        f"{'Case':<22} {'Target':<24} {'Runs':>4} {'OK':>5} {'p50 ms':>9} {'p95 ms':>9}"
+        f" {'LLM p95':>9} {'Tokens':>8} {'$/run':>9} {'Critic':>7} {'Retries':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    case_names: List[str] = []
+    for target in report["targets"]:
+        case_names.extend(name for name in target["cases"] if name not in case_names)
+    rows: List[Tuple[str, str, Dict[str, Any]]] = []
+    for name in case_names:
+        rows.extend((name, t["name"], t["cases"][name]) for t in report["targets"] if name in t["cases"])
+    rows.extend(("ALL", t["name"], t["overall"]) for t in report["targets"])
+    for case, target, stats in rows:
+        tokens = stats["input_tokens_mean"] + stats["output_tokens_mean"] + stats["cached_tokens_mean"]
+        token_text = f"{'~' if stats['tokens_estimated'] else ''}{tokens:.0f}"
+        lines.append(
+            f"{case[:22]:<22} {target[:24]:<24} {stats['samples']:>4} {stats['success_rate']:>5.0%}"
+            f" {_fmt(stats['latency_ms']['p50']):>9} {_fmt(stats['latency_ms']['p95']):>9}"
+            f" {_fmt(stats['llm_call_ms']['p95']):>9} {token_text:>8} {_fmt(stats['cost_mean'], '.5f'):>9}"
+            f" {_fmt(stats['critic_pass_rate'], '.0%'):>7} {_fmt(stats['retries_mean'], '.2f'):>7}"
+        )
+    return "\n".join(lines)
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.25,
+    min_delta_ms: float = 50.0,
+    rate_tolerance: float = 0.05,
+) -> List[str]:
+    """List regressions of *current* against *baseline* for matching targets and cases.
+
+    Latency (p50/p95) and cost regress when they grow by more than
+    *threshold* (a fraction) and, for latency, by at least *min_delta_ms*.
+    Success and critic pass rates regress when they drop by more than
+    *rate_tolerance*.
+    """
+    regressions = []
+    previous = {t["name"]: t for t in baseline.get("targets", [])}
+    for target in current.get("targets", []):
+        old_target = previous.get(target["name"])
+        if old_target is None:
+            continue
+        groups = [("ALL", target["overall"], old_target.get("overall"))]
+        groups += [(name, stats, old_target.get("cases", {}).get(name)) for name, stats in target["cases"].items()]
+        for case, new, old in groups:
+            if not old:
+                continue
+            label = f"{target['name']} / {case}"
+            for q in ("p50", "p95"):
+                before, after = old["latency_ms"].get(q), new["latency_ms"].get(q)
+                if before is None or after is None:
+                    continue
+                if after - before >= min_delta_ms and after > before * (1 + threshold):
+                    regressions.append(f"{label}: {q} latency {before:.0f} ms -> {after:.0f} ms")
+            before, after = old.get("cost_mean") or 0.0, new.get("cost_mean") or 0.0
+            if before and after > before * (1 + threshold):
+                regressions.append(f"{label}: cost per run ${before:.5f} -> ${after:.5f}")
+            for key, text in (("success_rate", "success rate"), ("critic_pass_rate", "critic pass rate")):
+                before, after = old.get(key), new.get(key)
+                if before is not None and after is not None and before - after > rate_tolerance:
+                    regressions.append(f"{label}: {text} {before:.0%} -> {after:.0%}")
+    return regressions
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    """Write *report* as indented JSON, creating parent directories."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -8,9 +8,10 @@ import json
 from typing import List, Optional
 
 import yaml
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from src.database import Class, LessonLog, Quiz
+from src.database import Class, ClassTopicKnowledge, LessonLog, LessonTopicCount, Quiz
 
 
 def create_class(
@@ -63,17 +64,32 @@ def list_classes(session: Session) -> List[dict]:
     """
     Query all classes with lesson and quiz counts.
 
+    Counts come from GROUP BY subqueries joined to the class rows, so this
+    is one statement however many classes there are.
+
     Args:
         session: SQLAlchemy session
 
     Returns:
         List of dicts with class info plus lesson_count and quiz_count
     """
-    classes = session.query(Class).order_by(Class.id).all()
+    lesson_counts = (
+        session.query(LessonLog.class_id, func.count(LessonLog.id).label("n")).group_by(LessonLog.class_id).subquery()
+    )
+    quiz_counts = session.query(Quiz.class_id, func.count(Quiz.id).label("n")).group_by(Quiz.class_id).subquery()
+    rows = (
+        session.query(
+            Class,
+            func.coalesce(lesson_counts.c.n, 0),
+            func.coalesce(quiz_counts.c.n, 0),
+        )
+        .outerjoin(lesson_counts, lesson_counts.c.class_id == Class.id)
+        .outerjoin(quiz_counts, quiz_counts.c.class_id == Class.id)
+        .order_by(Class.id)
+        .all()
+    )
     result = []
-    for cls in classes:
-        lesson_count = session.query(LessonLog).filter_by(class_id=cls.id).count()
-        quiz_count = session.query(Quiz).filter_by(class_id=cls.id).count()
+    for cls, lesson_count, quiz_count in rows:
         result.append(
             {
                 "id": cls.id,
@@ -112,7 +128,7 @@ def delete_class(session: Session, class_id: int) -> bool:
     """
     Delete a class by ID.
 
-    Associated lesson_logs are removed via CASCADE.
+    Associated lesson_logs and assumed knowledge are removed via CASCADE.
     Associated quizzes have class_id set to NULL via SET NULL.
 
     Args:
@@ -127,7 +143,10 @@ def delete_class(session: Session, class_id: int) -> bool:
         return False
     # Explicitly delete lesson_logs first to avoid SQLAlchemy trying to
     # SET NULL on the NOT NULL class_id column before SQL CASCADE fires.
+    # Bulk deletes skip the ORM events that maintain lesson_topic_counts.
     session.query(LessonLog).filter_by(class_id=class_id).delete()
+    session.query(LessonTopicCount).filter_by(class_id=class_id).delete()
+    session.query(ClassTopicKnowledge).filter_by(class_id=class_id).delete()
     session.delete(class_obj)
     session.commit()
     return True
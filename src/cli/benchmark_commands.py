@@ -0,0 +1,74 @@
+"""
+Provider benchmark CLI commands.
+"""
+
+import json
+import sys
+
+from src.benchmark import (
+    compare_reports,
+    format_comparison,
+    load_corpus,
+    load_targets,
+    parse_target,
+    run_benchmark,
+    write_report,
+)
+
+
+def register_benchmark_commands(subparsers):
+    """Register benchmark subcommands."""
+
+    p = subparsers.add_parser(
+        "benchmark",
+        help="Benchmark providers on a fixed corpus of generation cases.",
+    )
+    p.add_argument(
+        "--target",
+        dest="targets",
+        action="append",
+        default=[],
+        help="Target as provider[:model][@base_url]; 'mock' and 'standin' use the mock simulation. Repeatable.",
+    )
+    p.add_argument("--targets-file", type=str, help="JSON or YAML list of targets.")
+    p.add_argument("--corpus", type=str, help="JSON file overriding the built-in corpus.")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per case per target (default: 3).")
+    p.add_argument("--output", type=str, default="benchmark_results.json", help="Path of the JSON report artifact.")
+    p.add_argument("--baseline", type=str, help="Earlier JSON report to check for regressions.")
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative latency/cost increase counted as a regression (default: 0.25).",
+    )
+
+
+def handle_benchmark(config, args):
+    """Run the benchmark, print the comparison table and write the report.
+
+    Exits with status 1 when --baseline is given and a regression is found.
+    """
+    targets = [parse_target(spec, config) for spec in args.targets]
+    if args.targets_file:
+        targets.extend(load_targets(args.targets_file, config))
+    if not targets:
+        targets = [parse_target("mock", config)]
+    corpus = load_corpus(args.corpus)
+
+    print(f"Benchmarking {len(targets)} target(s) on corpus '{corpus['name']}' ({args.repeat} run(s) per case)")
+    report = run_benchmark(config, targets, corpus, repeat=args.repeat, progress=lambda line: print(f"   {line}"))
+    print()
+    print(format_comparison(report))
+    write_report(report, args.output)
+    print(f"\n[OK] Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"\n[FAIL] {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"[OK] No regressions against {args.baseline}")
@@ -0,0 +1,309 @@
+"""
+Indexed cost ledger over the API cost log.
+
+``api_costs.log`` stays the canonical, human-readable record of real API
+calls, but it grows forever and used to be re-parsed line by line for every
+summary, budget check and pre-run rate-limit check. CostLedger keeps a
+SQLite side-file next to the log (``api_costs.log`` ->
+``api_costs.ledger.db``) holding every entry plus running rollups per day,
+month and provider:
+
+- Readers compare the log size with the offset the ledger has ingested and
+  only parse lines appended since (by this process, another gunicorn worker
+  or an older version of the app), so totals cost a few indexed reads
+  however long the log is
+- The first read of an existing log imports it once; a log that was
+  truncated or replaced is detected (size shrank or first line changed)
+  and re-imported
+- CostLedger.append() writes the log line inside the ledger's write
+  transaction, so concurrent writers are serialized by SQLite's lock and
+  log lines never interleave
+
+A short-lived connection is opened per operation, as in src/llm_cache.py.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes of the log's first line remembered to notice a replaced log
+_FINGERPRINT_BYTES = 256
+
+_ROLLUPS = (("cost_daily", "day"), ("cost_monthly", "month"), ("cost_providers", "provider"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cost_entries (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cost_entries_day ON cost_entries (day);
+CREATE TABLE IF NOT EXISTS cost_ledger_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+""" + "".join(
+    f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    {key} TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0
+);
+"""
+    for table, key in _ROLLUPS
+)
+
+
+def ledger_path(log_file: str) -> str:
+    """Side-file path of the ledger for *log_file*."""
+    root, _ = os.path.splitext(log_file)
+    return f"{root}.ledger.db"
+
+
+def parse_log_line(line: str) -> Optional[Tuple[str, str, str, int, int, float, int]]:
+    """Parse one cost log line.
+
+    Returns (timestamp, provider, model, input, output, cost, cached), or
+    None for blank or malformed lines.
+    """
+    parts = [p.strip() for p in line.strip().split("|")]
+    if len(parts) < 6 or not parts[0]:
+        return None
+    try:
+        input_tokens = int(parts[3])
+        output_tokens = int(parts[4])
+        cost = float(parts[5].replace("$", ""))
+    except ValueError:
+        return None
+    cached = 0
+    if len(parts) > 6:
+        try:
+            cached = int(parts[6])
+        except ValueError:
+            cached = 0
+    return parts[0], parts[1], parts[2], input_tokens, output_tokens, cost, cached
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"calls": 0, "cost": 0.0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+
+
+class CostLedger:
+    """Incrementally maintained index of one cost log file.
+
+    The side-file outlives its log: deleting or rotating the log leaves
+    ``ledger_path(log_file)`` behind (it is re-imported from whatever log
+    next appears at that path), so remove both when discarding a log.
+    """
+
+    _schema_ready = set()
+    _schema_lock = threading.Lock()
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        self.path = ledger_path(log_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        key = os.path.abspath(self.path)
+        needs_schema = key not in self._schema_ready or not os.path.exists(self.path)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if needs_schema:
+                with self._schema_lock:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready.add(key)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    # -- writing --------------------------------------------------------
+
+    def append(self, line: str) -> None:
+        """Append *line* (newline-terminated) to the log and index it.
+
+        The log write happens inside the ledger's write transaction, so
+        writers in other threads and processes take turns. Raises
+        sqlite3.Error, before anything is written, when the ledger cannot
+        be locked.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                with open(self.log_file, "a") as f:
+                    f.write(line)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            try:
+                self._ingest(conn)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                # The line is in the log; the next sync indexes it
+                conn.execute("ROLLBACK")
+                logger.warning("Could not index cost log entry: %s", e)
+        finally:
+            conn.close()
+
+    def sync(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Index any log lines appended since the last sync."""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            if self._in_sync(conn):
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._ingest(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            if own:
+                conn.close()
+
+    def _state(self, conn: sqlite3.Connection) -> Tuple[int, str]:
+        rows = dict(conn.execute("SELECT key, value FROM cost_ledger_state").fetchall())
+        return int(rows.get("offset") or 0), rows.get("fingerprint") or ""
+
+    def _fingerprint(self) -> str:
+        with open(self.log_file, "rb") as f:
+            return f.read(_FINGERPRINT_BYTES).split(b"\n", 1)[0].decode("utf-8", "replace")
+
+    def _in_sync(self, conn: sqlite3.Connection) -> bool:
+        offset, fingerprint = self._state(conn)
+        size = os.path.getsize(self.log_file)
+        return size == offset and (offset == 0 or self._fingerprint() == fingerprint)
+
+    def _ingest(self, conn: sqlite3.Connection) -> None:
+        """Index the log from the stored offset (inside a write transaction)."""
+        offset, fingerprint = self._state(conn)
+        size = os.path.getsize(self.log_file)
+        current = self._fingerprint() if size else ""
+        if size < offset or (offset and current != fingerprint):
+            logger.info("Cost log %s was replaced; rebuilding its ledger", self.log_file)
+            self._clear(conn)
+            offset = 0
+        if size == offset:
+            return
+
+        with open(self.log_file, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # Leave a partially written last line for the next sync
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        entries = [
+            parsed for parsed in map(parse_log_line, data[:end].decode("utf-8", "replace").splitlines()) if parsed
+        ]
+        self._record(conn, entries)
+        conn.executemany(
+            "INSERT OR REPLACE INTO cost_ledger_state (key, value) VALUES (?, ?)",
+            [("offset", str(offset + end)), ("fingerprint", current)],
+        )
+
+    def _record(self, conn: sqlite3.Connection, entries: List[Tuple[str, str, str, int, int, float, int]]) -> None:
+        rollups: Dict[str, Dict[str, List[float]]] = {table: {} for table, _ in _ROLLUPS}
+        rows = []
+        for timestamp, provider, model, input_tokens, output_tokens, cost, cached in entries:
+            day = timestamp[:10]
+            rows.append((timestamp, day, provider, model, input_tokens, output_tokens, cached, cost))
+            for table, key in (("cost_daily", day), ("cost_monthly", timestamp[:7]), ("cost_providers", provider)):
+                totals = rollups[table].setdefault(key, [0, 0.0, 0, 0, 0])
+                totals[0] += 1
+                totals[1] += cost
+                totals[2] += input_tokens
+                totals[3] += output_tokens
+                totals[4] += cached
+        conn.executemany(
+            "INSERT INTO cost_entries (timestamp, day, provider, model, input_tokens, output_tokens, cached_tokens, cost)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        for table, key in _ROLLUPS:
+            conn.executemany(
+                f"INSERT INTO {table} ({key}, calls, cost, input_tokens, output_tokens, cached_tokens)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                f" ON CONFLICT({key}) DO UPDATE SET calls = calls + excluded.calls, cost = cost + excluded.cost,"
+                " input_tokens = input_tokens + excluded.input_tokens,"
+                " output_tokens = output_tokens + excluded.output_tokens,"
+                " cached_tokens = cached_tokens + excluded.cached_tokens",
+                [(value, *totals) for value, totals in rollups[table].items()],
+            )
+
+    def _clear(self, conn: sqlite3.Connection) -> None:
+        for table in ["cost_entries", "cost_ledger_state"] + [table for table, _ in _ROLLUPS]:
+            conn.execute(f"DELETE FROM {table}")
+
+    # -- reading --------------------------------------------------------
+
+    def totals(self, month: Optional[str] = None) -> Dict[str, Any]:
+        """Calls, cost and tokens overall, or for one ``YYYY-MM`` month."""
+        conn = self._connect()
+        try:
+            self.sync(conn)
+            if month is not None:
+                row = conn.execute(
+                    "SELECT calls, cost, input_tokens, output_tokens, cached_tokens FROM cost_monthly WHERE month = ?",
+                    (month,),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT SUM(calls), SUM(cost), SUM(input_tokens), SUM(output_tokens), SUM(cached_tokens)"
+                    " FROM cost_monthly"
+                ).fetchone()
+        finally:
+            conn.close()
+        return _totals_dict(row)
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall totals with per-provider and per-day breakdowns."""
+        conn = self._connect()
+        try:
+            self.sync(conn)
+            overall = conn.execute(
+                "SELECT SUM(calls), SUM(cost), SUM(input_tokens), SUM(output_tokens), SUM(cached_tokens)"
+                " FROM cost_monthly"
+            ).fetchone()
+            providers = conn.execute("SELECT provider, calls, cost FROM cost_providers ORDER BY rowid").fetchall()
+            days = conn.execute("SELECT day, calls, cost FROM cost_daily ORDER BY day").fetchall()
+        finally:
+            conn.close()
+        totals = _totals_dict(overall)
+        return {
+            "total_calls": totals["calls"],
+            "total_cost": totals["cost"],
+            "total_input_tokens": totals["input_tokens"],
+            "total_output_tokens": totals["output_tokens"],
+            "total_cached_tokens": totals["cached_tokens"],
+            "by_provider": _breakdown(providers),
+            "by_day": _breakdown(days),
+        }
+
+
+def _totals_dict(row) -> Dict[str, Any]:
+    totals = _empty_totals()
+    if row is not None and row[0] is not None:
+        totals.update(calls=row[0], cost=float(row[1]), input_tokens=row[2], output_tokens=row[3], cached_tokens=row[4])
+    return totals
+
+
+def _breakdown(rows: Iterable[Tuple[str, int, float]]) -> Dict[str, Dict[str, Any]]:
+    return {key: {"calls": calls, "cost": float(cost)} for key, calls, cost in rows}
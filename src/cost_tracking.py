@@ -3,36 +3,51 @@ Cost tracking infrastructure for QuizWeaver.
 
 Logs API calls, tracks costs, and enforces rate limits to prevent
 accidental overspending when using real LLM providers.
+
+Calls are appended to api_costs.log; summaries, budget and rate-limit
+checks read the running totals of its indexed ledger (src/cost_ledger.py)
+instead of re-parsing the log.
 """
 
+import logging
 import os
+import sqlite3
 from datetime import date, datetime
 from typing import Any, Dict, Optional, Tuple
 
-# Pricing table (per 1M tokens) for known models
+from src.cost_ledger import CostLedger, parse_log_line
+
+logger = logging.getLogger(__name__)
+
+# Pricing table (per 1M tokens) for known models.
+# "cached_input" is the prompt-cache read rate; models without one are
+# billed at CACHED_INPUT_RATIO of their input price.
 MODEL_PRICING = {
     "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
-    "gemini-2.5-flash": {"input": 0.15, "output": 0.60},
+    "gemini-2.5-flash": {"input": 0.15, "output": 0.60, "cached_input": 0.0375},
     "gemini-2.0-flash-exp": {"input": 0.10, "output": 0.40},
     "gemini-1.5-pro": {"input": 3.50, "output": 10.50},
-    "gemini-2.5-pro": {"input": 1.25, "output": 10.00},
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00, "cached_input": 0.31},
     "gemini-3-flash-preview": {"input": 0.15, "output": 0.60},
     "gemini-3-pro-preview": {"input": 1.25, "output": 10.00},
-    "claude-sonnet-4-20250514": {"input": 3.00, "output": 15.00},
-    "claude-haiku-4-5-20251001": {"input": 0.80, "output": 4.00},
+    "claude-sonnet-4-20250514": {"input": 3.00, "output": 15.00, "cached_input": 0.30},
+    "claude-haiku-4-5-20251001": {"input": 0.80, "output": 4.00, "cached_input": 0.08},
 }
 
+CACHED_INPUT_RATIO = 0.25
+
 DEFAULT_LOG_FILE = "api_costs.log"
 
 
-def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
     """
     Estimate cost based on model pricing table.
 
     Args:
         model: Model name
-        input_tokens: Number of input tokens
+        input_tokens: Number of input tokens billed at the full rate
         output_tokens: Number of output tokens
+        cached_tokens: Number of prompt tokens read from the provider's prompt cache
 
     Returns:
         Estimated cost in dollars
@@ -40,7 +55,9 @@ def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
     pricing = MODEL_PRICING.get(model, {"input": 0.15, "output": 0.60})
     input_cost = (input_tokens / 1_000_000) * pricing["input"]
     output_cost = (output_tokens / 1_000_000) * pricing["output"]
-    return input_cost + output_cost
+    cached_rate = pricing.get("cached_input", pricing["input"] * CACHED_INPUT_RATIO)
+    cached_cost = (cached_tokens / 1_000_000) * cached_rate
+    return input_cost + output_cost + cached_cost
 
 
 def log_api_call(
@@ -50,102 +67,119 @@ def log_api_call(
     output_tokens: int,
     cost: Optional[float] = None,
     log_file: str = DEFAULT_LOG_FILE,
+    cached_tokens: int = 0,
 ) -> bool:
     """
     Log an API call to the cost tracking log file.
 
+    Lines are ``timestamp | provider | model | input | output | $cost``,
+    with a seventh ``cached`` field appended when prompt-cache reads were
+    reported. Readers only rely on the first six fields.
+
     Args:
         provider: Provider name (e.g., "gemini", "vertex")
         model: Model name
-        input_tokens: Number of input tokens
+        input_tokens: Number of input tokens billed at the full rate
         output_tokens: Number of output tokens
         cost: Cost in dollars (auto-estimated if None)
         log_file: Path to log file
+        cached_tokens: Prompt tokens served from the provider's prompt cache
 
     Returns:
         True on success
     """
     if cost is None:
-        cost = estimate_cost(model, input_tokens, output_tokens)
+        cost = estimate_cost(model, input_tokens, output_tokens, cached_tokens)
 
     timestamp = datetime.now().isoformat()
-    line = f"{timestamp} | {provider} | {model} | {input_tokens} | {output_tokens} | ${cost:.6f}\n"
+    line = f"{timestamp} | {provider} | {model} | {input_tokens} | {output_tokens} | ${cost:.6f}"
+    if cached_tokens:
+        line += f" | {cached_tokens}"
+    line += "\n"
 
     try:
-        with open(log_file, "a") as f:
-            f.write(line)
+        try:
+            CostLedger(log_file).append(line)
+        except sqlite3.Error as e:
+            logger.warning("Cost ledger unavailable (%s); appending to the log only", e)
+            with open(log_file, "a") as f:
+                f.write(line)
         return True
     except Exception as e:
         print(f"Warning: Could not log API cost: {e}")
         return False
 
 
-def get_cost_summary(log_file: str = DEFAULT_LOG_FILE) -> Dict[str, Any]:
+def _scan_log(log_file: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Aggregate the log by reading every line (fallback when the ledger is unusable).
+
+    Returns (summary as from get_cost_summary(), totals per ``YYYY-MM``).
     """
-    Read and aggregate costs from the log file.
+    summary = _empty_summary()
+    months: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(log_file) as f:
+            for line in f:
+                parsed = parse_log_line(line)
+                if parsed is None:
+                    continue
+                timestamp, provider, _model, input_tokens, output_tokens, cost, cached = parsed
+                summary["total_calls"] += 1
+                summary["total_cost"] += cost
+                summary["total_input_tokens"] += input_tokens
+                summary["total_output_tokens"] += output_tokens
+                summary["total_cached_tokens"] += cached
+                for bucket, key in (("by_provider", provider), ("by_day", timestamp[:10])):
+                    entry = summary[bucket].setdefault(key, {"calls": 0, "cost": 0.0})
+                    entry["calls"] += 1
+                    entry["cost"] += cost
+                month = months.setdefault(
+                    timestamp[:7], {"calls": 0, "cost": 0.0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+                )
+                month["calls"] += 1
+                month["cost"] += cost
+                month["input_tokens"] += input_tokens
+                month["output_tokens"] += output_tokens
+                month["cached_tokens"] += cached
+    except Exception as e:
+        print(f"Warning: Could not read cost log: {e}")
+    return summary, months
 
-    Args:
-        log_file: Path to log file
 
-    Returns:
-        Dict with aggregated stats:
-            total_calls, total_cost, total_input_tokens, total_output_tokens,
-            by_provider, by_day
-    """
-    summary = {
+def _empty_summary() -> Dict[str, Any]:
+    return {
         "total_calls": 0,
         "total_cost": 0.0,
         "total_input_tokens": 0,
         "total_output_tokens": 0,
+        "total_cached_tokens": 0,
         "by_provider": {},
         "by_day": {},
     }
 
-    if not os.path.exists(log_file):
-        return summary
 
-    try:
-        with open(log_file) as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split("|")]
-                if len(parts) < 6:
-                    continue
-
-                timestamp_str = parts[0]
-                provider = parts[1]
-                _model = parts[2]  # noqa: F841
-                input_tokens = int(parts[3])
-                output_tokens = int(parts[4])
-                cost = float(parts[5].replace("$", ""))
-
-                summary["total_calls"] += 1
-                summary["total_cost"] += cost
-                summary["total_input_tokens"] += input_tokens
-                summary["total_output_tokens"] += output_tokens
+def get_cost_summary(log_file: str = DEFAULT_LOG_FILE) -> Dict[str, Any]:
+    """
+    Aggregate costs from the log file.
 
-                # By provider
-                if provider not in summary["by_provider"]:
-                    summary["by_provider"][provider] = {"calls": 0, "cost": 0.0}
-                summary["by_provider"][provider]["calls"] += 1
-                summary["by_provider"][provider]["cost"] += cost
-
-                # By day
-                try:
-                    day = timestamp_str[:10]  # YYYY-MM-DD
-                    if day not in summary["by_day"]:
-                        summary["by_day"][day] = {"calls": 0, "cost": 0.0}
-                    summary["by_day"][day]["calls"] += 1
-                    summary["by_day"][day]["cost"] += cost
-                except (ValueError, IndexError):
-                    pass
+    Served from the ledger's running totals; only lines appended since the
+    last read are parsed.
 
-    except Exception as e:
-        print(f"Warning: Could not read cost log: {e}")
+    Args:
+        log_file: Path to log file
 
-    return summary
+    Returns:
+        Dict with aggregated stats:
+            total_calls, total_cost, total_input_tokens, total_output_tokens,
+            total_cached_tokens, by_provider, by_day
+    """
+    if not os.path.exists(log_file):
+        return _empty_summary()
+    try:
+        return CostLedger(log_file).summary()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cost ledger unavailable (%s); scanning %s", e, log_file)
+        return _scan_log(log_file)[0]
 
 
 def check_rate_limit(config: dict, log_file: str = DEFAULT_LOG_FILE) -> Tuple[bool, int, float]:
@@ -297,7 +331,7 @@ def get_monthly_total(
         month: Month 1-12 (defaults to current month)
 
     Returns:
-        Dict with calls, cost, input_tokens, output_tokens for the month
+        Dict with calls, cost, input_tokens, output_tokens, cached_tokens for the month
     """
     today = date.today()
     if year is None:
@@ -306,30 +340,16 @@ def get_monthly_total(
         month = today.month
 
     prefix = f"{year}-{month:02d}"
-    result = {"calls": 0, "cost": 0.0, "input_tokens": 0, "output_tokens": 0}
+    result = {"calls": 0, "cost": 0.0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
 
     if not os.path.exists(log_file):
         return result
 
     try:
-        with open(log_file) as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split("|")]
-                if len(parts) < 6:
-                    continue
-                if not parts[0].startswith(prefix):
-                    continue
-                result["calls"] += 1
-                result["input_tokens"] += int(parts[3])
-                result["output_tokens"] += int(parts[4])
-                result["cost"] += float(parts[5].replace("$", ""))
-    except Exception:
-        pass
-
-    return result
+        return CostLedger(log_file).totals(month=prefix)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cost ledger unavailable (%s); scanning %s", e, log_file)
+        return _scan_log(log_file)[1].get(prefix, result)
 
 
 def check_budget(config: dict, log_file: str = DEFAULT_LOG_FILE) -> Dict[str, Any]:
@@ -388,6 +408,8 @@ def format_cost_report(stats: Dict[str, Any]) -> str:
     lines.append(f"Total cost: ${stats['total_cost']:.4f}")
     lines.append(f"Total input tokens: {stats['total_input_tokens']:,}")
     lines.append(f"Total output tokens: {stats['total_output_tokens']:,}")
+    if stats.get("total_cached_tokens"):
+        lines.append(f"Total cached prompt tokens: {stats['total_cached_tokens']:,}")
 
     if stats["by_provider"]:
         lines.append("\nBy Provider:")
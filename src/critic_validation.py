@@ -2,31 +2,59 @@
 Deterministic pre-validation layer for quiz questions.
 
 Runs BEFORE the LLM critic call, saving tokens on obvious structural
-failures.  Pure functions only — no LLM calls, no database access.
+failures and on near-duplicate questions.  Pure functions only — no LLM
+calls, no database access.
 
 Does NOT enforce question-type diversity.  If the teacher wants 100%
 multiple-choice, that is a valid configuration choice.
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+import re
+from typing import Any, Dict, FrozenSet, List, Optional
 
 logger = logging.getLogger(__name__)
 
 # Recognised question type identifiers (internal canonical forms)
 VALID_TYPES = {"mc", "tf", "short_answer", "fill_in_blank", "matching", "essay", "ordering", "ma", "stimulus", "cloze"}
 
+# Jaccard similarity of word-bigram shingles at or above which two questions
+# count as near-duplicates.  0 disables the check.
+DUPLICATE_SIMILARITY_THRESHOLD = 0.7
+
+# Filler words dropped before shingling so rewordings like "the cell" /
+# "a cell" still match.  Negations are kept: "is" vs "is not" is a
+# different question.
+_STOPWORDS = frozenset(
+    {
+        "a", "an", "the", "of", "to", "in", "on", "at", "for", "by", "with", "from", "and", "or", "as",
+        "is", "are", "was", "were", "be", "been", "this", "that", "these", "those", "it", "its", "which", "what",
+    }
+)  # fmt: skip
+
 
 def pre_validate_questions(
     questions: List[Dict[str, Any]],
     teacher_config: Optional[Dict[str, Any]] = None,
+    approved: Optional[List[Dict[str, Any]]] = None,
+    duplicate_threshold: float = DUPLICATE_SIMILARITY_THRESHOLD,
+    in_review: Optional[List[Dict[str, Any]]] = None,
 ) -> List[Dict[str, Any]]:
     """Validate each question structurally and return per-question results.
 
+    A structurally valid question also fails when it is a near-duplicate
+    (see :func:`question_similarity`) of an *approved* or *in_review*
+    question or of an earlier passing question in the same batch.
+
     Args:
         questions: List of question dicts from the generator.
         teacher_config: Optional dict with keys like ``allowed_types``
             (list of permitted type strings).
+        approved: Questions already accepted in this run.
+        duplicate_threshold: Similarity at or above which a question is
+            rejected as a near-duplicate; 0 disables the check.
+        in_review: Questions drafted in this run that the critic has not
+            judged yet.
 
     Returns:
         List of result dicts, one per question, in the same order::
@@ -44,6 +72,12 @@ def pre_validate_questions(
         if allowed_types:
             allowed_types = set(allowed_types)
 
+    # (label, shingles) of every question a new one must not repeat
+    seen = []
+    if duplicate_threshold > 0:
+        seen = [("an already-approved question", question_shingles(q)) for q in approved or []]
+        seen += [("a question still in review", question_shingles(q)) for q in in_review or []]
+
     results = []
     for idx, q in enumerate(questions):
         issues: List[str] = []
@@ -57,6 +91,16 @@ def pre_validate_questions(
             if qtype and qtype not in allowed_types:
                 issues.append(f"Type '{qtype}' not in allowed types: {sorted(allowed_types)}")
 
+        if not issues and duplicate_threshold > 0:
+            shingles = question_shingles(q)
+            for label, other in seen:
+                similarity = _jaccard(shingles, other, duplicate_threshold)
+                if similarity >= duplicate_threshold:
+                    issues.append(f"Near-duplicate of {label} (similarity {similarity:.2f})")
+                    break
+            else:
+                seen.append((f"Q{idx}", shingles))
+
         results.append(
             {
                 "index": idx,
@@ -69,11 +113,51 @@ def pre_validate_questions(
     return results
 
 
+def question_shingles(q: Dict[str, Any]) -> FrozenSet[str]:
+    """Word-bigram shingles over a question's text and answer content.
+
+    Covers the stem plus options, items, blanks, match pairs, the stimulus
+    passage and sub-questions, lowercased with filler words removed.
+    """
+    parts = [q.get("text"), q.get("stimulus_text"), q.get("correct_answer"), q.get("expected_answer")]
+    for key in ("options", "items", "prompt_items", "response_items"):
+        if isinstance(q.get(key), list):
+            parts.extend(q[key])
+    for key, fields in (("blanks", ("answer",)), ("matches", ("term", "definition")), ("sub_questions", ("text",))):
+        for entry in q.get(key) or []:
+            if isinstance(entry, dict):
+                parts.extend(entry.get(field) for field in fields)
+    words = [w for part in parts if isinstance(part, str) for w in re.findall(r"[a-z0-9]+", part.lower())]
+    words = [w for w in words if w not in _STOPWORDS]
+    if len(words) < 2:
+        return frozenset(words)
+    return frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def question_similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Jaccard similarity (0.0-1.0) of two questions' :func:`question_shingles`."""
+    return _jaccard(question_shingles(a), question_shingles(b))
+
+
 # ------------------------------------------------------------------
 # Internal helpers
 # ------------------------------------------------------------------
 
 
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str], floor: float = 0.0) -> float:
+    """Jaccard similarity of two shingle sets.
+
+    Returns 0.0 without intersecting when the size ratio alone rules out
+    reaching *floor*.
+    """
+    if not a or not b:
+        return 0.0
+    if min(len(a), len(b)) < floor * max(len(a), len(b)):
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
 def _check_common_fields(q: Dict[str, Any], issues: List[str]) -> None:
     """Check fields required on every question type."""
     # text must exist and be non-empty
@@ -254,8 +338,6 @@ def _check_cloze(q: Dict[str, Any], issues: List[str]) -> None:
             issues.append(f"Blank {bi} missing 'answer'")
 
     # Check that text contains {{id}} placeholders matching blank ids
-    import re
-
     placeholder_ids = set(re.findall(r"\{\{(\d+)\}\}", text))
     if blank_ids and not placeholder_ids:
         issues.append("Cloze text has no {{id}} placeholders matching blanks")
@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import date, datetime
 
@@ -8,15 +9,36 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    UniqueConstraint,
     create_engine,
+    event,
+    func,
+    inspect,
 )
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
 Base = declarative_base()
 
+# One session factory for the whole process; get_session() binds it per engine
+SessionFactory = sessionmaker()
+
+# SQLite production profile, applied to every new connection (see get_engine()).
+# WAL lets readers run alongside the single writer, so gunicorn workers and
+# job threads no longer block each other on reads; busy_timeout makes writers
+# wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # safe with WAL: a crash can only lose the last commits
+    "busy_timeout": 5000,  # milliseconds
+    "mmap_size": 268435456,  # 256 MB
+    "cache_size": -64000,  # negative = KiB, i.e. 64 MB per connection
+}
+
 
 class Lesson(Base):
     """Represents ingested lesson content from documents.
@@ -71,7 +93,9 @@ class Class(Base):
         grade_level: Grade level of students (e.g., "8th Grade").
         subject: Subject area (e.g., "Algebra", "Biology").
         standards: JSON array of standards to track (e.g., ["SOL 7.1", "SOL 7.2"]).
-        config: JSON object for class-specific configuration (assumed_knowledge, etc.).
+        config: JSON object for class-specific configuration. Assumed knowledge
+            lives in ClassTopicKnowledge; an ``assumed_knowledge`` key here is
+            legacy data, copied over by migration 019.
         created_at: Timestamp when the class was created.
         updated_at: Timestamp of last update.
         lesson_logs: Relationship to LessonLog objects tracking lessons taught.
@@ -85,7 +109,7 @@ class Class(Base):
     grade_level = Column(String)
     subject = Column(String)
     standards = Column(JSON)  # Array of standards (e.g., ["SOL 7.1", "SOL 7.2"])
-    config = Column(JSON)  # Class-specific config (assumed_knowledge, etc.)
+    config = Column(JSON)  # Class-specific config
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -113,6 +137,7 @@ class LessonLog(Base):
     """
 
     __tablename__ = "lesson_logs"
+    __table_args__ = (Index("ix_lesson_logs_class_id_date", "class_id", "date"),)
     id = Column(Integer, primary_key=True)
     class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
     date = Column(Date, default=date.today, nullable=False)
@@ -144,6 +169,7 @@ class PerformanceData(Base):
     """
 
     __tablename__ = "performance_data"
+    __table_args__ = (Index("ix_performance_data_class_id_topic_date", "class_id", "topic", "date"),)
     id = Column(Integer, primary_key=True)
     class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
     quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"))
@@ -182,6 +208,10 @@ class Quiz(Base):
     """
 
     __tablename__ = "quizzes"
+    __table_args__ = (
+        Index("ix_quizzes_class_id_created_at", "class_id", "created_at"),
+        Index("ix_quizzes_parent_quiz_id_created_at", "parent_quiz_id", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
     title = Column(String)
     class_id = Column(Integer, ForeignKey("classes.id", ondelete="SET NULL"))  # New field
@@ -216,6 +246,10 @@ class Question(Base):
     """
 
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_quiz_id_sort_order", "quiz_id", "sort_order", "id"),
+        Index("ix_questions_saved_to_bank", "saved_to_bank", "id"),
+    )
     id = Column(Integer, primary_key=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
     question_type = Column(String)  # mc, tf, ma, etc.
@@ -402,6 +436,83 @@ class Standard(Base):
     )
 
 
+# Full-text index over standards, read by standards.search_standards().
+# SQLite: an FTS5 table kept in step by triggers, so every writer
+# (bulk_import_standards(), import_from_source_document(), raw SQL) updates it.
+# PostgreSQL: a GIN index over a weighted tsvector of the same columns.
+# Migration 020 adds the SQLite table to existing databases.
+_STANDARD_CURRICULUM = (
+    "coalesce({row}essential_knowledge, '') || ' ' || "
+    "coalesce({row}essential_understandings, '') || ' ' || "
+    "coalesce({row}essential_skills, '')"
+)
+_STANDARDS_FTS_INSERT = (
+    "INSERT INTO standards_fts (rowid, code, description, strand, full_text, curriculum) "
+    "VALUES (new.id, new.code, new.description, new.strand, new.full_text, "
+    + _STANDARD_CURRICULUM.format(row="new.")
+    + ");"
+)
+STANDARDS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS standards_fts USING fts5("
+    "code, description, strand, full_text, curriculum, prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS standards_fts_insert AFTER INSERT ON standards BEGIN {_STANDARDS_FTS_INSERT} END",
+    "CREATE TRIGGER IF NOT EXISTS standards_fts_delete AFTER DELETE ON standards BEGIN "
+    "DELETE FROM standards_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS standards_fts_update AFTER UPDATE OF code, description, strand, full_text, "
+    "essential_knowledge, essential_understandings, essential_skills ON standards BEGIN "
+    f"DELETE FROM standards_fts WHERE rowid = old.id; {_STANDARDS_FTS_INSERT} END",
+]
+STANDARDS_FTS_BACKFILL = (
+    "INSERT INTO standards_fts (rowid, code, description, strand, full_text, curriculum) "
+    "SELECT id, code, description, strand, full_text, " + _STANDARD_CURRICULUM.format(row="") + " FROM standards"
+)
+# Code matches rank above description, strand/full text and curriculum content
+STANDARDS_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(code, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(strand, '') || ' ' || coalesce(full_text, '')), 'C') || "
+    "setweight(to_tsvector('simple', " + _STANDARD_CURRICULUM.format(row="") + "), 'D')"
+)
+STANDARDS_SEARCH_INDEX_PG = (
+    f"CREATE INDEX IF NOT EXISTS ix_standards_search ON standards USING gin (({STANDARDS_SEARCH_VECTOR}))"
+)
+
+
+@event.listens_for(Standard.__table__, "after_create")
+def _create_standards_search_index_with_table(target, connection, **kw):
+    create_standards_search_index(connection)
+
+
+def create_standards_search_index(connection):
+    """Create the full-text index over ``standards`` if it is missing.
+
+    A newly created SQLite FTS5 table is filled from the existing rows.
+    SQLite builds without FTS5 get no index and search_standards() falls
+    back to LIKE matching.
+
+    Args:
+        connection: SQLAlchemy Connection inside a transaction.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql(STANDARDS_SEARCH_INDEX_PG)
+        return
+    if dialect != "sqlite":
+        return
+    existed = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='standards_fts'"
+    ).first()
+    try:
+        for statement in STANDARDS_FTS_DDL:
+            connection.exec_driver_sql(statement)
+    except OperationalError as exc:
+        if "no such module" not in str(exc):
+            raise
+        return
+    if existed is None:
+        connection.exec_driver_sql(STANDARDS_FTS_BACKFILL)
+
+
 class LessonPlan(Base):
     """Represents an AI-generated lesson plan.
 
@@ -519,6 +630,7 @@ class StandardExcerpt(Base):
     """
 
     __tablename__ = "standard_excerpts"
+    __table_args__ = (Index("ix_standard_excerpts_standard_id_sort_order", "standard_id", "sort_order"),)
     id = Column(Integer, primary_key=True)
     standard_id = Column(
         Integer, ForeignKey("standards.id", ondelete="CASCADE"), nullable=False
@@ -537,6 +649,311 @@ class StandardExcerpt(Base):
     source_document = relationship("SourceDocument", back_populates="excerpts")
 
 
+class ApiAuditEntry(Base):
+    """A persisted API audit log entry (see ``llm.audit_log.persist``).
+
+    Mirrors the in-memory audit entries from ``src.llm_provider`` so
+    transparency reports survive worker restarts.
+
+    Attributes:
+        id: Primary key.
+        run_id: Audit run (pipeline run) that made the call, if any.
+        provider: Provider name.
+        model: Model name.
+        prompt_char_count: Length of the prompt sent.
+        prompt_preview: First characters of the prompt.
+        response_char_count: Length of the response received.
+        response_preview: First characters of the response.
+        input_tokens: Billed input tokens.
+        output_tokens: Billed output tokens.
+        cached_tokens: Prompt tokens served from the provider's prompt cache.
+        duration_ms: Call duration in milliseconds.
+        error: Error message for failed calls.
+        created_at: Timestamp when the call was logged.
+    """
+
+    __tablename__ = "api_audit_log"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, index=True)
+    provider = Column(String)
+    model = Column(String)
+    prompt_char_count = Column(Integer, default=0)
+    prompt_preview = Column(Text)
+    response_char_count = Column(Integer, default=0)
+    response_preview = Column(Text)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)
+    duration_ms = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CriticPassRate(Base):
+    """Running critic verdict counts per generator provider/model and question type.
+
+    Used to size over-generation (``agent_loop.overgeneration``): the
+    pipeline asks for enough extra questions that the expected number of
+    critic passes covers the quiz on the first attempt.
+
+    Attributes:
+        id: Primary key.
+        provider: Generator provider name.
+        model: Generator model name ("" when not configured).
+        question_type: Question type (mc, tf, ma, ...).
+        passed: Questions the critic passed.
+        total: Questions the critic reviewed.
+        updated_at: Timestamp of the last update.
+    """
+
+    __tablename__ = "critic_pass_rates"
+    __table_args__ = (UniqueConstraint("provider", "model", "question_type"),)
+    id = Column(Integer, primary_key=True)
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False, default="")
+    question_type = Column(String, nullable=False)
+    passed = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class GenerationJob(Base):
+    """A background generation job run by the web app's job queue (``src.jobs``).
+
+    Attributes:
+        id: Job identifier (uuid hex), used in the status/result URLs.
+        kind: What is being generated (quiz, study, variant, lesson_plan, audio).
+        status: queued, running, completed or failed.
+        progress: Percent complete (0-100).
+        message: Current stage shown in the UI.
+        params: Request parameters the job was submitted with.
+        result: Result payload once completed (e.g. {"quiz_id": 12}).
+        error: User-safe error message when failed.
+        user_id: User who submitted the job (None for config-based auth).
+        created_at: When the job was submitted.
+        started_at: When a worker picked it up.
+        finished_at: When it completed or failed.
+    """
+
+    __tablename__ = "generation_jobs"
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, default="queued", index=True)
+    progress = Column(Integer, default=0)
+    message = Column(Text)
+    params = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    user_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class LessonTopicCount(Base):
+    """Number of a class's lessons tagged with each topic or standard.
+
+    Kept in step with LessonLog inserts, updates and deletes by the mapper
+    events below, so topic lists and pacing progress read this small table
+    instead of loading and parsing every lesson log.
+
+    Attributes:
+        id: Primary key.
+        class_id: Foreign key to the Class the lessons belong to.
+        kind: ``"topic"`` (from LessonLog.topics) or ``"standard"``
+            (from LessonLog.standards_addressed).
+        value: The topic or standard, stripped of surrounding whitespace.
+        lesson_count: Number of lessons currently tagged with it.
+    """
+
+    __tablename__ = "lesson_topic_counts"
+    __table_args__ = (UniqueConstraint("class_id", "kind", "value"),)
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # topic, standard
+    value = Column(String, nullable=False)
+    lesson_count = Column(Integer, default=0, nullable=False)
+
+
+class ClassTopicKnowledge(Base):
+    """Assumed knowledge of one topic in one class.
+
+    One row per (class, topic), written with a single upsert per topic
+    taught (see lesson_tracker.update_assumed_knowledge()). Replaces the
+    ``assumed_knowledge`` blob formerly kept in Class.config.
+
+    Attributes:
+        id: Primary key.
+        class_id: Foreign key to the Class.
+        topic: Topic name as extracted from lesson content.
+        depth: Knowledge depth, 1 (introduced) to 5 (expert).
+        last_taught: Date the topic was last taught.
+        mention_count: Number of lessons that covered the topic.
+    """
+
+    __tablename__ = "class_topic_knowledge"
+    __table_args__ = (
+        UniqueConstraint("class_id", "topic"),
+        Index("ix_class_topic_knowledge_class_id_depth", "class_id", "depth"),
+        Index("ix_class_topic_knowledge_class_id_last_taught", "class_id", "last_taught"),
+        Index("ix_class_topic_knowledge_class_id_mention_count", "class_id", "mention_count"),
+    )
+    id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
+    topic = Column(String, nullable=False)
+    depth = Column(Integer, default=1, nullable=False)
+    last_taught = Column(Date)
+    mention_count = Column(Integer, default=1, nullable=False)
+
+
+def _json_list(value):
+    """A JSON column value (list or JSON-encoded string) as a list."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+def lesson_tags(topics, standards_addressed):
+    """The ``(kind, value)`` pairs a lesson log is counted under."""
+    tags = set()
+    for kind, values in (("topic", topics), ("standard", standards_addressed)):
+        for item in _json_list(values):
+            if isinstance(item, str) and item.strip():
+                tags.add((kind, item.strip()))
+    return tags
+
+
+def upsert(connection, table, keys, values=None, increments=None, updates=None):
+    """Insert a row or update the existing one for *keys* in one statement.
+
+    Uses ``INSERT ... ON CONFLICT DO UPDATE`` (SQLite 3.24+ and PostgreSQL),
+    so concurrent writers never race between a SELECT and an INSERT.
+
+    Args:
+        connection: SQLAlchemy Connection (or Session) to execute on.
+        table: Target Table; *keys* must match one of its unique constraints.
+        keys: Column values identifying the row.
+        values: Columns to set on insert and overwrite on update.
+        increments: Columns to set on insert and add to on update.
+        updates: Column expressions to apply on update only, overriding
+            *values* and *increments* for the same columns.
+    """
+    bind = connection.get_bind() if hasattr(connection, "get_bind") else connection
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    values = values or {}
+    increments = increments or {}
+    statement = insert(table).values(**keys, **values, **increments)
+    set_ = dict(values)
+    set_.update({name: table.c[name] + statement.excluded[name] for name in increments})
+    set_.update(updates or {})
+    connection.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=set_))
+
+
+def _adjust_lesson_topic_counts(connection, class_id, tags, delta):
+    table = LessonTopicCount.__table__
+    for kind, value in tags:
+        keys = {"class_id": class_id, "kind": kind, "value": value}
+        upsert(connection, table, keys, increments={"lesson_count": delta})
+    if delta < 0 and tags:
+        connection.execute(table.delete().where(table.c.class_id == class_id, table.c.lesson_count <= 0))
+
+
+@event.listens_for(LessonLog, "after_insert")
+def _count_inserted_lesson(mapper, connection, lesson):
+    _adjust_lesson_topic_counts(connection, lesson.class_id, lesson_tags(lesson.topics, lesson.standards_addressed), 1)
+
+
+@event.listens_for(LessonLog, "after_delete")
+def _count_deleted_lesson(mapper, connection, lesson):
+    _adjust_lesson_topic_counts(connection, lesson.class_id, lesson_tags(lesson.topics, lesson.standards_addressed), -1)
+
+
+@event.listens_for(LessonLog, "before_update")
+def _count_updated_lesson(mapper, connection, lesson):
+    state = inspect(lesson)
+    if not any(state.attrs[name].history.has_changes() for name in ("class_id", "topics", "standards_addressed")):
+        return
+    # Attribute history lacks the old value once the instance has expired, so read the stored row
+    table = LessonLog.__table__
+    old = connection.execute(
+        table.select()
+        .with_only_columns(table.c.class_id, table.c.topics, table.c.standards_addressed)
+        .where(table.c.id == lesson.id)
+    ).first()
+    if old is not None:
+        _adjust_lesson_topic_counts(connection, old.class_id, lesson_tags(old.topics, old.standards_addressed), -1)
+    _adjust_lesson_topic_counts(connection, lesson.class_id, lesson_tags(lesson.topics, lesson.standards_addressed), 1)
+
+
+def rebuild_lesson_topic_counts(session):
+    """Recompute ``lesson_topic_counts`` from all lesson logs and commit.
+
+    Used to backfill the table when it is first created outside the SQLite
+    migrations (see init_db()).
+    """
+    counts = {}
+    for class_id, topics, standards in session.query(
+        LessonLog.class_id, LessonLog.topics, LessonLog.standards_addressed
+    ).yield_per(500):
+        for kind, value in lesson_tags(topics, standards):
+            key = (class_id, kind, value)
+            counts[key] = counts.get(key, 0) + 1
+    session.query(LessonTopicCount).delete()
+    session.add_all(
+        LessonTopicCount(class_id=class_id, kind=kind, value=value, lesson_count=count)
+        for (class_id, kind, value), count in counts.items()
+    )
+    session.commit()
+
+
+def _knowledge_entry(entry):
+    """Column values for one legacy ``assumed_knowledge`` entry, or None."""
+    if not isinstance(entry, dict):
+        return None
+    try:
+        last_taught = date.fromisoformat(str(entry.get("last_taught"))[:10])
+    except ValueError:
+        last_taught = None
+    try:
+        return {
+            "depth": int(entry.get("depth", 1)),
+            "last_taught": last_taught,
+            "mention_count": int(entry.get("mention_count", 1)),
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def backfill_class_topic_knowledge(session):
+    """Copy legacy ``assumed_knowledge`` from Class.config into ``class_topic_knowledge``.
+
+    Topics that already have a row are left alone. Used when the table is
+    first created outside the SQLite migrations (see init_db()).
+    """
+    table = ClassTopicKnowledge.__table__
+    existing = set(session.query(ClassTopicKnowledge.class_id, ClassTopicKnowledge.topic))
+    for class_id, config in session.query(Class.id, Class.config):
+        if isinstance(config, str):
+            try:
+                config = json.loads(config)
+            except ValueError:
+                continue
+        knowledge = config.get("assumed_knowledge") if isinstance(config, dict) else None
+        if not isinstance(knowledge, dict):
+            continue
+        for topic, entry in knowledge.items():
+            values = _knowledge_entry(entry)
+            if values is not None and (class_id, topic) not in existing:
+                session.execute(table.insert().values(class_id=class_id, topic=topic, **values))
+    session.commit()
+
+
 def get_database_url(db_path=None, url=None):
     """Resolve the database connection URL.
 
@@ -584,7 +1001,7 @@ def get_dialect(engine):
     return engine.dialect.name
 
 
-def get_engine(db_path=None, url=None):
+def get_engine(db_path=None, url=None, pragmas=None):
     """Returns a SQLAlchemy engine for the specified database.
 
     Supports SQLite (default, zero-config) and PostgreSQL (opt-in via
@@ -597,12 +1014,16 @@ def get_engine(db_path=None, url=None):
 
     For PostgreSQL connections, connection pooling is configured
     automatically (pool_size=5, max_overflow=10).  For SQLite the
-    default pool behaviour is used (StaticPool / NullPool).
+    default pool behaviour is used (QueuePool for files, SingletonThreadPool
+    for ``:memory:``) and every new connection is configured with
+    ``SQLITE_PRAGMAS`` through a connect event.
 
     Args:
         db_path: Path to a SQLite database file (default behaviour).
         url: Explicit database URL.  Overrides both ``db_path`` and
             ``DATABASE_URL``.
+        pragmas: Overrides merged into ``SQLITE_PRAGMAS`` (SQLite only);
+            a value of ``None`` leaves that pragma at SQLite's default.
 
     Returns:
         SQLAlchemy Engine instance connected to the database.
@@ -628,26 +1049,219 @@ def get_engine(db_path=None, url=None):
             raise
 
     # SQLite (default)
-    return create_engine(database_url)
+    engine = create_engine(database_url)
+    if database_url.startswith("sqlite"):
+        apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def apply_sqlite_pragmas(engine, overrides=None):
+    """Run the SQLite production profile on every new connection of *engine*.
+
+    Args:
+        engine: SQLAlchemy Engine for a SQLite database.
+        overrides: Optional dict merged into ``SQLITE_PRAGMAS``; ``None``
+            values drop that pragma.
+    """
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas.update(overrides or {})
+    # In-memory databases have no journal file to switch to WAL
+    if engine.url.database in (None, "", ":memory:"):
+        pragmas.pop("journal_mode", None)
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items() if value is not None]
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
 
 
 def init_db(engine):
-    """Creates all tables in the database if they don't exist.
+    """Creates all tables and indexes in the database if they don't exist.
+
+    ``create_all()`` only creates indexes together with their table, so
+    indexes added to existing tables are created here as well (on SQLite
+    the migrations also create them), as is the full-text index over
+    standards. A newly created ``lesson_topic_counts`` table is backfilled
+    from the lesson logs, and a newly created ``class_topic_knowledge``
+    table from the class configs.
 
     Args:
         engine: SQLAlchemy Engine instance to use for table creation.
     """
+    inspector = inspect(engine)
+    backfill_topic_counts = not inspector.has_table(LessonTopicCount.__tablename__)
+    backfill_knowledge = not inspector.has_table(ClassTopicKnowledge.__tablename__)
     Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        create_standards_search_index(connection)
+    if backfill_topic_counts or backfill_knowledge:
+        session = get_session(engine)
+        try:
+            if backfill_topic_counts:
+                rebuild_lesson_topic_counts(session)
+            if backfill_knowledge:
+                backfill_class_topic_knowledge(session)
+        finally:
+            session.close()
 
 
 def get_session(engine):
     """Returns a new database session.
 
+    Sessions come from the module-level ``SessionFactory`` bound to
+    *engine*, so no sessionmaker is built per call.
+
     Args:
         engine: SQLAlchemy Engine instance to bind the session to.
 
     Returns:
         SQLAlchemy Session instance for database operations.
     """
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return SessionFactory(bind=engine)
+
+
+def save_api_audit_entry(engine, entry):
+    """Persist one API audit log entry as an :class:`ApiAuditEntry` row.
+
+    Installed as the audit sink (``set_api_audit_sink``) when
+    ``llm.audit_log.persist`` is enabled.
+
+    Args:
+        engine: SQLAlchemy Engine instance to write to.
+        entry: Audit entry dict produced by ``src.llm_provider._log_api_call``.
+    """
+    session = get_session(engine)
+    try:
+        session.add(
+            ApiAuditEntry(
+                run_id=entry.get("run_id"),
+                provider=entry.get("provider"),
+                model=entry.get("model"),
+                prompt_char_count=entry.get("prompt_char_count", 0),
+                prompt_preview=entry.get("prompt_preview"),
+                response_char_count=entry.get("response_char_count", 0),
+                response_preview=entry.get("response_preview"),
+                input_tokens=entry.get("input_tokens", 0),
+                output_tokens=entry.get("output_tokens", 0),
+                cached_tokens=entry.get("cached_tokens", 0),
+                duration_ms=entry.get("duration_ms", 0),
+                error=entry.get("error"),
+            )
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+# Counts are halved once a row reviews more than this many questions, so the
+# rate follows recent prompt/model behavior instead of all history.
+CRITIC_PASS_RATE_WINDOW = 500
+
+
+def get_critic_pass_rates(session, provider, model):
+    """Return ``{question_type: (passed, total)}`` for a generator provider/model.
+
+    Args:
+        session: SQLAlchemy session.
+        provider: Generator provider name.
+        model: Generator model name.
+    """
+    rows = session.query(CriticPassRate).filter_by(provider=provider, model=model or "").all()
+    return {row.question_type: (row.passed, row.total) for row in rows}
+
+
+def record_critic_outcomes(session, provider, model, outcomes):
+    """Add one run's critic verdict counts to the running pass rates.
+
+    Counts are added in the database (upsert plus one halving UPDATE), so
+    concurrent runs never lose each other's verdicts.
+
+    Args:
+        session: SQLAlchemy session (committed by this function).
+        provider: Generator provider name.
+        model: Generator model name.
+        outcomes: ``{question_type: {"passed": int, "total": int}}`` as in
+            pipeline metadata ``critic_outcomes``.
+    """
+    table = CriticPassRate.__table__
+    model = model or ""
+    for question_type, counts in outcomes.items():
+        upsert(
+            session,
+            table,
+            {"provider": provider, "model": model, "question_type": question_type},
+            values={"updated_at": datetime.utcnow()},
+            increments={"passed": int(counts.get("passed", 0)), "total": int(counts.get("total", 0))},
+        )
+    session.execute(
+        table.update()
+        .where(table.c.provider == provider, table.c.model == model, table.c.total > CRITIC_PASS_RATE_WINDOW)
+        .values(passed=table.c.passed // 2, total=table.c.total // 2)
+    )
+    session.commit()
+
+
+def get_question_counts(session, quiz_ids):
+    """Count the questions of several quizzes in one GROUP BY query.
+
+    Args:
+        session: SQLAlchemy session.
+        quiz_ids: Quiz IDs to count questions for.
+
+    Returns:
+        ``{quiz_id: question_count}``; quizzes without questions map to 0.
+    """
+    quiz_ids = list(quiz_ids)
+    counts = dict.fromkeys(quiz_ids, 0)
+    if not quiz_ids:
+        return counts
+    rows = (
+        session.query(Question.quiz_id, func.count(Question.id))
+        .filter(Question.quiz_id.in_(quiz_ids))
+        .group_by(Question.quiz_id)
+        .all()
+    )
+    counts.update(rows)
+    return counts
+
+
+def add_questions_to_bank(session, questions, source_quiz_id=None):
+    """Save generated question dicts to the question bank without adding them to a quiz.
+
+    Used for surplus approved questions from over-generation. The quiz they
+    were generated for is kept in ``data["source_quiz_id"]``. The caller
+    commits.
+
+    Args:
+        session: SQLAlchemy session.
+        questions: Normalized question dicts from the pipeline.
+        source_quiz_id: Quiz the questions were generated alongside.
+
+    Returns:
+        List of the new Question records.
+    """
+    records = []
+    for q_data in questions:
+        data = dict(q_data)
+        if source_quiz_id is not None:
+            data["source_quiz_id"] = source_quiz_id
+        record = Question(
+            quiz_id=None,
+            question_type=q_data.get("type"),
+            title=q_data.get("title"),
+            text=q_data.get("text"),
+            points=q_data.get("points"),
+            saved_to_bank=1,
+            data=data,
+        )
+        session.add(record)
+        records.append(record)
+    return records
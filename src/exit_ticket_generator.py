@@ -15,6 +15,7 @@ from sqlalchemy.orm import Session
 
 from src.classroom import get_class
 from src.database import Question, Quiz
+from src.json_extraction import extract_json_array
 from src.lesson_tracker import get_recent_lessons
 from src.llm_provider import get_provider
 
@@ -119,9 +120,7 @@ def generate_exit_ticket(
     try:
         llm = get_provider(run_config, web_mode=True)
         response = llm.generate([prompt], json_mode=True)
-        questions_data = json.loads(response)
-        if not isinstance(questions_data, list):
-            questions_data = questions_data.get("questions", [])
+        questions_data = extract_json_array(response, source="exit ticket response").items
     except Exception as e:
         logger.error("generate_exit_ticket: LLM call failed: %s", e)
         new_quiz.status = "failed"
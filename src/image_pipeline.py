@@ -0,0 +1,259 @@
+"""
+Image payload optimization for multimodal prompts.
+
+PDF ingestion extracts every embedded image at full resolution, and the
+generator used to hand each one to ``prepare_image_context()`` on every
+retry attempt, re-reading and re-encoding (or re-uploading) megabytes per
+request. This module sits in front of ``prepare_image_context()``:
+
+- select_images() keeps images from the requested pages, drops tiny
+  decorations (bullets, icons) and byte-identical repeats (a logo on every
+  page), ranks the rest by how many requested topics their page text
+  mentions, and caps the count
+- optimize_image() downscales an image to the provider's size budget and
+  re-encodes it (JPEG, or PNG when it has transparency). Results are cached
+  on disk, keyed by source path, mtime, size and budget
+- ImagePipeline prepares each optimized image once per generator, so retry
+  attempts reuse the provider payload (and Gemini reuses the upload)
+
+Config (all optional):
+
+    generation:
+      images:
+        max_images: 8
+        cache_dir: image_cache
+        max_edge: 1568        # override the per-provider budget
+        max_bytes: 1000000
+"""
+
+import hashlib
+import io
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from src.llm_provider import _provider_identity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "image_cache"
+DEFAULT_MAX_IMAGES = 8
+# Images smaller than this on either side are decorations, not content
+MIN_IMAGE_EDGE = 48
+
+# Largest useful size per provider: beyond these the provider downsamples
+# server-side anyway, so extra pixels only cost upload time and tokens.
+DEFAULT_BUDGET = {"max_edge": 1568, "max_bytes": 1_000_000}
+IMAGE_BUDGETS = {
+    "anthropic": {"max_edge": 1568, "max_bytes": 1_000_000},
+    "vertex-anthropic": {"max_edge": 1568, "max_bytes": 1_000_000},
+    "gemini": {"max_edge": 1536, "max_bytes": 1_000_000},
+    "vertex": {"max_edge": 1536, "max_bytes": 1_000_000},
+    "openai-compatible": {"max_edge": 2048, "max_bytes": 1_000_000},
+}
+
+_JPEG_QUALITIES = (85, 70, 55)
+_PAGE_PATTERN = re.compile(r"image_\d+_(\d+)_\d+\.\w+$")
+
+
+def image_page(path: str) -> Optional[int]:
+    """Return the PDF page number encoded in an extracted image filename, if any.
+
+    Ingestion names images ``image_<lesson>_<page>_<n>.png``.
+    """
+    match = _PAGE_PATTERN.search(os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def parse_page_ranges(spec: str) -> set:
+    """Parse a page selection such as ``"1-3,7"`` into a set of page numbers.
+
+    Raises:
+        ValueError: If the spec is not a comma-separated list of pages/ranges.
+    """
+    pages = set()
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(p) for p in part.split("-", 1))
+            pages.update(range(start, end + 1))
+        else:
+            pages.add(int(part))
+    return pages
+
+
+def _fingerprint(path: str) -> Tuple[str, Tuple[int, int]]:
+    """Return (content digest, (width, height)) for an image file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    with Image.open(io.BytesIO(data)) as img:
+        size = img.size
+    return hashlib.sha256(data).hexdigest(), size
+
+
+def select_images(
+    candidates: Iterable[Tuple[str, str]],
+    topics: Optional[List[str]] = None,
+    pages: Optional[set] = None,
+    max_images: int = DEFAULT_MAX_IMAGES,
+    min_edge: int = MIN_IMAGE_EDGE,
+) -> List[str]:
+    """Pick the images worth sending with a generation request.
+
+    Args:
+        candidates: ``(path, page_text)`` pairs in document order; page_text
+            may be empty when no page analysis is available.
+        topics: Requested topics. When given, only images whose page text
+            mentions at least one topic are kept, most matches first.
+            Without topics, document order is kept.
+        pages: Page numbers to keep; images without a page number in their
+            filename are dropped when a page filter is given.
+        max_images: Upper bound on the number of images returned.
+        min_edge: Images narrower or shorter than this are skipped.
+
+    Returns:
+        List of image paths.
+    """
+    terms = [t.strip().lower() for t in topics or [] if t and t.strip()]
+    seen = set()
+    ranked = []
+    for order, (path, page_text) in enumerate(candidates):
+        if pages and image_page(path) not in pages:
+            continue
+        try:
+            digest, (width, height) = _fingerprint(path)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            continue
+        if min(width, height) < min_edge or digest in seen:
+            continue
+        seen.add(digest)
+        text = (page_text or "").lower()
+        score = sum(1 for term in terms if term in text)
+        if terms and score == 0:
+            continue
+        ranked.append((-score, order, path))
+    ranked.sort()
+    return [path for _, _, path in ranked[:max_images]]
+
+
+def _has_alpha(img: Image.Image) -> bool:
+    return img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def _encode(img: Image.Image, max_bytes: int) -> Tuple[bytes, str]:
+    """Re-encode *img* under *max_bytes*, lowering quality, then size, as needed."""
+    while True:
+        if _has_alpha(img):
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", optimize=True)
+            data, ext = buf.getvalue(), ".png"
+        else:
+            rgb = img.convert("RGB")
+            for quality in _JPEG_QUALITIES:
+                buf = io.BytesIO()
+                rgb.save(buf, format="JPEG", quality=quality, optimize=True)
+                data, ext = buf.getvalue(), ".jpg"
+                if len(data) <= max_bytes:
+                    break
+        if len(data) <= max_bytes or min(img.size) <= MIN_IMAGE_EDGE:
+            return data, ext
+        img = img.resize((max(1, int(img.width * 0.75)), max(1, int(img.height * 0.75))), Image.LANCZOS)
+
+
+def optimize_image(
+    image_path: str,
+    max_edge: int = DEFAULT_BUDGET["max_edge"],
+    max_bytes: int = DEFAULT_BUDGET["max_bytes"],
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> str:
+    """Return a path to a copy of *image_path* that fits the size budget.
+
+    Images already within budget are returned unchanged. Otherwise the
+    downscaled, re-encoded copy is written to *cache_dir* under a name
+    derived from the source path, mtime, size and budget, so edits to the
+    source produce a fresh copy and unchanged sources are never re-encoded.
+
+    Raises:
+        OSError: If the file cannot be read or is not an image.
+    """
+    stat = os.stat(image_path)
+    if stat.st_size <= max_bytes:
+        with Image.open(image_path) as img:
+            if max(img.size) <= max_edge:
+                return image_path
+
+    key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{max_edge}|{max_bytes}"
+    stem = os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+    for ext in (".jpg", ".png"):
+        if os.path.exists(stem + ext):
+            return stem + ext
+
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        data, ext = _encode(img, max_bytes)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write-then-rename so concurrent workers never read a partial file
+    tmp_path = f"{stem}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, stem + ext)
+    logger.debug("Optimized %s: %d -> %d bytes", image_path, stat.st_size, len(data))
+    return stem + ext
+
+
+class ImagePipeline:
+    """Optimizes images for one provider and reuses the prepared payloads.
+
+    Attributes:
+        max_images: Most images to include in one prompt.
+        stats: Counters for prepared and reused payloads and bytes saved.
+    """
+
+    def __init__(self, provider, images_config: Optional[Dict[str, Any]] = None):
+        images_config = images_config or {}
+        budget = IMAGE_BUDGETS.get(_provider_identity(provider)[0], DEFAULT_BUDGET)
+        self.provider = provider
+        self.max_edge = int(images_config.get("max_edge", budget["max_edge"]))
+        self.max_bytes = int(images_config.get("max_bytes", budget["max_bytes"]))
+        self.max_images = int(images_config.get("max_images", DEFAULT_MAX_IMAGES))
+        self.cache_dir = images_config.get("cache_dir", DEFAULT_CACHE_DIR)
+        self._prepared: Dict[tuple, Any] = {}
+        self.stats = {"prepared": 0, "reused": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def prepare(self, image_path: str) -> Any:
+        """Return the provider payload for *image_path*, optimizing it first.
+
+        Payloads are cached by (path, mtime, size), so later attempts in the
+        same run reuse them. If the image cannot be optimized, the original
+        file is passed to the provider unchanged.
+        """
+        try:
+            stat = os.stat(image_path)
+            key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+        if key is not None and key in self._prepared:
+            self.stats["reused"] += 1
+            return self._prepared[key]
+
+        source = image_path
+        if key is not None:
+            try:
+                source = optimize_image(image_path, self.max_edge, self.max_bytes, self.cache_dir)
+                self.stats["bytes_in"] += key[2]
+                self.stats["bytes_out"] += os.path.getsize(source)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                logger.warning("Could not optimize image %s: %s", image_path, e)
+
+        payload = self.provider.prepare_image_context(source)
+        self.stats["prepared"] += 1
+        if key is not None:
+            self._prepared[key] = payload
+        return payload
@@ -1,5 +1,4 @@
 import io
-import json
 import os
 
 import fitz  # PyMuPDF
@@ -7,6 +6,7 @@ from docx import Document
 from PIL import Image
 
 from .database import Asset, Lesson
+from .json_extraction import extract_json_object
 from .llm_provider import get_provider
 
 
@@ -134,21 +134,12 @@ def process_pdf_multimodal(filepath, provider):
 
         response_text = provider.generate([prompt, img], json_mode=True)
 
-        try:
-            # Clean up potential markdown code blocks from response
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-
-            page_analysis = json.loads(cleaned_text)
-
+        page_analysis = extract_json_object(response_text, source=f"page {page_index + 1} analysis")
+        if page_analysis is not None:
             # Aggregate content
             full_text.append(page_analysis.get("text_content", ""))
             structured_pages.append(page_analysis)
-
-        except json.JSONDecodeError:
+        else:
             print(f"    ! Failed to parse JSON for page {page_index + 1}. Fallback to text extraction.")
             full_text.append(page.get_text())
             structured_pages.append({"error": "Failed to analyze layout", "page": page_index + 1})
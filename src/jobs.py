@@ -0,0 +1,227 @@
+"""
+Background generation jobs for the web app.
+
+LLM and TTS generation can take minutes. Run inside the request thread it
+pins a gunicorn worker thread and risks the 120s worker timeout, so the
+generation routes can submit a job instead: a ``generation_jobs`` row is
+written, the work runs on a bounded thread pool outside the request cycle,
+and the browser polls ``/api/jobs/<id>`` for status and progress and
+``/api/jobs/<id>/result`` for the outcome.
+
+Job state lives in the database, so any gunicorn worker can answer status
+requests for a job started by another.
+
+Configure in config.yaml:
+
+    jobs:
+      max_workers: 2      # concurrent generations per process
+      max_pending: 20     # queued + running jobs before submissions are refused
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from src.database import GenerationJob, get_session
+from src.llm_provider import ProviderError
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 20
+# Active jobs older than this are assumed lost to a worker restart
+STALE_JOB_SECONDS = 3600
+
+GENERIC_JOB_ERROR = "Generation failed. Check your provider settings and try again."
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit() when max_pending jobs are already active."""
+
+
+class JobError(Exception):
+    """Raised by a job function to fail the job with a user-safe message."""
+
+
+class JobProgress:
+    """Progress reporter passed to job functions.
+
+    Call it with a percentage and/or a stage message. Updates are written to
+    the job row in their own short session, and only when something changed,
+    so job functions can report freely.
+    """
+
+    def __init__(self, engine, job_id: str):
+        self.engine = engine
+        self.job_id = job_id
+        self.progress = 0
+        self.message: Optional[str] = None
+
+    def __call__(self, progress: Optional[int] = None, message: Optional[str] = None) -> None:
+        progress = self.progress if progress is None else max(0, min(int(progress), 100))
+        message = self.message if message is None else message
+        if progress == self.progress and message == self.message:
+            return
+        self.progress, self.message = progress, message
+        session = get_session(self.engine)
+        try:
+            session.query(GenerationJob).filter_by(id=self.job_id).update({"progress": progress, "message": message})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning("Could not record progress for job %s: %s", self.job_id, e)
+        finally:
+            session.close()
+
+
+class JobQueue:
+    """Bounded worker pool that runs generation jobs and records their state.
+
+    Args:
+        engine: SQLAlchemy engine; each job gets its own session.
+        max_workers: Jobs run at once in this process.
+        max_pending: Queued plus running jobs accepted before
+            :meth:`submit` raises JobQueueFull.
+    """
+
+    def __init__(self, engine, max_workers: int = DEFAULT_MAX_WORKERS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.engine = engine
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="generation-job")
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[Any, JobProgress], Optional[Dict[str, Any]]],
+        params: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+    ) -> str:
+        """Record a job and queue *fn* to run on the pool.
+
+        *fn* is called as ``fn(session, progress)`` with a session of its own
+        and a :class:`JobProgress`. Its return value becomes the job result;
+        raising fails the job (JobError and ProviderError messages are shown
+        to the user, anything else gets a generic message).
+
+        Returns:
+            The new job id.
+        """
+        with self._lock:
+            if self._active >= self.max_pending:
+                raise JobQueueFull(f"{self._active} generation jobs already queued or running")
+            self._active += 1
+
+        job_id = uuid.uuid4().hex
+        session = get_session(self.engine)
+        try:
+            session.add(
+                GenerationJob(
+                    id=job_id, kind=kind, status=JOB_QUEUED, message="Queued", params=params or {}, user_id=user_id
+                )
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            with self._lock:
+                self._active -= 1
+            raise
+        finally:
+            session.close()
+
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; with *wait*, block until running jobs finish."""
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id: str, fn: Callable[[Any, JobProgress], Optional[Dict[str, Any]]]) -> None:
+        session = get_session(self.engine)
+        try:
+            _update_job(session, job_id, status=JOB_RUNNING, started_at=datetime.utcnow(), message="Running")
+            result, error = None, None
+            try:
+                result = fn(session, JobProgress(self.engine, job_id))
+            except (JobError, ProviderError) as e:
+                error = e.user_message if isinstance(e, ProviderError) else str(e)
+            except Exception as e:
+                logger.exception("Generation job %s failed: %s", job_id, e)
+                error = GENERIC_JOB_ERROR
+            session.rollback()
+            if error is None:
+                _update_job(session, job_id, status=JOB_COMPLETED, progress=100, message="Done", result=result or {})
+            else:
+                _update_job(session, job_id, status=JOB_FAILED, message="Failed", error=error)
+        except Exception as e:
+            logger.exception("Could not record state for job %s: %s", job_id, e)
+        finally:
+            session.close()
+            with self._lock:
+                self._active -= 1
+
+
+def _update_job(session, job_id: str, **fields) -> None:
+    """Set *fields* on a job row and commit."""
+    if fields.get("status") in (JOB_COMPLETED, JOB_FAILED):
+        fields["finished_at"] = datetime.utcnow()
+    session.query(GenerationJob).filter_by(id=job_id).update(fields)
+    session.commit()
+
+
+def get_job(session, job_id: str) -> Optional[GenerationJob]:
+    """Return the job with *job_id*, or None."""
+    return session.query(GenerationJob).filter_by(id=job_id).first()
+
+
+def job_to_dict(job: GenerationJob) -> Dict[str, Any]:
+    """Serialize a job for the status API."""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress or 0,
+        "message": job.message,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def fail_stale_jobs(session, max_age_seconds: int = STALE_JOB_SECONDS) -> int:
+    """Fail queued/running jobs older than *max_age_seconds*.
+
+    Jobs only live in the process that accepted them, so ones left active
+    that long were lost to a restart and would otherwise poll forever.
+
+    Returns:
+        Number of jobs marked failed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    count = (
+        session.query(GenerationJob)
+        .filter(GenerationJob.status.in_(ACTIVE_STATUSES), GenerationJob.created_at < cutoff)
+        .update(
+            {
+                "status": JOB_FAILED,
+                "message": "Failed",
+                "error": "The server restarted before this job finished.",
+                "finished_at": datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    )
+    session.commit()
+    return count
@@ -0,0 +1,200 @@
+"""
+Incremental JSON extraction for LLM responses.
+
+Language models return JSON arrays wrapped in markdown fences, preceded by
+chatter, or streamed a few tokens at a time. IncrementalArrayParser scans
+the text exactly once, tracking string/escape state and nesting depth, and
+hands back each object of the top-level array as soon as its closing brace
+arrives -- so streamed questions can be shown before the array is finished.
+
+Every generator parses its response through the same parser:
+
+    result = extract_json_array(response_text)
+    result.items          # every complete object, even from a truncated array
+    result.stats()        # {"parsed": 4, "skipped": 1, "truncated": True}
+
+extract_json_object() does the same for responses that are a single object
+(critic verdicts, page analyses, regenerated questions).
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalArrayParser:
+    """Yield complete objects from a JSON array as text is fed in.
+
+    Usage::
+
+        parser = IncrementalArrayParser()
+        for chunk in stream:
+            for obj in parser.feed(chunk):
+                handle(obj)
+
+    Text before the first ``[`` (fences, prose) is ignored. Objects that
+    fail to decode are counted in ``skipped`` rather than aborting the scan.
+
+    With ``require_array=False`` no enclosing array is expected: every
+    top-level object in the text is returned and brackets between objects
+    are ignored.
+    """
+
+    def __init__(self, require_array: bool = True):
+        self._buffer = []  # chars of the object currently being scanned
+        self._require_array = require_array
+        self._started = not require_array  # seen the opening '[' of the array
+        self._finished = False  # seen the matching ']'
+        self._depth = 0  # nesting depth inside the array (0 = between items)
+        self._in_string = False
+        self._escape = False
+        self.parsed = 0
+        self.skipped = 0
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the top-level array was seen."""
+        return self._finished
+
+    @property
+    def started(self) -> bool:
+        """True once the opening bracket of the array was seen."""
+        return self._started
+
+    @property
+    def pending(self) -> bool:
+        """True while an object has been opened but not yet closed."""
+        return self._depth > 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume *text* and return any objects completed by it."""
+        completed = []
+        for ch in text:
+            if self._finished:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # Between array items: only '{' (start) and ']' (end) matter
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == "]" and self._require_array:
+                    self._finished = True
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = self._decode("".join(self._buffer))
+                    self._buffer = []
+                    if obj is not None:
+                        completed.append(obj)
+        return completed
+
+    def _decode(self, raw: str):
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return None
+        if not isinstance(obj, dict):
+            self.skipped += 1
+            return None
+        self.parsed += 1
+        return obj
+
+
+class ArrayExtraction:
+    """Objects recovered from a model response, with salvage statistics.
+
+    Attributes:
+        items: Every object that decoded, in order.
+        found: Whether the response contained an array at all.
+        parsed: Objects decoded.
+        skipped: Objects that were complete but not valid JSON objects.
+        truncated: The response ended before the array was closed (objects
+            after the last complete one were lost).
+    """
+
+    def __init__(self, items: List[Dict[str, Any]], found: bool, parsed: int, skipped: int, truncated: bool):
+        self.items = items
+        self.found = found
+        self.parsed = parsed
+        self.skipped = skipped
+        self.truncated = truncated
+
+    @property
+    def salvaged(self) -> bool:
+        """True when objects were recovered from a damaged response."""
+        return bool(self.items) and (self.skipped > 0 or self.truncated)
+
+    def stats(self) -> Dict[str, Any]:
+        """Salvage statistics for logs and generation metadata."""
+        return {"parsed": self.parsed, "skipped": self.skipped, "truncated": self.truncated}
+
+
+def extract_json_array(text: Optional[str], source: str = "response") -> ArrayExtraction:
+    """Recover every complete object of the first JSON array in *text*.
+
+    Markdown fences and surrounding prose are ignored; a truncated array
+    yields the objects that were closed before the cut, and malformed
+    objects are skipped. Damaged responses are logged with *source* naming
+    the caller.
+    """
+    parser = IncrementalArrayParser()
+    items = parser.feed(text or "")
+    truncated = parser.started and not parser.finished
+    result = ArrayExtraction(items, parser.started, parser.parsed, parser.skipped, truncated)
+    if not result.found:
+        logger.debug("No JSON array in %s", source)
+    elif result.skipped or result.truncated:
+        logger.warning(
+            "Salvaged %d object(s) from %s (%d malformed, %s)",
+            result.parsed,
+            source,
+            result.skipped,
+            "truncated" if result.truncated else "complete",
+        )
+    return result
+
+
+def extract_json_object(text: Optional[str], source: str = "response") -> Optional[Dict[str, Any]]:
+    """Return the first complete JSON object in *text*, or None.
+
+    Fences and prose around the object are ignored. A response that is an
+    array of objects yields its first element.
+    """
+    parser = IncrementalArrayParser(require_array=False)
+    for chunk in _chunks(text or ""):
+        objects = parser.feed(chunk)
+        if objects:
+            return objects[0]
+    if parser.pending or parser.skipped:
+        logger.warning("No complete JSON object in %s (%s)", source, "truncated" if parser.pending else "malformed")
+    return None
+
+
+def _chunks(text: str, size: int = 4096):
+    # Feed in slices so extract_json_object stops scanning after the first object
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 
 from src.classroom import get_class
 from src.database import LessonPlan
+from src.json_extraction import extract_json_object
 
 logger = logging.getLogger(__name__)
 
@@ -86,24 +87,9 @@ def _build_prompt(class_obj, topics, standards, duration_minutes, grade_level):
 
 def _parse_plan(response_text):
     """Parse JSON response into a plan data dict."""
-    try:
-        data = json.loads(response_text)
-        if isinstance(data, dict):
-            return data
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    # Try to extract JSON object from response
-    import re
-
-    match = re.search(r"\{.*\}", response_text, re.DOTALL)
-    if match:
-        try:
-            data = json.loads(match.group())
-            if isinstance(data, dict):
-                return data
-        except (json.JSONDecodeError, ValueError):
-            pass
+    data = extract_json_object(response_text, source="lesson plan response")
+    if data is not None:
+        return data
 
     logger.warning("Failed to parse lesson plan response")
     return None
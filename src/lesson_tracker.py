@@ -9,9 +9,10 @@ import json
 from datetime import date, timedelta
 from typing import Any, Dict, List, Optional
 
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 
-from src.database import Class, LessonLog
+from src.database import Class, ClassTopicKnowledge, LessonLog, upsert
 
 # Known science topic keywords for simple extraction
 KNOWN_TOPICS = [
@@ -200,7 +201,10 @@ def update_assumed_knowledge(
     session: Session, class_id: int, topics: List[str], depth_increment: int = 1
 ) -> Dict[str, Any]:
     """
-    Update assumed knowledge in Class.config JSON.
+    Update assumed knowledge in the class_topic_knowledge table.
+
+    Each topic is one atomic upsert: new topics start at depth 1, known
+    topics gain *depth_increment* (capped at 5) and one mention.
 
     Knowledge depth levels:
         1: introduced - topic mentioned once
@@ -216,34 +220,31 @@ def update_assumed_knowledge(
         depth_increment: How much to increase depth (default 1)
 
     Returns:
-        Updated assumed_knowledge dict
+        Dict of {topic: {depth, last_taught, mention_count}} for the updated topics
     """
-    class_obj = session.query(Class).filter_by(id=class_id).first()
-    if not class_obj:
+    if not topics or session.get(Class, class_id) is None:
         return {}
 
-    config = json.loads(class_obj.config or "{}")
-    knowledge = config.get("assumed_knowledge", {})
-
-    today_str = date.today().isoformat()
+    table = ClassTopicKnowledge.__table__
+    deepened = table.c.depth + depth_increment
     for topic in topics:
-        if topic in knowledge:
-            current_depth = knowledge[topic].get("depth", 0)
-            knowledge[topic]["depth"] = min(current_depth + depth_increment, 5)
-            knowledge[topic]["last_taught"] = today_str
-            knowledge[topic]["mention_count"] = knowledge[topic].get("mention_count", 1) + 1
-        else:
-            knowledge[topic] = {
-                "depth": 1,
-                "last_taught": today_str,
-                "mention_count": 1,
-            }
-
-    config["assumed_knowledge"] = knowledge
-    class_obj.config = json.dumps(config)
+        upsert(
+            session,
+            table,
+            {"class_id": class_id, "topic": topic},
+            values={"depth": 1, "last_taught": date.today(), "mention_count": 1},
+            updates={
+                "depth": case((deepened > 5, 5), else_=deepened),
+                "mention_count": table.c.mention_count + 1,
+            },
+        )
     session.commit()
 
-    return knowledge
+    return _knowledge_dict(
+        session.query(ClassTopicKnowledge).filter(
+            ClassTopicKnowledge.class_id == class_id, ClassTopicKnowledge.topic.in_(topics)
+        )
+    )
 
 
 def delete_lesson(session: Session, lesson_id: int) -> bool:
@@ -265,6 +266,18 @@ def delete_lesson(session: Session, lesson_id: int) -> bool:
     return True
 
 
+def _knowledge_dict(query) -> Dict[str, Any]:
+    """Knowledge rows from *query* as {topic: {depth, last_taught, mention_count}}."""
+    return {
+        row.topic: {
+            "depth": row.depth,
+            "last_taught": row.last_taught.isoformat() if row.last_taught else None,
+            "mention_count": row.mention_count,
+        }
+        for row in query.order_by(ClassTopicKnowledge.id)
+    }
+
+
 def get_assumed_knowledge(session: Session, class_id: int) -> Dict[str, Any]:
     """
     Get the assumed knowledge dict for a class.
@@ -276,8 +289,4 @@ def get_assumed_knowledge(session: Session, class_id: int) -> Dict[str, Any]:
     Returns:
         Dict of {topic: {depth, last_taught, mention_count}, ...}
     """
-    class_obj = session.query(Class).filter_by(id=class_id).first()
-    if not class_obj:
-        return {}
-    config = json.loads(class_obj.config or "{}")
-    return config.get("assumed_knowledge", {})
+    return _knowledge_dict(session.query(ClassTopicKnowledge).filter(ClassTopicKnowledge.class_id == class_id))
@@ -0,0 +1,348 @@
+"""
+Content-addressed response cache for LLM providers.
+
+Wraps any LLMProvider so byte-identical requests (same provider, model,
+json_mode and prompt parts, including image bytes) are answered from a
+local SQLite side-file instead of a paid API call. Entries expire after a
+TTL and the store is trimmed least-recently-used first once it grows past
+its size budget.
+
+Opt-in via config.yaml:
+
+    llm:
+      cache:
+        enabled: true
+        path: llm_cache.db          # SQLite file (created on first use)
+        max_bytes: 52428800         # evict LRU entries beyond 50 MB
+        ttl_seconds: 604800         # entries older than 7 days are stale
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from src.llm_provider import ProviderWrapper, _current_cache_status, _log_api_call, _provider_identity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "llm_cache.db"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# Process-wide hit/miss counters (reported in audit entries and stats)
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Return a snapshot of the process-wide cache counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats() -> None:
+    """Reset the process-wide cache counters to zero."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _bump(counter: str, amount: int = 1) -> Dict[str, int]:
+    with _stats_lock:
+        _stats[counter] += amount
+        return dict(_stats)
+
+
+def _normalize_part(part: Any) -> Any:
+    """Reduce a prompt part to a JSON-serializable, content-addressed form.
+
+    Text is kept verbatim; binary payloads are replaced by their SHA-256 so
+    the key reflects image content without storing it twice.
+    """
+    if isinstance(part, str):
+        return part
+    if isinstance(part, (bytes, bytearray)):
+        return {"bytes": hashlib.sha256(part).hexdigest()}
+    if isinstance(part, dict):
+        # OpenAI/Anthropic image dicts carry base64 data inline
+        return json.loads(json.dumps(part, sort_keys=True, default=str))
+    # google-genai Part with inline bytes (Vertex prepare_image_context)
+    inline = getattr(part, "inline_data", None)
+    if inline is not None and getattr(inline, "data", None) is not None:
+        return {
+            "inline": hashlib.sha256(inline.data).hexdigest(),
+            "mime_type": getattr(inline, "mime_type", None),
+        }
+    # google-genai uploaded File: prefer the content hash over the per-upload URI
+    sha = getattr(part, "sha256_hash", None)
+    if sha:
+        return {"file_sha256": sha}
+    uri = getattr(part, "uri", None)
+    if uri:
+        return {"file_uri": uri}
+    return {"repr": f"{type(part).__name__}:{part}"}
+
+
+def make_cache_key(provider_name: str, model: str, json_mode: bool, prompt_parts: list) -> str:
+    """Compute the SHA-256 cache key for a generate() request."""
+    payload = {
+        "provider": provider_name,
+        "model": model,
+        "json_mode": bool(json_mode),
+        "parts": [_normalize_part(p) for p in prompt_parts],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL expiry and LRU size eviction.
+
+    A short-lived connection is opened per operation so the store is safe
+    to share between threads and between gunicorn workers.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = int(ttl_seconds)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for *key*, or None if absent/expired."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                _bump("evictions")
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return response
+        finally:
+            conn.close()
+
+    def put(self, key: str, response: str, provider: str = "", model: str = "") -> None:
+        """Store *response* under *key* and evict stale/excess entries."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if self.max_bytes > 0 and size > self.max_bytes:
+            return  # Never let a single oversized response flush the cache
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, provider, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, size, now, now),
+            )
+            evicted = self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+        _bump("stores")
+        if evicted:
+            _bump("evictions", evicted)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        """Drop expired entries, then LRU entries until under max_bytes."""
+        evicted = 0
+        if self.ttl_seconds > 0:
+            cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            evicted += cur.rowcount
+        if self.max_bytes > 0:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_bytes:
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+                evicted += len(victims)
+        return evicted
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def info(self) -> Dict[str, Any]:
+        """Return entry count and total stored bytes."""
+        conn = self._connect()
+        try:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        finally:
+            conn.close()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl_seconds}
+
+
+_caches: Dict[tuple, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(cache_config: Optional[Dict[str, Any]] = None) -> ResponseCache:
+    """Return the shared ResponseCache for the given ``llm.cache`` settings."""
+    cache_config = cache_config or {}
+    path = cache_config.get("path", DEFAULT_CACHE_PATH)
+    max_bytes = int(cache_config.get("max_bytes", DEFAULT_MAX_BYTES))
+    ttl_seconds = int(cache_config.get("ttl_seconds", DEFAULT_TTL_SECONDS))
+    key = (os.path.abspath(path), max_bytes, ttl_seconds)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResponseCache(path=path, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+            _caches[key] = cache
+        return cache
+
+
+class CachingProvider(ProviderWrapper):
+    """
+    LLMProvider decorator that serves repeated requests from a ResponseCache.
+
+    Cache hits are recorded in the API audit log with zero tokens and a
+    ``cache`` field carrying the running hit/miss counters. Misses fall
+    through to the wrapped provider, whose own audit entry for the call gets
+    a ``cache`` field with status ``"miss"``.
+    """
+
+    def __init__(self, inner, cache: ResponseCache):
+        super().__init__(inner)
+        self.cache = cache
+
+    def _lookup(self, prompt_parts: list, json_mode: bool, start_time: float):
+        """Return ``(key, cached_response, miss_status)`` and record the hit/miss.
+
+        On a hit *miss_status* is None; on a miss *cached_response* is None
+        and *miss_status* is the ``cache`` field for the provider call.
+        """
+        provider_name, model = _provider_identity(self.inner)
+        key = make_cache_key(provider_name, model, json_mode, prompt_parts)
+
+        try:
+            cached = self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read failed: %s", e)
+            cached = None
+
+        if cached is not None:
+            counters = _bump("hits")
+            prompt_text = " ".join(str(p) for p in prompt_parts if isinstance(p, str))
+            _log_api_call(
+                provider_name,
+                model,
+                prompt_text,
+                cached,
+                duration_ms=int((time.time() - start_time) * 1000),
+                cache={"status": "hit", "hits": counters["hits"], "misses": counters["misses"]},
+            )
+            return key, cached, None
+
+        counters = _bump("misses")
+        logging.getLogger("quizweaver.api_audit").info(
+            f"[CACHE MISS] {provider_name}/{model} | hits={counters['hits']} misses={counters['misses']}"
+        )
+        return key, None, {"status": "miss", "hits": counters["hits"], "misses": counters["misses"]}
+
+    def _store(self, key: str, response: str) -> None:
+        if not response:
+            return
+        provider_name, model = _provider_identity(self.inner)
+        try:
+            self.cache.put(key, response, provider=provider_name, model=model)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Return a cached response if present, otherwise call the wrapped provider."""
+        key, cached, miss = self._lookup(prompt_parts, json_mode, time.time())
+        if cached is not None:
+            return cached
+        token = _current_cache_status.set(miss)
+        try:
+            response = self.inner.generate(prompt_parts, json_mode=json_mode)
+        finally:
+            _current_cache_status.reset(token)
+        self._store(key, response)
+        return response
+
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate(); store I/O runs in a worker thread."""
+        key, cached, miss = await asyncio.to_thread(self._lookup, prompt_parts, json_mode, time.time())
+        if cached is not None:
+            return cached
+        token = _current_cache_status.set(miss)
+        try:
+            response = await self.inner.agenerate(prompt_parts, json_mode=json_mode)
+        finally:
+            _current_cache_status.reset(token)
+        await asyncio.to_thread(self._store, key, response)
+        return response
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Replay a cached response as one chunk, or tee the live stream into the cache."""
+        key, cached, miss = self._lookup(prompt_parts, json_mode, time.time())
+        if cached is not None:
+            yield cached
+            return
+        # Advance the live stream in its own context so the miss status never
+        # leaks into the consumer's code between chunks
+        context = contextvars.copy_context()
+        context.run(_current_cache_status.set, miss)
+        stream = context.run(self.inner.stream_generate, prompt_parts, json_mode=json_mode)
+        chunks = []
+        for chunk in iter(lambda: context.run(next, stream, None), None):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, "".join(chunks))
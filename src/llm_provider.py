@@ -1,9 +1,20 @@
+import asyncio
+import contextvars
+import email.utils
+import hashlib
+import itertools
 import logging
 import mimetypes
 import os
+import re
+import threading
 import time
+import uuid
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
 
 # Provider name constants
 PROVIDER_MOCK = "mock"
@@ -13,29 +24,184 @@ PROVIDER_ANTHROPIC = "anthropic"
 PROVIDER_VERTEX_ANTHROPIC = "vertex-anthropic"
 PROVIDER_OPENAI = "openai-compatible"
 
-# API call audit log — captures exact payloads for transparency reporting
-_api_audit_log = []
+# API call audit log — captures exact payloads for transparency reporting.
+# A bounded ring buffer: the oldest entries are dropped once it is full, so a
+# long-lived worker's memory stays flat. Per-run accounting uses AuditRun.
+AUDIT_LOG_MAX_ENTRIES = 1000
 
+_audit_lock = threading.Lock()
+_api_audit_log = deque(maxlen=AUDIT_LOG_MAX_ENTRIES)
+_audit_ids = itertools.count(1)
+_audit_sink: Optional[Callable[[dict], None]] = None
+_current_audit_run: contextvars.ContextVar = contextvars.ContextVar("quizweaver_audit_run", default=None)
+# Response-cache lookup behind the provider call in progress. CachingProvider
+# sets it around a miss so the wrapped provider's own audit entry carries it.
+_current_cache_status: contextvars.ContextVar = contextvars.ContextVar("quizweaver_cache_status", default=None)
 
-def get_api_audit_log():
-    """Return the API audit log and clear it."""
-    global _api_audit_log
-    log = list(_api_audit_log)
-    return log
+
+class AuditRun:
+    """Audit entries made by one pipeline run (or any other unit of work).
+
+    The active run travels in a context variable, so calls made from
+    concurrent requests, threads started with a copied context, and
+    ``asyncio`` tasks are attributed to the right run even though they share
+    the process-wide ring buffer. A run keeps its own entries, so its token
+    totals stay correct even after the ring buffer has dropped them.
+
+    Runs nest: an entry is recorded on the active run and all of its parents.
+
+    Attributes:
+        run_id: Identifier stamped on every entry as ``run_id``.
+        parent: The run that was active when this one started, if any.
+        entries: Audit entries recorded while this run was active.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, parent: Optional["AuditRun"] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.parent = parent
+        self.entries: list = []
+        self._lock = threading.Lock()
+
+    def _record(self, entry: dict) -> None:
+        run = self
+        while run is not None:
+            with run._lock:
+                run.entries.append(entry)
+            run = run.parent
+
+    def since(self, mark: int) -> list:
+        """Return the entries recorded after ``len(self.entries)`` was *mark*."""
+        with self._lock:
+            return self.entries[mark:]
+
+    def totals(self) -> dict:
+        """Sum call, error and token counts over this run's entries."""
+        with self._lock:
+            entries = list(self.entries)
+        return {
+            "calls": len(entries),
+            "errors": sum(1 for e in entries if e.get("error")),
+            "input_tokens": sum(e.get("input_tokens", 0) for e in entries),
+            "output_tokens": sum(e.get("output_tokens", 0) for e in entries),
+            "cached_tokens": sum(e.get("cached_tokens", 0) for e in entries),
+        }
+
+
+@contextmanager
+def audit_run(run_id: Optional[str] = None):
+    """Attribute API calls made inside the block to a new :class:`AuditRun`.
+
+    Args:
+        run_id: Optional identifier; a random one is generated otherwise.
+
+    Yields:
+        The active AuditRun.
+    """
+    run = AuditRun(run_id, parent=_current_audit_run.get())
+    token = _current_audit_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_audit_run.reset(token)
+
+
+def current_audit_run() -> Optional[AuditRun]:
+    """Return the AuditRun active in this context, or None."""
+    return _current_audit_run.get()
+
+
+def get_api_audit_log(
+    run_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    errors_only: bool = False,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> list:
+    """Return a snapshot of the API audit log, oldest first.
+
+    Args:
+        run_id: Only entries made inside this run.
+        provider: Only entries from this provider name.
+        errors_only: Only failed calls.
+        before_id: Only entries with an ``id`` lower than this (paging cursor).
+        limit: Return at most this many of the newest matching entries.
+
+    Returns:
+        List of audit entry dicts.
+    """
+    with _audit_lock:
+        entries = list(_api_audit_log)
+    if run_id is not None:
+        entries = [e for e in entries if e.get("run_id") == run_id]
+    if provider is not None:
+        entries = [e for e in entries if e.get("provider") == provider]
+    if errors_only:
+        entries = [e for e in entries if e.get("error")]
+    if before_id is not None:
+        entries = [e for e in entries if e["id"] < before_id]
+    if limit is not None:
+        entries = entries[-limit:] if limit > 0 else []
+    return entries
 
 
 def clear_api_audit_log():
     """Clear the API audit log."""
+    with _audit_lock:
+        _api_audit_log.clear()
+
+
+def configure_api_audit_log(max_entries: Optional[int] = None) -> None:
+    """Resize the audit ring buffer, keeping the newest entries.
+
+    Args:
+        max_entries: New capacity (``llm.audit_log.max_entries``); None
+            leaves the current size unchanged.
+    """
     global _api_audit_log
-    _api_audit_log = []
+    if not max_entries or int(max_entries) == _api_audit_log.maxlen:
+        return
+    with _audit_lock:
+        _api_audit_log = deque(_api_audit_log, maxlen=max(int(max_entries), 1))
+
+
+def set_api_audit_sink(sink: Optional[Callable[[dict], None]]) -> None:
+    """Install a callable that receives every new audit entry (or None to remove).
+
+    Used by the web app to persist entries to the database when
+    ``llm.audit_log.persist`` is enabled. Sink failures are logged and
+    never affect the provider call.
+    """
+    global _audit_sink
+    _audit_sink = sink
 
 
 def _log_api_call(
-    provider_name, model, prompt_summary, response_summary, input_tokens=0, output_tokens=0, duration_ms=0, error=None
+    provider_name,
+    model,
+    prompt_summary,
+    response_summary,
+    input_tokens=0,
+    output_tokens=0,
+    duration_ms=0,
+    error=None,
+    cache=None,
+    cached_tokens=0,
 ):
-    """Log an API call for audit purposes."""
+    """Log an API call for audit purposes.
+
+    ``cache`` is an optional dict describing a response-cache lookup
+    (status plus running hit/miss counters) when the call went through
+    :class:`src.llm_cache.CachingProvider`. It defaults to the cache miss
+    this call is answering, if any. ``cached_tokens`` counts prompt tokens
+    the provider served from its prompt cache (billed at the discounted
+    cache-read rate, not included in ``input_tokens``).
+    """
+    run = _current_audit_run.get()
+    if cache is None:
+        cache = _current_cache_status.get()
     entry = {
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "run_id": run.run_id if run is not None else None,
         "provider": provider_name,
         "model": model,
         "prompt_char_count": len(prompt_summary),
@@ -44,10 +210,23 @@ def _log_api_call(
         "response_preview": response_summary[:300] + ("..." if len(response_summary) > 300 else ""),
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
         "duration_ms": duration_ms,
         "error": error,
     }
-    _api_audit_log.append(entry)
+    if cache is not None:
+        entry["cache"] = cache
+    with _audit_lock:
+        entry["id"] = next(_audit_ids)
+        _api_audit_log.append(entry)
+    if run is not None:
+        run._record(entry)
+    sink = _audit_sink
+    if sink is not None:
+        try:
+            sink(entry)
+        except Exception as e:
+            logging.getLogger("quizweaver.api_audit").warning("Audit sink failed: %s", e)
     logging.getLogger("quizweaver.api_audit").info(
         f"[API CALL] {provider_name}/{model} | "
         f"in={input_tokens} out={output_tokens} | {duration_ms}ms | "
@@ -79,15 +258,57 @@ class ProviderError(Exception):
             via flash() or CLI output. Always includes actionable guidance.
         provider_name: Which provider triggered the error (e.g., "gemini").
         error_code: Optional HTTP status or error classification for programmatic use.
+        retry_after: Seconds the provider asked us to wait before retrying
+            (from a Retry-After header or hint), or None if unknown.
     """
 
-    def __init__(self, user_message: str, provider_name: str = "", error_code: str = ""):
+    def __init__(
+        self, user_message: str, provider_name: str = "", error_code: str = "", retry_after: Optional[float] = None
+    ):
         self.user_message = user_message
         self.provider_name = provider_name
         self.error_code = error_code
+        self.retry_after = retry_after
         super().__init__(user_message)
 
 
+_RETRY_AFTER_PATTERNS = (
+    re.compile(r"retry[- _]after\D{0,4}(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+    re.compile(r"retryDelay\W+(\d+(?:\.\d+)?)s"),
+)
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    """Extract a provider's requested back-off (seconds) from an SDK exception.
+
+    Checks ``Retry-After``/``retry-after-ms`` response headers (anthropic and
+    openai SDKs expose ``e.response.headers``), then hints embedded in the
+    message such as Gemini's ``retryDelay: '7s'``.
+    """
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            ms = headers.get("retry-after-ms")
+            if ms is not None:
+                return float(ms) / 1000.0
+            value = headers.get("retry-after")
+            if value is not None:
+                try:
+                    return float(value)
+                except ValueError:
+                    retry_at = email.utils.parsedate_to_datetime(value)
+                    return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError, AttributeError):
+            pass
+    msg = str(e)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(msg)
+        if match:
+            return float(match.group(1))
+    return None
+
+
 def _classify_provider_error(e: Exception, provider_name: str) -> ProviderError:
     """Convert a raw provider exception into a ProviderError with actionable guidance."""
     msg = str(e)
@@ -120,6 +341,7 @@ def _classify_provider_error(e: Exception, provider_name: str) -> ProviderError:
             "or check your billing/quota at your provider's dashboard.",
             provider_name=provider_name,
             error_code="rate_limit",
+            retry_after=_retry_after_seconds(e),
         )
     if "timeout" in lower or "timed out" in lower or "deadline" in lower:
         return ProviderError(
@@ -173,6 +395,40 @@ class LLMProvider(ABC):
         """
         pass
 
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """
+        Async counterpart of generate() for overlapping many in-flight requests.
+
+        Built-in providers override this with their SDK's native async client.
+        The default runs generate() in a worker thread so third-party
+        providers remain usable from async code without changes.
+
+        Args:
+            prompt_parts (list): A list containing strings and/or image objects.
+            json_mode (bool): Whether to force JSON output.
+
+        Returns:
+            str: The generated text from the language model.
+        """
+        return await asyncio.to_thread(self.generate, prompt_parts, json_mode)
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """
+        Yield the generated text incrementally as the model produces it.
+
+        Built-in providers override this with their SDK's streaming API. The
+        default yields the complete generate() result as a single chunk, so
+        callers can always consume a stream.
+
+        Args:
+            prompt_parts (list): A list containing strings and/or image objects.
+            json_mode (bool): Whether to force JSON output.
+
+        Yields:
+            str: Successive fragments of the response text.
+        """
+        yield self.generate(prompt_parts, json_mode=json_mode)
+
     @abstractmethod
     def prepare_image_context(self, image_path: str) -> Any:
         """
@@ -188,80 +444,364 @@ class LLMProvider(ABC):
         pass
 
 
-class GeminiProvider(LLMProvider):
+class ProviderWrapper(LLMProvider):
     """
-    Concrete implementation of the LLMProvider for Google's Gemini models
-    using the unified google-genai SDK.
-    Handles both Gemini Flash and Gemini Pro — model is specified per-instance.
+    Base class for providers that decorate another LLMProvider.
+
+    Delegates every call to the wrapped provider so subclasses only override
+    the behaviour they add (caching, throttling, routing). Unknown attribute
+    lookups (e.g. ``_model_name``) fall through to the wrapped provider.
     """
 
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
-        """
-        Initialize the Gemini provider with API credentials.
+    def __init__(self, inner: LLMProvider):
+        self.inner = inner
 
-        Args:
-            api_key: Google Gemini API key for authentication
-            model_name: Name of the Gemini model to use (default: gemini-2.5-flash)
+    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        return self.inner.generate(prompt_parts, json_mode=json_mode)
+
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        return await self.inner.agenerate(prompt_parts, json_mode=json_mode)
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        return self.inner.stream_generate(prompt_parts, json_mode=json_mode)
+
+    def prepare_image_context(self, image_path: str) -> Any:
+        return self.inner.prepare_image_context(image_path)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails; guard against recursion
+        # before ``inner`` has been assigned.
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+def _provider_identity(provider: LLMProvider) -> tuple:
+    """Return ``(provider_name, model_name)`` for any (possibly wrapped) provider."""
+    while isinstance(provider, ProviderWrapper):
+        provider = provider.inner
+    name = _PROVIDER_CLASS_NAMES.get(type(provider).__name__, type(provider).__name__)
+    return name, getattr(provider, "_model_name", "") or ""
+
+
+class CacheablePrefix(str):
+    """A prompt part that ends the stable, reusable prefix of a prompt.
+
+    Agents put the parts that stay the same across attempts (instructions,
+    QA guidelines, lesson content) first and mark the last of them with
+    CacheablePrefix. Providers with native prompt caching cache everything
+    up to and including the marked part; every other provider sees a
+    plain string.
+    """
+
+
+def split_cacheable_prefix(prompt_parts: list) -> tuple:
+    """Split *prompt_parts* at the last CacheablePrefix into ``(prefix, suffix)``.
+
+    Returns ``([], prompt_parts)`` when no part is marked.
+    """
+    for i in range(len(prompt_parts) - 1, -1, -1):
+        if isinstance(prompt_parts[i], CacheablePrefix):
+            return list(prompt_parts[: i + 1]), list(prompt_parts[i + 1 :])
+    return [], list(prompt_parts)
+
+
+def _usage_count(usage, *path) -> int:
+    """Read a (possibly nested) integer usage field, treating anything else as 0."""
+    value = usage
+    for name in path:
+        value = getattr(value, name, None)
+        if value is None:
+            return 0
+    return value if isinstance(value, int) else 0
+
+
+def _record_call(
+    cost_name, audit_name, model, prompt_parts, result_text, input_tokens, output_tokens, start_time, cached_tokens=0
+):
+    """Record a completed provider call in the cost log and the audit log.
+
+    The cost log is only written when the provider reported token usage,
+    matching what the provider SDKs actually bill. *input_tokens* excludes
+    prompt-cache reads, which are passed separately as *cached_tokens*.
+    """
+    if input_tokens or output_tokens or cached_tokens:
+        try:
+            from src.cost_tracking import log_api_call
+
+            if cached_tokens:
+                log_api_call(cost_name, model, input_tokens, output_tokens, cached_tokens=cached_tokens)
+            else:
+                log_api_call(cost_name, model, input_tokens, output_tokens)
+        except Exception:
+            pass
+    duration_ms = int((time.time() - start_time) * 1000)
+    prompt_text = " ".join(str(p) for p in prompt_parts if isinstance(p, str))
+    _log_api_call(
+        audit_name,
+        model,
+        prompt_text,
+        str(result_text or ""),
+        input_tokens or 0,
+        output_tokens or 0,
+        duration_ms,
+        cached_tokens=cached_tokens or 0,
+    )
+
+
+def _record_failure(audit_name, model, prompt_parts, error, start_time):
+    """Record a failed provider call in the audit log."""
+    duration_ms = int((time.time() - start_time) * 1000)
+    prompt_text = " ".join(str(p) for p in prompt_parts if isinstance(p, str))
+    _log_api_call(audit_name, model, prompt_text, "", 0, 0, duration_ms, error=str(error))
+
+
+class _LoopBoundClients:
+    """Async SDK clients, one per event loop.
+
+    Async clients keep connection pools bound to the loop that opened them,
+    while pooled providers outlive any single loop (each ``asyncio.run()``
+    from a sync bridge or job thread starts a new one). Clients for closed
+    or collected loops are dropped. Outside a running loop a fresh,
+    uncached client is returned.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._factory()
+        with self._lock:
+            for stale in [known for known in self._clients if known.is_closed()]:
+                del self._clients[stale]
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = self._factory()
+            return client
+
+
+def _to_message_content(prompt_parts: list, image_type: str, cache_prefix: bool = False) -> list:
+    """Convert prompt parts into OpenAI/Anthropic message content blocks.
+
+    Strings become text blocks; dicts whose ``type`` matches *image_type*
+    are passed through; anything else is skipped gracefully. With
+    *cache_prefix*, the block for the last CacheablePrefix part carries an
+    Anthropic ``cache_control`` breakpoint.
+    """
+    prefix, _ = split_cacheable_prefix(prompt_parts) if cache_prefix else ([], prompt_parts)
+    content_parts = []
+    for i, part in enumerate(prompt_parts):
+        if isinstance(part, str):
+            block = {"type": "text", "text": part}
+            if prefix and i == len(prefix) - 1:
+                block["cache_control"] = {"type": "ephemeral"}
+            content_parts.append(block)
+        elif isinstance(part, dict) and part.get("type") == image_type:
+            content_parts.append(part)
+    return content_parts
+
+
+class _GenAIProviderMixin:
+    """Shared request/response handling for google-genai backed providers.
+
+    Prompt caching: Gemini caches repeated prefixes implicitly, and the
+    usage report says how many prompt tokens were served from cache. When
+    the same CacheablePrefix is seen a second time within the TTL, an
+    explicit cached content is created for it so later requests (retries,
+    the next quiz on the same lesson) only send the variable suffix.
+    """
+
+    _cost_name = PROVIDER_GEMINI
+    _display_name = "Gemini"
+    prompt_caching = True
+    prompt_cache_ttl = 600
+    # Explicit caches below this size are rejected by the API; don't try
+    prompt_cache_min_chars = 4096
+
+    def _prompt_cache_state(self) -> dict:
+        state = self.__dict__.get("_prompt_cache")
+        if state is None:
+            state = self.__dict__.setdefault("_prompt_cache", {"lock": threading.Lock(), "entries": {}})
+        return state
+
+    def _cached_content_name(self, prefix: list) -> Any:
+        """Return the name of an explicit cached content for *prefix*, creating it on reuse.
+
+        First sighting of a prefix only records it (implicit caching may
+        still apply). The second sighting creates the cache. Failures are
+        remembered until the TTL lapses so an unsupported model is not
+        retried on every call.
         """
-        from google import genai
+        text_chars = sum(len(p) for p in prefix if isinstance(p, str))
+        if text_chars < self.prompt_cache_min_chars:
+            return None
+        digest = hashlib.sha256()
+        for part in prefix:
+            digest.update((part if isinstance(part, str) else str(getattr(part, "uri", None) or part)).encode("utf-8"))
+            digest.update(b"\x00")
+        key = digest.hexdigest()
+        now = time.time()
+        state = self._prompt_cache_state()
+        with state["lock"]:
+            entry = state["entries"].get(key)
+            if entry is not None and entry["expires_at"] > now:
+                if entry["name"] is not None or entry["failed"]:
+                    return entry["name"]
+            else:
+                # Expire the record a little early so we never send a stale cache name
+                state["entries"][key] = {"name": None, "failed": False, "expires_at": now + self.prompt_cache_ttl - 30}
+                return None
+            try:
+                cache = self.client.caches.create(
+                    model=self._model_name,
+                    config={"contents": prefix, "ttl": f"{int(self.prompt_cache_ttl)}s"},
+                )
+                entry["name"] = cache.name
+            except Exception as e:
+                logging.getLogger(__name__).debug("Gemini cached content not created: %s", e)
+                entry["failed"] = True
+            return entry["name"]
+
+    def _forget_cached_content(self, name: str) -> None:
+        state = self._prompt_cache_state()
+        with state["lock"]:
+            for key, entry in list(state["entries"].items()):
+                if entry["name"] == name:
+                    del state["entries"][key]
+
+    def _request_kwargs(self, prompt_parts: list, json_mode: bool) -> dict:
+        config = {}
+        if json_mode:
+            config["response_mime_type"] = "application/json"
+        contents = prompt_parts
+        if self.prompt_caching:
+            prefix, suffix = split_cacheable_prefix(prompt_parts)
+            if prefix and suffix:
+                name = self._cached_content_name(prefix)
+                if name:
+                    config["cached_content"] = name
+                    contents = suffix
+        return {
+            "model": self._model_name,
+            "contents": contents,
+            "config": config if config else None,
+        }
 
-        self.client = genai.Client(api_key=api_key)
-        self._model_name = model_name
+    def _request_failed(self, kwargs: dict, prompt_parts: list, e: Exception, start_time: float) -> ProviderError:
+        """Record a failure; drop an explicit cache the request used so the retry goes uncached."""
+        name = (kwargs.get("config") or {}).get("cached_content")
+        if name:
+            self._forget_cached_content(name)
+        _record_failure(self._cost_name, self._model_name, prompt_parts, e, start_time)
+        return _classify_provider_error(e, self._display_name)
+
+    def _usage_tokens(self, usage) -> tuple:
+        """Return ``(input_tokens, output_tokens, cached_tokens)`` from usage_metadata."""
+        cached = _usage_count(usage, "cached_content_token_count")
+        prompt = _usage_count(usage, "prompt_token_count")
+        return max(0, prompt - cached), _usage_count(usage, "candidates_token_count"), cached
+
+    def _handle_response(self, response, prompt_parts: list, start_time: float) -> str:
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(getattr(response, "usage_metadata", None))
+        result_text = response.text
+        _record_call(
+            self._cost_name,
+            self._cost_name,
+            self._model_name,
+            prompt_parts,
+            result_text,
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
+        return result_text
 
     def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
         """
-        Generate content using the Gemini API.
+        Generate content using the google-genai API.
 
         Args:
             prompt_parts: List of prompt components (text strings and/or image objects)
             json_mode: If True, configures the model to return JSON-formatted output
 
         Returns:
-            Generated text response from the model, or empty JSON array on error
+            Generated text response from the model
+
+        Raises:
+            ProviderError: If the API call fails
         """
         start_time = time.time()
-        prompt_text = " ".join(str(p) for p in prompt_parts if isinstance(p, str))
+        kwargs = self._request_kwargs(prompt_parts, json_mode)
         try:
-            config = {}
-            if json_mode:
-                config["response_mime_type"] = "application/json"
-
-            response = self.client.models.generate_content(
-                model=self._model_name,
-                contents=prompt_parts,
-                config=config if config else None,
-            )
+            response = self.client.models.generate_content(**kwargs)
+            return self._handle_response(response, prompt_parts, start_time)
+        except Exception as e:
+            raise self._request_failed(kwargs, prompt_parts, e, start_time) from e
 
-            duration_ms = int((time.time() - start_time) * 1000)
-            input_tokens = 0
-            output_tokens = 0
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate() using the client's ``aio`` surface."""
+        start_time = time.time()
+        kwargs = await asyncio.to_thread(self._request_kwargs, prompt_parts, json_mode)
+        try:
+            response = await self.client.aio.models.generate_content(**kwargs)
+            return self._handle_response(response, prompt_parts, start_time)
+        except Exception as e:
+            raise self._request_failed(kwargs, prompt_parts, e, start_time) from e
 
-            # Log cost if token metadata available
-            try:
-                from src.cost_tracking import log_api_call
-
-                usage = getattr(response, "usage_metadata", None)
-                if usage:
-                    input_tokens = getattr(usage, "prompt_token_count", 0)
-                    output_tokens = getattr(usage, "candidates_token_count", 0)
-                    log_api_call(
-                        "gemini",
-                        self._model_name,
-                        input_tokens,
-                        output_tokens,
-                    )
-            except Exception:
-                pass
-
-            result_text = response.text
-            _log_api_call(
-                "gemini", self._model_name, prompt_text, result_text, input_tokens, output_tokens, duration_ms
-            )
-            return result_text
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Stream the response via ``generate_content_stream``; usage arrives on the last chunk."""
+        start_time = time.time()
+        chunks = []
+        usage = None
+        kwargs = self._request_kwargs(prompt_parts, json_mode)
+        try:
+            for chunk in self.client.models.generate_content_stream(**kwargs):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                text = chunk.text
+                if text:
+                    chunks.append(text)
+                    yield text
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
-            _log_api_call("gemini", self._model_name, prompt_text, "", 0, 0, duration_ms, error=str(e))
-            raise _classify_provider_error(e, "Gemini") from e
+            raise self._request_failed(kwargs, prompt_parts, e, start_time) from e
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(usage)
+        _record_call(
+            self._cost_name,
+            self._cost_name,
+            self._model_name,
+            prompt_parts,
+            "".join(chunks),
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
+
+
+class GeminiProvider(_GenAIProviderMixin, LLMProvider):
+    """
+    Concrete implementation of the LLMProvider for Google's Gemini models
+    using the unified google-genai SDK.
+    Handles both Gemini Flash and Gemini Pro — model is specified per-instance.
+    """
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
+        """
+        Initialize the Gemini provider with API credentials.
+
+        Args:
+            api_key: Google Gemini API key for authentication
+            model_name: Name of the Gemini model to use (default: gemini-2.5-flash)
+        """
+        from google import genai
+
+        self.client = genai.Client(api_key=api_key)
+        self._model_name = model_name
 
     def prepare_image_context(self, image_path: str) -> Any:
         """
@@ -276,12 +816,15 @@ class GeminiProvider(LLMProvider):
         return self.client.files.upload(file=image_path)
 
 
-class VertexAIProvider(LLMProvider):
+class VertexAIProvider(_GenAIProviderMixin, LLMProvider):
     """
     Concrete implementation of the LLMProvider for Google Cloud Vertex AI models
     using the unified google-genai SDK with vertexai=True.
     """
 
+    _cost_name = PROVIDER_VERTEX
+    _display_name = "Vertex AI"
+
     def __init__(self, project_id: str, location: str, model_name: str = "gemini-2.5-flash"):
         """
         Initialize the Vertex AI provider with Google Cloud credentials.
@@ -302,47 +845,6 @@ class VertexAIProvider(LLMProvider):
         self.client = genai.Client(vertexai=True, project=project_id, location=location)
         self._model_name = model_name
 
-    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
-        """
-        Generate content using the Vertex AI API.
-
-        Args:
-            prompt_parts: List of prompt components (text strings and/or image objects)
-            json_mode: If True, configures the model to return JSON-formatted output
-
-        Returns:
-            Generated text response from the model, or empty JSON object on error
-        """
-        try:
-            config = {}
-            if json_mode:
-                config["response_mime_type"] = "application/json"
-
-            response = self.client.models.generate_content(
-                model=self._model_name,
-                contents=prompt_parts,
-                config=config if config else None,
-            )
-
-            # Log cost if token metadata available
-            try:
-                from src.cost_tracking import log_api_call
-
-                usage = getattr(response, "usage_metadata", None)
-                if usage:
-                    log_api_call(
-                        "vertex",
-                        self._model_name,
-                        getattr(usage, "prompt_token_count", 0),
-                        getattr(usage, "candidates_token_count", 0),
-                    )
-            except Exception:
-                pass
-
-            return response.text
-        except Exception as e:
-            raise _classify_provider_error(e, "Vertex AI") from e
-
     def prepare_image_context(self, image_path: str) -> Any:
         """
         Load an image file as bytes for Vertex AI multimodal prompts.
@@ -371,14 +873,45 @@ class MockLLMProvider(LLMProvider):
     """
     Mock implementation of LLMProvider for cost-free development and testing.
     Returns fabricated but realistic responses without making external API calls.
+
+    With a ``simulation`` config (``llm.mock_simulation``) it also behaves
+    like a slow, occasionally failing real provider: calls wait for a sampled
+    latency, streams are paced by tokens per second, injected 429/5xx errors
+    are raised as ProviderError, and each call is recorded in the API audit
+    log with estimated token counts (never in the cost log).
     """
 
-    def __init__(self):
-        """Initialize mock provider (no API keys needed)."""
-        from src.mock_responses import get_mock_response
+    def __init__(self, simulation: Optional[dict] = None):
+        """Initialize mock provider (no API keys needed).
+
+        Args:
+            simulation: Optional MockSimulation config for load testing.
+
+        Raises:
+            ValueError: If the simulation config is invalid.
+        """
+        from src.mock_responses import MockSimulation, get_mock_response
 
         self._get_mock_response = get_mock_response
         self._call_count = 0
+        self.simulation = MockSimulation(simulation) if simulation is not None else None
+        self.stream_chunk_chars = self.simulation.stream_chunk_chars if self.simulation else 64
+
+    def _plan(self, prompt_parts: list, json_mode: bool):
+        self._call_count += 1
+        response = self._get_mock_response(prompt_parts=prompt_parts, json_mode=json_mode)
+        return self.simulation.plan(prompt_parts, response)
+
+    def _finish(self, call, prompt_parts: list, start_time: float) -> str:
+        """Record a simulated call in the audit log; raise its injected error, if any."""
+        prompt_text = " ".join(str(p) for p in prompt_parts if isinstance(p, str))
+        duration_ms = int((time.time() - start_time) * 1000)
+        if call.error:
+            error = _classify_provider_error(RuntimeError(call.error_message), PROVIDER_MOCK)
+            _log_api_call(PROVIDER_MOCK, "", prompt_text, "", duration_ms=duration_ms, error=str(error))
+            raise error
+        _log_api_call(PROVIDER_MOCK, "", prompt_text, call.response, call.input_tokens, call.output_tokens, duration_ms)
+        return call.response
 
     def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
         """
@@ -390,13 +923,51 @@ class MockLLMProvider(LLMProvider):
 
         Returns:
             Fabricated but realistic JSON response
+
+        Raises:
+            ProviderError: When simulation injects an error
         """
-        self._call_count += 1
+        if self.simulation is None:
+            self._call_count += 1
+            # Use mock_responses module to generate realistic responses
+            return self._get_mock_response(prompt_parts=prompt_parts, json_mode=json_mode)
 
-        # Use mock_responses module to generate realistic responses
-        response = self._get_mock_response(prompt_parts=prompt_parts, json_mode=json_mode)
+        start_time = time.time()
+        call = self._plan(prompt_parts, json_mode)
+        time.sleep(call.total_seconds)
+        return self._finish(call, prompt_parts, start_time)
 
-        return response
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate(); simulated latency does not block the loop."""
+        if self.simulation is None:
+            await asyncio.sleep(0)
+            return self.generate(prompt_parts, json_mode=json_mode)
+
+        start_time = time.time()
+        call = self._plan(prompt_parts, json_mode)
+        await asyncio.sleep(call.total_seconds)
+        return self._finish(call, prompt_parts, start_time)
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Yield the fabricated response in small chunks, like a real token stream."""
+        if self.simulation is None:
+            response = self.generate(prompt_parts, json_mode=json_mode)
+            for i in range(0, len(response), self.stream_chunk_chars):
+                yield response[i : i + self.stream_chunk_chars]
+            return
+
+        start_time = time.time()
+        call = self._plan(prompt_parts, json_mode)
+        time.sleep(call.first_token_seconds)
+        if call.error:
+            self._finish(call, prompt_parts, start_time)
+        response = call.response
+        for i in range(0, len(response), self.stream_chunk_chars):
+            chunk = response[i : i + self.stream_chunk_chars]
+            if i:
+                time.sleep(self.simulation.chunk_delay(chunk))
+            yield chunk
+        self._finish(call, prompt_parts, start_time)
 
     def prepare_image_context(self, image_path: str) -> Any:
         """
@@ -430,8 +1001,56 @@ class OpenAICompatibleProvider(LLMProvider):
         from openai import OpenAI
 
         self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self._api_key = api_key
+        self._base_url = base_url
+        self._async_clients = _LoopBoundClients(self._make_async_client)
         self._model_name = model_name
 
+    def _make_async_client(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self._api_key, base_url=self._base_url)
+
+    @property
+    def async_client(self):
+        """Lazily-created ``openai.AsyncOpenAI`` client for the running event loop."""
+        return self._async_clients.get()
+
+    def _request_kwargs(self, prompt_parts: list, json_mode: bool) -> dict:
+        messages = [{"role": "user", "content": _to_message_content(prompt_parts, "image_url")}]
+        kwargs = {"model": self._model_name, "messages": messages}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs
+
+    @staticmethod
+    def _usage_tokens(usage) -> tuple:
+        """Return ``(input_tokens, output_tokens, cached_tokens)``.
+
+        OpenAI caches long prompt prefixes automatically and reports the
+        hits in ``prompt_tokens_details.cached_tokens``, which are included
+        in ``prompt_tokens``.
+        """
+        cached = _usage_count(usage, "prompt_tokens_details", "cached_tokens")
+        prompt = _usage_count(usage, "prompt_tokens")
+        return max(0, prompt - cached), _usage_count(usage, "completion_tokens"), cached
+
+    def _handle_response(self, response, prompt_parts: list, start_time: float) -> str:
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(response.usage)
+        result_text = response.choices[0].message.content
+        _record_call(
+            PROVIDER_OPENAI,
+            PROVIDER_OPENAI,
+            self._model_name,
+            prompt_parts,
+            result_text,
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
+        return result_text
+
     def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
         """
         Generate content using an OpenAI-compatible API.
@@ -441,43 +1060,60 @@ class OpenAICompatibleProvider(LLMProvider):
             json_mode: If True, request JSON-formatted output
 
         Returns:
-            Generated text response, or empty JSON on error
+            Generated text response
+
+        Raises:
+            ProviderError: If the API call fails
         """
+        start_time = time.time()
         try:
-            content_parts = []
-            for part in prompt_parts:
-                if isinstance(part, str):
-                    content_parts.append({"type": "text", "text": part})
-                elif isinstance(part, dict) and part.get("type") == "image_url":
-                    content_parts.append(part)
-                # Skip unknown types gracefully
-
-            messages = [{"role": "user", "content": content_parts}]
-            kwargs = {"model": self._model_name, "messages": messages}
-            if json_mode:
-                kwargs["response_format"] = {"type": "json_object"}
-
-            response = self.client.chat.completions.create(**kwargs)
-
-            # Log cost if usage data available
-            try:
-                from src.cost_tracking import log_api_call
-
-                usage = response.usage
-                if usage:
-                    log_api_call(
-                        "openai-compatible",
-                        self._model_name,
-                        getattr(usage, "prompt_tokens", 0),
-                        getattr(usage, "completion_tokens", 0),
-                    )
-            except Exception:
-                pass
-
-            return response.choices[0].message.content
+            response = self.client.chat.completions.create(**self._request_kwargs(prompt_parts, json_mode))
+            return self._handle_response(response, prompt_parts, start_time)
         except Exception as e:
+            _record_failure(PROVIDER_OPENAI, self._model_name, prompt_parts, e, start_time)
             raise _classify_provider_error(e, "OpenAI-compatible") from e
 
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate() using ``AsyncOpenAI``."""
+        start_time = time.time()
+        try:
+            response = await self.async_client.chat.completions.create(**self._request_kwargs(prompt_parts, json_mode))
+            return self._handle_response(response, prompt_parts, start_time)
+        except Exception as e:
+            _record_failure(PROVIDER_OPENAI, self._model_name, prompt_parts, e, start_time)
+            raise _classify_provider_error(e, "OpenAI-compatible") from e
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Stream the response as chat-completion deltas."""
+        start_time = time.time()
+        chunks = []
+        usage = None
+        try:
+            stream = self.client.chat.completions.create(**self._request_kwargs(prompt_parts, json_mode), stream=True)
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            _record_failure(PROVIDER_OPENAI, self._model_name, prompt_parts, e, start_time)
+            raise _classify_provider_error(e, "OpenAI-compatible") from e
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(usage)
+        _record_call(
+            PROVIDER_OPENAI,
+            PROVIDER_OPENAI,
+            self._model_name,
+            prompt_parts,
+            "".join(chunks),
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
+
     def prepare_image_context(self, image_path: str) -> Any:
         """
         Encode an image as a base64 data URL for OpenAI vision format.
@@ -498,26 +1134,50 @@ class OpenAICompatibleProvider(LLMProvider):
         return {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{b64}"}}
 
 
-class AnthropicProvider(LLMProvider):
-    """
-    LLM provider for Anthropic's Claude models via the direct API.
-    Requires an ANTHROPIC_API_KEY.
-    """
+class _AnthropicMessagesMixin:
+    """Shared request/response handling for Anthropic Messages API providers."""
 
-    def __init__(self, api_key: str, model_name: str = "claude-sonnet-4-20250514"):
-        """
-        Initialize the Anthropic provider with API credentials.
+    _cost_name = PROVIDER_ANTHROPIC
+    _display_name = "Anthropic"
+    prompt_caching = True
 
-        Args:
-            api_key: Anthropic API key for authentication
-            model_name: Name of the Claude model to use
-        """
-        if not _ANTHROPIC_AVAILABLE:
-            raise ImportError("The Anthropic library is not installed. Run: pip install anthropic")
-        import anthropic
+    def _request_kwargs(self, prompt_parts: list, json_mode: bool) -> dict:
+        content = _to_message_content(prompt_parts, "image", cache_prefix=self.prompt_caching)
+        kwargs = {
+            "model": self._model_name,
+            "messages": [{"role": "user", "content": content}],
+            "max_tokens": 8192,
+        }
+        if json_mode:
+            kwargs["system"] = "Respond only with valid JSON."
+        return kwargs
 
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self._model_name = model_name
+    @staticmethod
+    def _usage_tokens(usage) -> tuple:
+        """Return ``(input_tokens, output_tokens, cached_tokens)``.
+
+        Anthropic reports cache writes and cache reads separately from
+        ``input_tokens``. Writes are billed as input; reads are the cached
+        tokens.
+        """
+        input_tokens = _usage_count(usage, "input_tokens") + _usage_count(usage, "cache_creation_input_tokens")
+        return input_tokens, _usage_count(usage, "output_tokens"), _usage_count(usage, "cache_read_input_tokens")
+
+    def _handle_response(self, response, prompt_parts: list, start_time: float) -> str:
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(response.usage)
+        result_text = response.content[0].text
+        _record_call(
+            self._cost_name,
+            self._cost_name,
+            self._model_name,
+            prompt_parts,
+            result_text,
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
+        return result_text
 
     def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
         """
@@ -528,45 +1188,55 @@ class AnthropicProvider(LLMProvider):
             json_mode: If True, prepend a system prompt requesting JSON output
 
         Returns:
-            Generated text response from the model, or empty JSON on error
+            Generated text response from the model
+
+        Raises:
+            ProviderError: If the API call fails
         """
+        start_time = time.time()
         try:
-            content_parts = []
-            for part in prompt_parts:
-                if isinstance(part, str):
-                    content_parts.append({"type": "text", "text": part})
-                elif isinstance(part, dict) and part.get("type") == "image":
-                    content_parts.append(part)
-                # Skip unknown types gracefully
-
-            kwargs = {
-                "model": self._model_name,
-                "messages": [{"role": "user", "content": content_parts}],
-                "max_tokens": 8192,
-            }
-            if json_mode:
-                kwargs["system"] = "Respond only with valid JSON."
+            response = self.client.messages.create(**self._request_kwargs(prompt_parts, json_mode))
+            return self._handle_response(response, prompt_parts, start_time)
+        except Exception as e:
+            _record_failure(self._cost_name, self._model_name, prompt_parts, e, start_time)
+            raise _classify_provider_error(e, self._display_name) from e
 
-            response = self.client.messages.create(**kwargs)
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate() using the SDK's async client."""
+        start_time = time.time()
+        try:
+            response = await self.async_client.messages.create(**self._request_kwargs(prompt_parts, json_mode))
+            return self._handle_response(response, prompt_parts, start_time)
+        except Exception as e:
+            _record_failure(self._cost_name, self._model_name, prompt_parts, e, start_time)
+            raise _classify_provider_error(e, self._display_name) from e
 
-            # Log cost if usage data available
-            try:
-                from src.cost_tracking import log_api_call
-
-                usage = response.usage
-                if usage:
-                    log_api_call(
-                        "anthropic",
-                        self._model_name,
-                        getattr(usage, "input_tokens", 0),
-                        getattr(usage, "output_tokens", 0),
-                    )
-            except Exception:
-                pass
-
-            return response.content[0].text
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Stream the response with ``messages.stream``; usage comes from the final message."""
+        start_time = time.time()
+        chunks = []
+        try:
+            with self.client.messages.stream(**self._request_kwargs(prompt_parts, json_mode)) as stream:
+                for text in stream.text_stream:
+                    if text:
+                        chunks.append(text)
+                        yield text
+                usage = getattr(stream.get_final_message(), "usage", None)
         except Exception as e:
-            raise _classify_provider_error(e, "Anthropic") from e
+            _record_failure(self._cost_name, self._model_name, prompt_parts, e, start_time)
+            raise _classify_provider_error(e, self._display_name) from e
+        input_tokens, output_tokens, cached_tokens = self._usage_tokens(usage)
+        _record_call(
+            self._cost_name,
+            self._cost_name,
+            self._model_name,
+            prompt_parts,
+            "".join(chunks),
+            input_tokens,
+            output_tokens,
+            start_time,
+            cached_tokens=cached_tokens,
+        )
 
     def prepare_image_context(self, image_path: str) -> Any:
         """
@@ -595,12 +1265,49 @@ class AnthropicProvider(LLMProvider):
         }
 
 
-class VertexAnthropicProvider(LLMProvider):
+class AnthropicProvider(_AnthropicMessagesMixin, LLMProvider):
+    """
+    LLM provider for Anthropic's Claude models via the direct API.
+    Requires an ANTHROPIC_API_KEY.
+    """
+
+    def __init__(self, api_key: str, model_name: str = "claude-sonnet-4-20250514"):
+        """
+        Initialize the Anthropic provider with API credentials.
+
+        Args:
+            api_key: Anthropic API key for authentication
+            model_name: Name of the Claude model to use
+        """
+        if not _ANTHROPIC_AVAILABLE:
+            raise ImportError("The Anthropic library is not installed. Run: pip install anthropic")
+        import anthropic
+
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self._api_key = api_key
+        self._async_clients = _LoopBoundClients(self._make_async_client)
+        self._model_name = model_name
+
+    def _make_async_client(self):
+        import anthropic
+
+        return anthropic.AsyncAnthropic(api_key=self._api_key)
+
+    @property
+    def async_client(self):
+        """Lazily-created ``anthropic.AsyncAnthropic`` client for the running event loop."""
+        return self._async_clients.get()
+
+
+class VertexAnthropicProvider(_AnthropicMessagesMixin, LLMProvider):
     """
     LLM provider for Claude models via Google Cloud Vertex AI Model Garden.
     Uses GCP application-default credentials (no API key needed).
     """
 
+    _cost_name = PROVIDER_VERTEX_ANTHROPIC
+    _display_name = "Vertex AI (Claude)"
+
     def __init__(self, project_id: str, location: str, model_name: str = "claude-sonnet-4@20250514"):
         """
         Initialize the Vertex AI Claude provider with GCP credentials.
@@ -615,81 +1322,32 @@ class VertexAnthropicProvider(LLMProvider):
         from anthropic import AnthropicVertex
 
         self.client = AnthropicVertex(project_id=project_id, region=location)
+        self._project_id = project_id
+        self._location = location
+        self._async_clients = _LoopBoundClients(self._make_async_client)
         self._model_name = model_name
 
-    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
-        """
-        Generate content using Claude via Vertex AI.
+    def _make_async_client(self):
+        from anthropic import AsyncAnthropicVertex
 
-        Args:
-            prompt_parts: List of prompt components (text strings and/or image dicts)
-            json_mode: If True, prepend a system prompt requesting JSON output
+        return AsyncAnthropicVertex(project_id=self._project_id, region=self._location)
 
-        Returns:
-            Generated text response from the model, or empty JSON on error
-        """
-        try:
-            content_parts = []
-            for part in prompt_parts:
-                if isinstance(part, str):
-                    content_parts.append({"type": "text", "text": part})
-                elif isinstance(part, dict) and part.get("type") == "image":
-                    content_parts.append(part)
-
-            kwargs = {
-                "model": self._model_name,
-                "messages": [{"role": "user", "content": content_parts}],
-                "max_tokens": 8192,
-            }
-            if json_mode:
-                kwargs["system"] = "Respond only with valid JSON."
-
-            response = self.client.messages.create(**kwargs)
+    @property
+    def async_client(self):
+        """Lazily-created ``anthropic.AsyncAnthropicVertex`` client for the running event loop."""
+        return self._async_clients.get()
 
-            # Log cost if usage data available
-            try:
-                from src.cost_tracking import log_api_call
-
-                usage = response.usage
-                if usage:
-                    log_api_call(
-                        "vertex-anthropic",
-                        self._model_name,
-                        getattr(usage, "input_tokens", 0),
-                        getattr(usage, "output_tokens", 0),
-                    )
-            except Exception:
-                pass
-
-            return response.content[0].text
-        except Exception as e:
-            raise _classify_provider_error(e, "Vertex AI (Claude)") from e
 
-    def prepare_image_context(self, image_path: str) -> Any:
-        """
-        Encode an image as base64 in Anthropic's vision format.
-
-        Args:
-            image_path: Path to the image file
-
-        Returns:
-            Dict in Anthropic image format with base64-encoded data
-        """
-        import base64
-
-        mime_type, _ = mimetypes.guess_type(image_path)
-        if not mime_type:
-            mime_type = "image/png"
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode()
-        return {
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": mime_type,
-                "data": b64,
-            },
-        }
+# Canonical provider names for each concrete provider class (used in cache
+# keys and audit entries where only the provider instance is available).
+_PROVIDER_CLASS_NAMES = {
+    "MockLLMProvider": PROVIDER_MOCK,
+    "GeminiProvider": PROVIDER_GEMINI,
+    "VertexAIProvider": PROVIDER_VERTEX,
+    "AnthropicProvider": PROVIDER_ANTHROPIC,
+    "VertexAnthropicProvider": PROVIDER_VERTEX_ANTHROPIC,
+    "OpenAICompatibleProvider": PROVIDER_OPENAI,
+}
 
 
 # --- Provider Registry ---
@@ -861,6 +1519,7 @@ def get_provider(config, web_mode=False):
             - vertex_location: Required for Vertex AI provider
             - api_key: API key for OpenAI/custom providers
             - base_url: Base URL for OpenAI-compatible providers
+            - client_pool: Reuse pooled provider clients (default True)
         web_mode: If True, skip interactive input() approval gate (for web UI)
 
     Returns:
@@ -895,6 +1554,7 @@ def get_provider(config, web_mode=False):
         "openai",
         "openai-compatible",
     ]
+    declined = False
     if provider_name in real_providers:
         mode = llm_config.get("mode", "development")
         if mode == "development" and not web_mode:
@@ -909,12 +1569,50 @@ def get_provider(config, web_mode=False):
                 if response != "yes":
                     print("\n   Switching to mock provider for cost-free development.")
                     provider_name = "mock"
+                    declined = True
             except (EOFError, KeyboardInterrupt):
                 print("\n   No input received. Switching to mock provider.")
                 provider_name = "mock"
+                declined = True
+
+    provider = _get_or_build_provider(provider_name, llm_config, model_name)
+    # Fallback routes are real providers too; never route after the gate was declined
+    return _apply_provider_wrappers(provider, config, routing=not declined)
 
+
+def _get_or_build_provider(provider_name, llm_config, model_name):
+    """Return a pooled (or, for mock / ``client_pool: false``, fresh) provider."""
+    if provider_name != PROVIDER_MOCK and llm_config.get("client_pool", True):
+        provider = _provider_pool.get_or_create(provider_name, llm_config, model_name)
+    else:
+        provider = _build_provider(provider_name, llm_config, model_name)
+    _configure_prompt_cache(provider, llm_config)
+    return provider
+
+
+def _configure_prompt_cache(provider, llm_config):
+    """Apply ``llm.prompt_cache`` settings (enabled, ttl_seconds) to *provider*.
+
+    Prompt caching is on by default; providers without native support
+    ignore the CacheablePrefix marker.
+    """
+    prompt_cache = llm_config.get("prompt_cache") or {}
+    if hasattr(provider, "prompt_caching"):
+        provider.prompt_caching = bool(prompt_cache.get("enabled", True))
+    if "ttl_seconds" in prompt_cache and hasattr(provider, "prompt_cache_ttl"):
+        provider.prompt_cache_ttl = int(prompt_cache["ttl_seconds"])
+
+
+def _build_provider(provider_name, llm_config, model_name):
+    """Instantiate the concrete LLMProvider for *provider_name*.
+
+    Raises:
+        ValueError: If provider is unsupported or missing credentials/config
+        ImportError: If the provider's SDK is not installed
+    """
     if provider_name == "mock":
-        return MockLLMProvider()
+        simulation = llm_config.get("mock_simulation") or {}
+        return MockLLMProvider(simulation=simulation if simulation.get("enabled") else None)
     elif provider_name in ("gemini", "gemini-pro", "gemini-3-flash", "gemini-3-pro"):
         api_key = os.getenv("GEMINI_API_KEY") or llm_config.get("api_key", "")
         if not api_key:
@@ -990,3 +1688,167 @@ def get_provider(config, web_mode=False):
         raise ValueError(
             f"Unsupported provider: '{provider_name}'. Go to Settings to choose a supported provider (Gemini, Anthropic, OpenAI, Vertex AI, or Mock)."
         )
+
+
+class _ProviderPool:
+    """Process-wide, thread-safe registry of constructed providers.
+
+    SDK clients hold HTTP connection pools and TLS sessions, so rebuilding
+    them on every get_provider() call throws away keep-alive connections.
+    Providers are keyed on (provider, model, credentials fingerprint,
+    base_url); changed settings produce a new key, and
+    invalidate_provider_pool() drops everything when settings are saved.
+    The pool is bounded and evicts least-recently-used entries.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._providers = OrderedDict()
+        self._building = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(provider_name, llm_config, model_name) -> tuple:
+        """Build the pool key; secrets are reduced to a SHA-256 fingerprint."""
+        env_var = PROVIDER_REGISTRY.get(provider_name, {}).get("env_var")
+        secrets = [
+            os.getenv(env_var, "") if env_var else "",
+            llm_config.get("api_key", "") or "",
+            llm_config.get("vertex_project_id", "") or "",
+            llm_config.get("vertex_location", "") or "",
+        ]
+        fingerprint = hashlib.sha256("\x00".join(secrets).encode("utf-8")).hexdigest()[:16]
+        return (provider_name, model_name, fingerprint, llm_config.get("base_url", "") or "")
+
+    def _lookup(self, key) -> Optional[LLMProvider]:
+        """Return the pooled provider for *key*, counting a hit. Caller holds ``_lock``."""
+        provider = self._providers.get(key)
+        if provider is not None:
+            self._providers.move_to_end(key)
+            self._stats["hits"] += 1
+        return provider
+
+    def get_or_create(self, provider_name, llm_config, model_name) -> LLMProvider:
+        """Return the pooled provider for these settings, building it on a miss.
+
+        Construction (SDK client setup, credential discovery) happens outside
+        the pool lock so a slow build never blocks lookups for other keys;
+        a per-key lock keeps concurrent misses for one key to a single build.
+        """
+        key = self.make_key(provider_name, llm_config, model_name)
+        with self._lock:
+            provider = self._lookup(key)
+            if provider is not None:
+                return provider
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                provider = self._lookup(key)
+            if provider is not None:
+                return provider
+            built = _build_provider(provider_name, llm_config, model_name)
+            with self._lock:
+                provider = self._providers.setdefault(key, built)
+                if provider is built:
+                    self._stats["misses"] += 1
+                while len(self._providers) > self.max_size:
+                    self._providers.popitem(last=False)
+                    self._stats["evictions"] += 1
+                self._building.pop(key, None)
+            return provider
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._providers.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._providers),
+                "max_size": self.max_size,
+                "reuse_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "providers": [f"{k[0]}/{k[1]}" for k in self._providers],
+            }
+
+    def reset(self) -> None:
+        """Clear entries and counters (used by tests)."""
+        with self._lock:
+            self._providers.clear()
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+_provider_pool = _ProviderPool()
+
+
+def invalidate_provider_pool():
+    """Drop all pooled providers (call after LLM settings change)."""
+    _provider_pool.invalidate()
+
+
+def get_provider_pool_stats():
+    """Return connection-reuse statistics for the provider pool."""
+    return _provider_pool.stats()
+
+
+def _apply_provider_wrappers(provider, config, routing=True):
+    """Decorate *provider* with the opt-in layers enabled in config.
+
+    Layers, innermost first:
+        - ``llm.rate_limits.enabled``: RPM/TPM/in-flight limiter
+          (see :mod:`src.rate_limiter`), applied to every route
+        - ``llm.routing.enabled``: latency-aware routing, hedging and
+          failover across ``llm.routing.fallbacks`` (see :mod:`src.provider_router`)
+        - ``llm.cache.enabled``: content-addressed response cache
+          (see :mod:`src.llm_cache`); cache hits never wait on the limiter
+    """
+    llm_config = config.get("llm", {})
+    limits_config = llm_config.get("rate_limits") or {}
+    limiter = None
+    if limits_config.get("enabled"):
+        from src.rate_limiter import RateLimitedProvider, get_rate_limiter
+
+        limiter = get_rate_limiter(limits_config)
+        provider = RateLimitedProvider(provider, limiter)
+    routing_config = llm_config.get("routing") or {}
+    if routing and routing_config.get("enabled") and routing_config.get("fallbacks"):
+        from src.provider_router import build_routing_provider
+
+        fallbacks = []
+        for fallback in _build_fallback_providers(routing_config["fallbacks"], llm_config):
+            fallbacks.append(RateLimitedProvider(fallback, limiter) if limiter is not None else fallback)
+        if fallbacks:
+            provider = build_routing_provider(provider, fallbacks, routing_config)
+    cache_config = llm_config.get("cache") or {}
+    if cache_config.get("enabled"):
+        from src.llm_cache import CachingProvider, get_response_cache
+
+        provider = CachingProvider(provider, get_response_cache(cache_config))
+    return provider
+
+
+def _build_fallback_providers(fallbacks, llm_config):
+    """Instantiate the providers listed in ``llm.routing.fallbacks``.
+
+    Each entry is a small llm-config dict (``provider``, ``model_name`` and
+    any credentials such as ``api_key``/``base_url``). Shared settings like
+    ``prompt_cache`` and ``client_pool`` are inherited from *llm_config*.
+    A fallback that cannot be built (missing key, SDK not installed) is
+    skipped with a warning rather than breaking the primary provider.
+    """
+    inherited = {k: llm_config[k] for k in ("prompt_cache", "client_pool") if k in llm_config}
+    providers = []
+    for entry in fallbacks:
+        entry_config = {**inherited, **(entry or {})}
+        name = _resolve_provider_name(entry_config.get("provider", PROVIDER_MOCK))
+        model_name = entry_config.get("model_name") or PROVIDER_REGISTRY.get(name, {}).get("default_model", "default")
+        try:
+            providers.append(_get_or_build_provider(name, entry_config, model_name))
+        except (ValueError, ImportError) as e:
+            logging.getLogger(__name__).warning("Skipping fallback provider %s: %s", name, e)
+    return providers
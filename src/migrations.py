@@ -60,6 +60,16 @@ def get_migration_files(migrations_dir="migrations"):
     return [(f.name, str(f)) for f in sql_files]
 
 
+def _sqlite_has_fts5(cursor):
+    """Whether this SQLite build can create FTS5 tables (needed by migration 020)."""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+
 def check_if_migration_needed(db_path):
     """
     Check if database needs migration by testing for new tables/columns.
@@ -147,6 +157,42 @@ def check_if_migration_needed(db_path):
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='standard_excerpts'")
         standard_excerpts_exists = cursor.fetchone() is not None
 
+        # Check if api_audit_log table exists (migration 014)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='api_audit_log'")
+        api_audit_log_exists = cursor.fetchone() is not None
+
+        # Check if critic_pass_rates table exists (migration 015)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='critic_pass_rates'")
+        critic_pass_rates_exists = cursor.fetchone() is not None
+
+        # Check if generation_jobs table exists (migration 016)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='generation_jobs'")
+        generation_jobs_exists = cursor.fetchone() is not None
+
+        # Check if lesson_topic_counts table exists (migration 018)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='lesson_topic_counts'")
+        lesson_topic_counts_exists = cursor.fetchone() is not None
+
+        # Check if class_topic_knowledge table exists (migration 019)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='class_topic_knowledge'")
+        class_topic_knowledge_exists = cursor.fetchone() is not None
+
+        # Check if the standards full-text index exists (migration 020);
+        # builds without FTS5 skip that migration, so never wait for it there
+        standards_fts_exists = True
+        if standards_exists and _sqlite_has_fts5(cursor):
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='standards_fts'")
+            standards_fts_exists = cursor.fetchone() is not None
+
+        # Check if hot-path indexes exist (migration 017)
+        # (if questions table doesn't exist yet, ORM will create it with the indexes)
+        hot_path_indexes_exist = True
+        if questions_exists:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name='ix_questions_quiz_id_sort_order'"
+            )
+            hot_path_indexes_exist = cursor.fetchone() is not None
+
         conn.close()
 
         return (
@@ -160,6 +206,13 @@ def check_if_migration_needed(db_path):
             or not pacing_guides_exists
             or not source_documents_exists
             or not standard_excerpts_exists
+            or not api_audit_log_exists
+            or not critic_pass_rates_exists
+            or not generation_jobs_exists
+            or not hot_path_indexes_exist
+            or not lesson_topic_counts_exists
+            or not class_topic_knowledge_exists
+            or not standards_fts_exists
         )
     except Exception as e:
         print(f"Error checking migration status: {e}")
@@ -241,6 +294,9 @@ def run_migrations(db_path, migrations_dir="migrations", verbose=True):
                 elif "no such table" in err_msg:
                     if verbose:
                         print("[OK] (table managed by ORM)")
+                elif "no such module: fts5" in err_msg:
+                    if verbose:
+                        print("[OK] (skipped, SQLite built without FTS5)")
                 else:
                     raise
 
@@ -3,11 +3,18 @@ Mock LLM response templates for cost-free development.
 
 This module provides fabricated but realistic responses that simulate
 real LLM API behavior without making external calls or incurring costs.
+
+MockSimulation adds the other half of real API behavior for load testing:
+latency, token counts, streaming pace, rate-limit/server errors and
+response size, all sampled from a seeded random generator. It is enabled
+with ``llm.mock_simulation`` (see docs/COST_STRATEGY.md).
 """
 
 import json
+import math
 import random
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional
 
 # Sample topics for generating realistic content
 SCIENCE_TOPICS = [
@@ -1115,3 +1122,168 @@ def get_mock_response(prompt_parts: List[Any], json_mode: bool = False, agent_ty
         return _get_structured_critic_response(prompt_parts)
     else:  # generator
         return get_generator_response(prompt_parts, context_keywords)
+
+
+# --- Load-test simulation ---
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# Raw error text per simulated failure; MockLLMProvider passes these through
+# the same classifier as real SDK errors, so 429s carry a retry_after.
+SIMULATED_ERRORS = {
+    "rate_limit": "429 Too Many Requests (mock simulation). Retry after {retry_after} seconds.",
+    "server_error": "503 Service Unavailable (mock simulation).",
+    "timeout": "Request timed out (mock simulation).",
+}
+
+
+def scale_response(response: str, scale: float) -> str:
+    """Grow or shrink a mock response to *scale* times its natural size.
+
+    JSON arrays (generator output) are scaled by item count, cycling through
+    the original items. Anything else is padded with trailing whitespace,
+    which keeps JSON valid while growing the payload and token count.
+    """
+    if scale == 1.0:
+        return response
+    try:
+        data = json.loads(response)
+    except ValueError:
+        data = None
+    if isinstance(data, list) and data:
+        count = max(1, round(len(data) * scale))
+        return json.dumps([data[i % len(data)] for i in range(count)], indent=2)
+    if scale > 1.0:
+        return response + " " * int(len(response) * (scale - 1.0))
+    return response
+
+
+class SimulatedCall:
+    """The sampled behavior of one simulated provider call.
+
+    Attributes:
+        response: Response text after size scaling.
+        first_token_seconds: Delay before the first token (or the error).
+        generation_seconds: Time to produce the whole response after the first token.
+        input_tokens: Estimated prompt tokens.
+        output_tokens: Estimated response tokens.
+        error: Key of SIMULATED_ERRORS to raise instead of responding, or None.
+        error_message: Raw error text for *error*.
+    """
+
+    def __init__(self, response, first_token_seconds, generation_seconds, input_tokens, output_tokens, error=None):
+        self.response = response
+        self.first_token_seconds = first_token_seconds
+        self.generation_seconds = generation_seconds
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.error = error
+        self.error_message = None
+
+    @property
+    def total_seconds(self) -> float:
+        return self.first_token_seconds + (0.0 if self.error else self.generation_seconds)
+
+
+class MockSimulation:
+    """Samples latency, token counts and failures for MockLLMProvider.
+
+    Every call draws from one ``random.Random(seed)``, so a given seed and
+    call order reproduce the same latencies and errors. Only timing, size
+    and failures are seeded; the fabricated content is not.
+
+    Config keys (all optional)::
+
+        seed: 42
+        latency:                  # time to first token
+          distribution: lognormal # fixed | uniform | normal | lognormal
+          seconds: 6              # fixed value, mean (uniform/normal) or median (lognormal)
+          spread: 0.5             # uniform half-width, normal stddev, lognormal sigma
+          min_seconds: 0
+          max_seconds: 60
+        tokens_per_second: 80     # output pacing; 0 returns the whole response at once
+        chars_per_token: 4
+        stream_chunk_chars: 64
+        response_scale: 1.0
+        error_rates: {rate_limit: 0.05, server_error: 0.02, timeout: 0.0}
+        retry_after_seconds: 5
+
+    Raises:
+        ValueError: On an unknown distribution or error type, or rates above 1.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        latency = config.get("latency") or {}
+        self.distribution = latency.get("distribution", "fixed")
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution {self.distribution!r}; expected one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+        self.latency_seconds = float(latency.get("seconds", 0.0))
+        self.latency_spread = float(latency.get("spread", 0.0))
+        self.min_seconds = float(latency.get("min_seconds", 0.0))
+        max_seconds = latency.get("max_seconds")
+        self.max_seconds = float(max_seconds) if max_seconds is not None else math.inf
+        self.tokens_per_second = float(config.get("tokens_per_second", 0.0))
+        self.chars_per_token = max(1, int(config.get("chars_per_token", 4)))
+        self.stream_chunk_chars = max(1, int(config.get("stream_chunk_chars", 64)))
+        self.response_scale = float(config.get("response_scale", 1.0))
+        self.retry_after_seconds = float(config.get("retry_after_seconds", 1.0))
+        self.error_rates = {}
+        for error, rate in (config.get("error_rates") or {}).items():
+            if error not in SIMULATED_ERRORS:
+                raise ValueError(f"Unknown simulated error {error!r}; expected one of {', '.join(SIMULATED_ERRORS)}")
+            self.error_rates[error] = float(rate)
+        if sum(self.error_rates.values()) > 1.0:
+            raise ValueError("Simulated error rates add up to more than 1")
+        self.seed = config.get("seed")
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        rng = self._rng
+        if self.distribution == "uniform":
+            value = rng.uniform(self.latency_seconds - self.latency_spread, self.latency_seconds + self.latency_spread)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.latency_seconds, self.latency_spread)
+        elif self.distribution == "lognormal":
+            value = rng.lognormvariate(math.log(max(self.latency_seconds, 1e-6)), self.latency_spread)
+        else:
+            value = self.latency_seconds
+        return min(max(value, self.min_seconds, 0.0), self.max_seconds)
+
+    def _pick_error(self, roll: float) -> Optional[str]:
+        threshold = 0.0
+        for error, rate in self.error_rates.items():
+            threshold += rate
+            if roll < threshold:
+                return error
+        return None
+
+    def tokens(self, text: str) -> int:
+        """Estimate the token count of *text*."""
+        return max(1, len(text) // self.chars_per_token) if text else 0
+
+    def plan(self, prompt_parts: List[Any], response: str) -> SimulatedCall:
+        """Sample the behavior of one call that would return *response*."""
+        with self._lock:
+            # Always draw both values so one call's outcome never shifts the
+            # sequence seen by later calls.
+            roll = self._rng.random()
+            first_token = self._sample_latency()
+        response = scale_response(response, self.response_scale)
+        output_tokens = self.tokens(response)
+        prompt_text = " ".join(p for p in prompt_parts if isinstance(p, str))
+        generation = output_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        call = SimulatedCall(response, first_token, generation, self.tokens(prompt_text), output_tokens)
+        call.error = self._pick_error(roll)
+        if call.error:
+            call.error_message = SIMULATED_ERRORS[call.error].format(retry_after=f"{self.retry_after_seconds:g}")
+        return call
+
+    def chunk_delay(self, chunk: str) -> float:
+        """Seconds to wait before yielding *chunk* of a stream."""
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return self.tokens(chunk) / self.tokens_per_second
@@ -16,7 +16,7 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Session, relationship
 
-from src.database import Base, Class, LessonLog
+from src.database import Base, Class, LessonTopicCount
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -609,23 +609,15 @@ def get_progress(session: Session, guide_id: int) -> Dict[str, Any]:
             "unit_details": [],
         }
 
-    # Get all lesson logs for this class
-    lesson_logs = (
-        session.query(LessonLog)
-        .filter_by(class_id=guide.class_id)
-        .all()
-    )
-
-    # Collect all taught topics and standards from lesson logs
+    # Taught topics and standards from the class's lesson topic counts
     taught_topics = set()
     taught_standards = set()
-    for log in lesson_logs:
-        topics = _parse_json_list(log.topics)
-        for t in topics:
-            taught_topics.add(t.lower().strip())
-        stds = _parse_json_list(log.standards_addressed)
-        for s in stds:
-            taught_standards.add(s.strip())
+    tags = session.query(LessonTopicCount.kind, LessonTopicCount.value).filter_by(class_id=guide.class_id).all()
+    for kind, value in tags:
+        if kind == "topic":
+            taught_topics.add(value.lower())
+        else:
+            taught_standards.add(value)
 
     total_units = len(units)
     covered_units = 0
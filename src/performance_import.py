@@ -228,8 +228,10 @@ def import_quiz_scores(
     topic_scores: Dict[str, List[float]] = {}
     topic_standards: Dict[str, Optional[str]] = {}
 
+    questions = session.query(Question).filter(Question.id.in_(list(question_scores))).all()
+    questions_by_id = {question.id: question for question in questions}
     for qid, score_pct in question_scores.items():
-        question = session.query(Question).filter_by(id=qid).first()
+        question = questions_by_id.get(qid)
         if not question:
             continue
 
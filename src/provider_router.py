@@ -0,0 +1,472 @@
+"""
+Latency-aware routing across several LLM providers.
+
+A RoutingProvider wraps the configured provider plus one or more fallbacks
+and, for every call:
+
+- ranks the routes by health: routes cooling down after an error go last,
+  then routes whose recent error rate is too high, then the rest by rolling
+  p50 latency (scaled up by their error rate)
+- fails over to the next route when a call raises one of the error classes
+  ``_classify_provider_error`` recognizes (auth, rate_limit, timeout, ...)
+- optionally hedges: if the first route has not answered within its own
+  p95 latency, the same request is sent to the next route and whichever
+  finishes first wins
+
+Latency and error history is kept per provider/model in a process-wide
+registry, so it survives the per-request get_provider() calls. Fallbacks
+start without history and are only preferred once failovers or hedges have
+shown them to be faster or healthier than the primary.
+
+Opt-in via config.yaml:
+
+    llm:
+      provider: gemini
+      routing:
+        enabled: true
+        fallbacks:
+          - {provider: anthropic, model_name: claude-haiku-4-5-20251001}
+        hedge: true              # duplicate slow calls (costs extra tokens)
+        hedge_min_seconds: 2     # never hedge sooner than this
+        cooldown_seconds: 30     # deprioritize a route after a failover error
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.llm_provider import (
+    LLMProvider,
+    ProviderError,
+    ProviderWrapper,
+    _classify_provider_error,
+    _provider_identity,
+)
+
+logger = logging.getLogger(__name__)
+
+# Error classes that move a call to the next route (all that _classify_provider_error produces)
+DEFAULT_FAILOVER_ERRORS = (
+    "auth",
+    "permission",
+    "not_found",
+    "rate_limit",
+    "timeout",
+    "connection",
+    "billing",
+    "unknown",
+)
+DEFAULT_WINDOW = 50
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_COOLDOWN_SECONDS = 30.0
+DEFAULT_HEDGE_MIN_SECONDS = 1.0
+# Routes failing more often than this are ranked after healthy ones
+DEFAULT_MAX_ERROR_RATE = 0.5
+# How strongly the error rate inflates a route's latency score
+_ERROR_PENALTY = 4.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-route")
+        return _executor
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RouteHealth:
+    """Rolling latency and outcome history for one provider/model.
+
+    Latencies of successful calls and the outcome (ok/failed) of every call
+    are kept in fixed-size windows, so percentiles and error rates track
+    recent behaviour only.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.counters = {"calls": 0, "failures": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0}
+
+    def record_success(self, seconds: Optional[float]) -> None:
+        with self._lock:
+            self.counters["calls"] += 1
+            self._outcomes.append(True)
+            if seconds is not None:
+                self._latencies.append(seconds)
+
+    def record_failure(self, cooldown: float = 0.0) -> None:
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["failures"] += 1
+            self._outcomes.append(False)
+            if cooldown > 0:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+    def bump(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def cooling_down(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) < self.cooldown_until
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile in seconds, or None without any samples."""
+        with self._lock:
+            values = sorted(self._latencies)
+        return _percentile(values, q) if values else None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "samples": self.samples(),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "cooling_down": self.cooling_down(),
+        }
+
+
+_health: Dict[str, RouteHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_route_health(key: str, window: int = DEFAULT_WINDOW) -> RouteHealth:
+    """Return the process-wide RouteHealth for a provider/model key."""
+    with _health_lock:
+        health = _health.get(key)
+        if health is None:
+            health = _health[key] = RouteHealth(window)
+        return health
+
+
+def get_routing_stats() -> Dict[str, Dict[str, Any]]:
+    """Per provider/model latency percentiles, error rates and counters."""
+    with _health_lock:
+        items = list(_health.items())
+    return {key: health.snapshot() for key, health in items}
+
+
+def reset_routing_stats() -> None:
+    """Forget all route history. Used by tests."""
+    with _health_lock:
+        _health.clear()
+
+
+class RoutedImage:
+    """Provider-neutral image reference handed out by RoutingProvider.
+
+    Each provider expects its own image representation (uploaded file,
+    inline bytes, base64 dict), so the real prepare_image_context() runs
+    only once a route has been chosen for the call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sha256 = None
+
+    @property
+    def sha256_hash(self) -> str:
+        """Content hash, so response-cache keys follow the image bytes."""
+        if self._sha256 is None:
+            with open(self.path, "rb") as f:
+                self._sha256 = hashlib.sha256(f.read()).hexdigest()
+        return self._sha256
+
+    def __repr__(self):
+        return f"RoutedImage({self.path!r})"
+
+
+class _Route:
+    def __init__(self, provider: LLMProvider, key: str, window: int):
+        self.provider = provider
+        self.key = key
+        self.health = get_route_health(key, window)
+
+
+class RoutingProvider(ProviderWrapper):
+    """
+    LLMProvider that spreads calls over several providers by health.
+
+    ``inner`` is the primary route, so attribute lookups such as
+    ``_model_name`` and audit/cache identity still describe the configured
+    provider.
+    """
+
+    def __init__(
+        self,
+        routes: List[LLMProvider],
+        failover_errors=DEFAULT_FAILOVER_ERRORS,
+        hedge: bool = False,
+        hedge_min_seconds: float = DEFAULT_HEDGE_MIN_SECONDS,
+        cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+        window: int = DEFAULT_WINDOW,
+    ):
+        if not routes:
+            raise ValueError("RoutingProvider needs at least one provider")
+        super().__init__(routes[0])
+        self.failover_errors = set(failover_errors)
+        self.hedge = hedge
+        self.hedge_min_seconds = float(hedge_min_seconds)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self.min_samples = int(min_samples)
+        self.max_error_rate = float(max_error_rate)
+        self.routes = []
+        for provider in routes:
+            name, model = _provider_identity(provider)
+            key = f"{name}/{model}" if model else name
+            if any(r.key == key for r in self.routes):
+                key = f"{key}#{len(self.routes) + 1}"
+            self.routes.append(_Route(provider, key, window))
+
+    # --- Ranking -----------------------------------------------------------
+
+    def _score(self, index: int, route: _Route) -> float:
+        """Expected latency adjusted for errors; cold fallbacks rank last."""
+        if route.health.samples() < self.min_samples:
+            return 0.0 if index == 0 else float("inf")
+        return route.health.percentile(0.5) * (1 + _ERROR_PENALTY * route.health.error_rate())
+
+    def ranked_routes(self) -> List[_Route]:
+        """Routes in the order they should be tried for the next call."""
+        now = time.monotonic()
+
+        def sort_key(item):
+            index, route = item
+            return (
+                route.health.cooling_down(now),
+                route.health.error_rate() > self.max_error_rate,
+                self._score(index, route),
+                index,
+            )
+
+        return [route for _, route in sorted(enumerate(self.routes), key=sort_key)]
+
+    def _hedge_delay(self, route: _Route) -> Optional[float]:
+        """Seconds to wait on *route* before hedging, or None to never hedge."""
+        if not self.hedge or route.health.samples() < self.min_samples:
+            return None
+        return max(route.health.percentile(0.95), self.hedge_min_seconds)
+
+    # --- Call helpers ------------------------------------------------------
+
+    def _resolve_parts(self, route: _Route, prompt_parts: list) -> list:
+        return [route.provider.prepare_image_context(p.path) if isinstance(p, RoutedImage) else p for p in prompt_parts]
+
+    def _classify(self, route: _Route, error: Exception) -> ProviderError:
+        if isinstance(error, ProviderError):
+            return error
+        return _classify_provider_error(error, route.key)
+
+    def _should_failover(self, route: _Route, error: Exception) -> bool:
+        return self._classify(route, error).error_code in self.failover_errors
+
+    def _record_failure(self, route: _Route, error: Exception) -> None:
+        """Record a failed call; failover-class errors also start a cooldown."""
+        classified = self._classify(route, error)
+        cooldown = 0.0
+        if classified.error_code in self.failover_errors:
+            cooldown = max(self.cooldown_seconds, classified.retry_after or 0.0)
+        route.health.record_failure(cooldown)
+
+    def _note_failover(self, route: _Route, error: Exception) -> None:
+        route.health.bump("failovers")
+        logger.warning("Provider %s failed (%s); failing over to the next route", route.key, error)
+
+    def _call(self, route: _Route, prompt_parts: list, json_mode: bool) -> str:
+        start = time.monotonic()
+        try:
+            response = route.provider.generate(self._resolve_parts(route, prompt_parts), json_mode=json_mode)
+        except Exception as e:
+            self._record_failure(route, e)
+            raise
+        route.health.record_success(time.monotonic() - start)
+        return response
+
+    async def _acall(self, route: _Route, prompt_parts: list, json_mode: bool) -> str:
+        start = time.monotonic()
+        try:
+            parts = await asyncio.to_thread(self._resolve_parts, route, prompt_parts)
+            response = await route.provider.agenerate(parts, json_mode=json_mode)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(route, e)
+            raise
+        route.health.record_success(time.monotonic() - start)
+        return response
+
+    # --- LLMProvider interface --------------------------------------------
+
+    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Call the healthiest route, hedging slow calls and failing over on errors.
+
+        A losing hedge cannot be interrupted; it finishes in the background
+        and still contributes to its route's latency history.
+        """
+        queue = self.ranked_routes()
+        pending = {}
+        first_error = None
+        hedged = None
+
+        def launch():
+            route = queue.pop(0)
+            # Each call runs in a copy of the caller's context so audit-run
+            # attribution follows it into the worker thread.
+            future = _get_executor().submit(contextvars.copy_context().run, self._call, route, prompt_parts, json_mode)
+            pending[future] = route
+            return route
+
+        if not self.hedge:
+            # No hedging: call routes in turn on the caller's thread.
+            for position, route in enumerate(queue):
+                try:
+                    return self._call(route, prompt_parts, json_mode)
+                except Exception as e:
+                    if not self._should_failover(route, e):
+                        raise
+                    first_error = first_error or e
+                    if position == len(queue) - 1:
+                        raise first_error from e
+                    self._note_failover(route, e)
+
+        launch()
+        while pending:
+            timeout = None
+            if hedged is None and queue and len(pending) == 1:
+                timeout = self._hedge_delay(next(iter(pending.values())))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                next(iter(pending.values())).health.bump("hedges")
+                hedged = launch()
+                continue
+            for future in done:
+                route = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    first_error = first_error or e
+                    if self._should_failover(route, e) and queue and not pending:
+                        self._note_failover(route, e)
+                        launch()
+                    continue
+                if route is hedged:
+                    route.health.bump("hedge_wins")
+                return response
+        raise first_error
+
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate(); a losing hedge is cancelled."""
+        queue = self.ranked_routes()
+        pending = {}
+        first_error = None
+        hedged = None
+
+        def launch():
+            route = queue.pop(0)
+            pending[asyncio.ensure_future(self._acall(route, prompt_parts, json_mode))] = route
+            return route
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedged is None and queue and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    next(iter(pending.values())).health.bump("hedges")
+                    hedged = launch()
+                    continue
+                for task in done:
+                    route = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        first_error = first_error or error
+                        if self._should_failover(route, error) and queue and not pending:
+                            self._note_failover(route, error)
+                            launch()
+                        continue
+                    if route is hedged:
+                        route.health.bump("hedge_wins")
+                    return task.result()
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Stream from the healthiest route; fail over only before the first chunk.
+
+        Streams are not hedged, and their latency is not sampled because
+        total stream time is not comparable with a blocking call.
+        """
+        queue = self.ranked_routes()
+        first_error = None
+        for position, route in enumerate(queue):
+            try:
+                stream = route.provider.stream_generate(self._resolve_parts(route, prompt_parts), json_mode=json_mode)
+                first = next(stream, None)
+            except Exception as e:
+                self._record_failure(route, e)
+                if not self._should_failover(route, e):
+                    raise
+                first_error = first_error or e
+                if position == len(queue) - 1:
+                    raise first_error from e
+                self._note_failover(route, e)
+                continue
+            if first is not None:
+                yield first
+                yield from stream
+            route.health.record_success(None)
+            return
+
+    def prepare_image_context(self, image_path: str) -> Any:
+        """Defer image preparation until a route is chosen (see RoutedImage)."""
+        return RoutedImage(image_path)
+
+
+def build_routing_provider(primary: LLMProvider, fallbacks: List[LLMProvider], routing_config: Dict[str, Any]):
+    """Wrap *primary* and *fallbacks* in a RoutingProvider configured from ``llm.routing``."""
+    return RoutingProvider(
+        [primary] + list(fallbacks),
+        failover_errors=routing_config.get("failover_errors", DEFAULT_FAILOVER_ERRORS),
+        hedge=bool(routing_config.get("hedge", False)),
+        hedge_min_seconds=routing_config.get("hedge_min_seconds", DEFAULT_HEDGE_MIN_SECONDS),
+        cooldown_seconds=routing_config.get("cooldown_seconds", DEFAULT_COOLDOWN_SECONDS),
+        min_samples=routing_config.get("min_samples", DEFAULT_MIN_SAMPLES),
+        max_error_rate=routing_config.get("max_error_rate", DEFAULT_MAX_ERROR_RATE),
+        window=routing_config.get("window", DEFAULT_WINDOW),
+    )
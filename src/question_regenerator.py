@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
 
 from src.database import Question, Quiz
+from src.json_extraction import extract_json_object
 from src.llm_provider import get_provider
 
 logger = logging.getLogger(__name__)
@@ -183,33 +184,10 @@ Return ONLY the JSON object, no markdown.
         logger.error("regenerate_question: LLM call failed: %s", e)
         return None
 
-    # Parse response
-    try:
-        cleaned = response_text.strip()
-        # Remove markdown code blocks if present
-        if cleaned.startswith("```"):
-            lines = cleaned.splitlines()
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip().startswith("```"):
-                lines = lines[:-1]
-            cleaned = "\n".join(lines)
-
-        # Try to parse as single object first, then as array
-        parsed = json.loads(cleaned)
-        if isinstance(parsed, list):
-            if len(parsed) == 0:
-                logger.warning("regenerate_question: empty array response")
-                return None
-            new_q = parsed[0]
-        elif isinstance(parsed, dict):
-            new_q = parsed
-        else:
-            logger.warning("regenerate_question: unexpected JSON type")
-            return None
-
-    except json.JSONDecodeError as e:
-        logger.error("regenerate_question: JSON parse error: %s", e)
+    # Parse response: a single object, or the first object of an array
+    new_q = extract_json_object(response_text, source="regenerated question")
+    if new_q is None:
+        logger.warning("regenerate_question: no question object in response")
         return None
 
     new_q = normalize_question_data(new_q)
@@ -11,15 +11,16 @@ Run tests with: python -m pytest tests/test_quiz_generator.py -v
 import copy
 import json
 import logging
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from sqlalchemy.orm import Session
 
-from src.agents import run_agentic_pipeline
+from src.agents import PipelineCancelled, run_agentic_pipeline
 from src.classroom import get_class
 from src.cognitive_frameworks import validate_distribution
-from src.database import Question, Quiz
+from src.database import Question, Quiz, add_questions_to_bank
 from src.llm_provider import ProviderError
+from src.tracing import current_tracer, export_trace, start_trace, trace_span
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,7 @@ def generate_quiz(
     topics: str = "",
     content_text: str = "",
     question_types: Optional[List[str]] = None,
+    on_event: Optional[Callable[[str, dict], None]] = None,
 ) -> Optional[Quiz]:
     """
     Generate a quiz for a given class using the agentic pipeline.
@@ -58,10 +60,60 @@ def generate_quiz(
         topics: Comma-separated topics string (e.g., "cell transport, osmosis")
         content_text: Free-text content/instructions for quiz generation
         question_types: List of allowed question types (e.g., ["mc", "tf", "short_answer"])
+        on_event: Optional progress callback ``on_event(event, payload)``; when
+                  set, questions and critic verdicts are reported as soon as
+                  they are available (see Orchestrator.run)
+
+    The run is traced (see src/tracing.py): a stage timing summary is stored
+    in ``generation_metadata["trace"]``, and the full trace is written to
+    ``tracing.export_dir`` when configured.
 
     Returns:
         A Quiz ORM object with questions attached, or None on failure
     """
+    with start_trace("quiz") as tracer:
+        quiz = _generate_quiz(
+            session,
+            class_id,
+            config,
+            num_questions=num_questions,
+            grade_level=grade_level,
+            sol_standards=sol_standards,
+            cognitive_framework=cognitive_framework,
+            cognitive_distribution=cognitive_distribution,
+            difficulty=difficulty,
+            provider_name=provider_name,
+            topics=topics,
+            content_text=content_text,
+            question_types=question_types,
+            on_event=on_event,
+        )
+    if quiz is not None:
+        try:
+            export_trace(tracer, config, f"quiz{quiz.id}")
+        except OSError as e:
+            logger.warning("generate_quiz: could not write trace: %s", e)
+    return quiz
+
+
+def _generate_quiz(
+    session,
+    class_id,
+    config,
+    *,
+    num_questions,
+    grade_level,
+    sol_standards,
+    cognitive_framework,
+    cognitive_distribution,
+    difficulty,
+    provider_name,
+    topics,
+    content_text,
+    question_types,
+    on_event,
+):
+    """Body of :func:`generate_quiz`, executed inside its trace."""
     # Apply provider override if specified
     run_config = config
     if provider_name:
@@ -152,15 +204,16 @@ def generate_quiz(
     # Run the agentic pipeline (enriches context with class lessons/knowledge)
     generation_metadata = None
     try:
-        pipeline_result = run_agentic_pipeline(run_config, context, class_id=class_id, web_mode=True)
+        pipeline_result = run_agentic_pipeline(run_config, context, class_id=class_id, web_mode=True, on_event=on_event)
         # Unpack tuple (questions, metadata)
         if isinstance(pipeline_result, tuple) and len(pipeline_result) == 2:
             questions_data, generation_metadata = pipeline_result
         else:
             # Backward compat: old callers may return a plain list
             questions_data = pipeline_result
-    except ProviderError:
-        # Let ProviderError propagate to the caller with its user_message intact
+    except (ProviderError, PipelineCancelled):
+        # Let ProviderError propagate to the caller with its user_message
+        # intact, and a cancelled run reach whoever cancelled it
         new_quiz.status = "failed"
         session.commit()
         raise
@@ -176,29 +229,40 @@ def generate_quiz(
         session.commit()
         return None
 
-    # Store questions
-    for idx, q_data in enumerate(questions_data):
-        question_record = Question(
-            quiz_id=new_quiz.id,
-            question_type=q_data.get("type"),
-            title=q_data.get("title"),
-            text=q_data.get("text"),
-            points=q_data.get("points"),
-            sort_order=idx,
-            data=q_data,
-        )
-        session.add(question_record)
+    if on_event is not None:
+        on_event("status", {"stage": "saving", "count": len(questions_data)})
 
-    # Check if critic approved the quiz
-    critic_approved = True
-    if generation_metadata and isinstance(generation_metadata, dict):
-        metrics = generation_metadata.get("metrics", {})
-        critic_approved = metrics.get("approved", True)
+    with trace_span("persist_quiz", questions=len(questions_data)):
+        # Store questions
+        for idx, q_data in enumerate(questions_data):
+            question_record = Question(
+                quiz_id=new_quiz.id,
+                question_type=q_data.get("type"),
+                title=q_data.get("title"),
+                text=q_data.get("text"),
+                points=q_data.get("points"),
+                sort_order=idx,
+                data=q_data,
+            )
+            session.add(question_record)
 
-    new_quiz.status = "generated" if critic_approved else "needs_review"
-    if generation_metadata:
-        new_quiz.generation_metadata = json.dumps(generation_metadata)
-    session.commit()
+        # Check if critic approved the quiz
+        critic_approved = True
+        if generation_metadata and isinstance(generation_metadata, dict):
+            metrics = generation_metadata.get("metrics", {})
+            critic_approved = metrics.get("approved", True)
+
+        new_quiz.status = "generated" if critic_approved else "needs_review"
+        if generation_metadata:
+            # Surplus approved questions from over-generation go to the question bank
+            surplus = generation_metadata.pop("surplus_questions", None)
+            if surplus:
+                add_questions_to_bank(session, surplus, source_quiz_id=new_quiz.id)
+            session.flush()
+            # Summary up to here; the persist span is counted up to this point
+            generation_metadata["trace"] = current_tracer().summary()
+            new_quiz.generation_metadata = json.dumps(generation_metadata)
+        session.commit()
 
     # Refresh to populate the questions relationship
     session.refresh(new_quiz)
@@ -0,0 +1,583 @@
+"""
+Per-provider rate limiting for LLM calls.
+
+Every request made through get_provider() can pass through a shared
+RateLimiter that enforces, per provider/model:
+
+- ``rpm``: requests per minute (token bucket, burst up to one minute's worth)
+- ``tpm``: tokens per minute (token bucket; estimated from prompt/response size)
+- ``max_in_flight``: concurrent requests
+
+Callers waiting on the same provider/model are admitted first-in, first-out.
+When a provider answers 429 with a Retry-After hint, the whole key is paused
+until then so queued callers do not hammer it.
+
+State lives in a backend. The in-memory backend covers a single process;
+the SQLite backend stores buckets and in-flight leases in a side-file so all
+gunicorn workers share one budget.
+
+Opt-in via config.yaml:
+
+    llm:
+      rate_limits:
+        enabled: true
+        backend: sqlite            # or "memory" (per process)
+        path: rate_limits.db
+        max_wait_seconds: 120      # give up (ProviderError) after queuing this long
+        default: {rpm: 60, tpm: 100000, max_in_flight: 4}
+        anthropic: {rpm: 50}
+        gemini/gemini-2.5-flash: {rpm: 10, tpm: 250000}
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from src.llm_provider import ProviderError, ProviderWrapper, _provider_identity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITER_PATH = "rate_limits.db"
+DEFAULT_MAX_WAIT_SECONDS = 120.0
+DEFAULT_RETRY_AFTER_SECONDS = 10.0
+# In-flight leases expire after this long so a crashed worker cannot hold a slot forever
+LEASE_SECONDS = 600.0
+# Longest a queued caller sleeps before re-checking shared (cross-process) state
+_POLL_SECONDS = 0.25
+# Rough characters-per-token ratio used to estimate TPM usage
+_CHARS_PER_TOKEN = 4
+# Output tokens reserved up front; reconciled against the actual response size
+_OUTPUT_TOKEN_RESERVE = 1000
+
+_LIMIT_FIELDS = ("rpm", "tpm", "max_in_flight")
+
+
+def estimate_tokens(prompt_parts: list) -> int:
+    """Estimate input tokens for *prompt_parts* from their text length."""
+    chars = sum(len(p) for p in prompt_parts if isinstance(p, str))
+    return max(1, chars // _CHARS_PER_TOKEN)
+
+
+def _refill(level: float, per_minute: float, elapsed: float) -> float:
+    """Return the bucket level after *elapsed* seconds of refill (capped at capacity)."""
+    return min(per_minute, level + elapsed * per_minute / 60.0)
+
+
+def _admit(state: Dict[str, float], limits: Dict[str, int], tokens: int, in_flight: int, now: float) -> float:
+    """Refill *state* and try to take one request plus *tokens* from it.
+
+    Mutates *state* in place. Returns 0.0 when admitted, otherwise the
+    number of seconds until the caller could be admitted.
+    """
+    elapsed = max(0.0, now - state["updated_at"])
+    rpm, tpm = limits.get("rpm"), limits.get("tpm")
+    if rpm:
+        state["rpm_level"] = _refill(state["rpm_level"], rpm, elapsed)
+    if tpm:
+        state["tpm_level"] = _refill(state["tpm_level"], tpm, elapsed)
+    state["updated_at"] = now
+
+    if state["blocked_until"] > now:
+        return state["blocked_until"] - now
+
+    waits = []
+    if rpm and state["rpm_level"] < 1:
+        waits.append((1 - state["rpm_level"]) * 60.0 / rpm)
+    if tpm:
+        cost = min(tokens, tpm)  # a single oversized request must still be admissible
+        if state["tpm_level"] < cost:
+            waits.append((cost - state["tpm_level"]) * 60.0 / tpm)
+    max_in_flight = limits.get("max_in_flight")
+    if max_in_flight and in_flight >= max_in_flight:
+        waits.append(_POLL_SECONDS)  # woken early when a slot is released
+    if waits:
+        return max(waits)
+
+    if rpm:
+        state["rpm_level"] -= 1
+    if tpm:
+        state["tpm_level"] -= min(tokens, tpm)
+    return 0.0
+
+
+def _new_state(limits: Dict[str, int], now: float) -> Dict[str, float]:
+    return {
+        "rpm_level": float(limits.get("rpm") or 0),
+        "tpm_level": float(limits.get("tpm") or 0),
+        "updated_at": now,
+        "blocked_until": 0.0,
+    }
+
+
+class MemoryBackend:
+    """Bucket and in-flight state for a single process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict[str, float]] = {}
+        self._leases: Dict[str, Dict[str, str]] = {}
+
+    def try_acquire(self, key: str, limits: Dict[str, int], tokens: int, now: float) -> Tuple[Optional[str], float]:
+        """Return ``(lease_id, 0.0)`` when admitted, else ``(None, seconds_to_wait)``."""
+        with self._lock:
+            state = self._states.setdefault(key, _new_state(limits, now))
+            leases = self._leases.setdefault(key, {})
+            wait = _admit(state, limits, tokens, len(leases), now)
+            if wait > 0:
+                return None, wait
+            lease_id = uuid.uuid4().hex
+            leases[lease_id] = key
+            return lease_id, 0.0
+
+    def release(self, key: str, lease_id: str, token_delta: int, limits: Dict[str, int]) -> None:
+        """Free the in-flight slot and correct the TPM bucket by *token_delta*."""
+        with self._lock:
+            self._leases.get(key, {}).pop(lease_id, None)
+            state = self._states.get(key)
+            if state is not None and limits.get("tpm") and token_delta:
+                state["tpm_level"] = min(float(limits["tpm"]), state["tpm_level"] - token_delta)
+
+    def block(self, key: str, until: float, limits: Dict[str, int]) -> None:
+        """Admit nobody for *key* before *until* (epoch seconds)."""
+        with self._lock:
+            state = self._states.setdefault(key, _new_state(limits, time.time()))
+            state["blocked_until"] = max(state["blocked_until"], until)
+
+    def in_flight(self, key: str) -> int:
+        with self._lock:
+            return len(self._leases.get(key, {}))
+
+
+class SQLiteBackend:
+    """Bucket and lease state in a SQLite side-file shared by every worker process.
+
+    Each admission runs in a ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers serialize on the database lock and never over-admit.
+    """
+
+    def __init__(self, path: str = DEFAULT_LIMITER_PATH):
+        self.path = path
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_schema(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    rpm_level REAL NOT NULL,
+                    tpm_level REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_leases (
+                    id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_leases_key ON rate_leases (key)")
+        finally:
+            conn.close()
+
+    def _load(self, conn: sqlite3.Connection, key: str, limits: Dict[str, int], now: float) -> Dict[str, float]:
+        row = conn.execute(
+            "SELECT rpm_level, tpm_level, updated_at, blocked_until FROM rate_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _new_state(limits, now)
+        return {"rpm_level": row[0], "tpm_level": row[1], "updated_at": row[2], "blocked_until": row[3]}
+
+    def _save(self, conn: sqlite3.Connection, key: str, state: Dict[str, float]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO rate_buckets (key, rpm_level, tpm_level, updated_at, blocked_until) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, state["rpm_level"], state["tpm_level"], state["updated_at"], state["blocked_until"]),
+        )
+
+    def try_acquire(self, key: str, limits: Dict[str, int], tokens: int, now: float) -> Tuple[Optional[str], float]:
+        """Return ``(lease_id, 0.0)`` when admitted, else ``(None, seconds_to_wait)``."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM rate_leases WHERE expires_at < ?", (now,))
+            in_flight = conn.execute("SELECT COUNT(*) FROM rate_leases WHERE key = ?", (key,)).fetchone()[0]
+            state = self._load(conn, key, limits, now)
+            wait = _admit(state, limits, tokens, in_flight, now)
+            lease_id = None
+            if wait <= 0:
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO rate_leases (id, key, expires_at) VALUES (?, ?, ?)",
+                    (lease_id, key, now + LEASE_SECONDS),
+                )
+            self._save(conn, key, state)
+            conn.execute("COMMIT")
+            return lease_id, wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, key: str, lease_id: str, token_delta: int, limits: Dict[str, int]) -> None:
+        """Free the in-flight slot and correct the TPM bucket by *token_delta*."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM rate_leases WHERE id = ?", (lease_id,))
+            if limits.get("tpm") and token_delta:
+                conn.execute(
+                    "UPDATE rate_buckets SET tpm_level = MIN(?, tpm_level - ?) WHERE key = ?",
+                    (float(limits["tpm"]), token_delta, key),
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def block(self, key: str, until: float, limits: Dict[str, int]) -> None:
+        """Admit nobody for *key* before *until* (epoch seconds)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            state = self._load(conn, key, limits, time.time())
+            state["blocked_until"] = max(state["blocked_until"], until)
+            self._save(conn, key, state)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def in_flight(self, key: str) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM rate_leases WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+
+class Permit:
+    """An admitted request. Use as a context manager around the provider call.
+
+    Set ``response_text`` (or call :meth:`settle`) before exiting so the TPM
+    bucket is corrected from the reserved estimate to the observed usage.
+    """
+
+    def __init__(self, limiter: "RateLimiter", key: str, lease_id: str, limits: Dict[str, int], reserved: int):
+        self.limiter = limiter
+        self.key = key
+        self.lease_id = lease_id
+        self.limits = limits
+        self.reserved = reserved
+        self.used: Optional[int] = None
+        self._released = False
+
+    def settle(self, used_tokens: int) -> None:
+        """Record the tokens this request actually consumed."""
+        self.used = used_tokens
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """Free the slot; a rate-limit *error* pauses the key for its Retry-After."""
+        if self._released:
+            return
+        self._released = True
+        if isinstance(error, ProviderError) and error.error_code == "rate_limit":
+            self.limiter.penalize(self.key, error.retry_after)
+        delta = (self.used - self.reserved) if self.used is not None else 0
+        try:
+            self.limiter.backend.release(self.key, self.lease_id, delta, self.limits)
+        except sqlite3.Error as e:
+            logger.warning("Rate limiter release failed: %s", e)
+        self.limiter._wake()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(exc)
+        return False
+
+
+class RateLimiter:
+    """Admits provider calls under per-key RPM/TPM/in-flight limits, FIFO per key."""
+
+    def __init__(self, backend, limits_config: Optional[Dict[str, Any]] = None):
+        self.backend = backend
+        self._cond = threading.Condition()
+        self._wakeups = 0  # bumped on every notify so waiters never miss one
+        self._queues: Dict[str, deque] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.configure(limits_config or {})
+
+    def configure(self, limits_config: Dict[str, Any]) -> None:
+        """Replace the limit table (the ``llm.rate_limits`` config block)."""
+        self.max_wait = float(limits_config.get("max_wait_seconds", DEFAULT_MAX_WAIT_SECONDS))
+        self.default_retry_after = float(limits_config.get("default_retry_after", DEFAULT_RETRY_AFTER_SECONDS))
+        self._table = {k: v for k, v in limits_config.items() if isinstance(v, dict)}
+
+    def limits_for(self, provider: str, model: str) -> Dict[str, int]:
+        """Resolve limits for a call: ``default`` < ``<provider>`` < ``<provider>/<model>``."""
+        limits: Dict[str, int] = {}
+        for section in ("default", provider, f"{provider}/{model}"):
+            for field in _LIMIT_FIELDS:
+                value = self._table.get(section, {}).get(field)
+                if value is not None:
+                    limits[field] = int(value)
+        return {k: v for k, v in limits.items() if v > 0}
+
+    def _bump(self, key: str, field: str, amount: float = 1) -> None:
+        stats = self._stats.setdefault(key, {"admitted": 0, "throttled": 0, "wait_seconds": 0.0, "retry_after": 0})
+        stats[field] += amount
+
+    def _notify(self) -> None:
+        """Wake all waiters; the caller holds ``_cond``."""
+        self._wakeups += 1
+        self._cond.notify_all()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._notify()
+
+    def acquire(
+        self,
+        provider: str,
+        model: str,
+        tokens: int = 0,
+        timeout: Optional[float] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Permit:
+        """Block until a call to *provider*/*model* may proceed; return its Permit.
+
+        Setting *cancelled* (then waking the limiter) makes a queued caller
+        give up its place instead of waiting for admission.
+
+        Raises:
+            ProviderError: (``error_code="rate_limit"``) if not admitted within
+                *timeout* (default ``max_wait_seconds``), or
+                (``error_code="cancelled"``) once *cancelled* is set.
+        """
+        key = f"{provider}/{model}" if model else provider
+        limits = self.limits_for(provider, model)
+        reserved = tokens + _OUTPUT_TOKEN_RESERVE if limits.get("tpm") else 0
+        if not limits:
+            return Permit(self, key, "", limits, reserved)
+
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.time()
+        deadline = start + timeout
+        ticket = object()
+        throttled = False
+        with self._cond:
+            queue = self._queues.setdefault(key, deque())
+            queue.append(ticket)
+        try:
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    raise ProviderError(
+                        "Request was cancelled while waiting for rate limits.",
+                        provider_name=provider,
+                        error_code="cancelled",
+                    )
+                with self._cond:
+                    at_head = queue[0] is ticket
+                    seen = self._wakeups
+                wait = None
+                if at_head:
+                    # Only the head of a key's queue calls the backend, so
+                    # admission stays FIFO without holding the lock across
+                    # a SQLite transaction
+                    lease_id, wait = self.backend.try_acquire(key, limits, reserved, time.time())
+                    if lease_id is not None:
+                        with self._cond:
+                            queue.popleft()
+                            self._notify()
+                            self._bump(key, "admitted")
+                            if throttled:
+                                self._bump(key, "throttled")
+                                self._bump(key, "wait_seconds", time.time() - start)
+                        return Permit(self, key, lease_id, limits, reserved)
+                throttled = True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise ProviderError(
+                        f"Too many requests are queued for {provider}. Wait a moment and try again, "
+                        "or raise llm.rate_limits in config.yaml.",
+                        provider_name=provider,
+                        error_code="rate_limit",
+                        retry_after=wait,
+                    )
+                with self._cond:
+                    if self._wakeups == seen:
+                        self._cond.wait(min(wait or _POLL_SECONDS, _POLL_SECONDS * 4, remaining))
+        except BaseException:
+            with self._cond:
+                if ticket in queue:
+                    queue.remove(ticket)
+                    self._notify()
+            raise
+
+    async def aacquire(self, provider: str, model: str, tokens: int = 0, timeout: Optional[float] = None) -> Permit:
+        """Async counterpart of acquire(); waits in a worker thread.
+
+        Cancelling the awaiting task takes the waiter out of the queue, and
+        a permit the thread was granted anyway is released straight away
+        instead of holding its slot until the lease expires.
+        """
+        cancelled = threading.Event()
+        future = asyncio.ensure_future(asyncio.to_thread(self.acquire, provider, model, tokens, timeout, cancelled))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancelled.set()
+            self._wake()
+            future.add_done_callback(_release_abandoned)
+            raise
+
+    def penalize(self, key: str, retry_after: Optional[float]) -> None:
+        """Pause *key* for *retry_after* seconds (or the default) after a 429."""
+        seconds = retry_after if retry_after and retry_after > 0 else self.default_retry_after
+        provider, _, model = key.partition("/")
+        logger.warning("Rate limited by %s; pausing for %.1fs", key, seconds)
+        try:
+            self.backend.block(key, time.time() + seconds, self.limits_for(provider, model))
+        except sqlite3.Error as e:
+            logger.warning("Rate limiter block failed: %s", e)
+        with self._cond:
+            self._bump(key, "retry_after")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-key counters plus current queue length and in-flight count."""
+        with self._cond:
+            keys = set(self._stats) | set(self._queues)
+            snapshot = {}
+            for key in sorted(keys):
+                entry = dict(
+                    self._stats.get(key, {"admitted": 0, "throttled": 0, "wait_seconds": 0.0, "retry_after": 0})
+                )
+                entry["wait_seconds"] = round(entry["wait_seconds"], 3)
+                entry["queued"] = len(self._queues.get(key, ()))
+                snapshot[key] = entry
+        for key, entry in snapshot.items():
+            try:
+                entry["in_flight"] = self.backend.in_flight(key)
+            except sqlite3.Error:
+                entry["in_flight"] = None
+        return snapshot
+
+
+def _release_abandoned(future: "asyncio.Future") -> None:
+    """Release the permit of an aacquire() whose caller was cancelled."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    future.result().release()
+
+
+_limiters: Dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(limits_config: Optional[Dict[str, Any]] = None) -> RateLimiter:
+    """Return the process-wide RateLimiter for the ``llm.rate_limits`` settings.
+
+    One limiter exists per backend so every provider instance (generator,
+    critic, variants, ...) draws from the same buckets. The limit table is
+    refreshed from *limits_config* on each call.
+    """
+    limits_config = limits_config or {}
+    backend_name = limits_config.get("backend", "memory")
+    if backend_name == "sqlite":
+        path = limits_config.get("path", DEFAULT_LIMITER_PATH)
+        key = ("sqlite", os.path.abspath(path))
+    else:
+        key = ("memory", None)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            backend = SQLiteBackend(key[1]) if backend_name == "sqlite" else MemoryBackend()
+            limiter = RateLimiter(backend, limits_config)
+            _limiters[key] = limiter
+        else:
+            limiter.configure(limits_config)
+        return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Merged stats of every limiter created in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    merged: Dict[str, Dict[str, Any]] = {}
+    for limiter in limiters:
+        merged.update(limiter.stats())
+    return merged
+
+
+def reset_rate_limiters() -> None:
+    """Forget every limiter (and in-memory bucket state). Used by tests."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+class RateLimitedProvider(ProviderWrapper):
+    """
+    LLMProvider decorator that admits each call through a RateLimiter.
+
+    The reserved token estimate (prompt text plus a fixed output allowance)
+    is corrected from the response size once the call completes. A
+    ``rate_limit`` ProviderError from the wrapped provider pauses the key
+    for the provider's Retry-After before the error propagates.
+    """
+
+    def __init__(self, inner, limiter: RateLimiter):
+        super().__init__(inner)
+        self.limiter = limiter
+
+    def _used_tokens(self, prompt_parts: list, response: str) -> int:
+        return estimate_tokens(prompt_parts) + len(response or "") // _CHARS_PER_TOKEN
+
+    def generate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Wait for admission, then call the wrapped provider."""
+        provider_name, model = _provider_identity(self.inner)
+        with self.limiter.acquire(provider_name, model, estimate_tokens(prompt_parts)) as permit:
+            response = self.inner.generate(prompt_parts, json_mode=json_mode)
+            permit.settle(self._used_tokens(prompt_parts, response))
+        return response
+
+    async def agenerate(self, prompt_parts: list, json_mode: bool = False) -> str:
+        """Async counterpart of generate(); queuing happens off the event loop."""
+        provider_name, model = _provider_identity(self.inner)
+        permit = await self.limiter.aacquire(provider_name, model, estimate_tokens(prompt_parts))
+        with permit:
+            response = await self.inner.agenerate(prompt_parts, json_mode=json_mode)
+            permit.settle(self._used_tokens(prompt_parts, response))
+        return response
+
+    def stream_generate(self, prompt_parts: list, json_mode: bool = False) -> Iterator[str]:
+        """Hold one admission for the whole stream."""
+        provider_name, model = _provider_identity(self.inner)
+        chunks = []
+        with self.limiter.acquire(provider_name, model, estimate_tokens(prompt_parts)) as permit:
+            for chunk in self.inner.stream_generate(prompt_parts, json_mode=json_mode):
+                chunks.append(chunk)
+                yield chunk
+            permit.settle(self._used_tokens(prompt_parts, "".join(chunks)))
@@ -6,37 +6,26 @@ Uses MockLLMProvider by default for zero-cost development.
 """
 
 import copy
-import json
 import logging
 from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
 from src.database import Class
+from src.json_extraction import extract_json_array
 from src.performance_analytics import compute_gap_analysis
 
 logger = logging.getLogger(__name__)
 
 
 def _parse_suggestions(response_text: str) -> Optional[List[Dict]]:
-    """Parse JSON response into list of suggestion dicts."""
-    try:
-        items = json.loads(response_text)
-        if isinstance(items, list):
-            return items
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    import re
-
-    match = re.search(r"\[.*\]", response_text, re.DOTALL)
-    if match:
-        try:
-            items = json.loads(match.group())
-            if isinstance(items, list):
-                return items
-        except (json.JSONDecodeError, ValueError):
-            pass
+    """Parse JSON response into list of suggestion dicts.
+
+    Complete suggestions are recovered from truncated or partly malformed arrays.
+    """
+    extraction = extract_json_array(response_text, source="re-teach response")
+    if extraction.found:
+        return extraction.items
 
     logger.warning("Failed to parse re-teach response")
     return None
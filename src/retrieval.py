@@ -0,0 +1,272 @@
+"""
+Retrieval-based selection of lesson content for generation prompts.
+
+The CLI generator used to paste the text of every ingested Lesson plus a
+JSON dump of every page analysis into the prompt, and the critic received
+the same text again, so prompt size (and cost and latency) grew with the
+whole library. This module splits that material into chunks and ranks them
+with BM25 against the requested topics and standards, so each prompt only
+carries the most relevant chunks that fit a token budget:
+
+- ContentIndex holds the chunks: lesson text split on paragraph boundaries,
+  one chunk per analysed PDF page (headings, text and diagram descriptions),
+  and the class's lesson logs
+- ContentIndex.select() takes the best-scoring chunks within a budget and
+  returns them in library order, falling back to library order when the
+  query matches nothing
+- select_lesson_context() builds the index from the database and returns
+  the generator and critic content for a run
+
+Everything is computed locally; no embedding service is involved.
+
+Config (all optional):
+
+    retrieval:
+      enabled: true
+      token_budget: 3000         # lesson content in the generator prompt
+      critic_token_budget: 1500  # lesson content the critic checks against
+      chunk_words: 200
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.cost_tracking import estimate_tokens
+from src.database import Lesson, LessonLog, Standard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 3000
+DEFAULT_CRITIC_TOKEN_BUDGET = 1500
+DEFAULT_CHUNK_WORDS = 200
+
+# BM25 parameters (the usual defaults)
+_K1 = 1.5
+_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "their", "this", "to", "was", "were", "which", "will", "with",
+}  # fmt: skip
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; standard codes like 7.1 stay whole."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class Chunk:
+    """One retrievable piece of lesson material."""
+
+    __slots__ = ("source", "text", "position", "tokens", "terms", "length")
+
+    def __init__(self, source: str, text: str, position: int):
+        self.source = source
+        self.text = text
+        self.position = position
+        self.tokens = estimate_tokens(text)
+        words = tokenize(text)
+        self.terms = Counter(words)
+        self.length = len(words)
+
+
+def split_text(text: str, chunk_words: int = DEFAULT_CHUNK_WORDS) -> List[str]:
+    """Split *text* into chunks of about *chunk_words* words on paragraph boundaries.
+
+    Paragraphs longer than a chunk are cut into word windows.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        words = paragraph.split()
+        if not words:
+            continue
+        if len(words) > chunk_words:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            for start in range(0, len(words), chunk_words):
+                chunks.append(" ".join(words[start : start + chunk_words]))
+            continue
+        if size + len(words) > chunk_words and current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph.strip())
+        size += len(words)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    """Flatten one page analysis from multimodal ingestion into plain text."""
+    parts = []
+    headings = page.get("headings") or []
+    if isinstance(headings, list) and headings:
+        parts.append("Headings: " + "; ".join(str(h) for h in headings))
+    if page.get("text_content"):
+        parts.append(str(page["text_content"]))
+    for diagram in page.get("diagrams") or []:
+        if isinstance(diagram, dict):
+            label = diagram.get("type") or "visual"
+            line = f"Diagram ({label}): {diagram.get('description', '')}"
+            if diagram.get("caption"):
+                line += f" Caption: {diagram['caption']}"
+            parts.append(line)
+    return "\n\n".join(parts)
+
+
+class ContentIndex:
+    """BM25 index over lesson material chunks.
+
+    Args:
+        chunk_words: Target chunk size in words.
+    """
+
+    def __init__(self, chunk_words: int = DEFAULT_CHUNK_WORDS):
+        self.chunk_words = max(20, int(chunk_words))
+        self.chunks: List[Chunk] = []
+        self._df: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(chunk.tokens for chunk in self.chunks)
+
+    def add_text(self, source: str, text: str) -> None:
+        """Chunk and index *text*, labelling each chunk with *source*."""
+        for piece in split_text(text, self.chunk_words):
+            chunk = Chunk(source, piece, len(self.chunks))
+            self.chunks.append(chunk)
+            self._df.update(chunk.terms.keys())
+
+    def add_pages(self, source: str, pages: Iterable[Any]) -> None:
+        """Index page analyses (see page_text()), one source label per page."""
+        for number, page in enumerate(pages, 1):
+            if isinstance(page, dict) and not page.get("error"):
+                self.add_text(f"{source} p.{number}", page_text(page))
+
+    def search(self, query: str) -> List[Tuple[float, Chunk]]:
+        """Return (score, chunk) for every chunk matching *query*, best first."""
+        terms = set(tokenize(query))
+        if not terms or not self.chunks:
+            return []
+        n = len(self.chunks)
+        avg_length = sum(chunk.length for chunk in self.chunks) / n or 1
+        idf = {t: math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in terms if self._df[t]}
+        scored = []
+        for chunk in self.chunks:
+            score = 0.0
+            norm = _K1 * (1 - _B + _B * chunk.length / avg_length)
+            for term, weight in idf.items():
+                tf = chunk.terms.get(term)
+                if tf:
+                    score += weight * tf * (_K1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, chunk))
+        scored.sort(key=lambda pair: (-pair[0], pair[1].position))
+        return scored
+
+    def select(self, query: str, token_budget: int) -> List[Chunk]:
+        """Best chunks for *query* that fit in *token_budget*, in library order.
+
+        When nothing matches (or the query is empty) chunks are taken in
+        library order instead, so generation still gets some material.
+        """
+        ranked = [chunk for _, chunk in self.search(query)] or self.chunks
+        selected, used = [], 0
+        for chunk in ranked:
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+        return sorted(selected, key=lambda chunk: chunk.position)
+
+
+def format_chunks(chunks: List[Chunk]) -> str:
+    """Render chunks for a prompt, each under its source label."""
+    return "\n\n".join(f"[{chunk.source}]\n{chunk.text}" for chunk in chunks)
+
+
+def build_content_index(
+    session, class_id: Optional[int] = None, chunk_words: int = DEFAULT_CHUNK_WORDS
+) -> ContentIndex:
+    """Index every ingested lesson, plus the lesson logs of *class_id*.
+
+    Lessons whose pages were all analysed are indexed page by page (the
+    page text is the lesson content, so it is not indexed twice).
+    """
+    index = ContentIndex(chunk_words)
+    for lesson in session.query(Lesson).order_by(Lesson.id).all():
+        source = lesson.source_file or f"Lesson {lesson.id}"
+        pages = lesson.page_data
+        if isinstance(pages, dict):
+            pages = [pages]
+        if isinstance(pages, list) and pages and all(isinstance(p, dict) and not p.get("error") for p in pages):
+            index.add_pages(source, pages)
+        else:
+            index.add_text(source, lesson.content or "")
+    if class_id is not None:
+        logs = session.query(LessonLog).filter_by(class_id=class_id).order_by(LessonLog.date, LessonLog.id).all()
+        for log in logs:
+            index.add_text(f"Lesson log {log.date}", log.content or "")
+    return index
+
+
+def build_query(session, topics: Optional[List[str]], standards: Optional[List[str]]) -> str:
+    """Query text for the requested topics and standards.
+
+    Standard codes rarely appear in lesson text, so the descriptions of
+    known standards are added to the query.
+    """
+    parts = list(topics or []) + list(standards or [])
+    if standards:
+        rows = session.query(Standard.description).filter(Standard.code.in_(list(standards))).all()
+        parts.extend(description for (description,) in rows if description)
+    return " ".join(parts)
+
+
+def select_lesson_context(
+    session,
+    config: Dict[str, Any],
+    topics: Optional[List[str]] = None,
+    standards: Optional[List[str]] = None,
+    class_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Pick the lesson material for one generation run.
+
+    Returns None when ``retrieval.enabled`` is false, otherwise a dict with
+    ``content_summary`` (generator prompt), ``critic_content_summary`` and
+    ``stats`` (chunks and estimated tokens selected vs. available).
+    """
+    settings = config.get("retrieval") or {}
+    if not settings.get("enabled", True):
+        return None
+    token_budget = int(settings.get("token_budget", DEFAULT_TOKEN_BUDGET))
+    critic_budget = int(settings.get("critic_token_budget", DEFAULT_CRITIC_TOKEN_BUDGET))
+
+    index = build_content_index(session, class_id, int(settings.get("chunk_words", DEFAULT_CHUNK_WORDS)))
+    query = build_query(session, topics, standards)
+    chunks = index.select(query, token_budget)
+    critic_chunks = index.select(query, min(critic_budget, token_budget))
+    stats = {
+        "chunks": len(chunks),
+        "total_chunks": len(index),
+        "tokens": sum(chunk.tokens for chunk in chunks),
+        "library_tokens": index.total_tokens,
+    }
+    logger.info(
+        "Selected %(chunks)d of %(total_chunks)d content chunks (%(tokens)d of %(library_tokens)d tokens)", stats
+    )
+    return {
+        "content_summary": format_chunks(chunks),
+        "critic_content_summary": format_chunks(critic_chunks),
+        "stats": stats,
+    }
@@ -13,6 +13,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from src.database import Question, Quiz, Rubric, RubricCriterion
+from src.json_extraction import extract_json_array
 
 logger = logging.getLogger(__name__)
 
@@ -63,24 +64,13 @@ def _load_quiz_context(session, quiz_id):
 
 
 def _parse_criteria(response_text):
-    """Parse JSON response into list of criterion dicts."""
-    try:
-        items = json.loads(response_text)
-        if isinstance(items, list):
-            return items
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    import re
-
-    match = re.search(r"\[.*\]", response_text, re.DOTALL)
-    if match:
-        try:
-            items = json.loads(match.group())
-            if isinstance(items, list):
-                return items
-        except (json.JSONDecodeError, ValueError):
-            pass
+    """Parse JSON response into list of criterion dicts.
+
+    Complete criteria are recovered from truncated or partly malformed arrays.
+    """
+    extraction = extract_json_array(response_text, source="rubric response")
+    if extraction.found:
+        return extraction.items
 
     logger.warning("Failed to parse rubric response")
     return None
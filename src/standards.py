@@ -20,14 +20,16 @@ Supports multiple standard sets:
 - Custom teacher-imported sets
 """
 
+import html
 import json
 import os
+import re
 from typing import Dict, List, Optional
 
-from sqlalchemy import or_
+from sqlalchemy import case, column, false, func, literal_column, or_, table, text
 from sqlalchemy.orm import Session
 
-from src.database import Standard
+from src.database import STANDARDS_SEARCH_VECTOR, Standard
 
 # Registry of available standard sets with metadata
 STANDARD_SETS = {
@@ -392,42 +394,163 @@ def list_standards(
     return query.order_by(Standard.code).all()
 
 
+def _search_words(query_text: str) -> List[List[str]]:
+    """Split a search into words, each a list of lowercase tokens.
+
+    Tokens are runs of letters and digits, as the FTS5 ``unicode61``
+    tokenizer splits them, so "SOL 7.1" gives [["sol"], ["7", "1"]].
+    """
+    words = (re.findall(r"[^\W_]+", word.lower()) for word in query_text.split())
+    return [tokens for tokens in words if tokens]
+
+
+def _search_backend(session: Session) -> str:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return "tsvector"
+    if dialect == "sqlite":
+        fts = session.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='standards_fts'"))
+        if fts.first() is not None:
+            return "fts5"
+    return "like"
+
+
+def _search_query(
+    session: Session,
+    query_text: str,
+    subject: Optional[str],
+    grade_band: Optional[str],
+    standard_set: Optional[str],
+):
+    """Filtered query for *query_text* and the ORDER BY that ranks it."""
+    q = session.query(Standard)
+    order_by = [Standard.code]
+    words = _search_words(query_text)
+    backend = _search_backend(session) if words else None
+    if backend == "fts5":
+        # Every word must match; its last token may be a prefix ("sol 7.1" -> "sol"* "7 1"*)
+        match = " ".join('"' + " ".join(tokens) + '"*' for tokens in words)
+        fts = table("standards_fts", column("rowid"))
+        q = q.join(fts, fts.c.rowid == Standard.id).filter(literal_column("standards_fts").op("MATCH")(match))
+        # bm25() is lower for better matches; weights follow the column order in STANDARDS_FTS_DDL
+        order_by = [
+            case((func.lower(Standard.code) == query_text.strip().lower(), 0), else_=1),
+            text("bm25(standards_fts, 10.0, 5.0, 3.0, 2.0, 1.0)"),
+        ] + order_by
+    elif backend == "tsvector":
+        terms = (re.sub(r"[^\w.-]+", " ", word).strip() for word in query_text.split())
+        tsquery = func.to_tsquery("simple", " & ".join(f"'{term}':*" for term in terms if term))
+        vector = literal_column(f"({STANDARDS_SEARCH_VECTOR})")
+        q = q.filter(vector.op("@@")(tsquery))
+        order_by = [
+            case((func.lower(Standard.code) == query_text.strip().lower(), 0), else_=1),
+            func.ts_rank(vector, tsquery).desc(),
+        ] + order_by
+    elif backend == "like":
+        like_pattern = f"%{query_text}%"
+        q = q.filter(
+            or_(
+                Standard.code.ilike(like_pattern),
+                Standard.description.ilike(like_pattern),
+                Standard.full_text.ilike(like_pattern),
+                Standard.strand.ilike(like_pattern),
+            )
+        )
+    elif query_text.strip():
+        # Only punctuation: nothing to match
+        q = q.filter(false())
+    if subject:
+        q = q.filter(Standard.subject == subject)
+    if grade_band:
+        q = q.filter(Standard.grade_band == grade_band)
+    if standard_set:
+        q = q.filter(Standard.standard_set == standard_set)
+    return q, order_by
+
+
 def search_standards(
     session: Session,
     query_text: str,
     subject: Optional[str] = None,
     grade_band: Optional[str] = None,
     standard_set: Optional[str] = None,
+    limit: Optional[int] = None,
 ) -> List[Standard]:
     """
-    Search standards by code, description, or full text.
+    Search standards by code, description, strand, full text or curriculum content.
+
+    Uses the full-text index (FTS5 on SQLite, tsvector on PostgreSQL).
+    Every word of *query_text* must match, and the last token of each word
+    matches as a prefix ("photo" finds "photosynthesis"). Results are ranked
+    by relevance, with an exact code match first. Without an index
+    (SQLite built without FTS5) words are matched as one substring.
 
     Args:
         session: SQLAlchemy session
-        query_text: Search term to match against code, description, or full_text
+        query_text: Search words; empty returns all standards matching the filters
         subject: Optional subject filter
         grade_band: Optional grade band filter
         standard_set: Optional standard set filter
+        limit: Optional maximum number of results
 
     Returns:
-        List of Standard objects matching the search
-    """
-    like_pattern = f"%{query_text}%"
-    q = session.query(Standard).filter(
-        or_(
-            Standard.code.ilike(like_pattern),
-            Standard.description.ilike(like_pattern),
-            Standard.full_text.ilike(like_pattern),
-            Standard.strand.ilike(like_pattern),
-        )
-    )
-    if subject:
-        q = q.filter(Standard.subject == subject)
-    if grade_band:
-        q = q.filter(Standard.grade_band == grade_band)
-    if standard_set:
-        q = q.filter(Standard.standard_set == standard_set)
-    return q.order_by(Standard.code).all()
+        List of Standard objects matching the search, best match first
+    """
+    q, order_by = _search_query(session, query_text, subject, grade_band, standard_set)
+    return q.order_by(*order_by).limit(limit).all()
+
+
+def count_search_results(
+    session: Session,
+    query_text: str,
+    subject: Optional[str] = None,
+    grade_band: Optional[str] = None,
+    standard_set: Optional[str] = None,
+) -> int:
+    """
+    Count the standards search_standards() would return without a limit.
+
+    Args:
+        session: SQLAlchemy session
+        query_text: Search words
+        subject: Optional subject filter
+        grade_band: Optional grade band filter
+        standard_set: Optional standard set filter
+
+    Returns:
+        Number of matching standards
+    """
+    q, _ = _search_query(session, query_text, subject, grade_band, standard_set)
+    return q.count()
+
+
+def highlight_search_terms(value: Optional[str], query_text: str) -> str:
+    """
+    HTML-escape *value* and wrap the words matching a search in <mark> tags.
+
+    A word matches when it starts with any token of *query_text*, the same
+    prefix rule search_standards() uses.
+
+    Args:
+        value: Text to highlight (e.g. a standard's code or description)
+        query_text: The search the text was found with
+
+    Returns:
+        HTML-safe string
+    """
+    value = value or ""
+    prefixes = tuple({token for tokens in _search_words(query_text) for token in tokens})
+    if not prefixes:
+        return html.escape(value)
+    parts = []
+    position = 0
+    for match in re.finditer(r"[^\W_]+", value):
+        if match.group().lower().startswith(prefixes):
+            parts.append(html.escape(value[position : match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            position = match.end()
+    parts.append(html.escape(value[position:]))
+    return "".join(parts)
 
 
 def delete_standard(session: Session, standard_id: int) -> bool:
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 
 from src.classroom import get_class
 from src.database import Question, Quiz, StudyCard, StudySet
+from src.json_extraction import extract_json_array
 
 logger = logging.getLogger(__name__)
 
@@ -85,25 +86,13 @@ def _build_context(session, class_id, quiz_id=None, topic=None):
 
 
 def _parse_items(response_text, material_type):
-    """Parse JSON response into list of item dicts."""
-    try:
-        items = json.loads(response_text)
-        if isinstance(items, list):
-            return items
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    # Try to extract JSON array from response
-    import re
-
-    match = re.search(r"\[.*\]", response_text, re.DOTALL)
-    if match:
-        try:
-            items = json.loads(match.group())
-            if isinstance(items, list):
-                return items
-        except (json.JSONDecodeError, ValueError):
-            pass
+    """Parse JSON response into list of item dicts.
+
+    Complete items are recovered from truncated or partly malformed arrays.
+    """
+    extraction = extract_json_array(response_text, source=f"{material_type} response")
+    if extraction.found:
+        return extraction.items
 
     logger.warning("Failed to parse study material response")
     return None
@@ -6,13 +6,12 @@ without needing a source quiz. Routes to the existing quiz_generator or
 study_generator based on the requested output type.
 """
 
-import json
 import logging
 from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
-from src.database import LessonLog
+from src.database import LessonTopicCount
 from src.lesson_tracker import get_assumed_knowledge
 from src.quiz_generator import generate_quiz
 from src.study_generator import VALID_MATERIAL_TYPES, generate_study_material
@@ -27,6 +26,9 @@ def get_class_topics(session: Session, class_id: int) -> List[str]:
     """
     Get all unique topics from a class's lesson history.
 
+    Reads the per-class topic set in ``lesson_topic_counts`` rather than
+    parsing every lesson log.
+
     Args:
         session: SQLAlchemy session
         class_id: ID of the class
@@ -34,21 +36,12 @@ def get_class_topics(session: Session, class_id: int) -> List[str]:
     Returns:
         Sorted list of unique topic strings
     """
-    lessons = session.query(LessonLog).filter(LessonLog.class_id == class_id).all()
-    topics = set()
-    for lesson in lessons:
-        if lesson.topics:
-            topic_list = lesson.topics
-            if isinstance(topic_list, str):
-                try:
-                    topic_list = json.loads(topic_list)
-                except (json.JSONDecodeError, TypeError):
-                    topic_list = []
-            if isinstance(topic_list, list):
-                for t in topic_list:
-                    if isinstance(t, str) and t.strip():
-                        topics.add(t.strip())
-    return sorted(topics)
+    rows = (
+        session.query(LessonTopicCount.value)
+        .filter(LessonTopicCount.class_id == class_id, LessonTopicCount.kind == "topic")
+        .all()
+    )
+    return sorted(value for (value,) in rows)
 
 
 def search_topics(session: Session, class_id: int, query: str) -> List[str]:
@@ -0,0 +1,199 @@
+"""
+Lightweight span tracing for the quiz generation pipeline.
+
+A Tracer records nested, timed spans with attributes. The pipeline opens
+spans with :func:`trace_span`, which is a near no-op when no trace is active,
+so library code can be instrumented unconditionally:
+
+    with start_trace("generate_quiz") as tracer:
+        with trace_span("generator.generate", num_questions=10):
+            ...
+    tracer.summary()            # compact per-span-name totals for metadata
+    tracer.to_chrome_trace()    # open in chrome://tracing or Perfetto
+
+The current tracer and span live in context variables, so spans opened in
+worker threads (pipelined mode copies the context into each task) nest
+under the span that submitted them.
+
+Set ``tracing.export_dir`` in config.yaml to write a Chrome trace-event JSON
+file per generation.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_tracer: contextvars.ContextVar[Optional["Tracer"]] = contextvars.ContextVar("tracer", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = ("name", "attrs", "parent", "start", "end", "thread_id", "thread_name")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        thread = threading.current_thread()
+        self.thread_id = thread.ident or 0
+        self.thread_name = thread.name
+
+    def set(self, **attrs) -> None:
+        """Add or update attributes on the span."""
+        self.attrs.update(attrs)
+
+    def duration(self, now: Optional[float] = None) -> float:
+        """Seconds elapsed; spans still open are measured up to *now*."""
+        end = self.end if self.end is not None else (now if now is not None else time.perf_counter())
+        return end - self.start
+
+
+class Tracer:
+    """Collects the spans of one pipeline run."""
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def open(self, name: str, attrs: Dict[str, Any], parent: Optional[Span]) -> Span:
+        span = Span(name, attrs, parent)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact timing summary: total wall time plus totals per span name.
+
+        Spans still open (e.g. the one calling this) count up to now.
+        """
+        now = time.perf_counter()
+        by_name: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            seconds = span.duration(now)
+            entry = by_name.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+        for entry in by_name.values():
+            entry["total_ms"] = round(entry["total_ms"], 1)
+            entry["max_ms"] = round(entry["max_ms"], 1)
+        return {"total_ms": round((now - self.started) * 1000, 1), "spans": by_name}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export spans as Chrome trace-event JSON ("X" complete events, microseconds)."""
+        now = time.perf_counter()
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            threads.setdefault(span.thread_id, span.thread_name)
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": round((span.start - self.started) * 1e6, 1),
+                    "dur": round(span.duration(now) * 1e6, 1),
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {key: _json_safe(value) for key, value in span.attrs.items()},
+                }
+            )
+        for tid, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace": self.name, "started_at": self.started_at.isoformat()},
+        }
+
+    def export(self, export_dir: str, label: Optional[str] = None) -> str:
+        """Write the Chrome trace JSON to *export_dir* and return the file path."""
+        os.makedirs(export_dir, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S-%f")
+        filename = f"trace-{self.name}-{stamp}{'-' + label if label else ''}.json"
+        path = os.path.join(export_dir, filename)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+def current_tracer() -> Optional[Tracer]:
+    """The tracer active in this context, if any."""
+    return _current_tracer.get()
+
+
+@contextmanager
+def start_trace(name: str = "pipeline") -> Iterator[Tracer]:
+    """Activate a tracer for this context, or reuse the one already active.
+
+    Nested calls (e.g. run_agentic_pipeline inside generate_quiz) share the
+    outer trace so one run produces one trace.
+    """
+    existing = _current_tracer.get()
+    if existing is not None:
+        yield existing
+        return
+    tracer = Tracer(name)
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def trace_span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a span of the active trace.
+
+    Yields the span (so callers can :meth:`Span.set` attributes learned
+    inside the block), or None when no trace is active.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+    span = tracer.open(name, attrs, _current_span.get())
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        span.end = time.perf_counter()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # A generator closed from another context (abandoned stream)
+            _current_span.set(span.parent)
+
+
+def export_trace(tracer: Tracer, config: Dict[str, Any], label: Optional[str] = None) -> Optional[str]:
+    """Write *tracer* to ``tracing.export_dir`` when configured; return the path."""
+    export_dir = (config.get("tracing") or {}).get("export_dir")
+    if not export_dir:
+        return None
+    return tracer.export(export_dir, label)
+
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
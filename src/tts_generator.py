@@ -106,7 +106,7 @@ def generate_question_audio(question_text, output_path, lang="en"):
         return None
 
 
-def generate_quiz_audio(questions, output_dir, lang="en"):
+def generate_quiz_audio(questions, output_dir, lang="en", on_progress=None):
     """Generate MP3 files for every question in *questions*.
 
     Parameters
@@ -118,6 +118,8 @@ def generate_quiz_audio(questions, output_dir, lang="en"):
         Directory under which ``q{id}.mp3`` files will be created.
     lang : str
         BCP-47 language code.
+    on_progress : callable, optional
+        Called as ``on_progress(done, total)`` after each question.
 
     Returns
     -------
@@ -131,18 +133,20 @@ def generate_quiz_audio(questions, output_dir, lang="en"):
     os.makedirs(output_dir, exist_ok=True)
     results = {}
 
-    for q in questions[:MAX_QUESTIONS_PER_QUIZ]:
+    batch = questions[:MAX_QUESTIONS_PER_QUIZ]
+    for done, q in enumerate(batch, start=1):
         q_id = q.get("id")
         spoken = _build_question_text(q)
-        if not spoken:
-            continue
+        if spoken:
+            filename = f"q{q_id}.mp3"
+            filepath = os.path.join(output_dir, filename)
 
-        filename = f"q{q_id}.mp3"
-        filepath = os.path.join(output_dir, filename)
+            path = generate_question_audio(spoken, filepath, lang=lang)
+            if path:
+                results[q_id] = path
 
-        path = generate_question_audio(spoken, filepath, lang=lang)
-        if path:
-            results[q_id] = path
+        if on_progress is not None:
+            on_progress(done, len(batch))
 
     return results
 
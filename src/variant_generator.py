@@ -14,6 +14,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from src.database import Question, Quiz
+from src.json_extraction import extract_json_array
 
 logger = logging.getLogger(__name__)
 
@@ -62,24 +63,13 @@ def _load_source_questions(session, quiz_id):
 
 
 def _parse_variant_questions(response_text):
-    """Parse JSON response into list of question dicts."""
-    try:
-        items = json.loads(response_text)
-        if isinstance(items, list):
-            return items
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    import re
-
-    match = re.search(r"\[.*\]", response_text, re.DOTALL)
-    if match:
-        try:
-            items = json.loads(match.group())
-            if isinstance(items, list):
-                return items
-        except (json.JSONDecodeError, ValueError):
-            pass
+    """Parse JSON response into list of question dicts.
+
+    Complete questions are recovered from truncated or partly malformed arrays.
+    """
+    extraction = extract_json_array(response_text, source="variant response")
+    if extraction.found:
+        return extraction.items
 
     logger.warning("Failed to parse variant response")
     return None
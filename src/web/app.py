@@ -11,7 +11,9 @@ from flask import Flask, g, redirect, send_from_directory, url_for
 from flask import session as flask_session
 from flask_wtf.csrf import CSRFProtect
 
-from src.database import get_engine, init_db
+from src.database import get_engine, get_session, init_db, save_api_audit_entry
+from src.jobs import DEFAULT_MAX_PENDING, DEFAULT_MAX_WORKERS, JobQueue, fail_stale_jobs
+from src.llm_provider import configure_api_audit_log, set_api_audit_sink
 from src.migrations import run_migrations
 from src.web.routes import register_routes
 
@@ -122,10 +124,30 @@ def create_app(config=None):
     # Run migrations before ORM init (skipped automatically for non-SQLite)
     run_migrations(db_path, verbose=False)
 
-    engine = get_engine(url=database_url) if database_url else get_engine(db_path)
+    # SQLite connections get the WAL production profile; config may override pragmas
+    pragmas = (config.get("database") or {}).get("sqlite_pragmas")
+    engine = get_engine(url=database_url, pragmas=pragmas) if database_url else get_engine(db_path, pragmas=pragmas)
     init_db(engine)
     app.config["DB_ENGINE"] = engine
 
+    # Background generation jobs (see src/jobs.py)
+    jobs_cfg = config.get("jobs") or {}
+    app.config["JOB_QUEUE"] = JobQueue(
+        engine,
+        max_workers=jobs_cfg.get("max_workers", DEFAULT_MAX_WORKERS),
+        max_pending=jobs_cfg.get("max_pending", DEFAULT_MAX_PENDING),
+    )
+    startup_session = get_session(engine)
+    try:
+        fail_stale_jobs(startup_session)
+    finally:
+        startup_session.close()
+
+    # API audit log: ring buffer size and optional database persistence
+    audit_cfg = config.get("llm", {}).get("audit_log") or {}
+    configure_api_audit_log(audit_cfg.get("max_entries"))
+    set_api_audit_sink(functools.partial(save_api_audit_entry, engine) if audit_cfg.get("persist") else None)
+
     @app.teardown_appcontext
     def close_db_session(exception):
         """Close the database session at the end of each request."""
@@ -4,6 +4,7 @@ from src.web.blueprints.analytics import analytics_bp
 from src.web.blueprints.auth import auth_bp
 from src.web.blueprints.classes import classes_bp
 from src.web.blueprints.content import content_bp
+from src.web.blueprints.jobs import jobs_bp
 from src.web.blueprints.main import main_bp
 from src.web.blueprints.quizzes import quizzes_bp
 from src.web.blueprints.settings import settings_bp
@@ -20,3 +21,4 @@ def register_blueprints(app):
     app.register_blueprint(analytics_bp)
     app.register_blueprint(settings_bp)
     app.register_blueprint(content_bp)
+    app.register_blueprint(jobs_bp)
@@ -16,15 +16,24 @@ from flask import (
     send_file,
     url_for,
 )
+from sqlalchemy.orm import joinedload
 
 from src.classroom import get_class, list_classes
 from src.database import Question, Quiz, Rubric, RubricCriterion
+from src.jobs import JobError
 from src.llm_provider import ProviderError, get_provider_info
 from src.rubric_export import export_rubric_csv, export_rubric_docx, export_rubric_pdf
 from src.rubric_generator import generate_rubric
 from src.topic_generator import generate_from_topics, search_topics
 from src.variant_generator import READING_LEVELS, generate_variant
-from src.web.blueprints.helpers import _get_session, flash_generation_error, login_required
+from src.web import config_utils
+from src.web.blueprints.helpers import (
+    _get_session,
+    flash_generation_error,
+    login_required,
+    submit_generation_job,
+    wants_background_job,
+)
 
 content_bp = Blueprint("content", __name__)
 
@@ -37,7 +46,7 @@ content_bp = Blueprint("content", __name__)
 def question_bank():
     """Show saved questions from the question bank."""
     session = _get_session()
-    query = session.query(Question).filter(Question.saved_to_bank == 1)
+    query = session.query(Question).options(joinedload(Question.quiz)).filter(Question.saved_to_bank == 1)
 
     # Filters
     q_type = request.args.get("type", "")
@@ -60,7 +69,7 @@ def question_bank():
                 data = {}
         if not isinstance(data, dict):
             data = {}
-        quiz = session.query(Quiz).filter_by(id=q.quiz_id).first() if q.quiz_id else None
+        quiz = q.quiz
         parsed.append(
             {
                 "id": q.id,
@@ -125,7 +134,11 @@ def api_question_bank_remove():
 @content_bp.route("/quizzes/<int:quiz_id>/generate-variant", methods=["GET", "POST"])
 @login_required
 def quiz_generate_variant(quiz_id):
-    """Generate a reading-level variant of a quiz."""
+    """Generate a reading-level variant of a quiz.
+
+    With ``background=1`` the variant is generated as a background job and
+    the response is 202 with the job URLs.
+    """
     session = _get_session()
     quiz = session.query(Quiz).filter_by(id=quiz_id).first()
     if not quiz:
@@ -150,6 +163,28 @@ def quiz_generate_variant(quiz_id):
                 error="Please select a valid reading level.",
             ), 400
 
+        if wants_background_job():
+
+            def run(job_session, progress):
+                progress(10, "Rewriting questions")
+                variant = generate_variant(
+                    job_session,
+                    quiz_id=quiz_id,
+                    reading_level=reading_level,
+                    config=config,
+                    title=title,
+                    provider_name=provider_override,
+                )
+                if not variant:
+                    raise JobError("Variant generation failed. Check your provider settings and try again.")
+                if provider_override:
+                    config.setdefault("last_provider", {})["quiz"] = provider_override
+                    config_utils.save_config(config)
+                return {"quiz_id": variant.id}
+
+            params = {"quiz_id": quiz_id, "reading_level": reading_level, "provider_name": provider_override}
+            return submit_generation_job("variant", run, params)
+
         try:
             variant = generate_variant(
                 session,
@@ -582,7 +617,11 @@ def lesson_plan_list():
 @content_bp.route("/lesson-plans/generate", methods=["GET", "POST"])
 @login_required
 def lesson_plan_generate():
-    """Generate a lesson plan via form POST or render form on GET."""
+    """Generate a lesson plan via form POST or render form on GET.
+
+    With ``background=1`` the plan is generated as a background job and the
+    response is 202 with the job URLs.
+    """
     session = _get_session()
     config = current_app.config["APP_CONFIG"]
     classes = list_classes(session)
@@ -618,6 +657,35 @@ def lesson_plan_generate():
 
         from src.lesson_plan_generator import generate_lesson_plan
 
+        if wants_background_job():
+
+            def run(job_session, progress):
+                progress(10, "Writing lesson plan")
+                plan = generate_lesson_plan(
+                    job_session,
+                    class_id=class_id,
+                    config=config,
+                    topics=topics,
+                    standards=standards,
+                    duration_minutes=duration,
+                    grade_level=grade_level,
+                    provider_name=provider_override,
+                )
+                if not plan:
+                    raise JobError("Lesson plan generation failed. Check your provider settings and try again.")
+                if provider_override:
+                    config.setdefault("last_provider", {})["lesson_plan"] = provider_override
+                    config_utils.save_config(config)
+                return {"plan_id": plan.id}
+
+            params = {
+                "class_id": class_id,
+                "topics": topics,
+                "standards": standards,
+                "provider_name": provider_override,
+            }
+            return submit_generation_job("lesson_plan", run, params)
+
         try:
             plan = generate_lesson_plan(
                 session,
@@ -3,10 +3,11 @@
 import functools
 import logging
 
-from flask import current_app, flash, g, redirect, request, url_for
+from flask import current_app, flash, g, jsonify, redirect, request, url_for
 from flask import session as flask_session
 
 from src.database import get_session
+from src.jobs import JobQueueFull
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,41 @@ def flash_generation_error(task_label, exception):
     )
 
 
+def wants_background_job():
+    """Whether the client asked for a background job instead of a blocking response.
+
+    Requested with a ``background=1`` form field, ``"background": true`` in
+    a JSON body, or a ``Prefer: respond-async`` header.
+    """
+    if "respond-async" in request.headers.get("Prefer", ""):
+        return True
+    if request.form.get("background", "").lower() in ("1", "true", "on"):
+        return True
+    body = request.get_json(silent=True) if request.is_json else None
+    return isinstance(body, dict) and bool(body.get("background"))
+
+
+def submit_generation_job(kind, fn, params=None):
+    """Queue *fn* on the app's job queue and return a 202 JSON response.
+
+    The response carries the job id plus the status and result URLs to poll.
+    Returns 503 when too many jobs are already queued.
+    """
+    job_queue = current_app.config["JOB_QUEUE"]
+    try:
+        job_id = job_queue.submit(kind, fn, params=params, user_id=flask_session.get("user_id"))
+    except JobQueueFull:
+        return jsonify({"ok": False, "error": "Too many generations are running. Try again in a minute."}), 503
+    return jsonify(
+        {
+            "ok": True,
+            "job_id": job_id,
+            "status_url": url_for("jobs.job_status", job_id=job_id),
+            "result_url": url_for("jobs.job_result", job_id=job_id),
+        }
+    ), 202
+
+
 def login_required(f):
     """Decorator to require login for a route."""
 
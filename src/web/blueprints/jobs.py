@@ -0,0 +1,85 @@
+"""Background job routes: status, progress and results for queued generations."""
+
+from flask import Blueprint, abort, jsonify, url_for
+from flask import session as flask_session
+
+from src.database import GenerationJob
+from src.jobs import ACTIVE_STATUSES, JOB_COMPLETED, get_job, job_to_dict
+from src.web.blueprints.helpers import _get_session, login_required
+
+jobs_bp = Blueprint("jobs", __name__)
+
+# Detail page each job kind's result links to: (endpoint, result key = URL argument)
+_RESULT_PAGES = {
+    "quiz": ("quizzes.quiz_detail", "quiz_id"),
+    "variant": ("quizzes.quiz_detail", "quiz_id"),
+    "audio": ("quizzes.quiz_detail", "quiz_id"),
+    "study": ("study.study_detail", "study_set_id"),
+    "lesson_plan": ("content.lesson_plan_detail", "plan_id"),
+}
+
+# Most recent jobs returned by the job list
+_JOB_LIST_LIMIT = 20
+
+
+def _get_user_job(job_id):
+    """Load a job, 404 if missing or submitted by another user."""
+    job = get_job(_get_session(), job_id)
+    if not job:
+        abort(404)
+    user_id = flask_session.get("user_id")
+    if job.user_id is not None and job.user_id != user_id:
+        abort(404)
+    return job
+
+
+def _result_redirect(job):
+    """URL of the page showing a completed job's result, or None."""
+    page = _RESULT_PAGES.get(job.kind)
+    result = job.result or {}
+    if not page or result.get(page[1]) is None:
+        return None
+    endpoint, key = page
+    return url_for(endpoint, **{key: result[key]})
+
+
+@jobs_bp.route("/api/jobs")
+@login_required
+def job_list():
+    """List the current user's most recent jobs."""
+    session = _get_session()
+    jobs = (
+        session.query(GenerationJob)
+        .filter(GenerationJob.user_id == flask_session.get("user_id"))
+        .order_by(GenerationJob.created_at.desc())
+        .limit(_JOB_LIST_LIMIT)
+        .all()
+    )
+    return jsonify({"ok": True, "jobs": [job_to_dict(job) for job in jobs]})
+
+
+@jobs_bp.route("/api/jobs/<job_id>")
+@login_required
+def job_status(job_id):
+    """Report a job's status, progress percentage and current stage."""
+    job = _get_user_job(job_id)
+    payload = job_to_dict(job)
+    payload["ok"] = True
+    payload["result_url"] = url_for("jobs.job_result", job_id=job.id)
+    return jsonify(payload)
+
+
+@jobs_bp.route("/api/jobs/<job_id>/result")
+@login_required
+def job_result(job_id):
+    """Return a finished job's result.
+
+    202 while the job is still queued or running, 500 with the error
+    message if it failed.
+    """
+    job = _get_user_job(job_id)
+    if job.status in ACTIVE_STATUSES:
+        return jsonify({"ok": False, "status": job.status, "progress": job.progress or 0}), 202
+    if job.status != JOB_COMPLETED:
+        return jsonify({"ok": False, "status": job.status, "error": job.error}), 500
+    return jsonify({"ok": True, "status": job.status, "result": job.result or {}, "redirect": _result_redirect(job)})
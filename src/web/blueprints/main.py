@@ -11,8 +11,10 @@ from flask import (
     request,
     url_for,
 )
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
-from src.classroom import get_class, list_classes
+from src.classroom import list_classes
 from src.database import LessonLog, Quiz
 from src.web.blueprints.helpers import _get_session, login_required
 
@@ -39,10 +41,16 @@ def dashboard():
     total_lessons = session.query(LessonLog).count()
 
     # Recent activity: 5 most recent lessons and quizzes
-    recent_lesson_rows = session.query(LessonLog).order_by(LessonLog.date.desc(), LessonLog.id.desc()).limit(5).all()
+    recent_lesson_rows = (
+        session.query(LessonLog)
+        .options(joinedload(LessonLog.class_obj))
+        .order_by(LessonLog.date.desc(), LessonLog.id.desc())
+        .limit(5)
+        .all()
+    )
     recent_lessons = []
     for lesson_row in recent_lesson_rows:
-        cls = get_class(session, lesson_row.class_id)
+        cls = lesson_row.class_obj
         topics = json.loads(lesson_row.topics) if lesson_row.topics else []
         recent_lessons.append(
             {
@@ -55,10 +63,10 @@ def dashboard():
             }
         )
 
-    recent_quiz_rows = session.query(Quiz).order_by(Quiz.id.desc()).limit(5).all()
+    recent_quiz_rows = session.query(Quiz).options(joinedload(Quiz.class_obj)).order_by(Quiz.id.desc()).limit(5).all()
     recent_quizzes = []
     for q in recent_quiz_rows:
-        cls = get_class(session, q.class_id)
+        cls = q.class_obj
         recent_quizzes.append(
             {
                 "id": q.id,
@@ -85,13 +93,11 @@ def api_stats():
     """Return JSON stats for dashboard charts (lessons by date, quizzes by class)."""
     session = _get_session()
 
-    # Lessons by date
-    all_lessons = session.query(LessonLog).order_by(LessonLog.date).all()
-    date_counts = {}
-    for lesson in all_lessons:
-        d = str(lesson.date)
-        date_counts[d] = date_counts.get(d, 0) + 1
-    lessons_by_date = [{"date": d, "count": c} for d, c in sorted(date_counts.items())]
+    # Lessons by date, counted in SQL
+    date_counts = (
+        session.query(LessonLog.date, func.count(LessonLog.id)).group_by(LessonLog.date).order_by(LessonLog.date).all()
+    )
+    lessons_by_date = [{"date": str(d), "count": c} for d, c in date_counts]
 
     # Quizzes by class
     classes = list_classes(session)
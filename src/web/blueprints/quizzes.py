@@ -3,12 +3,15 @@
 import json
 import logging
 import os
+import queue
 import re
+import threading
 import uuid
 from io import BytesIO
 
 from flask import (
     Blueprint,
+    Response,
     abort,
     current_app,
     flash,
@@ -17,13 +20,18 @@ from flask import (
     render_template,
     request,
     send_file,
+    stream_with_context,
     url_for,
 )
+from flask import session as flask_session
+from sqlalchemy.orm import joinedload
 
+from src.agents import PipelineCancelled
 from src.classroom import get_class, list_classes
 from src.cost_tracking import check_budget, estimate_pipeline_cost, get_cost_summary, get_monthly_total
-from src.database import Question, Quiz, Rubric
+from src.database import Question, Quiz, Rubric, get_question_counts
 from src.export import export_csv, export_docx, export_gift, export_pdf, export_qti, export_quizizz_csv
+from src.jobs import GENERIC_JOB_ERROR, JobError, JobQueueFull
 from src.llm_provider import ProviderError, get_provider_info
 from src.quiz_generator import generate_quiz
 from src.tts_generator import (
@@ -34,7 +42,14 @@ from src.tts_generator import (
     is_tts_available,
 )
 from src.variant_generator import READING_LEVELS
-from src.web.blueprints.helpers import ALLOWED_IMAGE_EXTENSIONS, _get_session, flash_generation_error, login_required
+from src.web.blueprints.helpers import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    _get_session,
+    flash_generation_error,
+    login_required,
+    submit_generation_job,
+    wants_background_job,
+)
 from src.web.config_utils import save_config
 
 logger = logging.getLogger(__name__)
@@ -69,18 +84,24 @@ def quizzes_list():
     if page > total_pages:
         page = total_pages
 
-    quizzes = query.order_by(Quiz.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+    quizzes = (
+        query.options(joinedload(Quiz.class_obj))
+        .order_by(Quiz.created_at.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+        .all()
+    )
+    question_counts = get_question_counts(session, [q.id for q in quizzes])
     quiz_data = []
     for q in quizzes:
-        class_obj = get_class(session, q.class_id) if q.class_id else None
-        question_count = session.query(Question).filter_by(quiz_id=q.id).count()
+        class_obj = q.class_obj
         quiz_data.append(
             {
                 "id": q.id,
                 "title": q.title,
                 "status": q.status,
                 "class_name": class_obj.name if class_obj else "N/A",
-                "question_count": question_count,
+                "question_count": question_counts[q.id],
                 "created_at": q.created_at,
             }
         )
@@ -202,16 +223,16 @@ def class_quizzes(class_id):
         abort(404)
 
     quizzes = session.query(Quiz).filter_by(class_id=class_id).order_by(Quiz.created_at.desc()).all()
+    question_counts = get_question_counts(session, [q.id for q in quizzes])
     quiz_data = []
     for q in quizzes:
-        question_count = session.query(Question).filter_by(quiz_id=q.id).count()
         quiz_data.append(
             {
                 "id": q.id,
                 "title": q.title,
                 "status": q.status,
                 "class_name": class_obj.name,
-                "question_count": question_count,
+                "question_count": question_counts[q.id],
                 "created_at": q.created_at,
             }
         )
@@ -636,10 +657,62 @@ def generate_redirect():
     return redirect("/classes/new")
 
 
+def _parse_generate_form(form):
+    """Parse the quiz generation form into generate_quiz() keyword arguments."""
+    try:
+        num_questions = max(1, min(int(form.get("num_questions", 20)), 100))
+    except (ValueError, TypeError):
+        num_questions = 20
+    grade_level = form.get("grade_level", "").strip() or None
+    sol_raw = form.get("sol_standards", "").strip()
+    sol_standards = [s.strip() for s in sol_raw.split(",") if s.strip()] if sol_raw else None
+
+    # Parse topics and content text (F1 + F3)
+    topics = form.get("topics", "").strip()
+    content_text = form.get("content_text", "").strip()
+
+    # Parse independent question types (F6)
+    question_types = form.getlist("question_types")
+    if not question_types:
+        question_types = ["mc", "tf"]  # sensible default
+
+    # Parse cognitive framework fields
+    cognitive_framework = form.get("cognitive_framework", "").strip() or None
+    cognitive_distribution = None
+    dist_raw = form.get("cognitive_distribution", "").strip()
+    if dist_raw:
+        try:
+            cognitive_distribution = json.loads(dist_raw)
+        except (json.JSONDecodeError, ValueError):
+            cognitive_distribution = None
+    try:
+        difficulty = max(1, min(int(form.get("difficulty", 3)), 5))
+    except (ValueError, TypeError):
+        difficulty = 3
+
+    return {
+        "num_questions": num_questions,
+        "grade_level": grade_level,
+        "sol_standards": sol_standards,
+        "cognitive_framework": cognitive_framework,
+        "cognitive_distribution": cognitive_distribution,
+        "difficulty": difficulty,
+        # Per-quiz provider override
+        "provider_name": form.get("provider", "").strip() or None,
+        "topics": topics,
+        "content_text": content_text,
+        "question_types": question_types,
+    }
+
+
 @quizzes_bp.route("/classes/<int:class_id>/generate", methods=["GET", "POST"])
 @login_required
 def quiz_generate(class_id):
-    """Generate a quiz for a class via form POST or render the form on GET."""
+    """Generate a quiz for a class via form POST or render the form on GET.
+
+    With ``background=1`` (see :func:`wants_background_job`) the quiz is
+    generated as a background job and the response is 202 with the job URLs.
+    """
     session = _get_session()
     class_obj = get_class(session, class_id)
     if not class_obj:
@@ -648,56 +721,14 @@ def quiz_generate(class_id):
     config = current_app.config["APP_CONFIG"]
 
     if request.method == "POST":
-        try:
-            num_questions = max(1, min(int(request.form.get("num_questions", 20)), 100))
-        except (ValueError, TypeError):
-            num_questions = 20
-        grade_level = request.form.get("grade_level", "").strip() or None
-        sol_raw = request.form.get("sol_standards", "").strip()
-        sol_standards = [s.strip() for s in sol_raw.split(",") if s.strip()] if sol_raw else None
-
-        # Parse topics and content text (F1 + F3)
-        topics = request.form.get("topics", "").strip()
-        content_text = request.form.get("content_text", "").strip()
-
-        # Parse independent question types (F6)
-        question_types = request.form.getlist("question_types")
-        if not question_types:
-            question_types = ["mc", "tf"]  # sensible default
-
-        # Parse cognitive framework fields
-        cognitive_framework = request.form.get("cognitive_framework", "").strip() or None
-        cognitive_distribution = None
-        dist_raw = request.form.get("cognitive_distribution", "").strip()
-        if dist_raw:
-            try:
-                cognitive_distribution = json.loads(dist_raw)
-            except (json.JSONDecodeError, ValueError):
-                cognitive_distribution = None
-        try:
-            difficulty = max(1, min(int(request.form.get("difficulty", 3)), 5))
-        except (ValueError, TypeError):
-            difficulty = 3
+        params = _parse_generate_form(request.form)
+        provider_override = params["provider_name"]
 
-        # Per-quiz provider override
-        provider_override = request.form.get("provider", "").strip() or None
+        if wants_background_job():
+            return submit_generation_job("quiz", _quiz_job(class_id, config, params), dict(params, class_id=class_id))
 
         try:
-            quiz = generate_quiz(
-                session,
-                class_id=class_id,
-                config=config,
-                num_questions=num_questions,
-                grade_level=grade_level,
-                sol_standards=sol_standards,
-                cognitive_framework=cognitive_framework,
-                cognitive_distribution=cognitive_distribution,
-                difficulty=difficulty,
-                provider_name=provider_override,
-                topics=topics,
-                content_text=content_text,
-                question_types=question_types,
-            )
+            quiz = generate_quiz(session, class_id=class_id, config=config, **params)
         except ProviderError as pe:
             quiz = None
             flash(pe.user_message, "error")
@@ -737,6 +768,136 @@ def quiz_generate(class_id):
     )
 
 
+# Progress message shown for each pipeline stage of a background quiz job
+_QUIZ_STAGE_MESSAGES = {
+    "generating": "Generating questions",
+    "critiquing": "Reviewing questions",
+    "saving": "Saving quiz",
+}
+
+
+def _quiz_job(class_id, config, params, listener=None, cancelled=None):
+    """Build the background job function for a quiz generation request.
+
+    Progress follows the pipeline: the stage becomes the job message and the
+    percentage tracks critic-approved questions against the requested count.
+    Pipeline events are also passed to *listener*, and setting the
+    *cancelled* event stops the pipeline at its next event.
+    """
+
+    def run(session, progress):
+        approved = 0
+
+        def on_event(event, payload):
+            nonlocal approved
+            if cancelled is not None and cancelled.is_set():
+                raise PipelineCancelled()
+            if event == "status" and payload.get("stage") in _QUIZ_STAGE_MESSAGES:
+                progress(message=_QUIZ_STAGE_MESSAGES[payload["stage"]])
+            elif event == "verdict" and payload.get("verdict") == "PASS":
+                approved += 1
+                progress(min(95, 5 + 90 * approved // params["num_questions"]))
+            if listener is not None:
+                listener(event, payload)
+
+        progress(5, "Preparing")
+        try:
+            quiz = generate_quiz(session, class_id=class_id, config=config, on_event=on_event, **params)
+        except PipelineCancelled:
+            raise JobError("Quiz generation was cancelled.") from None
+        if not quiz:
+            raise JobError("Quiz generation failed. Check your provider settings and try again.")
+        if params["provider_name"]:
+            config.setdefault("last_provider", {})["quiz"] = params["provider_name"]
+            save_config(config)
+        return {"quiz_id": quiz.id, "quiz_status": quiz.status}
+
+    return run
+
+
+# Seconds between SSE keep-alive comments while the pipeline is busy
+_SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sse(event, payload):
+    """Format one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@quizzes_bp.route("/classes/<int:class_id>/generate/stream", methods=["POST"])
+@login_required
+def quiz_generate_stream(class_id):
+    """Generate a quiz and stream progress as server-sent events.
+
+    Emits ``status`` (stage changes), ``question`` (each question as the
+    generator produces it) and ``verdict`` (each critic verdict) events,
+    then a final ``done`` event with the quiz URL or an ``error`` event.
+    Generation runs as a job on the app's bounded job queue, so the
+    response can flush events while the provider is still streaming; a
+    client that disconnects cancels the pipeline. Returns 503 when too many
+    jobs are already queued.
+    """
+    session = _get_session()
+    if not get_class(session, class_id):
+        abort(404)
+
+    config = current_app.config["APP_CONFIG"]
+    params = _parse_generate_form(request.form)
+    events = queue.Queue()
+    cancelled = threading.Event()
+    job = _quiz_job(
+        class_id, config, params, listener=lambda event, payload: events.put((event, payload)), cancelled=cancelled
+    )
+
+    def run(job_session, progress):
+        try:
+            result = job(job_session, progress)
+        except (JobError, ProviderError) as e:
+            events.put(("error", {"message": e.user_message if isinstance(e, ProviderError) else str(e)}))
+            raise
+        except Exception:
+            events.put(("error", {"message": GENERIC_JOB_ERROR}))
+            raise
+        events.put(("done", result))
+        return result
+
+    try:
+        current_app.config["JOB_QUEUE"].submit(
+            "quiz", run, params=dict(params, class_id=class_id), user_id=flask_session.get("user_id")
+        )
+    except JobQueueFull:
+        return jsonify({"ok": False, "error": "Too many generations are running. Try again in a minute."}), 503
+
+    @stream_with_context
+    def generate_events():
+        try:
+            yield _sse("status", {"stage": "started"})
+            while True:
+                try:
+                    event, payload = events.get(timeout=_SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event == "done":
+                    payload = {
+                        "quiz_id": payload["quiz_id"],
+                        "redirect": url_for("quizzes.quiz_detail", quiz_id=payload["quiz_id"]),
+                    }
+                yield _sse(event, payload)
+                if event in ("done", "error"):
+                    return
+        except GeneratorExit:
+            # The client went away: stop paying for a quiz nobody will see
+            cancelled.set()
+            raise
+
+    return Response(
+        generate_events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Cost Estimate API ---
 
 
@@ -982,7 +1143,11 @@ def api_tts_status(quiz_id):
 @quizzes_bp.route("/quizzes/<int:quiz_id>/generate-audio", methods=["POST"])
 @login_required
 def quiz_generate_audio(quiz_id):
-    """Generate MP3 audio for all questions in a quiz."""
+    """Generate MP3 audio for all questions in a quiz.
+
+    With ``"background": true`` the audio is generated as a background job
+    and the response is 202 with the job URLs.
+    """
     if not is_tts_available():
         return jsonify({"ok": False, "error": "gTTS is not installed. Run: pip install gtts"}), 400
 
@@ -1009,6 +1174,17 @@ def quiz_generate_audio(quiz_id):
     lang = request.json.get("lang", "en") if request.is_json else "en"
     audio_dir = get_quiz_audio_dir(quiz_id)
 
+    if wants_background_job():
+
+        def run(session, progress):
+            progress(0, "Generating audio")
+            results = generate_quiz_audio(
+                question_dicts, audio_dir, lang=lang, on_progress=lambda done, total: progress(100 * done // total)
+            )
+            return {"quiz_id": quiz_id, "generated": len(results), "total": len(question_dicts)}
+
+        return submit_generation_job("audio", run, {"quiz_id": quiz_id, "lang": lang})
+
     try:
         results = generate_quiz_audio(question_dicts, audio_dir, lang=lang)
     except Exception as e:
@@ -18,14 +18,16 @@ from werkzeug.utils import secure_filename
 
 logger = logging.getLogger(__name__)
 
-from src.llm_provider import ProviderError, get_provider, get_provider_info
+from src.llm_provider import ProviderError, get_provider, get_provider_info, invalidate_provider_pool
 from src.standards import (
     STANDARD_SETS,
+    count_search_results,
     ensure_standard_set_loaded,
     get_available_standard_sets,
     get_grade_bands,
     get_standard_sets_in_db,
     get_subjects,
+    highlight_search_terms,
     list_standards,
     search_standards,
     standards_count,
@@ -91,6 +93,8 @@ def settings():
 
         # Persist to config.yaml
         save_config(config)
+        # Pooled provider clients were built from the old settings
+        invalidate_provider_pool()
 
         flash("Settings saved successfully.", "success")
         return redirect(url_for("settings.settings"), code=303)
@@ -116,13 +120,73 @@ def settings():
 # --- API Audit Log (E2E testing/transparency) ---
 
 
+_AUDIT_PAGE_DEFAULT = 100
+_AUDIT_PAGE_MAX = 1000
+
+
+def _audit_row_to_entry(row):
+    """Convert a persisted ApiAuditEntry row to the in-memory entry shape."""
+    return {
+        "id": row.id,
+        "timestamp": row.created_at.strftime("%Y-%m-%dT%H:%M:%S") if row.created_at else None,
+        "run_id": row.run_id,
+        "provider": row.provider,
+        "model": row.model,
+        "prompt_char_count": row.prompt_char_count,
+        "prompt_preview": row.prompt_preview,
+        "response_char_count": row.response_char_count,
+        "response_preview": row.response_preview,
+        "input_tokens": row.input_tokens,
+        "output_tokens": row.output_tokens,
+        "cached_tokens": row.cached_tokens,
+        "duration_ms": row.duration_ms,
+        "error": row.error,
+    }
+
+
 @settings_bp.route("/api/audit-log")
 @login_required
 def api_audit_log():
-    """Return the API call audit log for transparency reporting."""
+    """Return one page of the API call audit log for transparency reporting.
+
+    Query parameters: ``run_id``, ``provider``, ``errors=1`` (failed calls
+    only), ``limit`` (default 100, max 1000), ``before_id`` (paging cursor
+    from ``next_before_id``) and ``source=db`` to read persisted entries
+    instead of the in-memory ring buffer. Entries are newest first.
+    """
+    from src.database import ApiAuditEntry
     from src.llm_provider import get_api_audit_log
 
-    return jsonify(get_api_audit_log())
+    run_id = request.args.get("run_id") or None
+    provider = request.args.get("provider") or None
+    errors_only = request.args.get("errors", "").lower() in ("1", "true", "yes")
+    before_id = request.args.get("before_id", type=int)
+    limit = request.args.get("limit", _AUDIT_PAGE_DEFAULT, type=int)
+    limit = min(max(limit, 1), _AUDIT_PAGE_MAX)
+
+    if request.args.get("source") == "db":
+        query = _get_session().query(ApiAuditEntry)
+        if run_id:
+            query = query.filter(ApiAuditEntry.run_id == run_id)
+        if provider:
+            query = query.filter(ApiAuditEntry.provider == provider)
+        if errors_only:
+            query = query.filter(ApiAuditEntry.error.isnot(None))
+        if before_id is not None:
+            query = query.filter(ApiAuditEntry.id < before_id)
+        entries = [_audit_row_to_entry(row) for row in query.order_by(ApiAuditEntry.id.desc()).limit(limit)]
+    else:
+        entries = get_api_audit_log(
+            run_id=run_id, provider=provider, errors_only=errors_only, before_id=before_id, limit=limit
+        )
+        entries.reverse()
+
+    return jsonify(
+        {
+            "entries": entries,
+            "next_before_id": entries[-1]["id"] if len(entries) == limit else None,
+        }
+    )
 
 
 @settings_bp.route("/api/audit-log/clear", methods=["POST"])
@@ -135,6 +199,33 @@ def clear_audit_log():
     return jsonify({"status": "cleared"})
 
 
+@settings_bp.route("/api/provider-pool")
+@login_required
+def api_provider_pool():
+    """Return connection-reuse statistics for pooled LLM provider clients."""
+    from src.llm_provider import get_provider_pool_stats
+
+    return jsonify(get_provider_pool_stats())
+
+
+@settings_bp.route("/api/rate-limits")
+@login_required
+def api_rate_limits():
+    """Return per-provider/model rate limiter counters (admitted, throttled, queued, in flight)."""
+    from src.rate_limiter import get_rate_limiter_stats
+
+    return jsonify(get_rate_limiter_stats())
+
+
+@settings_bp.route("/api/routing")
+@login_required
+def api_routing():
+    """Return per-provider/model latency percentiles, error rates and failover/hedge counters."""
+    from src.provider_router import get_routing_stats
+
+    return jsonify(get_routing_stats())
+
+
 # --- Provider Setup Wizard ---
 
 
@@ -496,7 +587,11 @@ def standard_detail(standard_id):
 @settings_bp.route("/api/standards/search")
 @login_required
 def api_standards_search():
-    """JSON API for standards autocomplete search."""
+    """JSON API for standards autocomplete search.
+
+    Returns up to 50 standards, best match first. ``highlight`` holds the
+    code and description as HTML with the matched words in <mark> tags.
+    """
     config = current_app.config["APP_CONFIG"]
     session = _get_session()
 
@@ -514,15 +609,13 @@ def api_standards_search():
     if not q:
         return jsonify({"results": []})
 
-    results = search_standards(
-        session,
-        q,
-        subject=subject or None,
-        grade_band=grade_band or None,
-        standard_set=standard_set or None,
-    )
-    total_results = len(results)
-    limited = results[:50]
+    filters = {
+        "subject": subject or None,
+        "grade_band": grade_band or None,
+        "standard_set": standard_set or None,
+    }
+    limited = search_standards(session, q, limit=50, **filters)
+    total_results = count_search_results(session, q, **filters) if len(limited) == 50 else len(limited)
     return jsonify(
         {
             "results": [
@@ -534,6 +627,10 @@ def api_standards_search():
                     "grade_band": std.grade_band,
                     "strand": std.strand,
                     "standard_set": std.standard_set or "sol",
+                    "highlight": {
+                        "code": highlight_search_terms(std.code, q),
+                        "description": highlight_search_terms(std.description, q),
+                    },
                 }
                 for std in limited
             ],
@@ -20,6 +20,7 @@ from flask import (
 from src.classroom import get_class, list_classes
 from src.database import Quiz, StudyCard, StudySet
 from src.exit_ticket_generator import generate_exit_ticket
+from src.jobs import JobError
 from src.lesson_tracker import list_lessons
 from src.llm_provider import ProviderError, get_provider_info
 from src.study_export import (
@@ -29,7 +30,14 @@ from src.study_export import (
     export_study_pdf,
 )
 from src.study_generator import generate_study_material
-from src.web.blueprints.helpers import _get_session, flash_generation_error, login_required
+from src.web import config_utils
+from src.web.blueprints.helpers import (
+    _get_session,
+    flash_generation_error,
+    login_required,
+    submit_generation_job,
+    wants_background_job,
+)
 
 study_bp = Blueprint("study", __name__)
 
@@ -83,7 +91,11 @@ def study_list():
 @study_bp.route("/study/generate", methods=["GET", "POST"])
 @login_required
 def study_generate():
-    """Generate study material via form POST or render form on GET."""
+    """Generate study material via form POST or render form on GET.
+
+    With ``background=1`` the material is generated as a background job and
+    the response is 202 with the job URLs.
+    """
     session = _get_session()
     config = current_app.config["APP_CONFIG"]
     classes = list_classes(session)
@@ -107,6 +119,30 @@ def study_generate():
                 error="Please select a class.",
             ), 400
 
+        if wants_background_job():
+
+            def run(job_session, progress):
+                progress(10, "Generating study material")
+                study_set = generate_study_material(
+                    job_session,
+                    class_id=class_id,
+                    material_type=material_type,
+                    config=config,
+                    quiz_id=quiz_id,
+                    topic=topic,
+                    title=title,
+                    provider_name=provider_override,
+                )
+                if not study_set:
+                    raise JobError("Study material generation failed. Check your provider settings and try again.")
+                if provider_override:
+                    config.setdefault("last_provider", {})["study"] = provider_override
+                    config_utils.save_config(config)
+                return {"study_set_id": study_set.id}
+
+            params = {"class_id": class_id, "material_type": material_type, "quiz_id": quiz_id, "topic": topic}
+            return submit_generation_job("study", run, params)
+
         try:
             study_set = generate_study_material(
                 session,
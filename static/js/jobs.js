@@ -0,0 +1,108 @@
+/**
+ * QuizWeaver - Background Generation Jobs
+ *
+ * Submits a generation request as a background job (Prefer: respond-async)
+ * and polls /api/jobs/<id> until it finishes, so a long generation never
+ * holds a server worker or runs into its request timeout.
+ *
+ * Usage:
+ *   QWJobs.submitForm(form, { onProgress: function (job) { ... } })
+ *     .then(function (result) { window.location.href = result.redirect; })
+ *     .catch(function (err) { QWJobs.showFormError(form, err.message); });
+ *
+ * If the server answers with a page instead of a job (e.g. the form failed
+ * validation), that page replaces the current one, or is passed to
+ * options.onPage(html) when given.
+ */
+(function () {
+  "use strict";
+
+  var POLL_INTERVAL_MS = 1500;
+  var GENERIC_ERROR = "Generation failed. Check your provider settings and try again.";
+
+  function csrfToken() {
+    var meta = document.querySelector('meta[name="csrf-token"]');
+    return meta ? meta.getAttribute("content") : "";
+  }
+
+  function sleep(ms) {
+    return new Promise(function (resolve) {
+      setTimeout(resolve, ms);
+    });
+  }
+
+  function getJson(url) {
+    return fetch(url, { headers: { Accept: "application/json" } }).then(function (response) {
+      return response.json();
+    });
+  }
+
+  /**
+   * Poll a submitted job until it finishes.
+   * Resolves with the result payload ({result, redirect}); rejects with the job error.
+   */
+  function poll(job, onProgress) {
+    return getJson(job.status_url).then(function (status) {
+      if (onProgress) onProgress(status);
+      if (status.status === "completed") return getJson(job.result_url);
+      if (status.status === "failed") throw new Error(status.error || GENERIC_ERROR);
+      return sleep(POLL_INTERVAL_MS).then(function () {
+        return poll(job, onProgress);
+      });
+    });
+  }
+
+  /**
+   * POST *body* (FormData or a JSON string) to *url* as a background job
+   * and wait for it to finish.
+   */
+  function submit(url, body, options) {
+    options = options || {};
+    var headers = {
+      "X-CSRFToken": csrfToken(),
+      Prefer: "respond-async",
+      Accept: "application/json",
+    };
+    if (typeof body === "string") headers["Content-Type"] = "application/json";
+    return fetch(url, { method: "POST", headers: headers, body: body }).then(function (response) {
+      var type = response.headers.get("Content-Type") || "";
+      if (type.indexOf("application/json") !== 0) {
+        return response.text().then(function (html) {
+          if (options.onPage) return options.onPage(html);
+          document.open();
+          document.write(html);
+          document.close();
+          return new Promise(function () {}); // the page was replaced
+        });
+      }
+      return response.json().then(function (data) {
+        if (response.status !== 202) throw new Error(data.error || GENERIC_ERROR);
+        return poll(data, options.onProgress);
+      });
+    });
+  }
+
+  function submitForm(form, options) {
+    return submit(form.action || window.location.href, new FormData(form), options);
+  }
+
+  /**
+   * Show *message* in an error alert just above *form*.
+   */
+  function showFormError(form, message) {
+    var alert = form.previousElementSibling;
+    if (!alert || !alert.classList.contains("alert-error")) {
+      alert = document.createElement("div");
+      alert.className = "alert alert-error";
+      form.parentNode.insertBefore(alert, form);
+    }
+    alert.textContent = message || GENERIC_ERROR;
+  }
+
+  window.QWJobs = {
+    submit: submit,
+    submitForm: submitForm,
+    poll: poll,
+    showFormError: showFormError,
+  };
+})();
@@ -137,8 +137,10 @@ function initStandardsPicker(opts) {
         dropdownResults.forEach(function(item, idx) {
             var option = document.createElement('div');
             option.className = 'picker-option' + (idx === highlightIndex ? ' highlighted' : '');
-            option.innerHTML = '<span class="picker-option-code">' + escapeHtml(item.code) + '</span>' +
-                '<span class="picker-option-desc">' + escapeHtml(item.description) + '</span>';
+            // highlight holds server-escaped HTML with the matched words in <mark>
+            var hl = item.highlight || {};
+            option.innerHTML = '<span class="picker-option-code">' + (hl.code || escapeHtml(item.code)) + '</span>' +
+                '<span class="picker-option-desc">' + (hl.description || escapeHtml(item.description)) + '</span>';
             option.addEventListener('click', function() {
                 selectResult(item);
             });
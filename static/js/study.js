@@ -74,34 +74,19 @@
                 }, delay));
             });
 
-            // Submit via fetch
-            var formData = new FormData(generateForm);
-            fetch(generateForm.action, {
-                method: 'POST',
-                body: formData,
-                redirect: 'follow',
-            })
-            .then(function(response) {
+            // Submit as a background job and poll until it finishes
+            QWJobs.submitForm(generateForm)
+            .then(function(result) {
                 timers.forEach(clearTimeout);
-                if (response.redirected) {
-                    steps.forEach(function(_, idx) { setStep(idx, 'done'); });
-                    setTimeout(function() {
-                        window.location.href = response.url;
-                    }, 500);
-                } else {
-                    overlay.style.display = 'none';
-                    // Reload with error
-                    response.text().then(function(html) {
-                        document.open();
-                        document.write(html);
-                        document.close();
-                    });
-                }
+                steps.forEach(function(_, idx) { setStep(idx, 'done'); });
+                setTimeout(function() {
+                    window.location.href = result.redirect;
+                }, 500);
             })
             .catch(function(err) {
                 timers.forEach(clearTimeout);
                 overlay.style.display = 'none';
-                alert('Network error: ' + err.message);
+                QWJobs.showFormError(generateForm, err.message);
             });
         });
     }
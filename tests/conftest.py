@@ -20,6 +20,7 @@ Config:
 
 LLM:
     mock_provider        -- a MockLLMProvider() instance
+    _reset_provider_pool -- (autouse) empties the get_provider() client pool
 
 Data builders:
     sample_class         -- factory that inserts a Class into a session
@@ -31,13 +32,18 @@ Flask:
     flask_client         -- logged-in test client (session-injected)
     anon_flask_client    -- unauthenticated test client
     make_flask_app       -- factory fixture for custom-seeded Flask apps
+
+Query counting:
+    assert_max_queries   -- context manager capping SQL statements per block
 """
 
+import contextlib
 import json
 import os
 import tempfile
 
 import pytest
+from sqlalchemy import event
 
 from src.database import Base, Class, Question, Quiz, get_engine, get_session, init_db
 from src.migrations import run_migrations
@@ -137,6 +143,20 @@ def mock_config(db_session):
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture(autouse=True)
+def _reset_provider_pool():
+    """Empty the process-wide provider pool around every test.
+
+    Many tests patch SDK client classes and call get_provider(); a pooled
+    provider from an earlier test would otherwise hand back a stale client.
+    """
+    from src.llm_provider import _provider_pool
+
+    _provider_pool.reset()
+    yield
+    _provider_pool.reset()
+
+
 @pytest.fixture
 def mock_provider():
     """Provide a MockLLMProvider instance (zero-cost, no API calls)."""
@@ -437,3 +457,39 @@ def make_flask_app(db_path):
             app.config["DB_ENGINE"].dispose()
         except Exception:
             pass
+
+
+# ---------------------------------------------------------------------------
+# Query counting
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Factory fixture: fail when a block runs more than *limit* SQL statements.
+
+    Returns a context manager ``assert_max_queries(engine, limit)`` that
+    yields the list of statements executed on *engine* inside the block.
+
+    Usage::
+
+        def test_page(flask_app, flask_client, assert_max_queries):
+            with assert_max_queries(flask_app.config["DB_ENGINE"], 8):
+                flask_client.get("/quizzes")
+    """
+
+    @contextlib.contextmanager
+    def _assert(engine, limit):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+        assert len(statements) <= limit, f"{len(statements)} statements (limit {limit}):\n" + "\n".join(statements)
+
+    return _assert
@@ -1,8 +1,11 @@
+import itertools
+import threading
 import time
 import unittest
 from unittest.mock import MagicMock, patch
 
 from src.agents import CriticAgent, GeneratorAgent, Orchestrator, _parse_critic_response
+from src.llm_provider import _log_api_call
 
 
 # Valid mock question that passes pre-validation
@@ -622,5 +625,273 @@ class TestParseCriticResponse(unittest.TestCase):
         self.assertEqual(result["status"], "APPROVED")
 
 
+class TestPipelinedOrchestrator(unittest.TestCase):
+    """Tests for the chunked, overlapping generate/critique mode."""
+
+    def setUp(self):
+        self.config = {
+            "agent_loop": {"max_retries": 3, "pipeline": {"enabled": True, "chunk_size": 4}},
+            "llm": {"provider": "mock"},
+        }
+        self.generated = 0
+        self.feedbacks = []
+
+    def _generate(self, context, feedback=None):
+        self.feedbacks.append(feedback)
+        questions = []
+        for _ in range(context["num_questions"]):
+            self.generated += 1
+            questions.append(_valid_q(text=f"Q{self.generated}"))
+        return questions
+
+    def _run(self, MockCritic, MockGenerator, num_questions, critique=None, on_event=None):
+        MockGenerator.return_value.generate.side_effect = self._generate
+        MockGenerator.return_value.generate_stream.side_effect = lambda ctx, fb=None: iter(self._generate(ctx, fb))
+        MockCritic.return_value.critique.side_effect = critique or (lambda qs, *a, **kw: _approved_result(len(qs)))
+        orch = Orchestrator(self.config)
+        questions, metadata = orch.run({"content_summary": "Cells", "num_questions": num_questions}, on_event=on_event)
+        return orch, questions, metadata
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_generates_in_chunks(self, _guidelines, MockCritic, MockGenerator):
+        orch, questions, metadata = self._run(MockCritic, MockGenerator, 10)
+        self.assertEqual(len(questions), 10)
+        sizes = [c.args[0]["num_questions"] for c in MockGenerator.return_value.generate.call_args_list]
+        self.assertEqual(sizes, [4, 4, 2])
+        self.assertEqual(MockCritic.return_value.critique.call_count, 3)
+        report = metadata["metrics"]
+        self.assertTrue(report["pipelined"])
+        self.assertTrue(report["approved"])
+        self.assertEqual(set(report["stage_seconds"]), {"generate", "pre_validate", "critique"})
+        self.assertIsNone(self.feedbacks[0])
+        self.assertIn("Q1", self.feedbacks[-1])
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_next_chunk_generated_during_critique(self, _guidelines, MockCritic, MockGenerator):
+        second_chunk = threading.Event()
+        overlapped = []
+
+        def generate(context, feedback=None):
+            if self.generated:
+                second_chunk.set()
+            return self._generate(context, feedback)
+
+        def critique(qs, *args, **kwargs):
+            overlapped.append(second_chunk.wait(2))
+            return _approved_result(len(qs))
+
+        MockGenerator.return_value.generate.side_effect = generate
+        MockCritic.return_value.critique.side_effect = critique
+        orch = Orchestrator(self.config)
+        questions, _ = orch.run({"content_summary": "Cells", "num_questions": 8})
+        self.assertEqual(len(questions), 8)
+        self.assertTrue(overlapped[0])
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_rejections_replaced_with_feedback(self, _guidelines, MockCritic, MockGenerator):
+        def critique(qs, *args, **kwargs):
+            if qs[0]["text"] == "Q1":
+                return _rejected_result(len(qs), feedback="Too vague")
+            return _approved_result(len(qs))
+
+        orch, questions, metadata = self._run(MockCritic, MockGenerator, 4, critique=critique)
+        self.assertEqual([q["text"] for q in questions], ["Q5", "Q6", "Q7", "Q8"])
+        self.assertIn("Too vague", self.feedbacks[-1])
+        self.assertEqual(metadata["metrics"]["questions_rejected"], 4)
+        self.assertEqual(len(metadata["critic_history"]), 2)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_generator_errors_abort(self, _guidelines, MockCritic, MockGenerator):
+        MockGenerator.return_value.generate.side_effect = RuntimeError("boom")
+        orch = Orchestrator(self.config)
+        questions, metadata = orch.run({"content_summary": "Cells", "num_questions": 8})
+        self.assertEqual(questions, [])
+        self.assertEqual(metadata["metrics"]["errors"], 2)
+        MockCritic.return_value.critique.assert_not_called()
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_critic_error_accepts_chunk(self, _guidelines, MockCritic, MockGenerator):
+        def critique(qs, *args, **kwargs):
+            raise RuntimeError("critic down")
+
+        orch, questions, _ = self._run(MockCritic, MockGenerator, 6, critique=critique)
+        self.assertEqual(len(questions), 6)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_streaming_events_tagged_by_chunk(self, _guidelines, MockCritic, MockGenerator):
+        events = []
+        self._run(MockCritic, MockGenerator, 6, on_event=lambda event, payload: events.append((event, payload)))
+        question_chunks = [p["attempt"] for e, p in events if e == "question"]
+        self.assertEqual(sorted(question_chunks), [1, 1, 1, 1, 2, 2])
+        self.assertEqual(len([e for e, _ in events if e == "verdict"]), 6)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_tokens_of_calls_in_flight_at_completion_counted(self, _guidelines, MockCritic, MockGenerator):
+        self.config["agent_loop"]["pipeline"]["chunk_size"] = 2
+        self.config["agent_loop"]["overgeneration"] = {"enabled": True, "prior_pass_rate": 0.5}
+        calls = itertools.count(1)
+
+        def generate(context, feedback=None):
+            if next(calls) == 3:
+                time.sleep(0.3)  # still running when the first two chunks complete the quiz
+            _log_api_call("mock", "m", "prompt", "response", 100, 10)
+            return self._generate(context, feedback)
+
+        MockGenerator.return_value.generate.side_effect = generate
+        MockCritic.return_value.critique.side_effect = lambda qs, *a, **kw: _approved_result(len(qs))
+        questions, metadata = Orchestrator(self.config).run({"content_summary": "Cells", "num_questions": 4})
+        self.assertEqual(len(questions), 4)
+        self.assertEqual(MockGenerator.return_value.generate.call_count, 3)
+        self.assertEqual(metadata["metrics"]["input_tokens"], 300)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_duplicate_of_chunk_in_review_not_critiqued(self, _guidelines, MockCritic, MockGenerator):
+        self.config["agent_loop"]["pipeline"]["chunk_size"] = 2
+        chunks = iter(
+            [
+                [_valid_q(text="What do plant cells use to capture sunlight?"), _valid_q(text="Name a gas.")],
+                [_valid_q(text="What do the plant cells use to capture sunlight?"), _valid_q(text="Define osmosis.")],
+                [_valid_q(text="What is a vacuole?")],
+            ]
+        )
+        second_in_review = threading.Event()
+        critiqued = []
+
+        def on_event(event, payload):
+            if event == "status" and payload.get("stage") == "critiquing" and payload.get("attempt") == 2:
+                second_in_review.set()
+
+        def critique(qs, *args, **kwargs):
+            second_in_review.wait(2)  # keep the first chunk in review while the second is checked
+            critiqued.extend(q["text"] for q in qs)
+            return _approved_result(len(qs))
+
+        def generate_stream(context, feedback=None):
+            self.feedbacks.append(feedback)
+            return iter(next(chunks))
+
+        MockGenerator.return_value.generate_stream.side_effect = generate_stream
+        MockCritic.return_value.critique.side_effect = critique
+        orch = Orchestrator(self.config)
+        questions, _ = orch.run({"content_summary": "Cells", "num_questions": 4}, on_event=on_event)
+
+        self.assertEqual(len(questions), 4)
+        self.assertEqual(sum("capture sunlight" in text for text in critiqued), 1)
+        self.assertEqual(orch.last_metrics.pre_validation_failures, 1)
+        self.assertTrue(any(fb and "a question still in review" in fb for fb in self.feedbacks))
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_sequential_mode_reports_stage_timings(self, _guidelines, MockCritic, MockGenerator):
+        self.config["agent_loop"].pop("pipeline")
+        orch, questions, metadata = self._run(MockCritic, MockGenerator, 5)
+        self.assertEqual(len(questions), 5)
+        self.assertFalse(metadata["metrics"]["pipelined"])
+        self.assertEqual(set(metadata["metrics"]["stage_seconds"]), {"generate", "pre_validate", "critique"})
+        self.assertEqual(MockGenerator.return_value.generate.call_count, 1)
+
+
+class TestOvergeneration(unittest.TestCase):
+    """Tests for sizing generation requests from critic pass rates."""
+
+    def setUp(self):
+        self.config = {
+            "agent_loop": {"max_retries": 3, "overgeneration": {"enabled": True}},
+            "llm": {"provider": "mock"},
+        }
+
+    def _generate(self, context, feedback=None):
+        return [_valid_q(text=f"Q{i}") for i in range(context["num_questions"])]
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    def test_planned_count_grows_as_pass_rate_falls(self, _critic, _generator):
+        orch = Orchestrator(self.config)
+        self.assertEqual(orch._planned_count(10, 1.0), 10)
+        high = orch._planned_count(10, 0.95)
+        low = orch._planned_count(10, 0.7)
+        self.assertGreater(high, 10)
+        self.assertGreaterEqual(low, high)
+        self.assertLessEqual(low, 15)
+        self.assertEqual(orch._planned_count(1, 0.1), 2)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    def test_pass_rate_smoothed_toward_prior(self, _critic, _generator):
+        orch = Orchestrator(self.config, pass_rates={"mc": (1, 10), "tf": (100, 100)})
+        self.assertAlmostEqual(orch._expected_pass_rate({"question_types": ["mc"]}), 0.475)
+        self.assertGreater(orch._expected_pass_rate({"question_types": ["tf"]}), 0.98)
+        self.assertEqual(Orchestrator({"llm": {"provider": "mock"}})._expected_pass_rate({}), 1.0)
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_surplus_and_outcomes_in_metadata(self, _guidelines, MockCritic, MockGenerator):
+        MockGenerator.return_value.generate.side_effect = self._generate
+        MockCritic.return_value.critique.side_effect = lambda qs, *a, **kw: _approved_result(len(qs))
+        orch = Orchestrator(self.config, pass_rates={"mc": (60, 100)})
+        questions, metadata = orch.run({"content_summary": "Cells", "num_questions": 10})
+
+        requested = MockGenerator.return_value.generate.call_args.args[0]["num_questions"]
+        self.assertGreater(requested, 10)
+        self.assertEqual(len(questions), 10)
+        self.assertEqual(len(metadata["surplus_questions"]), requested - 10)
+        self.assertEqual(metadata["overgeneration"]["surplus"], requested - 10)
+        self.assertEqual(metadata["critic_outcomes"], {"mc": {"passed": requested, "total": requested}})
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_disabled_requests_exact_count(self, _guidelines, MockCritic, MockGenerator):
+        self.config["agent_loop"].pop("overgeneration")
+        MockGenerator.return_value.generate.side_effect = self._generate
+        MockCritic.return_value.critique.side_effect = lambda qs, *a, **kw: _approved_result(len(qs))
+        _, metadata = Orchestrator(self.config).run({"content_summary": "Cells", "num_questions": 10})
+        self.assertEqual(MockGenerator.return_value.generate.call_args.args[0]["num_questions"], 10)
+        self.assertNotIn("surplus_questions", metadata)
+        self.assertNotIn("overgeneration", metadata)
+
+
+class TestDuplicateFiltering(unittest.TestCase):
+    """Near-duplicates of approved questions are dropped before the critic sees them."""
+
+    @patch("src.agents.GeneratorAgent")
+    @patch("src.agents.CriticAgent")
+    @patch("src.agents.get_qa_guidelines", return_value="Rules")
+    def test_retry_duplicate_of_approved_not_critiqued(self, _guidelines, MockCritic, MockGenerator):
+        MockGenerator.return_value.generate.side_effect = [
+            [_valid_q(text="What do plant cells use to capture sunlight?"), _valid_q(text="Name a gas.")],
+            [_valid_q(text="What do the plant cells use to capture sunlight?"), _valid_q(text="Define osmosis.")],
+        ]
+        MockCritic.return_value.critique.side_effect = [
+            {**_approved_result(2), "passed_indices": [0], "failed_indices": [1]},
+            _approved_result(1),
+        ]
+        orch = Orchestrator({"agent_loop": {"max_retries": 3}, "llm": {"provider": "mock"}})
+        questions, _ = orch.run({"content_summary": "Cells", "num_questions": 2})
+
+        second_batch = MockCritic.return_value.critique.call_args_list[1].args[0]
+        self.assertEqual([q["text"] for q in second_batch], ["Define osmosis."])
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(orch.last_metrics.pre_validation_failures, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
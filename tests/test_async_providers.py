@@ -0,0 +1,209 @@
+"""
+Tests for the async provider interface (LLMProvider.agenerate).
+
+Verifies:
+- Every built-in provider exposes a native agenerate()
+- agenerate() builds the same request as generate() and logs cost/audit
+- Errors are classified into ProviderError just like the sync path
+- The ABC default runs generate() in a worker thread for custom providers
+- Wrappers (CachingProvider) forward agenerate()
+- Many calls can be in flight at once via asyncio.gather
+- Async SDK clients are cached per event loop, never shared across loops
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.llm_cache import CachingProvider, ResponseCache
+from src.llm_provider import (
+    AnthropicProvider,
+    GeminiProvider,
+    LLMProvider,
+    MockLLMProvider,
+    OpenAICompatibleProvider,
+    ProviderError,
+    VertexAnthropicProvider,
+    _LoopBoundClients,
+    clear_api_audit_log,
+    get_api_audit_log,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_audit_log():
+    clear_api_audit_log()
+    yield
+    clear_api_audit_log()
+
+
+def _anthropic_response(text="response", input_tokens=10, output_tokens=5):
+    content = MagicMock()
+    content.text = text
+    response = MagicMock()
+    response.content = [content]
+    response.usage = MagicMock(input_tokens=input_tokens, output_tokens=output_tokens)
+    return response
+
+
+class TestMockAsync:
+    def test_agenerate_matches_generate(self):
+        provider = MockLLMProvider()
+        sync_result = provider.generate(["Generate quiz questions about cells"], json_mode=True)
+        async_result = asyncio.run(provider.agenerate(["Generate quiz questions about cells"], json_mode=True))
+        assert isinstance(async_result, str)
+        assert type(sync_result) is type(async_result)
+        assert provider._call_count == 2
+
+    def test_gather_many_in_flight(self):
+        provider = MockLLMProvider()
+
+        async def run():
+            return await asyncio.gather(*(provider.agenerate([f"prompt {i}"]) for i in range(20)))
+
+        results = asyncio.run(run())
+        assert len(results) == 20
+        assert provider._call_count == 20
+
+
+class TestAnthropicAsync:
+    def _make_provider(self):
+        with patch("anthropic.Anthropic"):
+            provider = AnthropicProvider(api_key="test-key")
+        async_client = MagicMock()
+        async_client.messages.create = AsyncMock(return_value=_anthropic_response())
+        provider._async_clients = _LoopBoundClients(lambda: async_client)
+        return provider, async_client
+
+    def test_agenerate_uses_async_client(self):
+        provider, async_client = self._make_provider()
+        result = asyncio.run(provider.agenerate(["Hello"], json_mode=True))
+        assert result == "response"
+        kwargs = async_client.messages.create.call_args.kwargs
+        assert kwargs["model"] == provider._model_name
+        assert kwargs["system"] == "Respond only with valid JSON."
+        assert kwargs["messages"][0]["content"] == [{"type": "text", "text": "Hello"}]
+
+    def test_agenerate_logs_cost_and_audit(self):
+        provider, _ = self._make_provider()
+        with patch("src.cost_tracking.log_api_call") as mock_log:
+            asyncio.run(provider.agenerate(["Hello"]))
+        mock_log.assert_called_once_with("anthropic", provider._model_name, 10, 5)
+        entries = get_api_audit_log()
+        assert entries[-1]["provider"] == "anthropic"
+        assert entries[-1]["input_tokens"] == 10
+
+    def test_agenerate_error_is_classified(self):
+        provider, async_client = self._make_provider()
+        async_client.messages.create.side_effect = Exception("401 Unauthorized")
+        with pytest.raises(ProviderError) as exc:
+            asyncio.run(provider.agenerate(["Hi"]))
+        assert exc.value.error_code == "auth"
+        assert get_api_audit_log()[-1]["error"]
+
+    def test_async_client_created_lazily(self):
+        with patch("anthropic.Anthropic"), patch("anthropic.AsyncAnthropic") as MockAsync:
+            provider = AnthropicProvider(api_key="test-key")
+            MockAsync.assert_not_called()
+            _ = provider.async_client
+            MockAsync.assert_called_once_with(api_key="test-key")
+
+    def test_vertex_anthropic_async_client(self):
+        with patch("anthropic.AnthropicVertex"), patch("anthropic.AsyncAnthropicVertex") as MockAsync:
+            provider = VertexAnthropicProvider(project_id="proj", location="us-east5")
+            _ = provider.async_client
+            MockAsync.assert_called_once_with(project_id="proj", region="us-east5")
+
+
+class TestOpenAIAsync:
+    def test_agenerate_uses_async_client(self):
+        with patch("openai.OpenAI"):
+            provider = OpenAICompatibleProvider(api_key="k", base_url="http://localhost:11434/v1")
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = '{"ok": true}'
+        response.usage = None
+        async_client = MagicMock()
+        async_client.chat.completions.create = AsyncMock(return_value=response)
+        provider._async_clients = _LoopBoundClients(lambda: async_client)
+
+        result = asyncio.run(provider.agenerate(["Hi"], json_mode=True))
+        assert result == '{"ok": true}'
+        kwargs = async_client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"] == {"type": "json_object"}
+
+    def test_async_client_uses_same_credentials(self):
+        with patch("openai.OpenAI"), patch("openai.AsyncOpenAI") as MockAsync:
+            provider = OpenAICompatibleProvider(api_key="k", base_url="http://x/v1")
+            _ = provider.async_client
+            MockAsync.assert_called_once_with(api_key="k", base_url="http://x/v1")
+
+    def test_async_client_cached_per_event_loop(self):
+        with patch("openai.OpenAI"), patch("openai.AsyncOpenAI", side_effect=lambda **kw: MagicMock()) as MockAsync:
+            provider = OpenAICompatibleProvider(api_key="k", base_url="http://x/v1")
+
+            async def clients():
+                return provider.async_client, provider.async_client
+
+            first, again = asyncio.run(clients())
+            second, _ = asyncio.run(clients())
+        assert first is again
+        assert first is not second
+        assert MockAsync.call_count == 2
+        assert len(provider._async_clients._clients) <= 1
+
+
+class TestGeminiAsync:
+    def test_agenerate_uses_aio_surface(self):
+        with patch("google.genai.Client"):
+            provider = GeminiProvider(api_key="k")
+        response = MagicMock()
+        response.text = "[]"
+        response.usage_metadata = None
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(return_value=response)
+        provider.client = client
+
+        result = asyncio.run(provider.agenerate(["Hi"], json_mode=True))
+        assert result == "[]"
+        kwargs = client.aio.models.generate_content.call_args.kwargs
+        assert kwargs["config"] == {"response_mime_type": "application/json"}
+        client.models.generate_content.assert_not_called()
+
+
+class TestDefaultAgenerate:
+    def test_custom_provider_runs_generate_in_thread(self):
+        class EchoProvider(LLMProvider):
+            def generate(self, prompt_parts, json_mode=False):
+                return "|".join(prompt_parts)
+
+            def prepare_image_context(self, image_path):
+                return image_path
+
+        assert asyncio.run(EchoProvider().agenerate(["a", "b"])) == "a|b"
+
+
+class TestCachingProviderAsync:
+    def test_async_hits_cache(self):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.remove(path)
+        try:
+            inner = MockLLMProvider()
+            inner.agenerate = AsyncMock(return_value="cached")
+            provider = CachingProvider(inner, ResponseCache(path=path))
+
+            async def run():
+                first = await provider.agenerate(["p"])
+                second = await provider.agenerate(["p"])
+                return first, second
+
+            assert asyncio.run(run()) == ("cached", "cached")
+            assert inner.agenerate.await_count == 1
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
@@ -0,0 +1,205 @@
+"""
+Tests for the bounded, run-scoped API audit log.
+
+Verifies:
+- The audit log is a ring buffer that keeps only the newest entries
+- Entries are attributed to the active audit run (threads, asyncio tasks, nesting)
+- Orchestrator token totals stay correct when pipelines run concurrently
+- /api/audit-log filters and pages, and can read persisted entries
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.agents import Orchestrator
+from src.database import ApiAuditEntry, get_session
+from src.llm_provider import (
+    AUDIT_LOG_MAX_ENTRIES,
+    _log_api_call,
+    audit_run,
+    clear_api_audit_log,
+    configure_api_audit_log,
+    current_audit_run,
+    get_api_audit_log,
+    set_api_audit_sink,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_audit_log():
+    clear_api_audit_log()
+    yield
+    clear_api_audit_log()
+    configure_api_audit_log(AUDIT_LOG_MAX_ENTRIES)
+    set_api_audit_sink(None)
+
+
+def _call(provider="gemini", tokens=10, error=None):
+    _log_api_call(provider, "m", "prompt", "response", tokens, tokens, 5, error=error)
+
+
+class TestRingBuffer:
+    def test_oldest_entries_dropped(self):
+        configure_api_audit_log(3)
+        for _ in range(5):
+            _call()
+        entries = get_api_audit_log()
+        assert len(entries) == 3
+        assert [e["id"] for e in entries] == sorted(e["id"] for e in entries)
+        assert entries[-1]["id"] - entries[0]["id"] == 2
+
+    def test_resize_keeps_newest(self):
+        for _ in range(4):
+            _call()
+        newest = get_api_audit_log()[-1]["id"]
+        configure_api_audit_log(2)
+        assert [e["id"] for e in get_api_audit_log()] == [newest - 1, newest]
+
+    def test_filters(self):
+        _call("gemini")
+        _call("anthropic", error="boom")
+        _call("anthropic")
+        assert len(get_api_audit_log(provider="anthropic")) == 2
+        assert [e["error"] for e in get_api_audit_log(errors_only=True)] == ["boom"]
+        last = get_api_audit_log()[-1]["id"]
+        assert len(get_api_audit_log(before_id=last)) == 2
+        assert get_api_audit_log(limit=1)[0]["id"] == last
+
+
+class TestAuditRuns:
+    def test_entries_tagged_with_run(self):
+        with audit_run("r1") as run:
+            _call()
+        _call()
+        assert [e["run_id"] for e in get_api_audit_log()] == ["r1", None]
+        assert run.totals()["calls"] == 1
+        assert current_audit_run() is None
+
+    def test_run_keeps_entries_after_ring_drops_them(self):
+        configure_api_audit_log(2)
+        with audit_run() as run:
+            for _ in range(5):
+                _call(tokens=10)
+        assert len(get_api_audit_log()) == 2
+        assert run.totals()["input_tokens"] == 50
+
+    def test_nested_runs_roll_up(self):
+        with audit_run("outer") as outer:
+            _call()
+            with audit_run("inner") as inner:
+                _call()
+        assert outer.totals()["calls"] == 2
+        assert inner.totals()["calls"] == 1
+
+    def test_threads_are_isolated(self):
+        runs = {}
+        barrier = threading.Barrier(4)
+
+        def worker(n):
+            with audit_run(f"t{n}") as run:
+                barrier.wait()
+                for _ in range(n + 1):
+                    _call(tokens=1)
+            runs[n] = run
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert {n: r.totals()["calls"] for n, r in runs.items()} == {0: 1, 1: 2, 2: 3, 3: 4}
+
+    def test_asyncio_tasks_are_isolated(self):
+        async def task(n):
+            with audit_run() as run:
+                for _ in range(n):
+                    _call()
+                    await asyncio.sleep(0)
+                    await asyncio.to_thread(_call)
+            return run.totals()["calls"]
+
+        async def main():
+            return await asyncio.gather(task(1), task(2), task(3))
+
+        assert asyncio.run(main()) == [2, 4, 6]
+
+
+class TestOrchestratorAccounting:
+    def test_concurrent_runs_do_not_share_tokens(self):
+        config = {"llm": {"provider": "mock"}, "agent_loop": {"max_retries": 1}}
+        context = {"content_summary": "cells", "num_questions": 2}
+        solo_questions, solo = Orchestrator(config, web_mode=True).run(context)
+
+        results = []
+
+        def worker():
+            results.append(Orchestrator(config, web_mode=True).run(context)[1])
+
+        noise = threading.Event()
+
+        def noisy():
+            while not noise.is_set():
+                _call(tokens=1000)
+
+        background = threading.Thread(target=noisy)
+        background.start()
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        noise.set()
+        background.join()
+
+        assert solo_questions
+        for metadata in results:
+            assert metadata["metrics"]["input_tokens"] < 1000
+            assert metadata["run_id"] != solo["run_id"]
+        assert len({m["run_id"] for m in results}) == 3
+
+
+class TestAuditEndpoint:
+    def test_filters_and_pages(self, flask_client):
+        with audit_run("abc"):
+            for _ in range(3):
+                _call("anthropic")
+        _call("gemini", error="quota")
+
+        body = flask_client.get("/api/audit-log?run_id=abc&limit=2").get_json()
+        assert [e["run_id"] for e in body["entries"]] == ["abc", "abc"]
+        assert body["entries"][0]["id"] > body["entries"][1]["id"]
+        page2 = flask_client.get(f"/api/audit-log?run_id=abc&limit=2&before_id={body['next_before_id']}").get_json()
+        assert len(page2["entries"]) == 1
+        assert page2["next_before_id"] is None
+
+        errors = flask_client.get("/api/audit-log?errors=1").get_json()["entries"]
+        assert [e["provider"] for e in errors] == ["gemini"]
+
+    def test_persisted_entries(self, make_flask_app):
+        app = make_flask_app(extra_config={"llm": {"audit_log": {"persist": True}}})
+        with audit_run("persist-me"):
+            _call("anthropic", tokens=42)
+        clear_api_audit_log()
+
+        session = get_session(app.config["DB_ENGINE"])
+        row = session.query(ApiAuditEntry).filter_by(run_id="persist-me").one()
+        assert row.input_tokens == 42
+        session.close()
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["logged_in"] = True
+            sess["username"] = "teacher"
+        assert client.get("/api/audit-log").get_json()["entries"] == []
+        body = client.get("/api/audit-log?source=db&run_id=persist-me").get_json()
+        assert body["entries"][0]["input_tokens"] == 42
+
+    def test_sink_failure_does_not_break_call(self):
+        def broken(entry):
+            raise RuntimeError("db down")
+
+        set_api_audit_sink(broken)
+        _call()
+        assert len(get_api_audit_log()) == 1
@@ -0,0 +1,236 @@
+"""
+Tests for the provider benchmark harness (src/benchmark.py).
+
+Verifies:
+- Target shorthands and percentile math
+- The stand-in server answers each generator's prompt with the matching
+  mock response, streams, and returns simulated errors as HTTP statuses
+- run_benchmark() measures stages, provider calls, tokens, cost and critic
+  outcomes for mock and stand-in targets, without writing the cost log
+- compare_reports() flags latency, cost and success-rate regressions
+- The ``benchmark`` CLI command writes the report and fails on regressions
+"""
+
+import argparse
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import src.cost_tracking as cost_tracking
+from src.benchmark import (
+    StandInServer,
+    compare_reports,
+    format_comparison,
+    load_corpus,
+    load_targets,
+    parse_target,
+    percentiles,
+    run_benchmark,
+    standin_response,
+)
+from src.cli.benchmark_commands import handle_benchmark
+from src.study_generator import MATERIAL_PROMPTS
+
+
+@pytest.fixture
+def small_corpus():
+    corpus = load_corpus()
+    corpus["cases"] = [
+        {"name": "quiz", "kind": "quiz", "num_questions": 3, "topics": ["photosynthesis"]},
+        {"name": "variant", "kind": "variant", "reading_level": "ell"},
+        {"name": "flashcards", "kind": "study", "material_type": "flashcard", "from_quiz": True},
+        {"name": "rubric", "kind": "rubric"},
+    ]
+    return corpus
+
+
+@pytest.fixture
+def no_cost_log(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cost_tracking, "log_api_call", lambda *args, **kwargs: calls.append(args))
+    return calls
+
+
+def _post(url, body):
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    return urllib.request.urlopen(request, timeout=10)
+
+
+class TestTargetsAndStats:
+    def test_parse_target_shorthands(self):
+        mock = parse_target("mock:gemini-2.5-flash", {"llm": {"mock_simulation": {"enabled": True, "seed": 7}}})
+        assert mock.llm["provider"] == "mock"
+        assert mock.pricing_model == "gemini-2.5-flash"
+        assert mock.simulation == {"seed": 7}
+        assert parse_target("standin").standin
+
+        local = parse_target("openai-compatible:llama3@http://localhost:11434/v1")
+        assert local.llm == {
+            "provider": "openai-compatible",
+            "model_name": "llama3",
+            "base_url": "http://localhost:11434/v1",
+        }
+
+    def test_load_targets_file(self, tmp_path):
+        path = tmp_path / "targets.json"
+        path.write_text(json.dumps(["mock", {"name": "slow", "standin": True, "simulation": {"seed": 1}}]))
+        targets = load_targets(str(path))
+        assert [t.name for t in targets] == ["mock", "slow"]
+        assert targets[1].standin and targets[1].simulation == {"seed": 1}
+
+    def test_unknown_case_kind_rejected(self, tmp_path):
+        path = tmp_path / "corpus.json"
+        path.write_text(json.dumps({"cases": [{"name": "x", "kind": "poster"}]}))
+        with pytest.raises(ValueError, match="kind"):
+            load_corpus(str(path))
+
+    def test_percentiles_interpolate(self):
+        stats = percentiles([10, 20, 30, 40, 50])
+        assert stats["p50"] == 30
+        assert stats["p90"] == 46
+        assert stats["max"] == 50
+        assert percentiles([])["p95"] is None
+
+
+class TestStandInServer:
+    def test_routes_generator_prompts(self):
+        flashcards = json.loads(standin_response(MATERIAL_PROMPTS["flashcard"] + "\n\nContext:\nphotosynthesis"))
+        assert "front" in flashcards[0]
+        questions = [{"type": "mc", "text": "Q?", "options": ["a", "b"], "correct_index": 0}]
+        variant = standin_response(
+            "Rewrite the following quiz questions at the English Language Learner reading level.\n\n"
+            f"Questions:\n{json.dumps(questions)}\n\nReturn a JSON array."
+        )
+        assert len(json.loads(variant)) == 1
+        rubric = json.loads(
+            standin_response(
+                f"Generate a scoring rubric for the following quiz.\n\nQuestions (1 total):\n{json.dumps(questions)}"
+            )
+        )
+        assert "criterion" in rubric[0]
+
+    def test_completion_and_stream(self):
+        with StandInServer() as server:
+            url = f"{server.base_url}/chat/completions"
+            body = {"model": "m", "messages": [{"role": "user", "content": MATERIAL_PROMPTS["vocabulary"]}]}
+            data = json.loads(_post(url, body).read())
+            assert "usage" not in data
+            assert "term" in json.loads(data["choices"][0]["message"]["content"])[0]
+
+            stream = _post(url, dict(body, stream=True)).read().decode("utf-8")
+            events = [line[6:] for line in stream.splitlines() if line.startswith("data: ")]
+            assert events[-1] == "[DONE]"
+            text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+            assert "term" in json.loads(text)[0]
+            assert server.requests == 2
+
+    def test_simulated_errors_become_http_statuses(self):
+        with StandInServer({"error_rates": {"rate_limit": 1.0}, "retry_after_seconds": 3}) as server:
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                _post(f"{server.base_url}/chat/completions", {"messages": []})
+        assert exc.value.code == 429
+        assert exc.value.headers["Retry-After"] == "3"
+
+
+class TestRunBenchmark:
+    def test_mock_target(self, small_corpus, no_cost_log):
+        report = run_benchmark({}, [parse_target("mock:gemini-2.5-flash")], small_corpus, repeat=2)
+        target = report["targets"][0]
+        assert report["repeat"] == 2
+        assert set(target["cases"]) == {"quiz", "variant", "flashcards", "rubric"}
+        assert target["overall"]["samples"] == 8
+        assert target["overall"]["success_rate"] == 1.0
+
+        quiz = target["cases"]["quiz"]
+        assert "generator.llm_call" in quiz["stages_ms"]
+        assert "critic.llm_call" in quiz["stages_ms"]
+        assert quiz["llm_calls_mean"] >= 2
+        assert quiz["input_tokens_mean"] > 0
+        assert quiz["cost_mean"] > 0
+        assert quiz["critic_pass_rate"] is not None
+        assert quiz["retries_mean"] is not None
+        # The mock answers variants without a provider call
+        assert target["cases"]["variant"]["llm_calls_mean"] == 0
+        assert no_cost_log == []
+
+    def test_standin_target_measures_provider_calls(self, small_corpus, no_cost_log):
+        report = run_benchmark({}, [parse_target("standin")], small_corpus, repeat=1)
+        cases = report["targets"][0]["cases"]
+        assert all(stats["success_rate"] == 1.0 for stats in cases.values())
+        for name in ("variant", "flashcards", "rubric"):
+            assert cases[name]["llm_calls_mean"] == 1
+            assert cases[name]["tokens_estimated"]
+            assert cases[name]["llm_call_ms"]["p50"] is not None
+        assert no_cost_log == []
+
+    def test_report_is_json_and_tabulated(self, small_corpus, no_cost_log):
+        small_corpus["cases"] = small_corpus["cases"][1:2]
+        report = run_benchmark({}, [parse_target("mock"), parse_target("standin")], small_corpus, repeat=1)
+        json.dumps(report)
+        table = format_comparison(report)
+        assert "variant" in table and "standin" in table
+        assert table.splitlines()[-1].startswith("ALL")
+
+
+def _report(p50, p95, success=1.0, cost=0.01):
+    stats = {
+        "latency_ms": {"p50": p50, "p95": p95},
+        "cost_mean": cost,
+        "success_rate": success,
+        "critic_pass_rate": None,
+    }
+    return {"targets": [{"name": "t", "overall": stats, "cases": {"quiz": stats}}]}
+
+
+class TestCompareReports:
+    def test_latency_regression(self):
+        regressions = compare_reports(_report(400, 900), _report(300, 600))
+        assert "t / quiz: p95 latency 600 ms -> 900 ms" in regressions
+        assert "t / ALL: p50 latency 300 ms -> 400 ms" in regressions
+        assert len(regressions) == 4
+
+    def test_small_deltas_ignored(self):
+        assert compare_reports(_report(20, 30), _report(10, 15)) == []
+
+    def test_success_and_cost_regressions(self):
+        regressions = compare_reports(_report(300, 600, success=0.5, cost=0.02), _report(300, 600))
+        assert any("success rate" in r for r in regressions)
+        assert any("cost per run" in r for r in regressions)
+
+
+class TestCli:
+    def _args(self, tmp_path, **overrides):
+        values = {
+            "targets": ["mock"],
+            "targets_file": None,
+            "corpus": None,
+            "repeat": 1,
+            "output": str(tmp_path / "report.json"),
+            "baseline": None,
+            "threshold": 0.25,
+        }
+        values.update(overrides)
+        return argparse.Namespace(**values)
+
+    def test_writes_report(self, tmp_path, small_corpus, no_cost_log, capsys):
+        corpus = tmp_path / "corpus.json"
+        corpus.write_text(json.dumps({"cases": small_corpus["cases"][2:]}))
+        handle_benchmark({}, self._args(tmp_path, corpus=str(corpus)))
+        report = json.loads((tmp_path / "report.json").read_text())
+        assert set(report["targets"][0]["cases"]) == {"flashcards", "rubric"}
+        assert "Report written" in capsys.readouterr().out
+
+    def test_exits_on_regression(self, tmp_path, small_corpus, no_cost_log, capsys):
+        corpus = tmp_path / "corpus.json"
+        corpus.write_text(json.dumps({"cases": small_corpus["cases"][:1]}))
+        baseline = _report(None, None, cost=1e-9)
+        baseline["targets"][0]["name"] = "mock"
+        (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+        with pytest.raises(SystemExit) as exc:
+            handle_benchmark({}, self._args(tmp_path, corpus=str(corpus), baseline=str(tmp_path / "baseline.json")))
+        assert exc.value.code == 1
+        assert "cost per run" in capsys.readouterr().out
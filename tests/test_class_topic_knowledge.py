@@ -0,0 +1,120 @@
+"""
+Tests for the per-class assumed knowledge table (class_topic_knowledge).
+
+Verifies:
+- update_assumed_knowledge() upserts only the topics it is given and no
+  longer rewrites Class.config
+- get_assumed_knowledge() reads the table with an indexed lookup
+- Deleting a class removes its knowledge
+- Migration 019 and init_db() backfill knowledge from legacy class configs
+"""
+
+import json
+import os
+import sqlite3
+from datetime import date
+
+from sqlalchemy import text
+
+from src.classroom import create_class, delete_class
+from src.database import Class, ClassTopicKnowledge, get_engine, get_session, init_db
+from src.lesson_tracker import get_assumed_knowledge, update_assumed_knowledge
+from src.migrations import check_if_migration_needed, run_migrations
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+LEGACY_KNOWLEDGE = {
+    "photosynthesis": {"depth": 3, "last_taught": "2026-02-01", "mention_count": 3},
+    "cell division": {"depth": 1, "last_taught": "2026-02-05", "mention_count": 1},
+}
+
+
+def test_update_touches_only_given_topics(db_engine_session, assert_max_queries):
+    engine, session, _ = db_engine_session
+    cls = create_class(session, "Block A")
+    update_assumed_knowledge(session, cls.id, ["atoms", "cells"])
+    config_before = session.get(Class, cls.id).config
+
+    with assert_max_queries(engine, 4) as statements:
+        updated = update_assumed_knowledge(session, cls.id, ["atoms"], depth_increment=2)
+    assert not any("UPDATE classes" in s for s in statements)
+    assert updated == {"atoms": {"depth": 3, "last_taught": date.today().isoformat(), "mention_count": 2}}
+    assert session.get(Class, cls.id).config == config_before
+
+    knowledge = get_assumed_knowledge(session, cls.id)
+    assert list(knowledge) == ["atoms", "cells"]
+    assert knowledge["cells"]["depth"] == 1
+
+
+def test_update_unknown_class(db_session):
+    session, _ = db_session
+    assert update_assumed_knowledge(session, 99999, ["atoms"]) == {}
+    assert session.query(ClassTopicKnowledge).count() == 0
+
+
+def test_read_is_indexed(db_session):
+    session, _ = db_session
+    query = session.query(ClassTopicKnowledge).filter(ClassTopicKnowledge.class_id == 1)
+    sql = str(query.statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = [row[3] for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()]
+    assert all(step.startswith("SEARCH") for step in plan), plan
+
+
+def test_delete_class_removes_knowledge(db_session):
+    session, _ = db_session
+    cls = create_class(session, "Block A")
+    update_assumed_knowledge(session, cls.id, ["atoms"])
+    delete_class(session, cls.id)
+    assert session.query(ClassTopicKnowledge).count() == 0
+
+
+def _seed_legacy_classes(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    session = get_session(engine)
+    legacy = Class(name="Legacy", config=json.dumps({"assumed_knowledge": LEGACY_KNOWLEDGE}))
+    session.add_all(
+        [
+            legacy,
+            Class(name="Empty", config=json.dumps({})),
+            Class(name="Broken", config="not json"),
+            Class(name="No config"),
+        ]
+    )
+    session.commit()
+    class_id = legacy.id
+    session.close()
+    return engine, class_id
+
+
+def test_migration_backfills_knowledge(db_path):
+    engine, class_id = _seed_legacy_classes(db_path)
+    engine.dispose()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE class_topic_knowledge")
+    conn.commit()
+    conn.close()
+
+    assert check_if_migration_needed(db_path) is True
+    assert run_migrations(db_path, MIGRATIONS_DIR, verbose=False) is True
+    engine = get_engine(db_path)
+    session = get_session(engine)
+    try:
+        assert get_assumed_knowledge(session, class_id) == LEGACY_KNOWLEDGE
+        assert session.query(ClassTopicKnowledge).count() == 2
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_init_db_backfills_new_table(db_path):
+    engine, class_id = _seed_legacy_classes(db_path)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE class_topic_knowledge")
+    init_db(engine)
+    session = get_session(engine)
+    try:
+        assert get_assumed_knowledge(session, class_id) == LEGACY_KNOWLEDGE
+    finally:
+        session.close()
+        engine.dispose()
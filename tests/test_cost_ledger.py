@@ -0,0 +1,161 @@
+"""
+Tests for the indexed cost ledger (src/cost_ledger.py).
+
+Verifies:
+- An existing log is imported once, and later reads only parse new lines
+- Lines appended by other writers (or older app versions) are picked up
+- A truncated or replaced log is re-imported
+- A partially written last line waits for its newline
+- Concurrent log_api_call() writers never lose or interleave entries
+- get_cost_summary()/get_monthly_total() fall back to scanning the log
+  when the ledger cannot be opened
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import src.cost_ledger as cost_ledger
+from src.cost_ledger import CostLedger, ledger_path, parse_log_line
+from src.cost_tracking import check_rate_limit, get_cost_summary, get_monthly_total, log_api_call
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    return str(tmp_path / "costs.log")
+
+
+def _write(path, lines, mode="a"):
+    with open(path, mode) as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+def _count_parses(monkeypatch):
+    calls = []
+
+    def counting(line):
+        calls.append(line)
+        return parse_log_line(line)
+
+    monkeypatch.setattr(cost_ledger, "parse_log_line", counting)
+    return calls
+
+
+class TestParseLogLine:
+    def test_cached_field_optional(self):
+        assert parse_log_line("2026-01-01T00:00:00 | gemini | flash | 10 | 5 | $0.5")[-1] == 0
+        assert parse_log_line("2026-01-01T00:00:00 | gemini | flash | 10 | 5 | $0.5 | 7")[-1] == 7
+
+    def test_malformed(self):
+        assert parse_log_line("") is None
+        assert parse_log_line("garbage | line") is None
+        assert parse_log_line("2026-01-01 | gemini | flash | ten | 5 | $0.5") is None
+
+
+class TestIncrementalIndexing:
+    def test_existing_log_imported_once(self, log_file, monkeypatch):
+        _write(log_file, [f"2026-01-0{d}T10:00:00 | gemini | flash | 100 | 50 | $0.0100" for d in range(1, 4)])
+        parses = _count_parses(monkeypatch)
+
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 3
+        assert sorted(summary["by_day"]) == ["2026-01-01", "2026-01-02", "2026-01-03"]
+        assert len(parses) == 3
+
+        get_cost_summary(log_file)
+        get_monthly_total(log_file, 2026, 1)
+        assert len(parses) == 3  # nothing new to parse
+
+    def test_external_appends_picked_up(self, log_file, monkeypatch):
+        log_api_call("gemini", "flash", 100, 50, cost=0.01, log_file=log_file)
+        parses = _count_parses(monkeypatch)
+        _write(log_file, ["2026-02-01T10:00:00 | vertex | pro | 10 | 5 | $1.0000"])
+
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 2
+        assert summary["by_provider"]["vertex"] == {"calls": 1, "cost": 1.0}
+        assert len(parses) == 1
+
+    def test_replaced_log_reimported(self, log_file):
+        _write(log_file, ["2026-01-01T10:00:00 | gemini | flash | 100 | 50 | $0.0100"] * 3)
+        assert get_cost_summary(log_file)["total_calls"] == 3
+
+        _write(log_file, ["2026-03-01T10:00:00 | vertex | pro | 1 | 1 | $2.0000"], mode="w")
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 1
+        assert list(summary["by_provider"]) == ["vertex"]
+
+    def test_partial_last_line_deferred(self, log_file):
+        with open(log_file, "w") as f:
+            f.write("2026-01-01T10:00:00 | gemini | flash | 100 | 50 | $0.0100\n2026-01-01T11:00:00 | gem")
+        assert get_cost_summary(log_file)["total_calls"] == 1
+        with open(log_file, "a") as f:
+            f.write("ini | flash | 100 | 50 | $0.0200\n")
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 2
+        assert summary["total_cost"] == pytest.approx(0.03)
+
+    def test_monthly_rollup(self, log_file):
+        _write(
+            log_file,
+            [
+                "2026-01-05T10:00:00 | gemini | flash | 100 | 50 | $0.0100 | 20",
+                "2026-01-20T10:00:00 | gemini | flash | 200 | 60 | $0.0200",
+                "2026-02-01T10:00:00 | gemini | flash | 300 | 70 | $0.0400",
+            ],
+        )
+        january = get_monthly_total(log_file, 2026, 1)
+        assert january["calls"] == 2
+        assert january["input_tokens"] == 300
+        assert january["cached_tokens"] == 20
+        assert january["cost"] == pytest.approx(0.03)
+        assert get_monthly_total(log_file, 2025, 12)["calls"] == 0
+
+    def test_rate_limit_uses_ledger_totals(self, log_file):
+        for _ in range(3):
+            log_api_call("gemini", "flash", 10, 10, cost=1.0, log_file=log_file)
+        exceeded, remaining_calls, remaining_budget = check_rate_limit(
+            {"llm": {"max_calls_per_session": 5, "max_cost_per_session": 10}}, log_file
+        )
+        assert not exceeded
+        assert remaining_calls == 2
+        assert remaining_budget == pytest.approx(7.0)
+
+
+class TestConcurrentWriters:
+    def test_threads_do_not_lose_entries(self, log_file):
+        def worker(n):
+            for _ in range(25):
+                log_api_call(f"p{n}", "flash", 10, 5, cost=0.01, log_file=log_file)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with open(log_file) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 100
+        assert all(parse_log_line(line) for line in lines)
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 100
+        assert {p: v["calls"] for p, v in summary["by_provider"].items()} == {f"p{n}": 25 for n in range(4)}
+
+
+class TestFallback:
+    def test_unopenable_ledger_scans_log(self, log_file, monkeypatch):
+        _write(log_file, ["2026-01-01T10:00:00 | gemini | flash | 100 | 50 | $0.5000"])
+
+        def broken(self):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(CostLedger, "_connect", broken)
+        assert get_cost_summary(log_file)["total_cost"] == pytest.approx(0.5)
+        assert get_monthly_total(log_file, 2026, 1)["calls"] == 1
+        assert log_api_call("gemini", "flash", 1, 1, cost=0.1, log_file=log_file) is True
+        assert get_cost_summary(log_file)["total_calls"] == 2
+
+    def test_ledger_path_beside_log(self):
+        assert ledger_path("/data/api_costs.log") == "/data/api_costs.ledger.db"
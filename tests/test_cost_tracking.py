@@ -10,6 +10,7 @@ import tempfile
 
 import pytest
 
+from src.cost_ledger import ledger_path
 from src.cost_tracking import (
     DEFAULT_LOG_FILE,
     MODEL_PRICING,
@@ -36,12 +37,15 @@ def _create_temp_log():
 
 
 def _remove_if_exists(path):
-    """Remove a file if it exists, ignoring errors."""
-    try:
-        if path and os.path.exists(path):
-            os.remove(path)
-    except OSError:
-        pass
+    """Remove a cost log and its ledger side-file if they exist, ignoring errors."""
+    if not path:
+        return
+    for target in (path, ledger_path(path)):
+        try:
+            if os.path.exists(target):
+                os.remove(target)
+        except OSError:
+            pass
 
 
 # ---------------------------------------------------------------------------
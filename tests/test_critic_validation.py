@@ -5,7 +5,7 @@ Covers structural checks, type-specific rules, basic fact-consistency,
 and teacher_config filtering.  ~25 tests.
 """
 
-from src.critic_validation import VALID_TYPES, pre_validate_questions
+from src.critic_validation import VALID_TYPES, pre_validate_questions, question_similarity
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -342,3 +342,54 @@ class TestMultipleQuestions:
         results = pre_validate_questions([good, bad])
         assert results[0]["passed"] is True
         assert results[1]["passed"] is False
+
+
+# ---------------------------------------------------------------------------
+# Near-duplicate detection
+# ---------------------------------------------------------------------------
+
+
+class TestNearDuplicates:
+    def test_reworded_duplicate_in_batch_fails(self):
+        first = _mc(text="Which organelle produces energy for the cell?", options=["Mitochondria", "Nucleus"])
+        second = _mc(text="Which organelle produces the energy for a cell?", options=["Mitochondria", "Nucleus"])
+        results = pre_validate_questions([first, second])
+        assert results[0]["passed"] is True
+        assert results[1]["passed"] is False
+        assert "Near-duplicate of Q0" in results[1]["issues"][0]
+
+    def test_duplicate_of_approved_fails(self):
+        approved = [_tf(text="Plants make their own food through photosynthesis.")]
+        results = pre_validate_questions(
+            [_tf(text="Plants make their own food through photosynthesis!")], approved=approved
+        )
+        assert results[0]["passed"] is False
+        assert "already-approved" in results[0]["issues"][0]
+
+    def test_duplicate_of_question_in_review_fails(self):
+        in_review = [_tf(text="Plants make their own food through photosynthesis.")]
+        results = pre_validate_questions(
+            [_tf(text="Plants make their own food through photosynthesis!")], in_review=in_review
+        )
+        assert results[0]["passed"] is False
+        assert "a question still in review" in results[0]["issues"][0]
+
+    def test_negation_is_not_duplicate(self):
+        a = _tf(text="Cells are the basic unit of life.")
+        b = _tf(text="Cells are not the basic unit of life.")
+        assert question_similarity(a, b) < 0.7
+        assert all(r["passed"] for r in pre_validate_questions([a, b]))
+
+    def test_same_stem_different_options_is_not_duplicate(self):
+        a = _mc(text="Which is a renewable energy source?", options=["Solar", "Coal", "Oil", "Gas"])
+        b = _mc(text="Which is a renewable energy source?", options=["Wind power", "Uranium", "Peat", "Diesel"])
+        assert all(r["passed"] for r in pre_validate_questions([a, b]))
+
+    def test_threshold_zero_disables_check(self):
+        results = pre_validate_questions([_mc(), _mc()], duplicate_threshold=0)
+        assert all(r["passed"] for r in results)
+
+    def test_structurally_invalid_question_not_reported_as_duplicate(self):
+        bad = _mc(points=0)
+        results = pre_validate_questions([_mc(), bad])
+        assert not any("Near-duplicate" in issue for issue in results[1]["issues"])
@@ -0,0 +1,208 @@
+"""
+Tests for background generation jobs (src/jobs.py and /api/jobs routes).
+
+Verifies:
+- JobQueue records jobs, runs them on the pool and stores result/progress
+- Job failures surface user-safe messages; the pending limit is enforced
+- Stale active jobs are failed on startup
+- Generation routes with background=1 return 202 and finish via the job API
+- Generate pages submit through the static/js/jobs.js poller
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.database import Base, GenerationJob, get_engine, get_session
+from src.jobs import (
+    GENERIC_JOB_ERROR,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JobError,
+    JobQueue,
+    JobQueueFull,
+    fail_stale_jobs,
+    get_job,
+)
+from src.llm_provider import ProviderError
+
+
+def _wait_for(session, job_id, timeout=10):
+    """Poll a job row until it finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        session.expire_all()
+        job = get_job(session, job_id)
+        if job and job.status in (JOB_COMPLETED, JOB_FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _poll_result(client, job_id, timeout=20):
+    """Poll the result endpoint until it stops returning 202."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resp = client.get(f"/api/jobs/{job_id}/result")
+        if resp.status_code != 202:
+            return resp
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def job_engine(db_path):
+    engine = get_engine(db_path)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def job_queue(job_engine):
+    queue = JobQueue(job_engine, max_workers=2, max_pending=3)
+    yield queue
+    queue.shutdown(wait=True)
+
+
+class TestJobQueue:
+    def test_runs_job_and_stores_result(self, job_engine, job_queue):
+        def fn(session, progress):
+            progress(50, "Halfway")
+            return {"quiz_id": 7}
+
+        job_id = job_queue.submit("quiz", fn, params={"num_questions": 5}, user_id=3)
+        session = get_session(job_engine)
+        job = _wait_for(session, job_id)
+        assert job.status == JOB_COMPLETED
+        assert job.result == {"quiz_id": 7}
+        assert job.progress == 100
+        assert job.params == {"num_questions": 5}
+        assert job.user_id == 3
+        assert job.started_at and job.finished_at
+        session.close()
+
+    def test_progress_visible_while_running(self, job_engine, job_queue):
+        release = threading.Event()
+
+        def fn(session, progress):
+            progress(40, "Generating questions")
+            release.wait(5)
+            return {}
+
+        job_id = job_queue.submit("quiz", fn)
+        session = get_session(job_engine)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            session.expire_all()
+            job = get_job(session, job_id)
+            if job.progress == 40:
+                break
+            time.sleep(0.02)
+        assert job.status == "running"
+        assert job.message == "Generating questions"
+        release.set()
+        assert _wait_for(session, job_id).status == JOB_COMPLETED
+        session.close()
+
+    @pytest.mark.parametrize(
+        "error, message",
+        [
+            (JobError("No questions were generated."), "No questions were generated."),
+            (ProviderError("Provider is down.", provider_name="gemini"), "Provider is down."),
+            (RuntimeError("/secret/path leaked"), GENERIC_JOB_ERROR),
+        ],
+    )
+    def test_failures_store_safe_message(self, job_engine, job_queue, error, message):
+        def fn(session, progress):
+            raise error
+
+        job_id = job_queue.submit("study", fn)
+        session = get_session(job_engine)
+        job = _wait_for(session, job_id)
+        assert job.status == JOB_FAILED
+        assert job.error == message
+        session.close()
+
+    def test_pending_limit(self, job_queue):
+        release = threading.Event()
+        for _ in range(3):
+            job_queue.submit("quiz", lambda session, progress: release.wait(5))
+        with pytest.raises(JobQueueFull):
+            job_queue.submit("quiz", lambda session, progress: None)
+        release.set()
+
+    def test_fail_stale_jobs(self, job_engine):
+        from datetime import datetime, timedelta
+
+        session = get_session(job_engine)
+        old = datetime.utcnow() - timedelta(hours=2)
+        session.add(GenerationJob(id="old", kind="quiz", status="running", created_at=old))
+        session.add(GenerationJob(id="new", kind="quiz", status="queued"))
+        session.add(GenerationJob(id="done", kind="quiz", status="completed", created_at=old))
+        session.commit()
+        assert fail_stale_jobs(session) == 1
+        assert get_job(session, "old").status == JOB_FAILED
+        assert get_job(session, "new").status == "queued"
+        assert get_job(session, "done").status == "completed"
+        session.close()
+
+
+class TestJobRoutes:
+    def test_background_quiz_generation(self, flask_client):
+        resp = flask_client.post(
+            "/classes/1/generate", data={"num_questions": "3", "grade_level": "7th Grade", "background": "1"}
+        )
+        assert resp.status_code == 202
+        body = resp.get_json()
+        assert body["status_url"] == f"/api/jobs/{body['job_id']}"
+
+        result = _poll_result(flask_client, body["job_id"])
+        assert result.status_code == 200
+        payload = result.get_json()
+        assert payload["redirect"] == f"/quizzes/{payload['result']['quiz_id']}"
+        assert flask_client.get(payload["redirect"]).status_code == 200
+
+        status = flask_client.get(body["status_url"]).get_json()
+        assert status["status"] == JOB_COMPLETED
+        assert status["progress"] == 100
+        assert status["kind"] == "quiz"
+
+    def test_prefer_header_requests_background(self, flask_client):
+        resp = flask_client.post(
+            "/classes/1/generate", data={"num_questions": "2"}, headers={"Prefer": "respond-async"}
+        )
+        assert resp.status_code == 202
+        assert _poll_result(flask_client, resp.get_json()["job_id"]).status_code == 200
+
+    @pytest.mark.parametrize(
+        "page",
+        ["/classes/1/generate", "/quizzes/1/generate-variant", "/study/generate", "/lesson-plans/generate"],
+    )
+    def test_generate_pages_submit_as_jobs(self, flask_client, page):
+        html = flask_client.get(page).get_data(as_text=True)
+        assert "js/jobs.js" in html
+        assert "QWJobs.submit" in html or "study.js" in html
+
+    def test_failed_job_result(self, flask_app, flask_client):
+        job_id = flask_app.config["JOB_QUEUE"].submit("quiz", lambda s, p: (_ for _ in ()).throw(JobError("Nope.")))
+        resp = _poll_result(flask_client, job_id)
+        assert resp.status_code == 500
+        assert resp.get_json()["error"] == "Nope."
+
+    def test_unknown_job_404(self, flask_client):
+        assert flask_client.get("/api/jobs/missing").status_code == 404
+        assert flask_client.get("/api/jobs/missing/result").status_code == 404
+
+    def test_other_users_job_hidden(self, flask_app, flask_client):
+        job_id = flask_app.config["JOB_QUEUE"].submit("quiz", lambda s, p: {}, user_id=99)
+        assert flask_client.get(f"/api/jobs/{job_id}").status_code == 404
+
+    def test_job_list(self, flask_app, flask_client):
+        job_id = flask_app.config["JOB_QUEUE"].submit("study", lambda s, p: {})
+        jobs = flask_client.get("/api/jobs").get_json()["jobs"]
+        assert job_id in [job["id"] for job in jobs]
+
+    def test_requires_login(self, anon_flask_client):
+        assert anon_flask_client.get("/api/jobs/anything").status_code == 303
@@ -0,0 +1,153 @@
+"""
+Tests for image payload optimization (src/image_pipeline.py).
+
+Verifies:
+- Oversized images are downscaled and re-encoded to the byte budget
+- Optimized copies are cached on disk and invalidated when the source changes
+- Images with transparency stay PNG
+- Selection drops tiny, duplicate, off-page and off-topic images
+- CLI image candidates load their lessons without a query per asset
+- GeneratorAgent prepares each image once across retry attempts
+"""
+
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from main import _image_assets, _image_candidates
+from src.database import Asset, Lesson
+from src.image_pipeline import (
+    IMAGE_BUDGETS,
+    ImagePipeline,
+    image_page,
+    optimize_image,
+    parse_page_ranges,
+    select_images,
+)
+from src.llm_provider import MockLLMProvider
+
+
+def _noise_image(path, size, mode="RGB"):
+    img = Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(mode)))
+    img.save(path)
+    return str(path)
+
+
+class TestOptimizeImage:
+    def test_small_image_returned_unchanged(self, tmp_path):
+        path = _noise_image(tmp_path / "small.png", (200, 100))
+        assert optimize_image(path, cache_dir=str(tmp_path / "cache")) == path
+        assert not (tmp_path / "cache").exists()
+
+    def test_large_image_downscaled_to_budget(self, tmp_path):
+        path = _noise_image(tmp_path / "big.png", (3000, 1500))
+        out = optimize_image(path, max_edge=1000, max_bytes=200_000, cache_dir=str(tmp_path / "cache"))
+        assert out != path and out.endswith(".jpg")
+        assert os.path.getsize(out) <= 200_000
+        with Image.open(out) as img:
+            assert max(img.size) <= 1000
+
+    def test_cache_hit_and_mtime_invalidation(self, tmp_path):
+        path = _noise_image(tmp_path / "big.png", (2000, 2000))
+        cache_dir = str(tmp_path / "cache")
+        first = optimize_image(path, max_edge=500, cache_dir=cache_dir)
+        written = os.path.getmtime(first)
+        assert optimize_image(path, max_edge=500, cache_dir=cache_dir) == first
+        assert os.path.getmtime(first) == written
+
+        _noise_image(tmp_path / "big.png", (2000, 2000))
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+        assert optimize_image(path, max_edge=500, cache_dir=cache_dir) != first
+
+    def test_alpha_kept_as_png(self, tmp_path):
+        path = _noise_image(tmp_path / "overlay.png", (1200, 1200), mode="RGBA")
+        out = optimize_image(path, max_edge=400, cache_dir=str(tmp_path / "cache"))
+        assert out.endswith(".png")
+        with Image.open(out) as img:
+            assert img.mode == "RGBA"
+
+    def test_unreadable_file_raises(self, tmp_path):
+        path = tmp_path / "broken.png"
+        path.write_bytes(b"x" * 2_000_000)
+        with pytest.raises(OSError):
+            optimize_image(str(path), cache_dir=str(tmp_path / "cache"))
+
+
+class TestSelectImages:
+    def test_page_helpers(self):
+        assert image_page("extracted_images/image_3_12_0.png") == 12
+        assert image_page("diagram.png") is None
+        assert parse_page_ranges("1-3, 7") == {1, 2, 3, 7}
+
+    def test_drops_tiny_and_duplicate_images(self, tmp_path):
+        a = _noise_image(tmp_path / "image_1_1_0.png", (300, 200))
+        dup = tmp_path / "image_1_2_0.png"
+        dup.write_bytes(open(a, "rb").read())
+        tiny = _noise_image(tmp_path / "image_1_2_1.png", (16, 16))
+        b = _noise_image(tmp_path / "image_1_3_0.png", (300, 200))
+        candidates = [(a, ""), (str(dup), ""), (tiny, ""), (b, ""), (str(tmp_path / "missing.png"), "")]
+        assert select_images(candidates) == [a, b]
+
+    def test_filters_by_page_and_ranks_by_topic(self, tmp_path):
+        p1 = _noise_image(tmp_path / "image_1_1_0.png", (100, 100))
+        p2 = _noise_image(tmp_path / "image_1_2_0.png", (100, 100))
+        p3 = _noise_image(tmp_path / "image_1_3_0.png", (100, 100))
+        candidates = [(p1, "Photosynthesis basics"), (p2, "Weather fronts"), (p3, "Photosynthesis and chlorophyll")]
+        assert select_images(candidates, pages={2, 3}) == [p2, p3]
+        assert select_images(candidates, topics=["photosynthesis", "chlorophyll"]) == [p3, p1]
+        assert select_images(candidates, max_images=1) == [p1]
+
+    def test_candidates_load_lessons_in_one_query(self, db_engine_session, assert_max_queries):
+        engine, session, _ = db_engine_session
+        for n in range(3):
+            lesson = Lesson(source_file=f"lesson{n}.pdf", content="", page_data=[{"text_content": f"Page of {n}"}])
+            session.add_all(
+                [lesson, *(Asset(lesson=lesson, asset_type="image", path=f"image_{n}_1_{i}.png") for i in range(2))]
+            )
+        session.commit()
+        session.expunge_all()
+
+        with assert_max_queries(engine, 2):
+            candidates = _image_candidates(_image_assets(session))
+        assert len(candidates) == 6
+        assert candidates[0] == ("image_0_1_0.png", "Page of 0 ")
+
+
+class TestImagePipeline:
+    def test_budget_follows_provider(self):
+        provider = MockLLMProvider()
+        assert ImagePipeline(provider).max_edge == 1568
+        assert ImagePipeline(provider, {"max_edge": 800}).max_edge == 800
+        assert IMAGE_BUDGETS["openai-compatible"]["max_edge"] == 2048
+
+    def test_prepares_optimized_copy_once(self, tmp_path):
+        path = _noise_image(tmp_path / "big.png", (2400, 1200))
+        provider = MagicMock()
+        pipeline = ImagePipeline(provider, {"max_edge": 600, "cache_dir": str(tmp_path / "cache")})
+        first = pipeline.prepare(path)
+        assert pipeline.prepare(path) is first
+        provider.prepare_image_context.assert_called_once()
+        sent = provider.prepare_image_context.call_args[0][0]
+        assert sent.startswith(str(tmp_path / "cache"))
+        assert pipeline.stats["reused"] == 1
+        assert pipeline.stats["bytes_out"] < pipeline.stats["bytes_in"]
+
+    def test_missing_file_passed_through(self, tmp_path):
+        provider = MagicMock()
+        ImagePipeline(provider).prepare(str(tmp_path / "gone.png"))
+        provider.prepare_image_context.assert_called_once_with(str(tmp_path / "gone.png"))
+
+    def test_generator_reuses_images_across_attempts(self, tmp_path):
+        from src.agents import GeneratorAgent
+
+        images = [_noise_image(tmp_path / f"image_1_{i}_0.png", (100, 100)) for i in range(1, 4)]
+        provider = MockLLMProvider()
+        provider.prepare_image_context = MagicMock(side_effect=lambda p: f"<image {p}>")
+        config = {"llm": {"provider": "mock"}, "generation": {"images": {"max_images": 2}}}
+        generator = GeneratorAgent(config, provider=provider)
+        context = {"content_summary": "Cells", "images": images, "num_questions": 2}
+        for _ in range(3):
+            generator.generate(context)
+        assert provider.prepare_image_context.call_count == 2
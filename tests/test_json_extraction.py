@@ -0,0 +1,142 @@
+"""
+Tests for the shared JSON extraction used by every generator.
+
+Verifies:
+- extract_json_array() recovers complete objects from fenced, noisy,
+  truncated and partly malformed arrays and reports salvage statistics
+- extract_json_object() finds the first object around prose/fences and
+  returns the first element of an array response
+- The generator, critic and study/variant/lesson plan parsers salvage
+  truncated responses instead of discarding them
+"""
+
+import json
+
+from src.agents import _parse_critic_response, _parse_generator_response
+from src.json_extraction import IncrementalArrayParser, extract_json_array, extract_json_object
+from src.lesson_plan_generator import _parse_plan
+from src.study_generator import _parse_items
+from src.variant_generator import _parse_variant_questions
+
+QUESTIONS = [
+    {"type": "mc", "text": "Q1?", "options": ["a", "b"], "correct_index": 0},
+    {"type": "tf", "text": "Q2 has a } brace", "correct_answer": "True"},
+    {"type": "mc", "text": "Q3?", "options": ["a", "b"], "correct_index": 1},
+]
+
+
+class TestExtractJsonArray:
+    def test_clean_array(self):
+        result = extract_json_array(json.dumps(QUESTIONS))
+        assert result.items == QUESTIONS
+        assert result.found
+        assert result.stats() == {"parsed": 3, "skipped": 0, "truncated": False}
+        assert not result.salvaged
+
+    def test_fences_and_prose_ignored(self):
+        text = "Sure! Here you go:\n```json\n" + json.dumps(QUESTIONS) + "\n```\nLet me know."
+        assert extract_json_array(text).items == QUESTIONS
+
+    def test_truncated_array_keeps_complete_objects(self):
+        text = json.dumps(QUESTIONS)
+        cut = text[: text.index('"Q3?"')]
+        result = extract_json_array(cut)
+        assert result.items == QUESTIONS[:2]
+        assert result.truncated
+        assert result.salvaged
+
+    def test_malformed_object_skipped(self):
+        text = '[{"text": "ok"}, {"text": "bad",}, {"text": "also ok"}]'
+        result = extract_json_array(text)
+        assert [q["text"] for q in result.items] == ["ok", "also ok"]
+        assert result.stats() == {"parsed": 2, "skipped": 1, "truncated": False}
+
+    def test_wrapped_in_object(self):
+        result = extract_json_array(json.dumps({"questions": QUESTIONS}))
+        assert result.items == QUESTIONS
+
+    def test_no_array(self):
+        result = extract_json_array("I cannot help with that.")
+        assert result.items == []
+        assert not result.found
+
+    def test_none_text(self):
+        assert not extract_json_array(None).found
+
+
+class TestExtractJsonObject:
+    def test_object_in_prose(self):
+        assert extract_json_object('Here is the plan:\n{"title": "T"}\nDone.') == {"title": "T"}
+
+    def test_nested_object_returned_whole(self):
+        data = {"questions": [{"index": 0}], "overall_notes": "x"}
+        assert extract_json_object("```json\n" + json.dumps(data) + "\n```") == data
+
+    def test_array_yields_first_element(self):
+        assert extract_json_object(json.dumps(QUESTIONS)) == QUESTIONS[0]
+
+    def test_brackets_in_prose_do_not_stop_scan(self):
+        assert extract_json_object('See [note] below: {"a": 1}') == {"a": 1}
+
+    def test_truncated_or_missing(self):
+        assert extract_json_object('{"title": "T", "warm_up": "Act') is None
+        assert extract_json_object("no json here") is None
+        assert extract_json_object("[]") is None
+
+    def test_parser_without_array(self):
+        parser = IncrementalArrayParser(require_array=False)
+        assert parser.feed('{"a": 1} ] {"b": 2}') == [{"a": 1}, {"b": 2}]
+
+
+class TestGeneratorSalvage:
+    def test_truncated_generator_response(self):
+        text = json.dumps(QUESTIONS)
+        questions = _parse_generator_response(text[: text.index('"Q3?"')])
+        assert [q["text"] for q in questions] == ["Q1?", "Q2 has a } brace"]
+
+    def test_non_list_response(self):
+        assert _parse_generator_response('{"error": "nope"}') == []
+
+    def test_stats_recorded_on_span(self):
+        class FakeSpan:
+            def __init__(self):
+                self.attrs = {}
+
+            def set(self, **attrs):
+                self.attrs.update(attrs)
+
+        span = FakeSpan()
+        _parse_generator_response('[{"text": "Q1?"}, {"text": ', span)
+        assert span.attrs == {"questions": 1, "parsed": 1, "skipped": 0, "truncated": True}
+
+
+class TestCriticSalvage:
+    def test_truncated_verdicts_fail_missing_questions(self):
+        verdicts = [{"index": i, "verdict": "PASS", "issues": []} for i in range(3)]
+        text = json.dumps({"questions": verdicts, "overall_notes": ""})
+        cut = text[: text.index('{"index": 2')] + '{"index": 2, "verd'
+        result = _parse_critic_response(cut, 3)
+        assert result["passed_indices"] == [0, 1]
+        assert result["failed_indices"] == [2]
+        assert result["status"] == "REJECTED"
+        assert "cut off" in result["feedback"]
+
+    def test_free_text_still_uses_legacy_fallback(self):
+        assert _parse_critic_response("APPROVED", 2)["passed_indices"] == [0, 1]
+
+
+class TestOtherGenerators:
+    def test_study_items_truncated(self):
+        text = '[{"front": "A", "back": "1"}, {"front": "B", "back": "2"}, {"front": "C", "ba'
+        assert [i["front"] for i in _parse_items(text, "flashcard")] == ["A", "B"]
+
+    def test_study_items_unparseable(self):
+        assert _parse_items("not json", "flashcard") is None
+
+    def test_variant_questions_fenced(self):
+        text = "```json\n" + json.dumps(QUESTIONS) + "\n```"
+        assert _parse_variant_questions(text) == QUESTIONS
+
+    def test_lesson_plan_with_trailing_prose_braces(self):
+        text = '{"title": "Plan"}\nNote: adjust {timing} as needed.'
+        assert _parse_plan(text) == {"title": "Plan"}
@@ -0,0 +1,132 @@
+"""
+Tests for the per-class lesson topic counts (lesson_topic_counts).
+
+Verifies:
+- Logging, editing and deleting lessons keep the counts in step
+- Deleting a class removes its counts
+- get_class_topics() and pacing progress read the counts, not lesson logs
+- Migration 018 and init_db() backfill counts from existing lesson logs
+"""
+
+import json
+import os
+import sqlite3
+
+from src.classroom import create_class, delete_class
+from src.database import LessonLog, LessonTopicCount, get_engine, get_session, init_db, rebuild_lesson_topic_counts
+from src.lesson_tracker import delete_lesson, log_lesson
+from src.migrations import run_migrations
+from src.pacing_guide import add_unit, create_pacing_guide, get_progress
+from src.topic_generator import get_class_topics
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+
+def _counts(session, class_id):
+    rows = session.query(LessonTopicCount).filter_by(class_id=class_id).all()
+    return {(r.kind, r.value): r.lesson_count for r in rows}
+
+
+def test_log_and_delete_lessons(db_session):
+    session, _ = db_session
+    cls = create_class(session, "Block A")
+    first = log_lesson(session, cls.id, "x", topics=["photosynthesis", " cells "], standards_addressed=["SOL 7.1"])
+    log_lesson(session, cls.id, "y", topics=["photosynthesis"])
+
+    assert _counts(session, cls.id) == {
+        ("topic", "photosynthesis"): 2,
+        ("topic", "cells"): 1,
+        ("standard", "SOL 7.1"): 1,
+    }
+    assert get_class_topics(session, cls.id) == ["cells", "photosynthesis"]
+
+    delete_lesson(session, first.id)
+    assert _counts(session, cls.id) == {("topic", "photosynthesis"): 1}
+
+
+def test_editing_lesson_topics(db_session):
+    session, _ = db_session
+    cls = create_class(session, "Block A")
+    lesson = log_lesson(session, cls.id, "x", topics=["atoms"])
+    lesson.topics = json.dumps(["molecules"])
+    session.commit()
+    assert _counts(session, cls.id) == {("topic", "molecules"): 1}
+
+
+def test_delete_class_removes_counts(db_session):
+    session, _ = db_session
+    cls = create_class(session, "Block A")
+    log_lesson(session, cls.id, "x", topics=["atoms"])
+    delete_class(session, cls.id)
+    assert session.query(LessonTopicCount).count() == 0
+
+
+def test_pacing_progress_reads_counts(db_engine_session, assert_max_queries):
+    engine, session, _ = db_engine_session
+    cls = create_class(session, "Block A")
+    log_lesson(session, cls.id, "x", topics=["Photosynthesis"], standards_addressed=["SOL 7.2"])
+    guide = create_pacing_guide(session, cls.id, "Year")
+    add_unit(session, guide.id, 1, "Plants", 1, 4, topics=["photosynthesis"])
+    add_unit(session, guide.id, 2, "Cells", 5, 8, standards=["SOL 7.2"])
+    add_unit(session, guide.id, 3, "Forces", 9, 12, topics=["forces"])
+
+    with assert_max_queries(engine, 4) as statements:
+        progress = get_progress(session, guide.id)
+    assert not any("FROM lesson_logs" in s for s in statements)
+    assert progress["covered_units"] == 2
+    assert progress["unit_details"][0]["topic_matches"] == ["photosynthesis"]
+    assert progress["unit_details"][1]["standard_matches"] == ["SOL 7.2"]
+
+
+def _seed_lessons(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    session = get_session(engine)
+    cls = create_class(session, "Legacy")
+    session.add_all(
+        [
+            LessonLog(
+                class_id=cls.id, content="a", topics=json.dumps(["atoms", "cells"]), standards_addressed=["SOL 7.1"]
+            ),
+            LessonLog(class_id=cls.id, content="b", topics=["atoms", ""], standards_addressed=None),
+            LessonLog(class_id=cls.id, content="c", topics="not json"),
+        ]
+    )
+    session.commit()
+    expected = _counts(session, cls.id)
+    session.close()
+    return engine, cls.id, expected
+
+
+def test_migration_backfills_counts(db_path):
+    engine, class_id, expected = _seed_lessons(db_path)
+    assert expected == {("topic", "atoms"): 2, ("topic", "cells"): 1, ("standard", "SOL 7.1"): 1}
+    engine.dispose()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE lesson_topic_counts")
+    conn.commit()
+    conn.close()
+
+    assert run_migrations(db_path, MIGRATIONS_DIR, verbose=False) is True
+    engine = get_engine(db_path)
+    session = get_session(engine)
+    try:
+        assert _counts(session, class_id) == expected
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_init_db_backfills_new_table(db_path):
+    engine, class_id, expected = _seed_lessons(db_path)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE lesson_topic_counts")
+    init_db(engine)
+    session = get_session(engine)
+    try:
+        assert _counts(session, class_id) == expected
+        rebuild_lesson_topic_counts(session)
+        assert _counts(session, class_id) == expected
+    finally:
+        session.close()
+        engine.dispose()
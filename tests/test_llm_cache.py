@@ -0,0 +1,213 @@
+"""
+Tests for the content-addressed LLM response cache (src/llm_cache.py).
+
+Verifies:
+- Cache keys cover provider, model, json_mode and prompt parts (incl. image bytes)
+- CachingProvider serves repeats without calling the wrapped provider
+- Hits and misses are recorded in the API audit log with hit/miss counters
+- TTL expiry and LRU size eviction
+- get_provider() only wraps when llm.cache.enabled is set
+"""
+
+import base64
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.llm_cache import (
+    CachingProvider,
+    ResponseCache,
+    get_cache_stats,
+    make_cache_key,
+    reset_cache_stats,
+)
+from src.llm_provider import (
+    MockLLMProvider,
+    _log_api_call,
+    clear_api_audit_log,
+    get_api_audit_log,
+    get_provider,
+)
+
+
+@pytest.fixture
+def cache_path():
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="llm_cache_test_")
+    os.close(fd)
+    os.remove(path)
+    yield path
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+@pytest.fixture(autouse=True)
+def _reset_state():
+    reset_cache_stats()
+    clear_api_audit_log()
+    yield
+    clear_api_audit_log()
+
+
+def _auditing_provider(response="live text"):
+    """A provider that writes its own audit entry per call, like the real ones."""
+
+    def generate(prompt_parts, json_mode=False):
+        _log_api_call("mock", "mock", "prompt", response)
+        return response
+
+    inner = MockLLMProvider()
+    inner.generate = MagicMock(side_effect=generate)
+    inner.stream_generate = lambda prompt_parts, json_mode=False: iter([generate(prompt_parts)])
+    return inner
+
+
+def _counting_provider(response="[]"):
+    inner = MockLLMProvider()
+    inner.generate = MagicMock(return_value=response)
+    return inner
+
+
+class TestCacheKey:
+    def test_identical_requests_share_key(self):
+        a = make_cache_key("gemini", "m", True, ["hello", "world"])
+        b = make_cache_key("gemini", "m", True, ["hello", "world"])
+        assert a == b
+
+    def test_json_mode_changes_key(self):
+        assert make_cache_key("gemini", "m", True, ["x"]) != make_cache_key("gemini", "m", False, ["x"])
+
+    def test_model_and_provider_change_key(self):
+        base = make_cache_key("gemini", "m1", True, ["x"])
+        assert base != make_cache_key("gemini", "m2", True, ["x"])
+        assert base != make_cache_key("anthropic", "m1", True, ["x"])
+
+    def test_image_bytes_change_key(self):
+        def img(data):
+            return {
+                "type": "image_url",
+                "image_url": {"url": "data:image/png;base64," + base64.b64encode(data).decode()},
+            }
+
+        assert make_cache_key("openai-compatible", "m", True, ["x", img(b"one")]) != make_cache_key(
+            "openai-compatible", "m", True, ["x", img(b"two")]
+        )
+
+    def test_raw_bytes_are_hashed(self):
+        assert make_cache_key("p", "m", False, [b"abc"]) != make_cache_key("p", "m", False, [b"abd"])
+
+
+class TestCachingProvider:
+    def test_second_call_is_served_from_cache(self, cache_path):
+        inner = _counting_provider('[{"text": "Q"}]')
+        provider = CachingProvider(inner, ResponseCache(path=cache_path))
+
+        first = provider.generate(["prompt"], json_mode=True)
+        second = provider.generate(["prompt"], json_mode=True)
+
+        assert first == second == '[{"text": "Q"}]'
+        assert inner.generate.call_count == 1
+        stats = get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_different_prompt_misses(self, cache_path):
+        inner = _counting_provider()
+        provider = CachingProvider(inner, ResponseCache(path=cache_path))
+        provider.generate(["a"])
+        provider.generate(["b"])
+        assert inner.generate.call_count == 2
+
+    def test_hit_recorded_in_audit_log(self, cache_path):
+        provider = CachingProvider(_counting_provider("cached text"), ResponseCache(path=cache_path))
+        provider.generate(["prompt"])
+        provider.generate(["prompt"])
+
+        entries = [e for e in get_api_audit_log() if "cache" in e]
+        assert len(entries) == 1
+        assert entries[0]["cache"] == {"status": "hit", "hits": 1, "misses": 1}
+        assert entries[0]["provider"] == "mock"
+        assert entries[0]["input_tokens"] == 0
+
+    def test_miss_recorded_on_provider_entry(self, cache_path):
+        provider = CachingProvider(_auditing_provider(), ResponseCache(path=cache_path))
+        provider.generate(["prompt"])
+        assert list(provider.stream_generate(["other"])) == ["live text"]
+        provider.generate(["prompt"])
+        _log_api_call("mock", "mock", "unrelated", "call")
+
+        caches = [e.get("cache") for e in get_api_audit_log()]
+        assert caches == [
+            {"status": "miss", "hits": 0, "misses": 1},
+            {"status": "miss", "hits": 0, "misses": 2},
+            {"status": "hit", "hits": 1, "misses": 2},
+            None,
+        ]
+
+    def test_empty_response_not_cached(self, cache_path):
+        inner = _counting_provider("")
+        provider = CachingProvider(inner, ResponseCache(path=cache_path))
+        provider.generate(["prompt"])
+        provider.generate(["prompt"])
+        assert inner.generate.call_count == 2
+
+    def test_cache_persists_across_instances(self, cache_path):
+        CachingProvider(_counting_provider("persisted"), ResponseCache(path=cache_path)).generate(["p"])
+        inner = _counting_provider("fresh")
+        assert CachingProvider(inner, ResponseCache(path=cache_path)).generate(["p"]) == "persisted"
+        inner.generate.assert_not_called()
+
+    def test_delegates_image_preparation(self, cache_path):
+        provider = CachingProvider(MockLLMProvider(), ResponseCache(path=cache_path))
+        assert provider.prepare_image_context("x.png") == "<MockImage: x.png>"
+
+
+class TestEviction:
+    def test_ttl_expiry(self, cache_path):
+        cache = ResponseCache(path=cache_path, ttl_seconds=1)
+        cache.put("k", "value")
+        assert cache.get("k") == "value"
+        conn = cache._connect()
+        conn.execute("UPDATE llm_cache SET created_at = ?", (time.time() - 10,))
+        conn.commit()
+        conn.close()
+        assert cache.get("k") is None
+
+    def test_lru_eviction_by_size(self, cache_path):
+        cache = ResponseCache(path=cache_path, max_bytes=25)
+        cache.put("a", "x" * 10)
+        time.sleep(0.01)
+        cache.put("b", "y" * 10)
+        time.sleep(0.01)
+        assert cache.get("a") is not None  # touch "a" so "b" is least recent
+        time.sleep(0.01)
+        cache.put("c", "z" * 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.info()["bytes"] <= 25
+
+    def test_oversized_response_skipped(self, cache_path):
+        cache = ResponseCache(path=cache_path, max_bytes=5)
+        cache.put("big", "x" * 100)
+        assert cache.get("big") is None
+
+
+class TestGetProviderWiring:
+    def test_disabled_by_default(self):
+        provider = get_provider({"llm": {"provider": "mock"}})
+        assert isinstance(provider, MockLLMProvider)
+
+    def test_enabled_wraps_provider(self, cache_path):
+        config = {"llm": {"provider": "mock", "cache": {"enabled": True, "path": cache_path}}}
+        provider = get_provider(config)
+        assert isinstance(provider, CachingProvider)
+        assert isinstance(provider.inner, MockLLMProvider)
+        # Attribute lookups fall through to the wrapped provider
+        assert provider._call_count == 0
@@ -0,0 +1,135 @@
+"""
+Tests for the MockLLMProvider load-test simulation (llm.mock_simulation).
+
+Verifies:
+- Latency distributions are seeded, clamped and validated
+- Injected 429/5xx errors surface as classified ProviderErrors
+- Streams are paced and response size scales
+- Simulated calls land in the audit log with token counts
+- get_provider() enables simulation from config
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.llm_provider import MockLLMProvider, ProviderError, audit_run, get_provider
+from src.mock_responses import MockSimulation, scale_response
+
+PROMPT = ["Generate 3 quiz questions about photosynthesis"]
+
+
+class TestMockSimulation:
+    def test_same_seed_same_samples(self):
+        config = {"seed": 7, "latency": {"distribution": "lognormal", "seconds": 5, "spread": 0.6}}
+        a, b = MockSimulation(config), MockSimulation(config)
+        samples = [a.plan(PROMPT, "x").first_token_seconds for _ in range(20)]
+        assert samples == [b.plan(PROMPT, "x").first_token_seconds for _ in range(20)]
+        assert len(set(samples)) == 20 and min(samples) > 0
+
+    def test_latency_clamped(self):
+        sim = MockSimulation(
+            {
+                "seed": 1,
+                "latency": {"distribution": "normal", "seconds": 5, "spread": 50, "min_seconds": 1, "max_seconds": 9},
+            }
+        )
+        samples = [sim.plan(PROMPT, "x").first_token_seconds for _ in range(200)]
+        assert min(samples) == 1 and max(samples) == 9
+
+    def test_error_rates_reproducible(self):
+        config = {"seed": 3, "error_rates": {"rate_limit": 0.3, "server_error": 0.2}}
+        sim_a, sim_b = MockSimulation(config), MockSimulation(config)
+        run_a = [sim_a.plan(PROMPT, "x").error for _ in range(200)]
+        assert run_a == [sim_b.plan(PROMPT, "x").error for _ in range(200)]
+        assert 30 < run_a.count("rate_limit") < 90
+        assert 15 < run_a.count("server_error") < 65
+
+    def test_invalid_config_rejected(self):
+        with pytest.raises(ValueError, match="distribution"):
+            MockSimulation({"latency": {"distribution": "pareto"}})
+        with pytest.raises(ValueError, match="simulated error"):
+            MockSimulation({"error_rates": {"teapot": 0.1}})
+        with pytest.raises(ValueError, match="more than 1"):
+            MockSimulation({"error_rates": {"rate_limit": 0.7, "timeout": 0.7}})
+
+    def test_tokens_drive_generation_time(self):
+        sim = MockSimulation({"tokens_per_second": 100, "chars_per_token": 4})
+        call = sim.plan(["a" * 400], "b" * 800)
+        assert (call.input_tokens, call.output_tokens) == (100, 200)
+        assert call.generation_seconds == pytest.approx(2.0)
+
+    def test_scale_response(self):
+        items = json.dumps([{"q": 1}, {"q": 2}])
+        assert len(json.loads(scale_response(items, 2.0))) == 4
+        assert len(json.loads(scale_response(items, 0.1))) == 1
+        padded = scale_response('{"a": 1}', 3.0)
+        assert json.loads(padded) == {"a": 1} and len(padded) == 24
+
+
+class TestSimulatedProvider:
+    def test_latency_applied(self):
+        provider = MockLLMProvider(simulation={"latency": {"seconds": 0.2}})
+        start = time.monotonic()
+        json.loads(provider.generate(PROMPT, json_mode=True))
+        assert time.monotonic() - start >= 0.2
+
+    def test_async_latency_does_not_block_loop(self):
+        provider = MockLLMProvider(simulation={"latency": {"seconds": 0.2}})
+
+        async def run_many():
+            return await asyncio.gather(*(provider.agenerate(PROMPT, json_mode=True) for _ in range(5)))
+
+        start = time.monotonic()
+        assert len(asyncio.run(run_many())) == 5
+        assert time.monotonic() - start < 0.8
+
+    def test_rate_limit_carries_retry_after(self):
+        provider = MockLLMProvider(simulation={"error_rates": {"rate_limit": 1.0}, "retry_after_seconds": 7})
+        with pytest.raises(ProviderError) as exc_info:
+            provider.generate(PROMPT, json_mode=True)
+        assert exc_info.value.error_code == "rate_limit"
+        assert exc_info.value.retry_after == 7
+
+    def test_server_error_in_stream(self):
+        provider = MockLLMProvider(simulation={"error_rates": {"server_error": 1.0}})
+        with pytest.raises(ProviderError) as exc_info:
+            list(provider.stream_generate(PROMPT, json_mode=True))
+        assert exc_info.value.error_code == "unknown"
+
+    def test_stream_is_paced(self):
+        provider = MockLLMProvider(simulation={"tokens_per_second": 2000, "stream_chunk_chars": 40})
+        start = time.monotonic()
+        chunks = list(provider.stream_generate(PROMPT, json_mode=True))
+        elapsed = time.monotonic() - start
+        text = "".join(chunks)
+        json.loads(text)
+        assert all(len(c) <= 40 for c in chunks)
+        assert elapsed >= (len(text) - 40) / 4 / 2000 * 0.9
+
+    def test_calls_recorded_in_audit_log(self):
+        provider = MockLLMProvider(simulation={"error_rates": {"timeout": 0.0}})
+        with audit_run() as run:
+            provider.generate(PROMPT, json_mode=True)
+        totals = run.totals()
+        assert totals["output_tokens"] > 0
+        assert run.entries[0]["provider"] == "mock"
+
+    def test_plain_mock_unchanged(self):
+        provider = MockLLMProvider()
+        assert provider.simulation is None
+        with audit_run() as run:
+            provider.generate(PROMPT, json_mode=True)
+        assert run.entries == []
+
+
+class TestGetProviderWiring:
+    def test_enabled_from_config(self):
+        provider = get_provider({"llm": {"provider": "mock", "mock_simulation": {"enabled": True, "seed": 5}}})
+        assert provider.simulation.seed == 5
+
+    def test_disabled_by_default(self):
+        provider = get_provider({"llm": {"provider": "mock", "mock_simulation": {"seed": 5}}})
+        assert provider.simulation is None
@@ -201,8 +201,9 @@ class TestPostgreSQLEngine:
         )
         assert engine is mock_engine
 
+    @patch("src.database.apply_sqlite_pragmas")
     @patch("src.database.create_engine")
-    def test_sqlite_url_no_pool_params(self, mock_create_engine, tmp_db):
+    def test_sqlite_url_no_pool_params(self, mock_create_engine, mock_pragmas, tmp_db):
         """SQLite engine does NOT get pool_size/max_overflow kwargs."""
         mock_engine = MagicMock()
         mock_engine.dialect.name = "sqlite"
@@ -212,6 +213,7 @@ class TestPostgreSQLEngine:
         get_engine(url=sqlite_url)
 
         mock_create_engine.assert_called_once_with(sqlite_url)
+        mock_pragmas.assert_called_once_with(mock_engine, None)
 
     @patch("src.database.create_engine")
     def test_postgresql_missing_psycopg2_gives_helpful_error(self, mock_create_engine):
@@ -0,0 +1,259 @@
+"""
+Tests for provider prompt-prefix caching.
+
+Verifies:
+- Generator and critic prompts put a stable CacheablePrefix before the variable suffix
+- Anthropic requests carry a cache_control breakpoint on the prefix (opt-out via config)
+- Gemini creates explicit cached content when a prefix repeats and sends only the suffix
+- Cached-token counts reach the audit log, cost log and pipeline metrics
+- The cost log's optional 7th field is parsed and older 6-field lines still work
+"""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.agents import AgentMetrics, CriticAgent, GeneratorAgent, _accumulate_tokens
+from src.cost_tracking import estimate_cost, get_cost_summary, get_monthly_total, log_api_call
+from src.llm_provider import (
+    AnthropicProvider,
+    CacheablePrefix,
+    GeminiProvider,
+    OpenAICompatibleProvider,
+    clear_api_audit_log,
+    get_api_audit_log,
+    get_provider,
+    split_cacheable_prefix,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_audit_log():
+    clear_api_audit_log()
+    yield
+    clear_api_audit_log()
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    # Under tmp_path so the cost ledger side-file is cleaned up with the log
+    path = tmp_path / "api_costs.log"
+    path.touch()
+    return str(path)
+
+
+def _capture_provider():
+    provider = MagicMock()
+    provider.generate.return_value = '[{"text": "Q1", "type": "mc", "options": ["A", "B"], "correct_index": 0}]'
+    provider.prepare_image_context.side_effect = lambda path: {"type": "image", "path": path}
+    return provider
+
+
+class TestSplit:
+    def test_splits_after_last_marker(self):
+        parts = [CacheablePrefix("a"), "img", CacheablePrefix("b"), "task"]
+        assert split_cacheable_prefix(parts) == (parts[:3], ["task"])
+
+    def test_no_marker(self):
+        assert split_cacheable_prefix(["a", "b"]) == ([], ["a", "b"])
+
+    def test_marker_is_plain_string(self):
+        assert CacheablePrefix("abc") == "abc"
+        assert isinstance(CacheablePrefix("abc"), str)
+
+
+class TestPromptLayout:
+    def test_generator_prefix_stable_across_attempts(self):
+        provider = _capture_provider()
+        agent = GeneratorAgent({}, provider=provider)
+        context = {"content_summary": "Photosynthesis", "num_questions": 10, "grade_level": "7th Grade"}
+
+        agent.generate(context)
+        first = provider.generate.call_args[0][0]
+        agent.generate(dict(context, num_questions=4), feedback="Q2 was ambiguous")
+        second = provider.generate.call_args[0][0]
+
+        assert isinstance(first[0], CacheablePrefix)
+        assert first[0] == second[0]
+        assert "Photosynthesis" in first[0]
+        assert "Generate 10 unique" in first[-1]
+        assert "Generate 4 unique" in second[-1]
+        assert "Q2 was ambiguous" in second[-1]
+        assert "Q2 was ambiguous" not in second[0]
+
+    def test_images_belong_to_prefix(self):
+        provider = _capture_provider()
+        agent = GeneratorAgent({}, provider=provider)
+        agent.generate({"content_summary": "Cells", "num_questions": 2, "images": ["cell.png"]})
+        parts = provider.generate.call_args[0][0]
+        prefix, suffix = split_cacheable_prefix(parts)
+        assert {"type": "image", "path": "cell.png"} in prefix
+        assert len(suffix) == 1 and "**Task:**" in suffix[0]
+
+    def test_critic_prefix_stable_across_drafts(self):
+        provider = MagicMock()
+        provider.generate.return_value = "APPROVED"
+        critic = CriticAgent({}, provider=provider)
+        critic.critique([{"text": "Q1"}], "guidelines", "summary")
+        first = provider.generate.call_args[0][0]
+        critic.critique([{"text": "Q2"}], "guidelines", "summary")
+        second = provider.generate.call_args[0][0]
+        assert isinstance(first[0], CacheablePrefix)
+        assert first[0] == second[0]
+        assert "Q1" in first[1] and "Q2" in second[1]
+
+
+class TestAnthropic:
+    def _provider(self):
+        with patch("anthropic.Anthropic"):
+            return AnthropicProvider(api_key="k")
+
+    def test_cache_control_on_prefix_block(self):
+        provider = self._provider()
+        kwargs = provider._request_kwargs([CacheablePrefix("static"), "variable"], json_mode=True)
+        content = kwargs["messages"][0]["content"]
+        assert content[0] == {"type": "text", "text": "static", "cache_control": {"type": "ephemeral"}}
+        assert "cache_control" not in content[1]
+
+    def test_no_marker_no_breakpoint(self):
+        kwargs = self._provider()._request_kwargs(["plain"], json_mode=False)
+        assert "cache_control" not in kwargs["messages"][0]["content"][0]
+
+    def test_disabled_via_config(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            provider = get_provider(
+                {"llm": {"provider": "anthropic", "prompt_cache": {"enabled": False}}}, web_mode=True
+            )
+        kwargs = provider._request_kwargs([CacheablePrefix("static"), "v"], json_mode=False)
+        assert "cache_control" not in kwargs["messages"][0]["content"][0]
+
+    def test_cache_reads_recorded(self):
+        provider = self._provider()
+        response = MagicMock()
+        response.content = [MagicMock(text="ok")]
+        response.usage = MagicMock(
+            input_tokens=50, output_tokens=20, cache_creation_input_tokens=0, cache_read_input_tokens=1500
+        )
+        provider.client.messages.create.return_value = response
+        with patch("src.cost_tracking.log_api_call") as mock_log:
+            provider.generate([CacheablePrefix("static"), "v"])
+        mock_log.assert_called_once_with("anthropic", provider._model_name, 50, 20, cached_tokens=1500)
+        entry = get_api_audit_log()[-1]
+        assert entry["cached_tokens"] == 1500
+        assert entry["input_tokens"] == 50
+
+    def test_cache_writes_billed_as_input(self):
+        provider = self._provider()
+        usage = MagicMock(
+            input_tokens=50, output_tokens=20, cache_creation_input_tokens=1500, cache_read_input_tokens=0
+        )
+        assert provider._usage_tokens(usage) == (1550, 20, 0)
+
+
+class TestOpenAI:
+    def test_cached_tokens_split_from_prompt_tokens(self):
+        usage = MagicMock(prompt_tokens=2000, completion_tokens=100)
+        usage.prompt_tokens_details.cached_tokens = 1024
+        assert OpenAICompatibleProvider._usage_tokens(usage) == (976, 100, 1024)
+
+    def test_missing_details(self):
+        usage = MagicMock(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None)
+        assert OpenAICompatibleProvider._usage_tokens(usage) == (10, 5, 0)
+
+
+class TestGemini:
+    def _provider(self):
+        with patch("google.genai.Client"):
+            provider = GeminiProvider(api_key="k")
+        provider.client = MagicMock()
+        response = MagicMock(text="[]")
+        response.usage_metadata = MagicMock(
+            prompt_token_count=3000, candidates_token_count=100, cached_content_token_count=2500
+        )
+        provider.client.models.generate_content.return_value = response
+        provider.client.caches.create.return_value = MagicMock()
+        provider.client.caches.create.return_value.name = "cachedContents/abc"
+        return provider
+
+    def test_explicit_cache_created_on_reuse(self):
+        provider = self._provider()
+        prefix = CacheablePrefix("x" * 5000)
+        provider.generate([prefix, "task 1"])
+        first = provider.client.models.generate_content.call_args.kwargs
+        assert first["contents"] == [prefix, "task 1"]
+        provider.client.caches.create.assert_not_called()
+
+        provider.generate([prefix, "task 2"])
+        second = provider.client.models.generate_content.call_args.kwargs
+        assert second["contents"] == ["task 2"]
+        assert second["config"]["cached_content"] == "cachedContents/abc"
+
+        provider.generate([prefix, "task 3"])
+        assert provider.client.caches.create.call_count == 1
+
+    def test_short_prefix_not_cached(self):
+        provider = self._provider()
+        for _ in range(3):
+            provider.generate([CacheablePrefix("short"), "task"])
+        provider.client.caches.create.assert_not_called()
+
+    def test_create_failure_falls_back(self):
+        provider = self._provider()
+        provider.client.caches.create.side_effect = Exception("400 cached content too small")
+        prefix = CacheablePrefix("x" * 5000)
+        for _ in range(3):
+            provider.generate([prefix, "task"])
+        assert provider.client.caches.create.call_count == 1
+        assert provider.client.models.generate_content.call_args.kwargs["contents"] == [prefix, "task"]
+
+    def test_failed_request_forgets_cache(self):
+        provider = self._provider()
+        prefix = CacheablePrefix("x" * 5000)
+        provider.generate([prefix, "a"])
+        provider.generate([prefix, "b"])
+        provider.client.models.generate_content.side_effect = [
+            Exception("404 cached content not found"),
+            MagicMock(text="[]"),
+        ]
+        with pytest.raises(Exception):
+            provider.generate([prefix, "c"])
+        provider.generate([prefix, "d"])
+        assert provider.client.models.generate_content.call_args.kwargs["contents"] == [prefix, "d"]
+
+    def test_implicit_cache_usage_recorded(self):
+        provider = self._provider()
+        with patch("src.cost_tracking.log_api_call") as mock_log:
+            provider.generate(["plain prompt"])
+        mock_log.assert_called_once_with("gemini", "gemini-2.5-flash", 500, 100, cached_tokens=2500)
+
+
+class TestCostLog:
+    def test_cached_tokens_discounted(self):
+        full = estimate_cost("claude-sonnet-4-20250514", 1_000_000, 0)
+        cached = estimate_cost("claude-sonnet-4-20250514", 0, 0, cached_tokens=1_000_000)
+        assert cached == pytest.approx(full * 0.1)
+        # Unknown models fall back to a fraction of the input price
+        assert estimate_cost("unknown", 0, 0, cached_tokens=1_000_000) == pytest.approx(0.15 * 0.25)
+
+    def test_seventh_field_written_and_summed(self, log_file):
+        log_api_call("anthropic", "claude-sonnet-4-20250514", 100, 50, log_file=log_file, cached_tokens=900)
+        log_api_call("gemini", "gemini-2.5-flash", 10, 5, log_file=log_file)
+        with open(log_file) as f:
+            lines = f.read().splitlines()
+        assert lines[0].endswith("| 900")
+        assert lines[1].count("|") == 5
+        summary = get_cost_summary(log_file)
+        assert summary["total_calls"] == 2
+        assert summary["total_cached_tokens"] == 900
+        assert get_monthly_total(log_file)["cached_tokens"] == 900
+
+    def test_metrics_accumulate_cached_tokens(self):
+        from src.llm_provider import _log_api_call, audit_run
+
+        metrics = AgentMetrics()
+        with audit_run():
+            _log_api_call("anthropic", "m", "p", "r", 100, 50, 10, cached_tokens=700)
+            _accumulate_tokens(metrics, 0)
+        assert metrics.cached_tokens == 700
+        assert metrics.report()["cached_tokens"] == 700
@@ -0,0 +1,164 @@
+"""
+Tests for the process-wide provider client pool in get_provider().
+
+Verifies:
+- Repeated get_provider() calls reuse one client per (provider, model, credentials, base_url)
+- Different models, keys or base URLs get separate clients
+- Mock provider and llm.client_pool: false bypass the pool
+- invalidate_provider_pool() and saving settings drop pooled clients
+- Stats report hits, misses and reuse rate
+- The pool is bounded (LRU eviction)
+- Concurrent lookups construct a single client, outside the pool lock
+"""
+
+import os
+import threading
+from unittest.mock import patch
+
+from src.llm_provider import (
+    AnthropicProvider,
+    MockLLMProvider,
+    _provider_pool,
+    _ProviderPool,
+    get_provider,
+    get_provider_pool_stats,
+    invalidate_provider_pool,
+)
+
+
+def _anthropic_config(**llm):
+    return {"llm": {"provider": "anthropic", "mode": "production", **llm}}
+
+
+def _openai_config(base_url, **llm):
+    return {"llm": {"provider": "openai-compatible", "mode": "production", "api_key": "k", "base_url": base_url, **llm}}
+
+
+class TestPoolReuse:
+    def test_same_settings_reuse_provider(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "key-1"}), patch("anthropic.Anthropic") as MockClient:
+            first = get_provider(_anthropic_config(), web_mode=True)
+            second = get_provider(_anthropic_config(), web_mode=True)
+        assert first is second
+        assert isinstance(first, AnthropicProvider)
+        assert MockClient.call_count == 1
+
+    def test_different_model_gets_new_provider(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "key-1"}), patch("anthropic.Anthropic"):
+            a = get_provider(_anthropic_config(model_name="claude-a"), web_mode=True)
+            b = get_provider(_anthropic_config(model_name="claude-b"), web_mode=True)
+        assert a is not b
+
+    def test_changed_api_key_gets_new_provider(self):
+        with patch("anthropic.Anthropic"):
+            with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "key-1"}):
+                a = get_provider(_anthropic_config(), web_mode=True)
+            with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "key-2"}):
+                b = get_provider(_anthropic_config(), web_mode=True)
+        assert a is not b
+
+    def test_different_base_url_gets_new_provider(self):
+        with patch("openai.OpenAI"):
+            a = get_provider(_openai_config("http://localhost:11434/v1"), web_mode=True)
+            b = get_provider(_openai_config("http://localhost:8000/v1"), web_mode=True)
+        assert a is not b
+
+    def test_key_does_not_contain_raw_secret(self):
+        key = _ProviderPool.make_key("anthropic", {"api_key": "super-secret"}, "m")
+        assert "super-secret" not in repr(key)
+
+
+class TestPoolBypass:
+    def test_mock_is_not_pooled(self):
+        a = get_provider({"llm": {"provider": "mock"}})
+        b = get_provider({"llm": {"provider": "mock"}})
+        assert isinstance(a, MockLLMProvider)
+        assert a is not b
+        assert get_provider_pool_stats()["misses"] == 0
+
+    def test_client_pool_false_disables_reuse(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            a = get_provider(_anthropic_config(client_pool=False), web_mode=True)
+            b = get_provider(_anthropic_config(client_pool=False), web_mode=True)
+        assert a is not b
+
+
+class TestPoolInvalidationAndStats:
+    def test_invalidate_drops_clients(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            a = get_provider(_anthropic_config(), web_mode=True)
+            invalidate_provider_pool()
+            b = get_provider(_anthropic_config(), web_mode=True)
+        assert a is not b
+        assert get_provider_pool_stats()["invalidations"] == 1
+
+    def test_stats_report_reuse(self):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            for _ in range(4):
+                get_provider(_anthropic_config(), web_mode=True)
+        stats = get_provider_pool_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 3
+        assert stats["size"] == 1
+        assert stats["reuse_rate"] == 0.75
+        assert stats["providers"] == ["anthropic/claude-sonnet-4-20250514"]
+
+    def test_pool_is_bounded(self):
+        pool = _ProviderPool(max_size=2)
+        with patch("openai.OpenAI"):
+            for port in (1, 2, 3):
+                pool.get_or_create("openai-compatible", {"api_key": "k", "base_url": f"http://h:{port}"}, "m")
+        stats = pool.stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+
+    def test_concurrent_lookups_build_one_client(self):
+        results = []
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic") as MockClient:
+
+            def worker():
+                results.append(get_provider(_anthropic_config(), web_mode=True))
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert MockClient.call_count == 1
+        assert all(r is results[0] for r in results)
+
+    def test_build_runs_outside_pool_lock(self):
+        pool = _ProviderPool()
+        held = []
+
+        def build(*args):
+            held.append(pool._lock.locked())
+            return MockLLMProvider()
+
+        with patch("src.llm_provider._build_provider", side_effect=build):
+            provider = pool.get_or_create("anthropic", {}, "m")
+        assert held == [False]
+        assert pool.get_or_create("anthropic", {}, "m") is provider
+
+
+class TestSettingsIntegration:
+    def test_saving_settings_invalidates_pool(self, flask_client):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            get_provider(_anthropic_config(), web_mode=True)
+        assert get_provider_pool_stats()["size"] == 1
+
+        with patch("src.web.blueprints.settings.save_config"):
+            resp = flask_client.post("/settings", data={"provider": "mock"})
+        assert resp.status_code == 303
+        assert get_provider_pool_stats()["size"] == 0
+
+    def test_stats_endpoint(self, flask_client):
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "k"}), patch("anthropic.Anthropic"):
+            get_provider(_anthropic_config(), web_mode=True)
+            get_provider(_anthropic_config(), web_mode=True)
+        resp = flask_client.get("/api/provider-pool")
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["hits"] == 1
+        assert data["misses"] == 1
+        assert _provider_pool.stats()["size"] == 1
@@ -0,0 +1,278 @@
+"""
+Tests for latency-aware provider routing (src/provider_router.py).
+
+Verifies:
+- Routes rank by cooldown, error rate and rolling p50 latency
+- Failover happens on classified provider errors and respects failover_errors
+- Slow calls are hedged to the next route once the first exceeds its p95
+- Hedged calls stay attributed to the caller's audit run, and a cancelled
+  hedge over rate-limited routes leaves no slot leased
+- Streams fail over before the first chunk; images are prepared per route
+- get_provider() builds routes from llm.routing and /api/routing reports them
+"""
+
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.llm_provider import LLMProvider, MockLLMProvider, ProviderError, _log_api_call, audit_run, get_provider
+from src.provider_router import (
+    RoutedImage,
+    RoutingProvider,
+    _percentile,
+    get_routing_stats,
+    reset_routing_stats,
+)
+from src.rate_limiter import MemoryBackend, RateLimitedProvider, RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def _fresh_routing_stats():
+    reset_routing_stats()
+    yield
+    reset_routing_stats()
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, model, delay=0.0, error=None):
+        self._model_name = model
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.seen_parts = None
+
+    def generate(self, prompt_parts, json_mode=False):
+        self.calls += 1
+        self.seen_parts = prompt_parts
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        _log_api_call("fake", self._model_name, "p", self._model_name)
+        return self._model_name
+
+    async def agenerate(self, prompt_parts, json_mode=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self._model_name
+
+    def stream_generate(self, prompt_parts, json_mode=False):
+        if self.error is not None:
+            raise self.error
+        yield from (self._model_name[:1], self._model_name[1:])
+
+    def prepare_image_context(self, image_path):
+        return f"<{self._model_name}:{image_path}>"
+
+
+def _warm(router, route_index, seconds, n=5):
+    for _ in range(n):
+        router.routes[route_index].health.record_success(seconds)
+
+
+class TestRanking:
+    def test_percentile(self):
+        assert _percentile([1, 2, 3, 4, 5], 0.5) == 3
+        assert _percentile([1, 2, 3, 4, 5], 0.95) == 5
+        assert _percentile([7], 0.95) == 7
+
+    def test_cold_primary_first(self):
+        router = RoutingProvider([FakeProvider("a"), FakeProvider("b")])
+        assert router.generate(["hi"]) == "a"
+
+    def test_faster_warm_route_preferred(self):
+        router = RoutingProvider([FakeProvider("a"), FakeProvider("b")])
+        _warm(router, 0, 2.0)
+        _warm(router, 1, 0.5)
+        assert [r.key for r in router.ranked_routes()] == ["FakeProvider/b", "FakeProvider/a"]
+
+    def test_unhealthy_and_cooling_routes_last(self):
+        router = RoutingProvider([FakeProvider("a"), FakeProvider("b"), FakeProvider("c")])
+        _warm(router, 0, 0.1)
+        _warm(router, 1, 0.2)
+        _warm(router, 2, 0.3)
+        for _ in range(10):
+            router.routes[1].health.record_failure()
+        router.routes[0].health.record_failure(cooldown=60)
+        assert [r.key.split("/")[1] for r in router.ranked_routes()] == ["c", "b", "a"]
+
+    def test_duplicate_identities_get_distinct_keys(self):
+        router = RoutingProvider([MockLLMProvider(), MockLLMProvider()])
+        assert [r.key for r in router.routes] == ["mock", "mock#2"]
+
+
+class TestFailover:
+    def test_rate_limit_fails_over_and_cools_down(self):
+        primary = FakeProvider("a", error=ProviderError("slow down", error_code="rate_limit", retry_after=90))
+        fallback = FakeProvider("b")
+        router = RoutingProvider([primary, fallback])
+        assert router.generate(["hi"]) == "b"
+        stats = get_routing_stats()
+        assert stats["FakeProvider/a"]["failovers"] == 1
+        assert stats["FakeProvider/a"]["cooling_down"] is True
+        primary.error = None
+        assert router.generate(["hi"]) == "b"
+        assert primary.calls == 1
+
+    def test_raw_exceptions_are_classified(self):
+        router = RoutingProvider([FakeProvider("a", error=OSError("Connection refused")), FakeProvider("b")])
+        assert router.generate(["hi"]) == "b"
+
+    def test_non_failover_error_raises(self):
+        fallback = FakeProvider("b")
+        router = RoutingProvider(
+            [FakeProvider("a", error=ProviderError("bad key", error_code="auth")), fallback],
+            failover_errors=["timeout"],
+        )
+        with pytest.raises(ProviderError, match="bad key"):
+            router.generate(["hi"])
+        assert fallback.calls == 0
+
+    def test_all_routes_failing_raises_first_error(self):
+        router = RoutingProvider(
+            [
+                FakeProvider("a", error=ProviderError("first", error_code="timeout")),
+                FakeProvider("b", error=ProviderError("second", error_code="timeout")),
+            ]
+        )
+        with pytest.raises(ProviderError, match="first"):
+            router.generate(["hi"])
+
+    def test_async_failover(self):
+        router = RoutingProvider(
+            [FakeProvider("a", error=ProviderError("x", error_code="connection")), FakeProvider("b")]
+        )
+        assert asyncio.run(router.agenerate(["hi"])) == "b"
+
+    def test_stream_fails_over_before_first_chunk(self):
+        router = RoutingProvider(
+            [FakeProvider("a", error=ProviderError("x", error_code="timeout")), FakeProvider("bc")]
+        )
+        assert list(router.stream_generate(["hi"])) == ["b", "c"]
+
+
+class TestHedging:
+    def test_slow_primary_is_hedged(self):
+        primary, fallback = FakeProvider("a"), FakeProvider("b")
+        router = RoutingProvider([primary, fallback], hedge=True, hedge_min_seconds=0.05)
+        _warm(router, 0, 0.01)
+        primary.delay = 0.5
+        start = time.monotonic()
+        assert router.generate(["hi"]) == "b"
+        assert time.monotonic() - start < 0.4
+        stats = get_routing_stats()
+        assert stats["FakeProvider/a"]["hedges"] == 1
+        assert stats["FakeProvider/b"]["hedge_wins"] == 1
+
+    def test_fast_primary_not_hedged(self):
+        primary, fallback = FakeProvider("a"), FakeProvider("b")
+        router = RoutingProvider([primary, fallback], hedge=True, hedge_min_seconds=0.2)
+        _warm(router, 0, 0.01)
+        assert router.generate(["hi"]) == "a"
+        assert fallback.calls == 0
+
+    def test_hedged_calls_keep_audit_run(self):
+        primary, fallback = FakeProvider("a", delay=0.3), FakeProvider("b")
+        router = RoutingProvider([primary, fallback], hedge=True, hedge_min_seconds=0.02)
+        _warm(router, 0, 0.01)
+        with audit_run() as run:
+            router.generate(["hi"])
+        assert [e["response_preview"] for e in run.entries] == ["b"]
+
+    def test_async_hedge_cancels_loser(self):
+        primary, fallback = FakeProvider("a", delay=5), FakeProvider("b")
+        router = RoutingProvider([primary, fallback], hedge=True, hedge_min_seconds=0.02)
+        _warm(router, 0, 0.01)
+        start = time.monotonic()
+        assert asyncio.run(router.agenerate(["hi"])) == "b"
+        assert time.monotonic() - start < 1
+
+    def test_async_hedge_over_rate_limited_routes_frees_slots(self):
+        limiter = RateLimiter(MemoryBackend(), {"default": {"max_in_flight": 1}})
+        primary = RateLimitedProvider(FakeProvider("a", delay=0.3), limiter)
+        fallback = RateLimitedProvider(FakeProvider("b"), limiter)
+        router = RoutingProvider([primary, fallback], hedge=True, hedge_min_seconds=0.02)
+        _warm(router, 0, 0.01)
+        holder = limiter.acquire("FakeProvider", "b")  # the hedge queues behind this
+
+        async def run():
+            result = await router.agenerate(["hi"])
+            holder.release()
+            deadline = time.monotonic() + 1
+            while limiter.stats()["FakeProvider/b"]["queued"]:
+                assert time.monotonic() < deadline
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)  # let a worker admitted after the cancel run its callback
+            return result
+
+        assert asyncio.run(run()) == "a"
+        stats = limiter.stats()
+        assert stats["FakeProvider/a"]["in_flight"] == 0
+        assert stats["FakeProvider/b"]["in_flight"] == 0
+        assert stats["FakeProvider/b"]["admitted"] == 1  # only the holder was admitted
+
+
+class TestImages:
+    def test_images_prepared_by_chosen_route(self, tmp_path):
+        image = tmp_path / "cell.png"
+        image.write_bytes(b"png")
+        primary = FakeProvider("a", error=ProviderError("x", error_code="timeout"))
+        fallback = FakeProvider("b")
+        router = RoutingProvider([primary, fallback])
+        ref = router.prepare_image_context(str(image))
+        assert isinstance(ref, RoutedImage)
+        assert len(ref.sha256_hash) == 64
+        router.generate(["look", ref])
+        assert primary.seen_parts == ["look", f"<a:{image}>"]
+        assert fallback.seen_parts == ["look", f"<b:{image}>"]
+
+
+class TestGetProviderWiring:
+    def test_routing_from_config(self):
+        config = {"llm": {"provider": "mock", "routing": {"enabled": True, "fallbacks": [{"provider": "mock"}]}}}
+        provider = get_provider(config)
+        assert isinstance(provider, RoutingProvider)
+        assert len(provider.routes) == 2
+        assert provider.generate(["Generate quiz questions"], json_mode=True)
+
+    def test_routes_are_rate_limited(self):
+        from src.rate_limiter import RateLimitedProvider, reset_rate_limiters
+
+        reset_rate_limiters()
+        config = {
+            "llm": {
+                "provider": "mock",
+                "rate_limits": {"enabled": True},
+                "routing": {"enabled": True, "fallbacks": [{"provider": "mock"}]},
+            }
+        }
+        provider = get_provider(config)
+        assert all(isinstance(r.provider, RateLimitedProvider) for r in provider.routes)
+        reset_rate_limiters()
+
+    def test_unbuildable_fallback_skipped(self):
+        config = {"llm": {"provider": "mock", "routing": {"enabled": True, "fallbacks": [{"provider": "anthropic"}]}}}
+        with patch.dict(os.environ, {"ANTHROPIC_API_KEY": ""}):
+            provider = get_provider(config)
+        assert isinstance(provider, MockLLMProvider)
+
+    def test_declined_gate_disables_routing(self):
+        config = {
+            "llm": {
+                "provider": "anthropic",
+                "routing": {"enabled": True, "fallbacks": [{"provider": "mock"}]},
+            }
+        }
+        with patch("builtins.input", return_value="no"):
+            provider = get_provider(config)
+        assert isinstance(provider, MockLLMProvider)
+
+    def test_stats_endpoint(self, flask_client):
+        RoutingProvider([FakeProvider("a"), FakeProvider("b")]).generate(["hi"])
+        body = flask_client.get("/api/routing").get_json()
+        assert body["FakeProvider/a"]["calls"] == 1
+        assert body["FakeProvider/a"]["p50_ms"] is not None
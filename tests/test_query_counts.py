@@ -0,0 +1,103 @@
+"""
+Statement-count tests for listing pages.
+
+Verifies that the class list, quiz lists, dashboard and question bank run
+a fixed number of SQL statements however many classes, quizzes and
+questions exist (no per-row COUNT or lookup queries), and that
+import_quiz_scores() loads all scored questions in one query.
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from src.database import Class, LessonLog, Question, Quiz
+from src.performance_import import import_quiz_scores
+
+
+def _seed(num_classes, quizzes_per_class):
+    def seed(session):
+        for c in range(num_classes):
+            cls = Class(name=f"Block {c + 1}", grade_level="7th Grade", subject="Science", config=json.dumps({}))
+            session.add(cls)
+            session.flush()
+            for d in range(3):
+                session.add(
+                    LessonLog(
+                        class_id=cls.id,
+                        date=date.today() - timedelta(days=d),
+                        content=f"Lesson {d} for block {c}",
+                        topics=json.dumps(["photosynthesis"]),
+                    )
+                )
+            for n in range(quizzes_per_class):
+                quiz = Quiz(title=f"Quiz {c}-{n}", class_id=cls.id, status="generated")
+                session.add(quiz)
+                session.flush()
+                for i in range(3):
+                    session.add(
+                        Question(
+                            quiz_id=quiz.id,
+                            question_type="mc",
+                            text=f"Question {i} of quiz {quiz.id}?",
+                            points=1.0,
+                            sort_order=i,
+                            saved_to_bank=1 if i == 0 else 0,
+                            data=json.dumps({"type": "mc", "options": ["a", "b"], "correct_index": 0}),
+                        )
+                    )
+        session.commit()
+
+    return seed
+
+
+PAGES = [
+    ("/dashboard", 5),
+    ("/classes", 2),
+    ("/quizzes", 5),
+    ("/classes/1/quizzes", 4),
+    ("/question-bank", 2),
+    ("/api/stats", 3),
+]
+
+
+@pytest.fixture
+def client_for(make_flask_app):
+    def _client(num_classes, quizzes_per_class):
+        app = make_flask_app(seed_fn=_seed(num_classes, quizzes_per_class))
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["logged_in"] = True
+            sess["username"] = "teacher"
+        return app, client
+
+    return _client
+
+
+@pytest.mark.parametrize("path,limit", PAGES)
+def test_listing_pages_have_bounded_statements(client_for, assert_max_queries, path, limit):
+    app, client = client_for(num_classes=6, quizzes_per_class=8)
+    with assert_max_queries(app.config["DB_ENGINE"], limit):
+        response = client.get(path)
+    assert response.status_code == 200
+
+
+def test_quiz_list_shows_aggregated_counts(client_for):
+    app, client = client_for(num_classes=2, quizzes_per_class=2)
+    html = client.get("/classes/1/quizzes").get_data(as_text=True)
+    assert "Quiz 0-0" in html
+    classes = client.get("/api/stats").get_json()["quizzes_by_class"]
+    assert classes == [{"class_name": "Block 1", "count": 2}, {"class_name": "Block 2", "count": 2}]
+
+
+def test_import_quiz_scores_batches_question_lookup(db_engine_session, sample_quiz_with_questions, assert_max_queries):
+    engine, session, _ = db_engine_session
+    quiz, cls, questions = sample_quiz_with_questions(session, num_questions=12)
+    scores = {q.id: 80.0 for q in questions}
+    scores[999999] = 50.0  # unknown question ids are skipped
+    session.expire_all()
+
+    with assert_max_queries(engine, 4):
+        count = import_quiz_scores(session, cls.id, quiz.id, scores, sample_size=20)
+    assert count == 1
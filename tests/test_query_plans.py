@@ -0,0 +1,139 @@
+"""
+Query-plan regression tests for the hot query paths.
+
+Runs EXPLAIN QUERY PLAN on the queries behind quiz lists, question loading,
+the question bank, lesson history, analytics and standard provenance, and
+fails if any of them scans a whole table instead of searching an index
+(migration 017 / the Index declarations in src/database.py). Queries that
+sort are also checked for a temporary sort, which the composite indexes
+are meant to make unnecessary.
+"""
+
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, text
+
+from src.database import LessonLog, PerformanceData, Question, Quiz, StandardExcerpt, get_engine, init_db
+from src.migrations import check_if_migration_needed, run_migrations
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+HOT_PATH_INDEXES = {
+    "ix_questions_quiz_id_sort_order",
+    "ix_questions_saved_to_bank",
+    "ix_quizzes_class_id_created_at",
+    "ix_quizzes_parent_quiz_id_created_at",
+    "ix_lesson_logs_class_id_date",
+    "ix_performance_data_class_id_topic_date",
+    "ix_standard_excerpts_standard_id_sort_order",
+}
+
+
+def _plan(session, query):
+    """EXPLAIN QUERY PLAN detail lines for an ORM *query*."""
+    sql = str(query.statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()]
+
+
+def _assert_indexed(plan, table, sorted_by_index=True):
+    steps = [step for step in plan if f" {table} " in f"{step} "]
+    assert steps, f"{table} missing from plan {plan}"
+    for step in steps:
+        assert step.startswith("SEARCH"), f"full scan of {table}: {plan}"
+    if sorted_by_index:
+        assert not any("TEMP B-TREE" in step for step in plan), f"temporary sort: {plan}"
+
+
+@pytest.fixture
+def session(db_session):
+    return db_session[0]
+
+
+def test_questions_for_quiz(session):
+    query = session.query(Question).filter_by(quiz_id=1).order_by(Question.sort_order, Question.id)
+    _assert_indexed(_plan(session, query), "questions")
+
+
+def test_question_bank(session):
+    query = session.query(Question).filter(Question.saved_to_bank == 1).order_by(Question.id.desc())
+    _assert_indexed(_plan(session, query), "questions")
+
+
+def test_quizzes_for_class(session):
+    query = session.query(Quiz).filter_by(class_id=1).order_by(Quiz.created_at.desc())
+    _assert_indexed(_plan(session, query), "quizzes")
+
+
+def test_variants_of_quiz(session):
+    query = session.query(Quiz).filter_by(parent_quiz_id=1).order_by(Quiz.created_at.desc())
+    _assert_indexed(_plan(session, query), "quizzes")
+
+
+def test_recent_lessons(session):
+    threshold = date.today() - timedelta(days=14)
+    query = (
+        session.query(LessonLog)
+        .filter(LessonLog.class_id == 1, LessonLog.date >= threshold)
+        .order_by(LessonLog.date.desc())
+    )
+    _assert_indexed(_plan(session, query), "lesson_logs")
+
+
+def test_performance_trend_for_topic(session):
+    threshold = date.today() - timedelta(days=90)
+    query = (
+        session.query(PerformanceData)
+        .filter(
+            PerformanceData.class_id == 1,
+            PerformanceData.topic == "photosynthesis",
+            PerformanceData.date >= threshold,
+        )
+        .order_by(PerformanceData.date)
+    )
+    _assert_indexed(_plan(session, query), "performance_data")
+
+
+def test_performance_for_class(session):
+    query = session.query(PerformanceData).filter(PerformanceData.class_id == 1)
+    _assert_indexed(_plan(session, query), "performance_data", sorted_by_index=False)
+
+
+def test_excerpts_for_standard(session):
+    query = session.query(func.count(StandardExcerpt.id)).filter(StandardExcerpt.standard_id == 1)
+    _assert_indexed(_plan(session, query), "standard_excerpts")
+
+
+def _index_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    finally:
+        conn.close()
+
+
+def test_migration_adds_indexes_to_existing_db(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    engine.dispose()
+    conn = sqlite3.connect(db_path)
+    for name in HOT_PATH_INDEXES:
+        conn.execute(f"DROP INDEX {name}")
+    conn.commit()
+    conn.close()
+
+    assert check_if_migration_needed(db_path) is True
+    assert run_migrations(db_path, MIGRATIONS_DIR, verbose=False) is True
+    assert _index_names(db_path) >= HOT_PATH_INDEXES
+
+
+def test_init_db_creates_indexes_on_existing_tables(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_quizzes_class_id_created_at"))
+    init_db(engine)
+    engine.dispose()
+    assert "ix_quizzes_class_id_created_at" in _index_names(db_path)
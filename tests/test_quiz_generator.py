@@ -8,6 +8,7 @@ Run with: python -m pytest tests/test_quiz_generator.py -v
 import json
 import os
 import sys
+import threading
 
 import pytest
 
@@ -15,7 +16,16 @@ import pytest
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from src.classroom import create_class
-from src.database import Question, Quiz, get_engine, get_session, init_db
+from src.database import (
+    CRITIC_PASS_RATE_WINDOW,
+    Question,
+    Quiz,
+    get_critic_pass_rates,
+    get_engine,
+    get_session,
+    init_db,
+    record_critic_outcomes,
+)
 from src.migrations import run_migrations
 from src.quiz_generator import generate_quiz
 
@@ -268,3 +278,64 @@ class TestGenerateQuizDefaultConfig:
         assert quiz is not None, "generate_quiz should succeed with minimal mock config"
         assert isinstance(quiz, Quiz)
         assert len(quiz.questions) > 0
+
+
+class TestOvergenerationSurplus:
+    """Surplus questions from agent_loop.overgeneration go to the question bank."""
+
+    def test_surplus_saved_to_bank(self, db_session, mock_config, sample_class):
+        mock_config["agent_loop"] = {"overgeneration": {"enabled": True}}
+        quiz = generate_quiz(db_session, sample_class.id, mock_config, num_questions=10)
+        assert quiz is not None
+        metadata = json.loads(quiz.generation_metadata)
+        assert "surplus_questions" not in metadata
+        banked = db_session.query(Question).filter(Question.quiz_id.is_(None)).all()
+        assert len(banked) == metadata["overgeneration"]["surplus"]
+        for question in banked:
+            assert question.saved_to_bank == 1
+            assert question.data["source_quiz_id"] == quiz.id
+
+    def test_critic_outcomes_recorded(self, db_session, mock_config, sample_class):
+        mock_config["agent_loop"] = {"overgeneration": {"enabled": True}}
+        generate_quiz(db_session, sample_class.id, mock_config, num_questions=5)
+        rates = get_critic_pass_rates(db_session, "mock", "")
+        assert rates and all(0 <= passed <= total for passed, total in rates.values())
+
+
+class TestCriticPassRates:
+    """record_critic_outcomes() keeps a decaying running count."""
+
+    def test_counts_accumulate(self, db_session):
+        record_critic_outcomes(db_session, "gemini", "flash", {"mc": {"passed": 8, "total": 10}})
+        record_critic_outcomes(
+            db_session, "gemini", "flash", {"mc": {"passed": 2, "total": 5}, "tf": {"passed": 1, "total": 1}}
+        )
+        assert get_critic_pass_rates(db_session, "gemini", "flash") == {"mc": (10, 15), "tf": (1, 1)}
+        assert get_critic_pass_rates(db_session, "gemini", "pro") == {}
+
+    def test_counts_halved_past_window(self, db_session):
+        record_critic_outcomes(db_session, "mock", "", {"mc": {"passed": 450, "total": CRITIC_PASS_RATE_WINDOW}})
+        record_critic_outcomes(db_session, "mock", "", {"mc": {"passed": 0, "total": 2}})
+        assert get_critic_pass_rates(db_session, "mock", "") == {"mc": (225, 251)}
+
+    def test_recorded_without_overgeneration(self, db_session, mock_config, sample_class):
+        generate_quiz(db_session, sample_class.id, mock_config, num_questions=5)
+        assert get_critic_pass_rates(db_session, "mock", "")
+
+    def test_concurrent_runs_all_counted(self, db_session, db_path):
+        engine = get_engine(db_path)
+
+        def record():
+            session = get_session(engine)
+            try:
+                record_critic_outcomes(session, "mock", "", {"mc": {"passed": 1, "total": 2}})
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+        assert get_critic_pass_rates(db_session, "mock", "") == {"mc": (8, 16)}
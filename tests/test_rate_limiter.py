@@ -0,0 +1,313 @@
+"""
+Tests for the per-provider rate limiter (src/rate_limiter.py).
+
+Verifies:
+- Limits resolve default < provider < provider/model
+- RPM and TPM token buckets admit bursts, then make callers wait
+- max_in_flight caps concurrency and waiters are admitted FIFO, without
+  holding the limiter lock across backend calls
+- A cancelled aacquire() leaves the queue and never keeps a slot leased
+- Retry-After on a 429 pauses the key; ProviderError carries retry_after
+- The SQLite backend shares buckets and leases across limiter instances
+- get_provider() wraps providers only when llm.rate_limits.enabled is set
+- Orchestrator honors retry_after instead of its fixed backoff
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.agents import _retry_delay
+from src.llm_provider import MockLLMProvider, ProviderError, _classify_provider_error, get_provider
+from src.rate_limiter import (
+    MemoryBackend,
+    RateLimitedProvider,
+    RateLimiter,
+    SQLiteBackend,
+    get_rate_limiter,
+    reset_rate_limiters,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_limiters():
+    reset_rate_limiters()
+    yield
+    reset_rate_limiters()
+
+
+@pytest.fixture
+def limiter_path():
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="rate_limits_test_")
+    os.close(fd)
+    os.remove(path)
+    yield path
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+def _limiter(**table):
+    return RateLimiter(MemoryBackend(), table)
+
+
+class TestLimitResolution:
+    def test_most_specific_wins(self):
+        limiter = _limiter(
+            default={"rpm": 60, "tpm": 1000, "max_in_flight": 4},
+            anthropic={"rpm": 50},
+            **{"anthropic/claude-x": {"max_in_flight": 1}},
+        )
+        assert limiter.limits_for("anthropic", "claude-x") == {"rpm": 50, "tpm": 1000, "max_in_flight": 1}
+        assert limiter.limits_for("gemini", "flash") == {"rpm": 60, "tpm": 1000, "max_in_flight": 4}
+
+    def test_unconfigured_key_is_unlimited(self):
+        limiter = _limiter()
+        for _ in range(100):
+            limiter.acquire("mock", "m").release()
+
+
+class TestBuckets:
+    def test_rpm_bucket_blocks_after_burst(self):
+        limiter = _limiter(default={"rpm": 2})
+        limiter.acquire("p", "m").release()
+        limiter.acquire("p", "m").release()
+        with pytest.raises(ProviderError) as exc:
+            limiter.acquire("p", "m", timeout=0.05)
+        assert exc.value.error_code == "rate_limit"
+        assert exc.value.retry_after == pytest.approx(30, abs=1)
+
+    def test_rpm_bucket_refills(self):
+        backend = MemoryBackend()
+        limits = {"rpm": 60}
+        now = 1000.0
+        assert backend.try_acquire("k", limits, 0, now)[0] is not None
+        backend._states["k"]["rpm_level"] = 0
+        lease, wait = backend.try_acquire("k", limits, 0, now)
+        assert lease is None and wait == pytest.approx(1.0)
+        assert backend.try_acquire("k", limits, 0, now + 1.0)[0] is not None
+
+    def test_tpm_reservation_and_settle(self):
+        limiter = _limiter(default={"tpm": 5000})
+        with limiter.acquire("p", "m", tokens=1000) as permit:
+            permit.settle(200)
+        # 1000 input + 1000 output reserve taken, then refunded down to 200 used
+        state = limiter.backend._states["p/m"]
+        assert state["tpm_level"] == pytest.approx(4800, abs=5)
+
+    def test_oversized_request_still_admitted(self):
+        limiter = _limiter(default={"tpm": 100})
+        limiter.acquire("p", "m", tokens=10_000, timeout=0.1).release()
+
+
+class TestConcurrency:
+    def test_max_in_flight(self):
+        limiter = _limiter(default={"max_in_flight": 1})
+        first = limiter.acquire("p", "m")
+        with pytest.raises(ProviderError):
+            limiter.acquire("p", "m", timeout=0.1)
+        first.release()
+        limiter.acquire("p", "m", timeout=0.1).release()
+
+    def test_waiters_admitted_in_order(self):
+        limiter = _limiter(default={"max_in_flight": 1})
+        holder = limiter.acquire("p", "m")
+        order = []
+
+        def waiter(n):
+            with limiter.acquire("p", "m", timeout=5):
+                order.append(n)
+
+        threads = []
+        for n in range(4):
+            t = threading.Thread(target=waiter, args=(n,))
+            t.start()
+            threads.append(t)
+            while len(limiter._queues["p/m"]) < n + 1:  # enqueue deterministically
+                time.sleep(0.001)
+        holder.release()
+        for t in threads:
+            t.join()
+        assert order == [0, 1, 2, 3]
+        assert limiter.stats()["p/m"]["throttled"] == 4
+
+    def test_backend_called_without_limiter_lock(self):
+        limiter = _limiter(default={"max_in_flight": 2})
+        held = []
+        try_acquire = limiter.backend.try_acquire
+
+        def probe():
+            acquired = limiter._cond.acquire(blocking=False)
+            if acquired:
+                limiter._cond.release()
+            held.append(not acquired)
+
+        def spy(*args):
+            t = threading.Thread(target=probe)
+            t.start()
+            t.join()
+            return try_acquire(*args)
+
+        limiter.backend.try_acquire = spy
+        limiter.acquire("p", "m").release()
+        assert held == [False]
+
+
+class TestAsyncCancellation:
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = _limiter(default={"max_in_flight": 1})
+        holder = limiter.acquire("p", "m")
+
+        async def run():
+            task = asyncio.ensure_future(limiter.aacquire("p", "m", timeout=5))
+            while not limiter._queues["p/m"]:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            deadline = time.time() + 1
+            while limiter._queues["p/m"]:
+                assert time.time() < deadline, "cancelled waiter is still queued"
+                await asyncio.sleep(0.001)
+
+        asyncio.run(run())
+        holder.release()
+        limiter.acquire("p", "m", timeout=0.1).release()
+        assert limiter.stats()["p/m"]["in_flight"] == 0
+
+    def test_permit_granted_after_cancel_is_released(self):
+        limiter = _limiter(default={"max_in_flight": 1})
+        entered, proceed = threading.Event(), threading.Event()
+        try_acquire = limiter.backend.try_acquire
+
+        def slow_try_acquire(*args):
+            entered.set()
+            proceed.wait(5)
+            return try_acquire(*args)
+
+        limiter.backend.try_acquire = slow_try_acquire
+
+        async def run():
+            task = asyncio.ensure_future(limiter.aacquire("p", "m", timeout=5))
+            while not entered.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            proceed.set()  # the worker is admitted after its caller gave up
+            deadline = time.time() + 5
+            while limiter.stats()["p/m"]["admitted"] < 1 or limiter.backend.in_flight("p/m"):
+                assert time.time() < deadline, "abandoned permit was never released"
+                await asyncio.sleep(0.001)
+
+        asyncio.run(run())
+        limiter.backend.try_acquire = try_acquire
+        assert limiter.stats()["p/m"]["in_flight"] == 0
+        limiter.acquire("p", "m", timeout=0.1).release()
+
+
+class TestRetryAfter:
+    def test_header_parsed_into_provider_error(self):
+        exc = Exception("Error code: 429 - rate_limit_error")
+        exc.response = MagicMock(headers={"retry-after": "7"})
+        err = _classify_provider_error(exc, "Anthropic")
+        assert err.error_code == "rate_limit"
+        assert err.retry_after == 7.0
+
+    def test_message_hint_parsed(self):
+        err = _classify_provider_error(Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '12s'}"), "Gemini")
+        assert err.retry_after == 12.0
+
+    def test_rate_limit_error_pauses_key(self):
+        limiter = _limiter(default={"rpm": 100})
+        inner = MockLLMProvider()
+        inner.generate = MagicMock(side_effect=ProviderError("slow down", error_code="rate_limit", retry_after=30))
+        provider = RateLimitedProvider(inner, limiter)
+        with pytest.raises(ProviderError):
+            provider.generate(["hi"])
+        with pytest.raises(ProviderError) as exc:
+            limiter.acquire("mock", "", timeout=0.05)
+        assert exc.value.retry_after == pytest.approx(30, abs=1)
+        assert limiter.stats()["mock"]["retry_after"] == 1
+
+    def test_orchestrator_prefers_retry_after(self):
+        assert _retry_delay(ProviderError("x", error_code="rate_limit", retry_after=3), 1) == 3
+        assert _retry_delay(ProviderError("x", error_code="rate_limit", retry_after=600), 1) == 60
+        assert _retry_delay(RuntimeError("x"), 2) == 4
+
+
+class TestSQLiteBackend:
+    def test_state_shared_between_limiters(self, limiter_path):
+        table = {"default": {"rpm": 1}}
+        worker_a = RateLimiter(SQLiteBackend(limiter_path), table)
+        worker_b = RateLimiter(SQLiteBackend(limiter_path), table)
+        worker_a.acquire("p", "m").release()
+        with pytest.raises(ProviderError):
+            worker_b.acquire("p", "m", timeout=0.05)
+
+    def test_in_flight_shared_and_released(self, limiter_path):
+        table = {"default": {"max_in_flight": 1}}
+        worker_a = RateLimiter(SQLiteBackend(limiter_path), table)
+        worker_b = RateLimiter(SQLiteBackend(limiter_path), table)
+        permit = worker_a.acquire("p", "m")
+        with pytest.raises(ProviderError):
+            worker_b.acquire("p", "m", timeout=0.1)
+        permit.release()
+        worker_b.acquire("p", "m", timeout=1).release()
+
+    def test_expired_leases_are_reclaimed(self, limiter_path):
+        backend = SQLiteBackend(limiter_path)
+        limits = {"max_in_flight": 1}
+        assert backend.try_acquire("k", limits, 0, 1000.0)[0] is not None
+        assert backend.try_acquire("k", limits, 0, 1001.0)[0] is None
+        assert backend.try_acquire("k", limits, 0, 1000.0 + 3600)[0] is not None
+
+
+class TestGetProviderWiring:
+    def test_disabled_by_default(self):
+        assert isinstance(get_provider({"llm": {"provider": "mock"}}), MockLLMProvider)
+
+    def test_enabled_wraps_provider(self):
+        config = {"llm": {"provider": "mock", "rate_limits": {"enabled": True, "default": {"rpm": 10}}}}
+        provider = get_provider(config)
+        assert isinstance(provider, RateLimitedProvider)
+        assert provider.generate(["Generate quiz questions"], json_mode=True)
+        assert provider.limiter is get_rate_limiter(config["llm"]["rate_limits"])
+        assert provider.limiter.stats()["mock"]["admitted"] == 1
+
+    def test_cache_wraps_outside_limiter(self, limiter_path):
+        from src.llm_cache import CachingProvider
+
+        config = {
+            "llm": {
+                "provider": "mock",
+                "rate_limits": {"enabled": True},
+                "cache": {"enabled": True, "path": limiter_path},
+            }
+        }
+        provider = get_provider(config)
+        assert isinstance(provider, CachingProvider)
+        assert isinstance(provider.inner, RateLimitedProvider)
+
+    def test_stats_endpoint(self, flask_client):
+        config = {"llm": {"provider": "mock", "rate_limits": {"enabled": True, "default": {"rpm": 10}}}}
+        get_provider(config).generate(["hello"])
+        resp = flask_client.get("/api/rate-limits")
+        assert resp.status_code == 200
+        assert resp.get_json()["mock"]["admitted"] == 1
+
+    def test_streaming_holds_one_admission(self):
+        limiter = _limiter(default={"max_in_flight": 1})
+        provider = RateLimitedProvider(MockLLMProvider(), limiter)
+        stream = provider.stream_generate(["Generate quiz questions"], json_mode=True)
+        next(stream)
+        assert limiter.backend.in_flight("mock") == 1
+        list(stream)
+        assert limiter.backend.in_flight("mock") == 0
@@ -0,0 +1,156 @@
+"""
+Tests for retrieval-based lesson content selection (src/retrieval.py).
+
+Verifies:
+- split_text() chunks on paragraph boundaries and cuts oversized paragraphs
+- ContentIndex ranks chunks with BM25, respects the token budget and keeps
+  library order, falling back to library order when nothing matches
+- build_content_index() indexes lessons (page by page when analysed) and the
+  class's lesson logs
+- select_lesson_context() expands standard codes with their descriptions,
+  gives the critic a tighter budget and can be disabled
+- The critic prompt uses critic_content_summary when present
+"""
+
+from datetime import date
+
+import pytest
+
+from src.agents import _critique_kwargs
+from src.database import Lesson, LessonLog, Standard
+from src.retrieval import ContentIndex, build_content_index, page_text, select_lesson_context, split_text, tokenize
+
+PHOTOSYNTHESIS = (
+    "Photosynthesis converts light energy into chemical energy. Chlorophyll in the chloroplast absorbs light."
+)
+VOLCANOES = "Volcanoes form where magma rises through the crust. Lava cools into igneous rock."
+FRACTIONS = "To add fractions with unlike denominators, find a common denominator first."
+
+
+def _filler(word, count):
+    return " ".join([word] * count)
+
+
+class TestTokenizeAndSplit:
+    def test_tokenize_drops_stopwords_keeps_codes(self):
+        assert tokenize("The SOL 7.1 standard and the cell") == ["sol", "7.1", "standard", "cell"]
+
+    def test_paragraphs_grouped_up_to_chunk_size(self):
+        text = "\n\n".join([_filler("alpha", 30), _filler("beta", 30), _filler("gamma", 30)])
+        chunks = split_text(text, chunk_words=60)
+        assert len(chunks) == 2
+        assert "beta" in chunks[0] and "gamma" in chunks[1]
+
+    def test_long_paragraph_cut_into_windows(self):
+        chunks = split_text(_filler("word", 250), chunk_words=100)
+        assert [len(c.split()) for c in chunks] == [100, 100, 50]
+
+    def test_page_text_includes_headings_and_diagrams(self):
+        page = {
+            "text_content": "Body text.",
+            "headings": ["The Water Cycle"],
+            "diagrams": [{"type": "diagram", "description": "Evaporation arrows", "caption": "Figure 1"}],
+        }
+        text = page_text(page)
+        assert "The Water Cycle" in text
+        assert "Evaporation arrows" in text
+        assert "Figure 1" in text
+
+
+class TestContentIndex:
+    def _index(self):
+        index = ContentIndex()
+        index.add_text("bio.pdf", PHOTOSYNTHESIS)
+        index.add_text("earth.pdf", VOLCANOES)
+        index.add_text("math.pdf", FRACTIONS)
+        return index
+
+    def test_search_ranks_matching_chunk_first(self):
+        results = self._index().search("volcanoes magma")
+        assert results[0][1].source == "earth.pdf"
+        assert len(results) == 1
+
+    def test_select_only_relevant_chunks(self):
+        chunks = self._index().select("photosynthesis chlorophyll", token_budget=1000)
+        assert [c.source for c in chunks] == ["bio.pdf"]
+
+    def test_select_respects_budget(self):
+        index = ContentIndex(chunk_words=50)
+        for i in range(10):
+            index.add_text(f"doc{i}", "cells " + _filler("membrane", 40))
+        chunks = index.select("cells", token_budget=200)
+        assert sum(c.tokens for c in chunks) <= 200
+        assert 0 < len(chunks) < 10
+
+    def test_selected_chunks_in_library_order(self):
+        index = self._index()
+        chunks = index.select("fractions photosynthesis chlorophyll light", token_budget=1000)
+        assert [c.source for c in chunks] == ["bio.pdf", "math.pdf"]
+
+    def test_no_match_falls_back_to_library_order(self):
+        chunks = self._index().select("", token_budget=1000)
+        assert [c.source for c in chunks] == ["bio.pdf", "earth.pdf", "math.pdf"]
+
+
+@pytest.fixture
+def session(db_session):
+    session, _ = db_session
+    return session
+
+
+class TestDatabaseSelection:
+    def _seed(self, session, sample_class):
+        cls = sample_class(session)
+        session.add(Lesson(source_file="bio.pdf", content=PHOTOSYNTHESIS))
+        session.add(
+            Lesson(
+                source_file="earth.pdf",
+                content=VOLCANOES,
+                page_data=[{"text_content": VOLCANOES, "headings": ["Plate Tectonics"], "diagrams": []}],
+            )
+        )
+        session.add(LessonLog(class_id=cls.id, date=date(2026, 1, 5), content=FRACTIONS, topics=["fractions"]))
+        session.add(
+            Standard(
+                standard_id="SOL 6.5",
+                code="SOL 6.5",
+                description="Fractions with unlike denominators",
+                subject="Mathematics",
+            )
+        )
+        session.commit()
+        return cls
+
+    def test_index_covers_lessons_pages_and_logs(self, session, sample_class):
+        cls = self._seed(session, sample_class)
+        sources = [c.source for c in build_content_index(session, cls.id).chunks]
+        assert sources == ["bio.pdf", "earth.pdf p.1", "Lesson log 2026-01-05"]
+        assert "Plate Tectonics" in build_content_index(session).chunks[1].text
+
+    def test_standard_code_expanded_with_description(self, session, sample_class):
+        cls = self._seed(session, sample_class)
+        result = select_lesson_context(session, {}, topics=[], standards=["SOL 6.5"], class_id=cls.id)
+        assert "common denominator" in result["content_summary"]
+        assert "Photosynthesis" not in result["content_summary"]
+        assert result["stats"]["chunks"] == 1
+        assert result["stats"]["total_chunks"] == 3
+
+    def test_critic_budget_is_tighter(self, session, sample_class):
+        cls = self._seed(session, sample_class)
+        config = {"retrieval": {"token_budget": 1000, "critic_token_budget": 30}}
+        result = select_lesson_context(session, config, topics=["photosynthesis", "volcanoes"], class_id=cls.id)
+        assert "Photosynthesis" in result["content_summary"]
+        assert "Volcanoes" in result["content_summary"]
+        assert len(result["critic_content_summary"]) < len(result["content_summary"])
+
+    def test_disabled(self, session):
+        assert select_lesson_context(session, {"retrieval": {"enabled": False}}, topics=["x"]) is None
+
+
+class TestCriticContent:
+    def test_critic_uses_its_own_selection(self):
+        kwargs = _critique_kwargs({"content_summary": "full", "critic_content_summary": "short"}, None)
+        assert kwargs["content_summary"] == "short"
+
+    def test_critic_defaults_to_generator_content(self):
+        assert _critique_kwargs({"content_summary": "full"}, None)["content_summary"] == "full"
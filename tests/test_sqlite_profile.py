@@ -0,0 +1,143 @@
+"""
+Tests for the SQLite production profile in src/database.py.
+
+Verifies:
+- get_engine() applies SQLITE_PRAGMAS (WAL, synchronous, busy_timeout,
+  mmap_size, cache_size) to every new connection
+- Pragma overrides, and that in-memory databases skip WAL
+- get_session() reuses the module-level SessionFactory
+- The documented gunicorn settings (4 workers x 4 threads) can write and
+  read one database concurrently without "database is locked" errors
+"""
+
+import multiprocessing
+import os
+import threading
+
+import pytest
+from sqlalchemy import text
+
+import src.database as database
+from src.database import Class, Quiz, get_engine, get_session, init_db
+
+# gunicorn.conf.py defaults
+WORKERS = 4
+THREADS = 4
+WRITES_PER_THREAD = 10
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "profile.db")
+
+
+class TestPragmas:
+    def test_profile_applied(self, db_path):
+        engine = get_engine(db_path)
+        try:
+            assert _pragma(engine, "journal_mode") == "wal"
+            assert _pragma(engine, "synchronous") == 1  # NORMAL
+            assert _pragma(engine, "busy_timeout") == 5000
+            assert _pragma(engine, "mmap_size") == 268435456
+            assert _pragma(engine, "cache_size") == -64000
+            assert _pragma(engine, "foreign_keys") == 0  # existing databases may hold orphan rows
+        finally:
+            engine.dispose()
+
+    def test_overrides(self, db_path):
+        engine = get_engine(db_path, pragmas={"busy_timeout": 100, "mmap_size": None, "foreign_keys": "ON"})
+        try:
+            assert _pragma(engine, "busy_timeout") == 100
+            assert _pragma(engine, "mmap_size") == 0
+            assert _pragma(engine, "foreign_keys") == 1
+            assert _pragma(engine, "journal_mode") == "wal"
+        finally:
+            engine.dispose()
+
+    def test_memory_database_skips_wal(self):
+        engine = get_engine(url="sqlite:///:memory:")
+        try:
+            assert _pragma(engine, "journal_mode") == "memory"
+            assert _pragma(engine, "cache_size") == -64000
+        finally:
+            engine.dispose()
+
+
+class TestSessionFactory:
+    def test_sessions_share_one_factory(self, db_path, monkeypatch):
+        built = []
+        monkeypatch.setattr(database, "sessionmaker", lambda *a, **kw: built.append(kw))
+        engine = get_engine(db_path)
+        try:
+            first, second = get_session(engine), get_session(engine)
+            assert first is not second
+            assert first.get_bind() is engine
+            assert built == []
+            first.close()
+            second.close()
+        finally:
+            engine.dispose()
+
+
+def _worker(db_path, worker_id, errors):
+    """One gunicorn-style worker: its own engine, THREADS threads writing and reading."""
+    engine = get_engine(db_path)
+
+    def handle_requests(thread_id):
+        for i in range(WRITES_PER_THREAD):
+            session = get_session(engine)
+            try:
+                cls = session.query(Class).first()
+                session.add(Quiz(title=f"w{worker_id}-t{thread_id}-{i}", class_id=cls.id, status="generated"))
+                session.commit()
+                session.query(Quiz).filter_by(class_id=cls.id).count()
+            except Exception as e:
+                errors.put(f"{type(e).__name__}: {e}")
+                session.rollback()
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=handle_requests, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="forks worker processes like gunicorn")
+def test_documented_workers_write_concurrently(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    session = get_session(engine)
+    session.add(Class(name="Concurrency", grade_level="7th Grade", subject="Science"))
+    session.commit()
+    session.close()
+    engine.dispose()
+
+    ctx = multiprocessing.get_context("fork")
+    errors = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(db_path, w, errors)) for w in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+
+    failures = []
+    while not errors.empty():
+        failures.append(errors.get())
+    assert failures == []
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    engine = get_engine(db_path)
+    session = get_session(engine)
+    try:
+        assert session.query(Quiz).count() == WORKERS * THREADS * WRITES_PER_THREAD
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,216 @@
+"""
+Tests for full-text standards search (standards_fts).
+
+Verifies:
+- search_standards() ranks matches, puts an exact code match first and
+  matches word prefixes
+- The index follows bulk_import_standards(), import_from_source_document()
+  and deletes
+- The search uses the FTS5 index instead of scanning standards
+- /api/standards/search returns escaped, highlighted code and description
+- Migration 020 and init_db() build the index for existing databases, and
+  search falls back to LIKE matching without it
+- Without FTS5 a missing index does not make every startup re-run migrations
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import text
+
+import src.migrations as migrations
+from src.database import SourceDocument, get_engine, get_session, init_db
+from src.migrations import check_if_migration_needed, run_migrations
+from src.source_documents import import_from_source_document
+from src.standards import (
+    bulk_import_standards,
+    count_search_results,
+    delete_standard,
+    get_standard_by_code,
+    highlight_search_terms,
+    search_standards,
+)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+STANDARDS = [
+    {
+        "code": "SOL LS.4",
+        "description": "Photosynthesis and energy flow in ecosystems",
+        "subject": "Science",
+        "grade_band": "6-8",
+        "strand": "Living Systems",
+        "full_text": "The student will investigate how plants convert light energy.",
+    },
+    {
+        "code": "SOL LS.10",
+        "description": "Organisms change over time",
+        "subject": "Science",
+        "grade_band": "6-8",
+        "strand": "Living Systems",
+        "full_text": "The student will investigate adaptations, referring back to SOL LS.4.",
+    },
+    {
+        "code": "SOL 7.2",
+        "description": "Solve problems with rational numbers",
+        "subject": "Mathematics",
+        "grade_band": "6-8",
+        "strand": "Computation and Estimation",
+        "full_text": "The student will solve practical problems involving <operations> & rational numbers.",
+    },
+]
+
+
+def _seed(session):
+    bulk_import_standards(session, [dict(item) for item in STANDARDS])
+
+
+def _codes(results):
+    return [s.code for s in results]
+
+
+class TestSearch:
+    def test_prefix_and_ranking(self, db_session):
+        session, _ = db_session
+        _seed(session)
+        assert _codes(search_standards(session, "photo")) == ["SOL LS.4"]
+        assert _codes(search_standards(session, "ration num")) == ["SOL 7.2"]
+        # Exact code first, then the standard that only cites it in full text
+        assert _codes(search_standards(session, "SOL LS.4")) == ["SOL LS.4", "SOL LS.10"]
+        assert _codes(search_standards(session, "ls.1")) == ["SOL LS.10"]
+
+    def test_filters_limit_and_count(self, db_session):
+        session, _ = db_session
+        _seed(session)
+        assert len(search_standards(session, "investigate", subject="Science", limit=1)) == 1
+        assert search_standards(session, "investigate", subject="Mathematics") == []
+        assert count_search_results(session, "the student") == 3
+        assert count_search_results(session, "student", subject="Mathematics") == 1
+        assert search_standards(session, "-") == []
+        assert len(search_standards(session, "", grade_band="6-8")) == 3
+
+    def test_index_follows_imports_and_deletes(self, db_session):
+        session, _ = db_session
+        _seed(session)
+        assert search_standards(session, "chlorophyll") == []
+
+        doc = SourceDocument(
+            filename="ls.pdf", title="LS", standard_set="sol", file_hash="h", page_count=1, created_at=datetime.utcnow()
+        )
+        session.add(doc)
+        session.commit()
+        parsed = [{"code": "SOL LS.4", "page": 1, "essential_knowledge": ["Chlorophyll absorbs light"]}]
+        assert import_from_source_document(session, doc.id, parsed) == 1
+        assert _codes(search_standards(session, "chlorophyll")) == ["SOL LS.4"]
+
+        bulk_import_standards(session, [dict(STANDARDS[0], essential_skills=["Graph stomata counts"])])
+        assert _codes(search_standards(session, "stomata")) == ["SOL LS.4"]
+
+        delete_standard(session, get_standard_by_code(session, "SOL LS.4").id)
+        assert _codes(search_standards(session, "photosynthesis")) == []
+
+    def test_uses_fts_index(self, db_session, assert_max_queries):
+        session, _ = db_session
+        _seed(session)
+        engine = session.get_bind()
+        with assert_max_queries(engine, 2) as statements:
+            search_standards(session, "rational", subject="Mathematics")
+        sql = statements[-1]
+        assert "MATCH" in sql and "LIKE" not in sql.upper()
+
+
+class TestApi:
+    def test_results_are_ranked_and_highlighted(self, make_flask_app):
+        app = make_flask_app(seed_fn=_seed)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["logged_in"] = True
+            sess["username"] = "teacher"
+
+        data = client.get("/api/standards/search?q=rational").get_json()
+        assert data["total"] == 1
+        assert data["truncated"] is False
+        result = data["results"][0]
+        assert result["code"] == "SOL 7.2"
+        assert result["highlight"] == {
+            "code": "SOL 7.2",
+            "description": "Solve problems with <mark>rational</mark> numbers",
+        }
+
+    def test_highlight_escapes_html(self):
+        assert highlight_search_terms("<b>Ratios</b> & rates", "rat") == (
+            "&lt;b&gt;<mark>Ratios</mark>&lt;/b&gt; &amp; <mark>rates</mark>"
+        )
+        assert highlight_search_terms(None, "rat") == ""
+
+
+def _seed_db(db_path):
+    engine = get_engine(db_path)
+    init_db(engine)
+    session = get_session(engine)
+    _seed(session)
+    session.close()
+    return engine
+
+
+def _drop_index(db_path):
+    conn = sqlite3.connect(db_path)
+    for name in ("standards_fts_insert", "standards_fts_update", "standards_fts_delete"):
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE standards_fts")
+    conn.commit()
+    conn.close()
+
+
+def test_migration_builds_index(db_path):
+    _seed_db(db_path).dispose()
+    _drop_index(db_path)
+
+    assert check_if_migration_needed(db_path) is True
+    assert run_migrations(db_path, MIGRATIONS_DIR, verbose=False) is True
+    engine = get_engine(db_path)
+    session = get_session(engine)
+    try:
+        assert _codes(search_standards(session, "photo")) == ["SOL LS.4"]
+        bulk_import_standards(session, [dict(STANDARDS[0], code="SOL LS.5", description="Cellular respiration")])
+        assert _codes(search_standards(session, "respiration")) == ["SOL LS.5"]
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_missing_index_without_fts5_needs_no_migration(db_path, monkeypatch):
+    _seed_db(db_path).dispose()
+    run_migrations(db_path, MIGRATIONS_DIR, verbose=False)
+    _drop_index(db_path)
+    conn = sqlite3.connect(db_path)
+    assert migrations._sqlite_has_fts5(conn.cursor()) is True
+    conn.close()
+
+    monkeypatch.setattr(migrations, "_sqlite_has_fts5", lambda cursor: False)
+    assert check_if_migration_needed(db_path) is False
+
+
+def test_init_db_builds_index(db_path):
+    engine = _seed_db(db_path)
+    _drop_index(db_path)
+    init_db(engine)
+    session = get_session(engine)
+    try:
+        assert _codes(search_standards(session, "photo")) == ["SOL LS.4"]
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_like_fallback_without_index(db_path):
+    engine = _seed_db(db_path)
+    _drop_index(db_path)
+    session = get_session(engine)
+    try:
+        assert session.execute(text("SELECT count(*) FROM standards")).scalar() == 3
+        assert _codes(search_standards(session, "rational numbers")) == ["SOL 7.2"]
+    finally:
+        session.close()
+        engine.dispose()
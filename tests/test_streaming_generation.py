@@ -0,0 +1,225 @@
+"""
+Tests for streamed quiz generation.
+
+Verifies:
+- IncrementalArrayParser yields each object as soon as it closes, across chunk
+  boundaries, and ignores fences/prose and braces inside strings
+- Providers expose stream_generate() (mock chunks, ABC default for custom providers)
+- GeneratorAgent.generate_stream() yields normalized questions from the stream
+- Orchestrator.run(on_event=...) reports question, verdict and status events
+- POST /classes/<id>/generate/stream returns server-sent events ending in done/error
+- The stream runs on the bounded job queue and a disconnect cancels the pipeline
+"""
+
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from src.agents import GeneratorAgent, Orchestrator
+from src.database import GenerationJob, Quiz, get_session
+from src.jobs import JobError, JobQueueFull
+from src.json_extraction import IncrementalArrayParser
+from src.llm_provider import LLMProvider, MockLLMProvider, ProviderError
+from src.quiz_generator import generate_quiz
+from src.web.blueprints.quizzes import _parse_generate_form, _quiz_job
+
+
+def _parse_sse(body):
+    """Split an SSE body into (event, payload) tuples, skipping comments."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event, data = None, ""
+        for line in frame.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+            elif line.startswith("data: "):
+                data += line[len("data: ") :]
+        if event:
+            events.append((event, json.loads(data)))
+    return events
+
+
+class TestIncrementalArrayParser:
+    def test_objects_yielded_as_they_close(self):
+        parser = IncrementalArrayParser()
+        assert parser.feed('[{"text": "Q1"}, {"te') == [{"text": "Q1"}]
+        assert parser.feed('xt": "Q2"}') == [{"text": "Q2"}]
+        assert not parser.finished
+        assert parser.feed("]") == []
+        assert parser.finished
+
+    def test_ignores_fences_and_prose(self):
+        parser = IncrementalArrayParser()
+        out = parser.feed('Here you go:\n```json\n[{"a": 1}]\n```')
+        assert out == [{"a": 1}]
+
+    def test_braces_inside_strings(self):
+        parser = IncrementalArrayParser()
+        text = '[{"text": "Solve {x} when \\"]\\" appears", "options": ["{", "}"]}]'
+        out = []
+        for ch in text:
+            out.extend(parser.feed(ch))
+        assert out == [{"text": 'Solve {x} when "]" appears', "options": ["{", "}"]}]
+
+    def test_malformed_object_skipped(self):
+        parser = IncrementalArrayParser()
+        out = parser.feed('[{"a": 1,}, {"b": 2}]')
+        assert out == [{"b": 2}]
+        assert parser.skipped == 1
+        assert parser.parsed == 1
+
+
+class TestProviderStreaming:
+    def test_mock_streams_in_chunks(self):
+        provider = MockLLMProvider()
+        provider.stream_chunk_chars = 10
+        chunks = list(provider.stream_generate(["Generate quiz questions"], json_mode=True))
+        assert len(chunks) > 1
+        assert all(len(c) <= 10 for c in chunks)
+        assert json.loads("".join(chunks))
+
+    def test_default_stream_yields_whole_response(self):
+        class EchoProvider(LLMProvider):
+            def generate(self, prompt_parts, json_mode=False):
+                return "|".join(prompt_parts)
+
+            def prepare_image_context(self, image_path):
+                return image_path
+
+        assert list(EchoProvider().stream_generate(["a", "b"])) == ["a|b"]
+
+
+class TestGeneratorStream:
+    def test_yields_normalized_questions(self):
+        provider = MagicMock()
+        provider.stream_generate.return_value = iter(
+            ['[{"question": "What is 2+2?", "type": "multiple_choice", ', '"options": ["3", "4"], "answer": "4"}', "]"]
+        )
+        agent = GeneratorAgent({}, provider=provider)
+        questions = list(agent.generate_stream({"content_summary": "math", "num_questions": 1}))
+        assert len(questions) == 1
+        assert questions[0]["text"] == "What is 2+2?"
+        assert questions[0]["correct_answer"] == "4"
+        assert questions[0]["correct_index"] == 1
+        assert provider.stream_generate.call_args.kwargs["json_mode"] is True
+
+    def test_stream_matches_generate(self):
+        response = '```json\n[{"question_text": "A?", "options": {"A": "x", "B": "y"}, "answer": "B"}]\n```'
+        provider = MagicMock()
+        provider.generate.return_value = response
+        provider.stream_generate.side_effect = lambda parts, json_mode=False: iter([response[:20], response[20:]])
+        agent = GeneratorAgent({}, provider=provider)
+        context = {"content_summary": "letters", "num_questions": 1}
+        assert list(agent.generate_stream(context)) == agent.generate(context)
+
+
+class TestOrchestratorEvents:
+    def test_events_reported(self):
+        events = []
+        orch = Orchestrator({"llm": {"provider": "mock"}, "agent_loop": {"max_retries": 1}}, web_mode=True)
+        questions, _ = orch.run(
+            {"content_summary": "cells", "num_questions": 3, "grade_level": "7th Grade"},
+            on_event=lambda event, payload: events.append((event, payload)),
+        )
+        names = [e for e, _ in events]
+        assert "question" in names
+        assert "verdict" in names
+        stages = [p["stage"] for e, p in events if e == "status"]
+        assert stages[:2] == ["generating", "critiquing"]
+        assert names.index("question") < names.index("verdict")
+        assert questions
+
+    def test_callback_errors_do_not_break_run(self):
+        def boom(event, payload):
+            raise RuntimeError("listener gone")
+
+        orch = Orchestrator({"llm": {"provider": "mock"}, "agent_loop": {"max_retries": 1}}, web_mode=True)
+        questions, _ = orch.run({"content_summary": "cells", "num_questions": 2}, on_event=boom)
+        assert questions
+
+    def test_without_callback_uses_blocking_generate(self):
+        orch = Orchestrator({"llm": {"provider": "mock"}, "agent_loop": {"max_retries": 1}}, web_mode=True)
+        with patch.object(GeneratorAgent, "generate_stream") as mock_stream:
+            orch.run({"content_summary": "cells", "num_questions": 2})
+        mock_stream.assert_not_called()
+
+
+class TestStreamEndpoint:
+    def test_streams_events_and_creates_quiz(self, flask_client):
+        resp = flask_client.post("/classes/1/generate/stream", data={"num_questions": "3", "grade_level": "7th Grade"})
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/event-stream"
+        events = _parse_sse(resp.get_data(as_text=True))
+        names = [e for e, _ in events]
+        assert names[0] == "status"
+        assert "question" in names
+        assert names[-1] == "done"
+        done = events[-1][1]
+        assert done["redirect"] == f"/quizzes/{done['quiz_id']}"
+        assert flask_client.get(done["redirect"]).status_code == 200
+
+    def test_provider_error_becomes_error_event(self, flask_client):
+        err = ProviderError("Provider is not configured.", error_code="auth")
+        with patch("src.web.blueprints.quizzes.generate_quiz", side_effect=err):
+            resp = flask_client.post("/classes/1/generate/stream", data={})
+            events = _parse_sse(resp.get_data(as_text=True))
+        assert events[-1] == ("error", {"message": "Provider is not configured."})
+
+    def test_unknown_class_404(self, flask_client):
+        assert flask_client.post("/classes/999/generate/stream", data={}).status_code == 404
+
+    def test_requires_login(self, anon_flask_client):
+        resp = anon_flask_client.post("/classes/1/generate/stream", data={})
+        assert resp.status_code in (302, 303)
+
+    def test_runs_on_job_queue(self, flask_app, flask_client):
+        resp = flask_client.post("/classes/1/generate/stream", data={"num_questions": "2"})
+        done = _parse_sse(resp.get_data(as_text=True))[-1][1]
+        flask_app.config["JOB_QUEUE"].shutdown(wait=True)
+        session = get_session(flask_app.config["DB_ENGINE"])
+        try:
+            job = session.query(GenerationJob).one()
+            assert job.kind == "quiz"
+            assert job.result["quiz_id"] == done["quiz_id"]
+        finally:
+            session.close()
+
+    def test_queue_full_returns_503(self, flask_app, flask_client):
+        with patch.object(flask_app.config["JOB_QUEUE"], "submit", side_effect=JobQueueFull("full")):
+            resp = flask_client.post("/classes/1/generate/stream", data={})
+        assert resp.status_code == 503
+        assert resp.get_json()["ok"] is False
+
+    def test_cancelled_job_stops_pipeline(self, flask_app):
+        cancelled = threading.Event()
+        cancelled.set()
+        events = []
+        config = flask_app.config["APP_CONFIG"]
+        params = _parse_generate_form(MultiDict({"num_questions": "3"}))
+        run = _quiz_job(1, config, params, listener=lambda *event: events.append(event), cancelled=cancelled)
+        session = get_session(flask_app.config["DB_ENGINE"])
+        try:
+            with patch.object(GeneratorAgent, "generate_stream") as mock_stream:
+                with pytest.raises(JobError, match="cancelled"):
+                    run(session, MagicMock())
+            mock_stream.assert_not_called()
+            assert events == []
+            assert session.query(Quiz).order_by(Quiz.id.desc()).first().status == "failed"
+        finally:
+            session.close()
+
+
+def test_generate_quiz_forwards_on_event(db_session, mock_config, sample_class):
+    session, _ = db_session
+    cls = sample_class(session)
+
+    def on_event(event, payload):
+        pass
+
+    with patch("src.quiz_generator.run_agentic_pipeline", return_value=([], {})) as mock_pipeline:
+        generate_quiz(session, class_id=cls.id, config=mock_config)
+        generate_quiz(session, class_id=cls.id, config=mock_config, on_event=on_event)
+    assert [c.kwargs["on_event"] for c in mock_pipeline.call_args_list] == [None, on_event]
@@ -112,22 +112,16 @@ def tmp_config():
 
 
 @pytest.fixture()
-def tmp_cost_log():
+def tmp_cost_log(tmp_path):
     """
     Provide a temporary cost log file.
 
-    Yields the file path. The file is removed after the test.
+    Returns the file path. It lives under tmp_path, so the log and its
+    cost ledger side-file are removed with the test's directory.
     """
-    tmp = tempfile.NamedTemporaryFile(suffix=".log", delete=False, mode="w", encoding="utf-8")
-    tmp.close()
-
-    yield tmp.name
-
-    try:
-        if os.path.exists(tmp.name):
-            os.remove(tmp.name)
-    except OSError:
-        pass
+    path = tmp_path / "api_costs.log"
+    path.touch()
+    return str(path)
 
 
 # ---------------------------------------------------------------------------
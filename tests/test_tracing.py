@@ -0,0 +1,124 @@
+"""
+Tests for pipeline span tracing (src/tracing.py).
+
+Verifies:
+- Spans nest, record attributes and errors, and are no-ops without a trace
+- Spans opened in worker threads with a copied context join the trace
+- Chrome trace-event export and the compact summary
+- The agentic pipeline and generate_quiz attach a trace summary to metadata
+"""
+
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.agents import run_agentic_pipeline
+from src.classroom import create_class
+from src.quiz_generator import generate_quiz
+from src.tracing import current_tracer, start_trace, trace_span
+
+
+class TestSpans:
+    def test_no_trace_is_noop(self):
+        assert current_tracer() is None
+        with trace_span("anything", x=1) as span:
+            assert span is None
+
+    def test_nested_spans_and_attributes(self):
+        with start_trace("test") as tracer:
+            with trace_span("outer", a=1) as outer:
+                with trace_span("inner") as inner:
+                    inner.set(b=2)
+        assert [s.name for s in tracer.spans] == ["outer", "inner"]
+        assert inner.parent is outer
+        assert outer.attrs == {"a": 1}
+        assert inner.attrs == {"b": 2}
+        assert outer.duration() >= inner.duration() >= 0
+        assert current_tracer() is None
+
+    def test_error_recorded(self):
+        with start_trace() as tracer:
+            with pytest.raises(ValueError):
+                with trace_span("boom"):
+                    raise ValueError("x")
+        assert tracer.spans[0].attrs["error"] == "ValueError"
+        assert tracer.spans[0].end is not None
+
+    def test_nested_start_trace_reuses_outer(self):
+        with start_trace("outer") as outer:
+            with start_trace("inner") as inner:
+                assert inner is outer
+
+    def test_worker_thread_spans_join_trace(self):
+        with start_trace() as tracer:
+            with trace_span("parent") as parent:
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    futures = [pool.submit(contextvars.copy_context().run, _traced_work, f"child{i}") for i in range(2)]
+                    [f.result() for f in futures]
+        children = [s for s in tracer.spans if s.name.startswith("child")]
+        assert len(children) == 2
+        assert all(s.parent is parent for s in children)
+
+
+def _traced_work(name):
+    with trace_span(name):
+        pass
+
+
+class TestExport:
+    def test_chrome_trace_format(self, tmp_path):
+        with start_trace("demo") as tracer:
+            with trace_span("generator.llm_call", provider="mock", obj=object()):
+                pass
+        trace = tracer.to_chrome_trace()
+        complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        assert complete[0]["name"] == "generator.llm_call"
+        assert complete[0]["cat"] == "generator"
+        assert complete[0]["dur"] >= 0
+        assert complete[0]["args"]["provider"] == "mock"
+        assert isinstance(complete[0]["args"]["obj"], str)
+        assert any(e["ph"] == "M" for e in trace["traceEvents"])
+
+        path = tracer.export(str(tmp_path), "run1")
+        assert path.endswith("-run1.json")
+        with open(path) as f:
+            assert json.load(f)["traceEvents"]
+
+    def test_summary_totals(self):
+        with start_trace() as tracer:
+            for _ in range(3):
+                with trace_span("critic.critique"):
+                    pass
+        summary = tracer.summary()
+        assert summary["spans"]["critic.critique"]["count"] == 3
+        assert summary["total_ms"] >= summary["spans"]["critic.critique"]["total_ms"]
+
+
+class TestPipelineTracing:
+    def test_pipeline_metadata_has_trace(self, tmp_path):
+        config = {
+            "llm": {"provider": "mock"},
+            "agent_loop": {"max_retries": 1},
+            "tracing": {"export_dir": str(tmp_path)},
+        }
+        _, metadata = run_agentic_pipeline(config, {"content_summary": "cells", "num_questions": 3}, web_mode=True)
+        spans = metadata["trace"]["spans"]
+        for name in ("run_agentic_pipeline", "orchestrator.run", "generator.generate", "generator.llm_call"):
+            assert name in spans
+        assert os.path.exists(metadata["trace_file"])
+
+    def test_generate_quiz_traces_persistence(self, db_session, mock_config, tmp_path):
+        session, _ = db_session
+        cls = create_class(session, name="Trace Class", grade_level="7th Grade")
+        mock_config["tracing"] = {"export_dir": str(tmp_path)}
+        quiz = generate_quiz(session, cls.id, mock_config, num_questions=3)
+        assert quiz is not None
+        trace = json.loads(quiz.generation_metadata)["trace"]
+        assert "persist_quiz" in trace["spans"]
+        assert "run_agentic_pipeline" in trace["spans"]
+        assert "trace_file" not in json.loads(quiz.generation_metadata)
+        files = os.listdir(tmp_path)
+        assert files == [f for f in files if f.endswith(f"-quiz{quiz.id}.json")] and len(files) == 1
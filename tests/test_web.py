@@ -13,7 +13,7 @@ from datetime import date
 import pytest
 
 # Import database models for test setup
-from src.database import Base, Class, LessonLog, Question, Quiz, get_engine, get_session
+from src.database import Base, Class, ClassTopicKnowledge, LessonLog, Question, Quiz, get_engine, get_session
 
 
 @pytest.fixture
@@ -33,14 +33,7 @@ def app():
         grade_level="7th Grade",
         subject="Science",
         standards=json.dumps(["SOL 7.1"]),
-        config=json.dumps(
-            {
-                "assumed_knowledge": {
-                    "photosynthesis": {"depth": 3, "last_taught": "2026-02-01", "mention_count": 3},
-                    "cell division": {"depth": 1, "last_taught": "2026-02-05", "mention_count": 1},
-                }
-            }
-        ),
+        config=json.dumps({}),
     )
     block_a = Class(
         name="7th Grade Science - Block A",
@@ -53,6 +46,26 @@ def app():
     session.add(block_a)
     session.commit()
 
+    session.add_all(
+        [
+            ClassTopicKnowledge(
+                class_id=legacy_class.id,
+                topic="photosynthesis",
+                depth=3,
+                last_taught=date(2026, 2, 1),
+                mention_count=3,
+            ),
+            ClassTopicKnowledge(
+                class_id=legacy_class.id,
+                topic="cell division",
+                depth=1,
+                last_taught=date(2026, 2, 5),
+                mention_count=1,
+            ),
+        ]
+    )
+    session.commit()
+
     # Add lesson logs for the legacy class across multiple days
     lesson1 = LessonLog(
         class_id=legacy_class.id,
@@ -15,6 +15,7 @@ import pytest
 from src.database import (
     Base,
     Class,
+    ClassTopicKnowledge,
     PerformanceData,
     Question,
     Quiz,
@@ -37,16 +38,16 @@ def app():
         grade_level="7th Grade",
         subject="Science",
         standards=json.dumps(["SOL 7.1"]),
-        config=json.dumps(
-            {
-                "assumed_knowledge": {
-                    "photosynthesis": {"depth": 2, "last_taught": "2025-03-01", "mention_count": 2},
-                }
-            }
-        ),
+        config=json.dumps({}),
     )
     session.add(cls)
     session.commit()
+    session.add(
+        ClassTopicKnowledge(
+            class_id=cls.id, topic="photosynthesis", depth=2, last_taught=date(2025, 3, 1), mention_count=2
+        )
+    )
+    session.commit()
 
     # A quiz with questions
     quiz = Quiz(